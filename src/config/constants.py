@@ -7,8 +7,91 @@ COMPANY_NAME = "Syntra for Business Solutions"
 
 # Encryption constants
 SALT_SIZE = 16
+FILE_NONCE_SIZE = 16  # Per-file HKDF salt (format version 3)
+KEY_CHECK_SIZE = 16  # Header key-check value (format version 3)
+DATA_KEY_SIZE = 32  # Random frame key of envelope files (format version 4)
+WRAPPED_KEY_SIZE = 40  # RFC 3394 AES key wrap of the data key
 PBKDF2_ITERATIONS = 100000
-CHUNK_SIZE = 64 * 1024  # 64KB chunks for large files
+
+# Password KDF cost defaults for new files (format version 3); the
+# parameters are stored in each file's header, so they can change freely.
+# Memory costs are in KiB; scrypt uses r=8, so its N equals its memory cost
+ARGON2_TIME_COST = 3
+ARGON2_MEMORY_COST = 64 * 1024  # 64MB
+ARGON2_PARALLELISM = 4
+SCRYPT_MEMORY_COST = 128 * 1024  # N = 2**17, 128MB
+SCRYPT_PARALLELISM = 1
+# KDF calibration: target unlock times per profile and the cost floors a
+# slow machine is never calibrated below
+KDF_INTERACTIVE_TARGET = 0.25  # Seconds
+KDF_ARCHIVAL_TARGET = 1.0  # Seconds
+KDF_MIN_MEMORY_COST = 16 * 1024  # 16MB
+KDF_MIN_PBKDF2_ITERATIONS = PBKDF2_ITERATIONS
+KDF_CALIBRATION_FILE = "kdf_calibration.json"
+# Environment variable selecting a KDF profile for default parameters;
+# "test" gives near-zero costs for test suites
+KDF_PROFILE_ENV = "ENTRYPTOR_KDF_PROFILE"
+# Upper bounds accepted from headers, so a crafted file cannot exhaust memory
+MAX_KDF_TIME_COST = 10_000_000
+MAX_KDF_MEMORY_COST = 4 * 1024 * 1024  # 4GB
+MAX_KDF_PARALLELISM = 255
+
+# Session key cache: password-derived master keys are reused for this long
+KEY_CACHE_TTL = 300.0  # Seconds
+KEY_CACHE_MAX_ENTRIES = 16
+CHUNK_SIZE = 64 * 1024  # 64KB chunks; format version 2 and streamed files
+
+# Adaptive chunk size (format version 3): a power of two between the limits,
+# aiming for about TARGET_CHUNK_COUNT chunks per file
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+TARGET_CHUNK_COUNT = 1024
+AUTO_CHUNK_SIZE = 0  # Settings value for per-file selection
+
+# Encrypted file format versions
+FORMAT_VERSION = 4  # Binary container; a random data key wrapped in the header
+DIRECT_KEY_FORMAT_VERSION = 3  # Binary container keyed by the credential itself
+LEGACY_FORMAT_VERSION = 2  # JSON metadata with Fernet frames
+
+# Cipher auto-selection: ChaCha20-Poly1305 must beat AES-GCM by this factor
+CIPHER_BENCHMARK_SIZE = 256 * 1024
+CIPHER_BENCHMARK_ROUNDS = 4
+CIPHER_SELECTION_MARGIN = 1.25
+
+# Per-chunk compression (format version 3): chunks whose sampled byte
+# entropy reaches the threshold (bits per byte) are stored uncompressed
+COMPRESSION_SAMPLE_SIZE = 1024  # Bytes per entropy sample
+COMPRESSION_SAMPLES = 4  # Samples spread over each chunk
+COMPRESSION_ENTROPY_THRESHOLD = 7.5
+ZLIB_COMPRESSION_LEVEL = 6
+LZMA_COMPRESSION_PRESET = 6
+ZSTD_COMPRESSION_LEVEL = 3
+
+# Parallel processing constants
+DEFAULT_WORKER_COUNT = 0  # 0 = one worker process per CPU core
+PARALLEL_BATCH_CHUNKS = 16  # Chunks sent to a worker per task (1MB at 64KB)
+PARALLEL_MIN_FILE_SIZE = 4 * 1024 * 1024  # Smaller files are processed serially
+PIPELINE_IN_FLIGHT_CHUNKS = 128  # CHUNK_SIZE units buffered by the pipeline (8MB)
+
+# Random-access reader constants
+READER_CACHE_SIZE = 1024 * 1024  # Decrypted chunks kept per reader, in bytes
+READER_INDEX_CACHE_ENTRIES = 32  # Scanned frame indexes kept per process
+
+# Inventory scanner constants
+INVENTORY_WORKERS = 16  # Header reads in flight; I/O bound, so above core count
+INVENTORY_QUEUE_SIZE = 1024  # Paths and results buffered between scan stages
+INVENTORY_PROGRESS_INTERVAL = 10000  # Files between progress reports
+
+# Progress reporting of encrypt/decrypt calls
+PROGRESS_INTERVAL = 0.1  # Minimum seconds between progress callbacks
+# Environment variable naming a directory; when set, every encrypt, decrypt
+# and verify call runs under cProfile and dumps a .pstats file there
+PROFILE_DIR_ENV = "ENTRYPTOR_PROFILE_DIR"
+
+# Resumable encryption
+CHECKPOINT_INTERVAL = 256 * 1024 * 1024  # Output bytes between checkpoints
+PARTIAL_SUFFIX = ".partial"  # Output of a resumable call until it completes
+CHECKPOINT_SUFFIX = ".checkpoint"  # Sidecar recording the last durable chunk
 
 # File extensions
 ENCRYPTED_EXTENSION = ".enc"
@@ -17,3 +100,11 @@ KEYFILE_EXTENSION = ".key"
 # Settings keys
 SETTINGS_ENCRYPTION_MODE = "encryption_mode"
 SETTINGS_EXTENSION_OPTION = "extension_option"
+SETTINGS_WORKER_COUNT = "worker_count"
+SETTINGS_CIPHER = "cipher"
+SETTINGS_IN_FLIGHT_CHUNKS = "in_flight_chunks"
+SETTINGS_CHUNK_SIZE = "chunk_size"
+SETTINGS_KDF = "kdf"
+SETTINGS_KDF_PROFILE = "kdf_profile"
+SETTINGS_COMPRESSION = "compression"
+SETTINGS_FSYNC_POLICY = "fsync_policy"
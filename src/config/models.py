@@ -1,8 +1,15 @@
 """Data models for Entryptor."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
+
+from .constants import (
+    AUTO_CHUNK_SIZE,
+    CHUNK_SIZE,
+    DEFAULT_WORKER_COUNT,
+    PIPELINE_IN_FLIGHT_CHUNKS,
+)
 
 
 class EncryptionMode(Enum):
@@ -12,6 +19,59 @@ class EncryptionMode(Enum):
     KEYFILE = "keyfile"
 
 
+class CipherAlgorithm(Enum):
+    """AEAD cipher options for format version 3 files."""
+
+    AUTO = "auto"  # Fastest cipher on this machine
+    AES_256_GCM = "aes-256-gcm"
+    CHACHA20_POLY1305 = "chacha20-poly1305"
+
+
+class KdfAlgorithm(Enum):
+    """Password key derivation functions for format version 3 files."""
+
+    AUTO = "auto"  # Argon2id when available, otherwise scrypt
+    PBKDF2 = "pbkdf2-sha256"
+    SCRYPT = "scrypt"
+    ARGON2ID = "argon2id"
+
+
+class CompressionCodec(Enum):
+    """Per-chunk compression options for format version 3 files."""
+
+    NONE = "none"
+    AUTO = "auto"  # Zstandard when available, otherwise zlib
+    ZLIB = "zlib"
+    LZMA = "lzma"
+    ZSTD = "zstd"  # Requires the zstandard package
+
+
+class KdfProfile(Enum):
+    """Target unlock latency used to calibrate password KDF costs."""
+
+    INTERACTIVE = "interactive"  # About KDF_INTERACTIVE_TARGET seconds
+    ARCHIVAL = "archival"  # About KDF_ARCHIVAL_TARGET seconds
+    TEST = "test"  # Minimal costs for test suites; not for real data
+
+
+class OperationStage(Enum):
+    """Stages reported to progress callbacks of encrypt/decrypt calls."""
+
+    DERIVING_KEY = "deriving_key"
+    ENCRYPTING = "encrypting"
+    DECRYPTING = "decrypting"
+    VERIFYING = "verifying"
+    FINISHED = "finished"
+
+
+class FsyncPolicy(Enum):
+    """Durability of encrypt/decrypt outputs before they replace the target."""
+
+    NONE = "none"  # Rely on the OS to flush; fastest
+    FILE = "file"  # fsync the output file before the rename
+    FILE_AND_DIRECTORY = "file_and_directory"  # Also fsync the rename itself
+
+
 class ExtensionOption(Enum):
     """File extension preservation options."""
 
@@ -25,6 +85,14 @@ class AppSettings:
 
     encryption_mode: EncryptionMode
     extension_option: ExtensionOption
+    worker_count: int = DEFAULT_WORKER_COUNT  # 0 = one worker per CPU core
+    cipher: CipherAlgorithm = CipherAlgorithm.AUTO
+    in_flight_chunks: int = PIPELINE_IN_FLIGHT_CHUNKS  # Pipeline buffering cap
+    chunk_size: int = AUTO_CHUNK_SIZE  # 0 = chosen per file from its size
+    kdf: KdfAlgorithm = KdfAlgorithm.AUTO  # Password KDF for new files
+    kdf_profile: KdfProfile = KdfProfile.INTERACTIVE  # KDF cost calibration
+    compression: CompressionCodec = CompressionCodec.NONE  # Before encryption
+    fsync_policy: FsyncPolicy = FsyncPolicy.FILE  # Output durability
 
 
 @dataclass
@@ -33,6 +101,26 @@ class FileMetadata:
 
     original_extension: str
     version: str
+    cipher: Optional[CipherAlgorithm] = None  # None for Fernet (version 2) files
+    chunk_size: int = CHUNK_SIZE
+
+
+@dataclass
+class OperationStats:
+    """Timings and sizes of one successful encrypt or decrypt call."""
+
+    operation: str  # "encrypt" or "decrypt"
+    elapsed: float = 0.0  # Seconds for the whole call
+    kdf_time: float = 0.0  # Seconds spent deriving the key
+    bytes_in: int = 0  # Size of the input file
+    bytes_out: int = 0  # Size of the output file
+    read_time: float = 0.0  # Seconds spent reading input chunks
+    crypt_time: float = 0.0  # Seconds of cipher work, summed over workers
+    write_time: float = 0.0  # Seconds spent writing output
+    chunk_count: int = 0
+    peak_buffer_bytes: int = 0  # Largest chunk buffer allocation
+    worker_count: int = 1
+    worker_utilization: Optional[float] = None  # Busy share of the workers, 0-1
 
 
 @dataclass
@@ -42,6 +130,47 @@ class EncryptionResult:
     success: bool
     output_path: Optional[str] = None
     error_message: Optional[str] = None
+    stats: Optional[OperationStats] = None  # Set on success
+    cancelled: bool = False  # Stopped by a cancellation token or deadline
+
+
+@dataclass
+class ProgressInfo:
+    """Snapshot of a running encrypt, decrypt or verify call."""
+
+    stage: OperationStage
+    bytes_done: int = 0  # Plaintext bytes processed
+    total_bytes: Optional[int] = None  # None if the plaintext size is unknown
+    elapsed: float = 0.0  # Seconds since the call started
+    throughput: float = 0.0  # Bytes per second since data processing began
+    eta: Optional[float] = None  # Seconds left; None if unknown
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Completed fraction from 0 to 1, or None if the total is unknown."""
+        if self.total_bytes is None:
+            return None
+        if self.total_bytes == 0:
+            return 1.0
+        return min(1.0, self.bytes_done / self.total_bytes)
+
+
+@dataclass
+class VerificationResult:
+    """Result of verifying an encrypted file without writing plaintext."""
+
+    success: bool
+    error_message: Optional[str] = None
+    chunk_count: int = 0
+    bad_chunks: List[int] = field(default_factory=list)  # Failed chunk indices
+    bytes_verified: int = 0  # Plaintext bytes authenticated
+    elapsed: float = 0.0  # Seconds, including key derivation
+    plaintext_digest: Optional[str] = None  # BLAKE2b-512 hex, if computed
+
+    @property
+    def throughput(self) -> float:
+        """Verified plaintext bytes per second."""
+        return self.bytes_verified / self.elapsed if self.elapsed > 0 else 0.0
 
 
 @dataclass
@@ -4,7 +4,23 @@ import json
 import os
 from typing import Optional
 
-from .models import AppSettings, EncryptionMode, ExtensionOption
+from .constants import (
+    AUTO_CHUNK_SIZE,
+    DEFAULT_WORKER_COUNT,
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    PIPELINE_IN_FLIGHT_CHUNKS,
+)
+from .models import (
+    AppSettings,
+    CipherAlgorithm,
+    CompressionCodec,
+    EncryptionMode,
+    ExtensionOption,
+    FsyncPolicy,
+    KdfAlgorithm,
+    KdfProfile,
+)
 from ..utils.resources import get_settings_file_path
 from ..utils.file_utils import ensure_directory_exists
 
@@ -37,12 +53,40 @@ class SettingsManager:
             # Parse settings with validation
             encryption_mode = EncryptionMode(data.get("encryption_mode", "password"))
             extension_option = ExtensionOption(data.get("extension_option", "preserve"))
+            worker_count = int(data.get("worker_count", DEFAULT_WORKER_COUNT))
+            if worker_count < 0:
+                raise ValueError(f"Invalid worker count: {worker_count}")
+            cipher = CipherAlgorithm(data.get("cipher", "auto"))
+            in_flight_chunks = int(
+                data.get("in_flight_chunks", PIPELINE_IN_FLIGHT_CHUNKS)
+            )
+            if in_flight_chunks < 1:
+                raise ValueError(f"Invalid in-flight chunk limit: {in_flight_chunks}")
+            chunk_size = int(data.get("chunk_size", AUTO_CHUNK_SIZE))
+            if chunk_size != AUTO_CHUNK_SIZE and (
+                not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE
+                or chunk_size & (chunk_size - 1)
+            ):
+                raise ValueError(f"Invalid chunk size: {chunk_size}")
+            kdf = KdfAlgorithm(data.get("kdf", "auto"))
+            kdf_profile = KdfProfile(data.get("kdf_profile", "interactive"))
+            compression = CompressionCodec(data.get("compression", "none"))
+            fsync_policy = FsyncPolicy(data.get("fsync_policy", "file"))
 
             return AppSettings(
-                encryption_mode=encryption_mode, extension_option=extension_option
+                encryption_mode=encryption_mode,
+                extension_option=extension_option,
+                worker_count=worker_count,
+                cipher=cipher,
+                in_flight_chunks=in_flight_chunks,
+                chunk_size=chunk_size,
+                kdf=kdf,
+                kdf_profile=kdf_profile,
+                compression=compression,
+                fsync_policy=fsync_policy,
             )
 
-        except (json.JSONDecodeError, ValueError, KeyError) as e:
+        except (json.JSONDecodeError, ValueError, KeyError, TypeError) as e:
             # If settings file is corrupted, use defaults
             print(f"Warning: Failed to load settings: {e}. Using defaults.")
             return self._default_settings
@@ -67,6 +111,14 @@ class SettingsManager:
             data = {
                 "encryption_mode": settings.encryption_mode.value,
                 "extension_option": settings.extension_option.value,
+                "worker_count": settings.worker_count,
+                "cipher": settings.cipher.value,
+                "in_flight_chunks": settings.in_flight_chunks,
+                "chunk_size": settings.chunk_size,
+                "kdf": settings.kdf.value,
+                "kdf_profile": settings.kdf_profile.value,
+                "compression": settings.compression.value,
+                "fsync_policy": settings.fsync_policy.value,
             }
 
             # Write to file
@@ -99,6 +151,14 @@ class SettingsManager:
         return AppSettings(
             encryption_mode=self._default_settings.encryption_mode,
             extension_option=self._default_settings.extension_option,
+            worker_count=self._default_settings.worker_count,
+            cipher=self._default_settings.cipher,
+            in_flight_chunks=self._default_settings.in_flight_chunks,
+            chunk_size=self._default_settings.chunk_size,
+            kdf=self._default_settings.kdf,
+            kdf_profile=self._default_settings.kdf_profile,
+            compression=self._default_settings.compression,
+            fsync_policy=self._default_settings.fsync_policy,
         )
 
 
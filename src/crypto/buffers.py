@@ -0,0 +1,333 @@
+"""In-memory encryption and decryption of byte buffers."""
+
+import io
+from typing import Any, BinaryIO, List, Optional
+
+from .ciphers import AEAD_TAG_SIZE, BytesLike, create_frame_cipher
+from .compression import with_compression
+from .container import MAGIC, has_magic, read_header, resolve_chunk_size
+from .digest import check_plaintext_digest, new_plaintext_hash
+from .encryption import DecryptionError, EncryptionError
+from .file_format import (
+    METADATA_PROBE_SIZE,
+    derive_file_key,
+    detect_file_metadata,
+    read_file_header,
+)
+from .framing import load_frame_index
+from .key_derivation import KdfParams
+from .secure_memory import SecurePassword
+from .writer import EncryptedFileWriter
+from ..config.constants import CHUNK_SIZE
+from ..config.models import CipherAlgorithm, CompressionCodec, EncryptionMode
+
+
+# Reason: BinaryIO is listed as a base only so the header readers, which
+# take BinaryIO, type-check; io.BytesIO does the same in typeshed
+class _BufferReader(io.BufferedIOBase, BinaryIO):
+    """Seekable read-only stream over a byte view, without copying it."""
+
+    def __init__(self, view: memoryview) -> None:
+        """
+        Initialize the stream.
+
+        Args:
+            view: Byte view to read from
+        """
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        """Return True."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return True."""
+        return True
+
+    def tell(self) -> int:
+        """Return the current position."""
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to a new position."""
+        base = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self._position,
+            io.SEEK_END: len(self._view),
+        }
+        self._position = max(0, base[whence] + offset)
+        return self._position
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """Read up to size bytes (all remaining bytes if size is negative)."""
+        start = min(self._position, len(self._view))
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(end, start + size)
+        self._position = end
+        return bytes(self._view[start:end])
+
+    def readinto(self, buffer: Any) -> int:
+        """Copy bytes from the current position into buffer."""
+        start = min(self._position, len(self._view))
+        count = min(len(buffer), len(self._view) - start)
+        buffer[:count] = self._view[start : start + count]
+        self._position = start + count
+        return count
+
+
+def encrypt_bytes(
+    data: Any,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+    original_extension: str = "",
+    cipher: Optional[CipherAlgorithm] = None,
+    chunk_size: Optional[int] = None,
+    kdf: Optional[KdfParams] = None,
+    compression: Optional[CompressionCodec] = None,
+) -> bytes:
+    """
+    Encrypt a buffer into the encrypted file format.
+
+    Args:
+        data: Bytes-like plaintext (bytes, bytearray, memoryview, ...)
+        password: Password for password mode
+        keyfile_path: Keyfile path for keyfile mode (used if no password)
+        original_extension: Extension to restore when decrypted to a file
+        cipher: AEAD cipher (None or AUTO picks the fastest cipher on this
+            machine)
+        chunk_size: Chunk size (None or AUTO_CHUNK_SIZE picks one from the
+            data size)
+        kdf: Password KDF and cost parameters (None uses
+            stored_kdf_params())
+        compression: Per-chunk compression codec (None stores chunks as is)
+
+    Returns:
+        Encrypted file contents
+
+    Raises:
+        EncryptionError: If encryption fails
+    """
+    try:
+        view = memoryview(data).cast("B")
+        sink = io.BytesIO()
+        with EncryptedFileWriter(
+            sink,
+            password,
+            keyfile_path,
+            original_extension,
+            cipher,
+            chunk_size=resolve_chunk_size(chunk_size, len(view)),
+            kdf=kdf,
+            compression=compression,
+        ) as writer:
+            writer.write(view)
+        return sink.getvalue()
+
+    except Exception as e:
+        raise EncryptionError(f"Encryption failed: {str(e)}") from e
+
+
+def decrypt_bytes(
+    data: Any,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+) -> bytes:
+    """
+    Decrypt the contents of an encrypted file held in memory.
+
+    Args:
+        data: Bytes-like encrypted file contents (format version 2 or 3)
+        password: Password for password mode files
+        keyfile_path: Keyfile path for keyfile mode files
+
+    Returns:
+        Plaintext
+
+    Raises:
+        DecryptionError: If the data cannot be decrypted or authenticated
+    """
+    size = get_plaintext_size(data)
+    if size is None:
+        # Fernet frames do not reveal their plaintext size; decrypt chunkwise
+        chunks: List[bytes] = []
+        _decrypt_frames(data, password, keyfile_path, chunks=chunks)
+        return b"".join(chunks)
+
+    output = bytearray(size)
+    decrypt_into(data, output, password, keyfile_path)
+    return bytes(output)
+
+
+def decrypt_into(
+    data: Any,
+    buffer: Any,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+) -> int:
+    """
+    Decrypt encrypted file contents straight into a caller-provided buffer.
+
+    Each chunk is decrypted into its final position in buffer, so no
+    intermediate plaintext objects are created (with cryptography 46+).
+    Any writable, C-contiguous buffer works, such as a bytearray, mmap or
+    NumPy array; use get_plaintext_size to size it. If decryption fails,
+    the bytes already written are zeroized.
+
+    Args:
+        data: Bytes-like encrypted file contents (format version 2 or 3)
+        buffer: Writable buffer with room for the plaintext
+        password: Password for password mode files
+        keyfile_path: Keyfile path for keyfile mode files
+
+    Returns:
+        Number of plaintext bytes written to the start of buffer
+
+    Raises:
+        DecryptionError: If the data cannot be decrypted or authenticated,
+            or the buffer is too small
+    """
+    out = memoryview(buffer).cast("B")
+    return _decrypt_frames(data, password, keyfile_path, out=out)
+
+
+def get_plaintext_size(data: Any) -> Optional[int]:
+    """
+    Calculate the plaintext size of encrypted file contents without a key.
+
+    Args:
+        data: Bytes-like encrypted file contents
+
+    Returns:
+        Plaintext size in bytes, or None for format version 2 data and
+        compressed streams of unknown length, whose size is only known
+        after decryption
+
+    Raises:
+        DecryptionError: If the data is not an Entryptor buffer or not a
+            valid container
+    """
+    view = memoryview(data).cast("B")
+    if not _is_entryptor_data(view):
+        raise DecryptionError("Decryption failed: Not an Entryptor buffer")
+    if not has_magic(bytes(view[: len(MAGIC)])):
+        return None
+    try:
+        stream = _BufferReader(view)
+        header = read_header(stream)
+        _, lengths = load_frame_index(stream, stream.tell())
+    except ValueError as e:
+        raise DecryptionError(f"Decryption failed: {str(e)}") from e
+
+    if header.compression is not None:
+        # Reason: compressed frame lengths say nothing about the plaintext
+        return header.plaintext_size
+    chunk_size = header.chunk_size
+
+    if not lengths:
+        return 0
+    return (len(lengths) - 1) * chunk_size + max(0, lengths[-1] - AEAD_TAG_SIZE)
+
+
+def _decrypt_frames(
+    data: Any,
+    password: Optional[SecurePassword],
+    keyfile_path: Optional[str],
+    out: Optional[memoryview] = None,
+    chunks: Optional[List[bytes]] = None,
+) -> int:
+    """
+    Decrypt every frame of in-memory file contents.
+
+    Args:
+        data: Bytes-like encrypted file contents
+        password: Password for password mode files
+        keyfile_path: Keyfile path for keyfile mode files
+        out: Writable byte view receiving the plaintext
+        chunks: List receiving the plaintext chunks (used when out is None)
+
+    Returns:
+        Number of plaintext bytes produced
+
+    Raises:
+        DecryptionError: If decryption fails
+    """
+    view = memoryview(data).cast("B")
+    written = 0
+    touched = 0
+    try:
+        if not _is_entryptor_data(view):
+            raise ValueError("Not an Entryptor buffer")
+        stream = _BufferReader(view)
+        mode = (
+            EncryptionMode.PASSWORD if password is not None else EncryptionMode.KEYFILE
+        )
+        metadata, key_info = read_file_header(stream, mode)
+        if metadata.get("encryption_mode") != mode.value:
+            raise ValueError(f"Data was not encrypted with {mode.value} mode")
+
+        key = derive_file_key(mode, key_info, password, keyfile_path)
+        chunk_size = metadata.get("chunk_size", CHUNK_SIZE)
+        cipher = with_compression(
+            create_frame_cipher(key_info.cipher_name, key),
+            metadata.get("compression"),
+            chunk_size,
+        )
+        offsets, lengths = load_frame_index(stream, stream.tell())
+        if not offsets and cipher.terminated:
+            raise ValueError("Encrypted data has no final frame")
+
+        header = key_info.header
+        digest_nonce = None
+        plaintext_hash = None
+        if header is not None and header.digest is not None:
+            digest_nonce = header.file_nonce
+            plaintext_hash = new_plaintext_hash()
+
+        final_index = len(offsets) - 1
+        chunk: BytesLike
+        for index, (offset, length) in enumerate(zip(offsets, lengths)):
+            frame = view[offset : offset + length]
+            if out is None:
+                chunk = cipher.open(index, frame, index == final_index)
+                if chunks is not None:
+                    chunks.append(chunk)
+            else:
+                # Only the final chunk may be short, so chunk i starts at
+                # i * chunk_size in the output
+                if written != index * chunk_size:
+                    raise ValueError("Encrypted data does not use fixed-size chunks")
+                touched = min(len(out), written + chunk_size)
+                count = cipher.open_into(
+                    index, frame, index == final_index, out[written:]
+                )
+                chunk = out[written : written + count]
+            if plaintext_hash is not None:
+                plaintext_hash.update(chunk)
+            written += len(chunk)
+
+        if plaintext_hash is not None and digest_nonce is not None:
+            check_plaintext_digest(stream, key, digest_nonce, plaintext_hash.digest())
+        return written
+
+    except Exception as e:
+        # Reason: a failed frame may leave unauthenticated plaintext behind
+        if out is not None:
+            out[:touched] = bytes(touched)
+        raise DecryptionError(f"Decryption failed: {str(e)}") from e
+
+
+def _is_entryptor_data(view: memoryview) -> bool:
+    """
+    Check whether in-memory data starts like an encrypted file.
+
+    Args:
+        view: Byte view of the data
+
+    Returns:
+        True if the data has the container magic or version 2 metadata
+    """
+    prefix = bytes(view[:METADATA_PROBE_SIZE])
+    return has_magic(prefix) or detect_file_metadata(prefix) is not None
@@ -0,0 +1,60 @@
+"""Cooperative cancellation and deadlines for long-running calls."""
+
+import threading
+import time
+from typing import Optional
+
+
+class OperationCancelled(Exception):
+    """Raised inside an operation whose cancellation token has fired."""
+
+    pass
+
+
+class CancellationToken:
+    """
+    Cancellation flag with an optional deadline, shared with a running call.
+
+    The engine checks the token between chunks and inside pool tasks, so a
+    call stops within about one chunk of work after cancel() or the
+    deadline. Key derivation cannot be interrupted; the token is checked
+    as soon as it finishes. One token may be shared by several calls, e.g.
+    to stop a whole batch.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        """
+        Initialize the token.
+
+        Args:
+            timeout: Seconds from now after which calls using the token
+                stop, or None for no deadline
+        """
+        self._event = threading.Event()
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+    def cancel(self) -> None:
+        """Request cancellation; safe to call from any thread."""
+        self._event.set()
+
+    @property
+    def deadline_exceeded(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() was called or the deadline has passed."""
+        return self._event.is_set() or self.deadline_exceeded
+
+    def check(self) -> None:
+        """
+        Stop the calling operation if the token has fired.
+
+        Raises:
+            OperationCancelled: If cancel() was called or the deadline passed
+        """
+        if self._event.is_set():
+            raise OperationCancelled("cancelled")
+        if self.deadline_exceeded:
+            raise OperationCancelled("deadline exceeded")
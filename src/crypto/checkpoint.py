@@ -0,0 +1,307 @@
+"""Checkpoints of resumable encryption: sidecar file and resume point."""
+
+import hashlib
+import json
+import os
+from array import array
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Optional, Tuple
+
+from .container import ContainerHeader
+from .digest import new_plaintext_hash
+from .file_format import FileKeyInfo, read_file_header
+from .framing import read_into_full, scan_frames
+from .output import AtomicOutput
+from .progress import ProgressReporter
+from ..config.constants import (
+    CHECKPOINT_INTERVAL,
+    CHECKPOINT_SUFFIX,
+    ENCRYPTED_EXTENSION,
+    LEGACY_FORMAT_VERSION,
+    PARTIAL_SUFFIX,
+)
+from ..config.models import EncryptionMode, FsyncPolicy, OperationStage
+
+CHECKPOINT_VERSION = 1
+
+
+@dataclass
+class Checkpoint:
+    """Durable progress of a resumable encryption."""
+
+    chunk_index: int  # Frames durably written; the next chunk to encrypt
+    output_offset: int  # End of the last durable frame in the partial output
+    data_offset: int  # Offset of the first frame (the header size)
+    prefix_digest: str  # Hex plaintext digest of the first chunk_index chunks
+    source_size: int  # Input size when the call started
+    source_mtime_ns: int  # Input modification time when the call started
+
+
+@dataclass
+class ResumePoint:
+    """Checkpoint and header of a partial output that a call can continue."""
+
+    checkpoint: Checkpoint
+    key_info: FileKeyInfo  # Key derivation fields of the partial output
+    header: ContainerHeader  # The same header as key_info.header, not None
+
+
+def partial_path(output_path: str) -> str:
+    """
+    Return the path a resumable call writes before it completes.
+
+    Args:
+        output_path: Final output path
+
+    Returns:
+        Partial output path next to the final one
+    """
+    return output_path + PARTIAL_SUFFIX
+
+
+def checkpoint_path(output_path: str) -> str:
+    """
+    Return the path of the checkpoint sidecar of an output.
+
+    Args:
+        output_path: Final output path
+
+    Returns:
+        Sidecar path next to the final output
+    """
+    return output_path + CHECKPOINT_SUFFIX
+
+
+def load_checkpoint(
+    output_path: str, file_path: str, mode: EncryptionMode
+) -> Optional[ResumePoint]:
+    """
+    Load the checkpoint of an interrupted call, if it can be resumed.
+
+    A checkpoint is only usable while its partial output exists, the input
+    still has the size and modification time it had when the call started,
+    and the partial output is a format 3 file of the requested mode.
+
+    Args:
+        output_path: Final output path
+        file_path: Input path of the call
+        mode: Encryption mode of the call
+
+    Returns:
+        Checkpoint and header of the partial output, or None if there is
+        nothing to resume
+    """
+    sidecar = checkpoint_path(output_path)
+    if not os.path.exists(sidecar) or not os.path.exists(partial_path(output_path)):
+        return None
+
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.pop("version", None) != CHECKPOINT_VERSION:
+            return None
+        checkpoint = Checkpoint(**data)
+        with open(partial_path(output_path), "rb") as partial:
+            _, key_info = read_file_header(partial, mode)
+
+    except (json.JSONDecodeError, OSError, TypeError, ValueError) as e:
+        print(f"Warning: Failed to load checkpoint: {e}. Starting over.")
+        return None
+
+    source = os.stat(file_path)
+    header = key_info.header
+    if (
+        source.st_size != checkpoint.source_size
+        or source.st_mtime_ns != checkpoint.source_mtime_ns
+        or header is None
+        or header.mode != mode
+    ):
+        return None
+    return ResumePoint(checkpoint, key_info, header)
+
+
+def resume_point(
+    file_path: str,
+    output_path: Optional[str],
+    mode: EncryptionMode,
+    format_version: int,
+    resumable: bool,
+) -> Optional[ResumePoint]:
+    """
+    Find the checkpoint an encryption call can resume from.
+
+    Args:
+        file_path: Path to the file to encrypt
+        output_path: Requested output path, or None for the default
+        mode: Encryption mode of the call
+        format_version: File format to write
+        resumable: Whether the call is resumable
+
+    Returns:
+        Checkpoint and header fields of the partial output, or None to
+        start from the first chunk
+    """
+    if not resumable or format_version == LEGACY_FORMAT_VERSION:
+        return None
+    if output_path is None:
+        output_path = file_path + ENCRYPTED_EXTENSION
+    return load_checkpoint(output_path, file_path, mode)
+
+
+def start_partial(output_path: str, resume: Optional[ResumePoint]) -> str:
+    """
+    Prepare the partial output of a resumable call.
+
+    Args:
+        output_path: Final output path
+        resume: Resume point of the call, or None
+
+    Returns:
+        Partial output path, for AtomicOutput's fixed temp path
+    """
+    if resume is None:
+        # Reason: a sidecar left by another run must never describe the
+        # partial output this call is about to rewrite
+        remove_checkpoint(output_path)
+    return partial_path(output_path)
+
+
+def remove_checkpoint(output_path: str) -> None:
+    """
+    Delete the checkpoint sidecar of an output, if any.
+
+    Args:
+        output_path: Final output path
+    """
+    try:
+        os.remove(checkpoint_path(output_path))
+    except FileNotFoundError:
+        pass
+
+
+def restore_checkpoint(
+    infile: BinaryIO,
+    outfile: BinaryIO,
+    output_path: str,
+    checkpoint: Checkpoint,
+    chunk_size: int,
+    progress: Optional[ProgressReporter] = None,
+) -> Tuple[array, "hashlib._Hash"]:
+    """
+    Position the input and partial output at a checkpoint.
+
+    Frames written after the checkpoint may be torn, so the partial output
+    is truncated to the checkpoint and its frame offsets are rebuilt from
+    the length prefixes. The running hash state cannot be serialized, so
+    the plaintext prefix is hashed again; its digest must match the one
+    recorded with the checkpoint. A checkpoint that does not match is
+    deleted, since it would fail every retry; the next call starts over.
+
+    Args:
+        infile: Plaintext input stream positioned at the first byte
+        outfile: Partial output opened for update
+        output_path: Final output path
+        checkpoint: Checkpoint to resume from
+        chunk_size: Plaintext size of every non-final chunk
+        progress: Reporter counting the prefix bytes hashed
+
+    Returns:
+        Tuple of (payload offsets of the frames already written, running
+        plaintext hash of the prefix)
+
+    Raises:
+        ValueError: If the partial output or the input does not match the
+            checkpoint
+        OperationCancelled: If the call was cancelled
+    """
+    plaintext_hash = new_plaintext_hash()
+    if progress is not None:
+        # Reason: hashing the prefix again is data work, so it counts
+        # towards the encrypting stage
+        progress.set_stage(OperationStage.ENCRYPTING)
+    try:
+        outfile.truncate(checkpoint.output_offset)
+        offsets, _ = scan_frames(outfile, checkpoint.data_offset)
+        if len(offsets) != checkpoint.chunk_index:
+            raise ValueError("Partial output does not match its checkpoint")
+
+        buffer = memoryview(bytearray(chunk_size))
+        for _ in range(checkpoint.chunk_index):
+            count = read_into_full(infile, buffer)
+            plaintext_hash.update(buffer[:count])
+            if progress is not None:
+                progress.update(count)
+        buffer[:] = bytes(chunk_size)
+
+        if plaintext_hash.hexdigest() != checkpoint.prefix_digest:
+            raise ValueError("Input changed since the checkpoint was written")
+    except ValueError:
+        remove_checkpoint(output_path)
+        raise
+    outfile.seek(checkpoint.output_offset)
+    return offsets, plaintext_hash
+
+
+class CheckpointWriter:
+    """
+    Checkpoint callback of encrypt_frames for one resumable call.
+
+    The engine calls it after each write of whole frames; at most every
+    CHECKPOINT_INTERVAL output bytes it flushes and fsyncs the partial
+    output and only then replaces the sidecar, so a checkpoint never
+    points past durable data.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        outfile: BinaryIO,
+        plaintext_hash: "hashlib._Hash",
+        data_offset: int,
+        source: os.stat_result,
+    ) -> None:
+        """
+        Initialize the writer.
+
+        Args:
+            output_path: Final output path
+            outfile: Partial output stream
+            plaintext_hash: Running hash of the plaintext written so far
+            data_offset: Offset of the first frame
+            source: Status of the input when the call started
+        """
+        self._sidecar = checkpoint_path(output_path)
+        self._outfile = outfile
+        self._plaintext_hash = plaintext_hash
+        self._data_offset = data_offset
+        self._source = source
+        self._saved_offset = outfile.tell()
+
+    def __call__(self, chunk_index: int, output_offset: int) -> None:
+        """
+        Record a checkpoint if the interval has passed.
+
+        Args:
+            chunk_index: Frames written so far
+            output_offset: End of the last written frame
+        """
+        if output_offset - self._saved_offset < CHECKPOINT_INTERVAL:
+            return
+        self._outfile.flush()
+        os.fsync(self._outfile.fileno())
+
+        checkpoint = Checkpoint(
+            chunk_index=chunk_index,
+            output_offset=output_offset,
+            data_offset=self._data_offset,
+            prefix_digest=self._plaintext_hash.hexdigest(),
+            source_size=self._source.st_size,
+            source_mtime_ns=self._source.st_mtime_ns,
+        )
+        # Reason: without a directory fsync a crash may bring back the
+        # previous sidecar, which still points at durable frames
+        with AtomicOutput(self._sidecar, FsyncPolicy.FILE) as output:
+            with open(output.temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CHECKPOINT_VERSION, **asdict(checkpoint)}, f)
+            output.commit()
+        self._saved_offset = output_offset
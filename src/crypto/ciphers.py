@@ -0,0 +1,475 @@
+"""Per-chunk frame ciphers for the encrypted file formats."""
+
+import os
+import struct
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Union, cast
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+from ..config.constants import (
+    CIPHER_BENCHMARK_ROUNDS,
+    CIPHER_BENCHMARK_SIZE,
+    CIPHER_SELECTION_MARGIN,
+)
+from ..config.models import CipherAlgorithm
+
+AEAD_KEY_SIZE = 32  # 256-bit keys
+AEAD_NONCE_SIZE = 12
+AEAD_TAG_SIZE = 16
+# Extra room seal_into/open_into output buffers need for update_into
+INTO_BUFFER_SLACK = 16
+
+CIPHER_FERNET = "fernet"
+CIPHER_AES_256_GCM = CipherAlgorithm.AES_256_GCM.value
+CIPHER_CHACHA20_POLY1305 = CipherAlgorithm.CHACHA20_POLY1305.value
+
+# Chunks and frames may be bytes or views into reused buffers
+BytesLike = Union[bytes, bytearray, memoryview]
+
+_FRAME_AAD = struct.Struct(">QB")  # chunk index, final-frame flag
+
+# encrypt_into/decrypt_into on the AEAD classes (cryptography 46+)
+_AEAD_INTO = hasattr(AESGCM, "encrypt_into")
+
+# Fernet token layout: version (1) + timestamp (8) + IV (16) + HMAC (32)
+_FERNET_OVERHEAD = 57
+
+
+class FrameAuthenticationError(Exception):
+    """Raised when a frame fails authentication."""
+
+    def __init__(self, index: int) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            index: Zero-based index of the chunk that failed
+        """
+        super().__init__(f"Authentication failed for chunk {index}")
+        self.index = index
+
+    def __reduce__(self):
+        """Pickle by index, so pool workers can report the failure."""
+        return (type(self), (self.index,))
+
+
+def fernet_token_length(plaintext_length: int) -> int:
+    """
+    Calculate the encoded Fernet token length for a plaintext length.
+
+    Args:
+        plaintext_length: Plaintext size in bytes
+
+    Returns:
+        Length of the base64-encoded token in bytes
+    """
+    padded_length = (plaintext_length // 16 + 1) * 16
+    raw_length = _FERNET_OVERHEAD + padded_length
+    return 4 * ((raw_length + 2) // 3)
+
+
+def frame_nonce(index: int) -> bytes:
+    """
+    Derive the AEAD nonce for a chunk from its index.
+
+    Every file uses its own key, so a counter nonce is never reused.
+
+    Args:
+        index: Zero-based chunk index
+
+    Returns:
+        12-byte nonce
+    """
+    return index.to_bytes(AEAD_NONCE_SIZE, byteorder="big")
+
+
+def frame_aad(index: int, final: bool) -> bytes:
+    """
+    Build the associated data that binds a frame to its position.
+
+    Args:
+        index: Zero-based chunk index
+        final: Whether this is the last frame of the file
+
+    Returns:
+        Associated data bytes
+    """
+    return _FRAME_AAD.pack(index, 1 if final else 0)
+
+
+class FrameCipher:
+    """Base class for ciphers that encrypt one chunk into one frame."""
+
+    name = ""
+    # Whether the cipher releases the GIL, so threads scale across cores
+    releases_gil = False
+    # Whether streams end with an authenticated final frame
+    terminated = False
+    # Whether every full chunk seals to exactly frame_length(chunk_size) bytes
+    fixed_frame_length = True
+
+    def seal(self, index: int, chunk: BytesLike, final: bool) -> bytes:
+        """
+        Encrypt one chunk into a frame.
+
+        Args:
+            index: Zero-based chunk index
+            chunk: Plaintext chunk
+            final: Whether this is the last chunk of the stream
+
+        Returns:
+            Encrypted frame bytes
+        """
+        raise NotImplementedError
+
+    def open(self, index: int, frame: BytesLike, final: bool) -> bytes:
+        """
+        Decrypt and authenticate one frame.
+
+        Args:
+            index: Zero-based chunk index
+            frame: Encrypted frame bytes
+            final: Whether this is the last frame of the stream
+
+        Returns:
+            Plaintext chunk
+
+        Raises:
+            FrameAuthenticationError: If the frame fails authentication
+        """
+        raise NotImplementedError
+
+    def seal_into(
+        self, index: int, chunk: BytesLike, final: bool, out: memoryview
+    ) -> int:
+        """
+        Encrypt one chunk into a caller-provided buffer.
+
+        Args:
+            index: Zero-based chunk index
+            chunk: Plaintext chunk
+            final: Whether this is the last chunk of the stream
+            out: Writable byte view with room for the frame plus
+                INTO_BUFFER_SLACK bytes
+
+        Returns:
+            Frame length written to the start of out
+
+        Raises:
+            ValueError: If out is too small for the frame
+        """
+        frame = self.seal(index, chunk, final)
+        if len(frame) > len(out):
+            raise ValueError("Output buffer is too small")
+        out[: len(frame)] = frame
+        return len(frame)
+
+    def open_into(
+        self, index: int, frame: BytesLike, final: bool, out: memoryview
+    ) -> int:
+        """
+        Decrypt and authenticate one frame into a caller-provided buffer.
+
+        Args:
+            index: Zero-based chunk index
+            frame: Encrypted frame bytes
+            final: Whether this is the last frame of the stream
+            out: Writable byte view with room for the plaintext
+
+        Returns:
+            Plaintext length written to the start of out
+
+        Raises:
+            ValueError: If out is too small for the plaintext
+            FrameAuthenticationError: If the frame fails authentication
+        """
+        plaintext = self.open(index, frame, final)
+        if len(plaintext) > len(out):
+            raise ValueError("Output buffer is too small")
+        out[: len(plaintext)] = plaintext
+        return len(plaintext)
+
+    def frame_length(self, plaintext_length: int) -> int:
+        """
+        Calculate the frame length for a plaintext length.
+
+        Args:
+            plaintext_length: Plaintext size in bytes
+
+        Returns:
+            Encrypted frame size in bytes
+        """
+        raise NotImplementedError
+
+    def plaintext_length(self, frame_length: int) -> Optional[int]:
+        """
+        Calculate the plaintext length of a frame without decrypting it.
+
+        Args:
+            frame_length: Encrypted frame size in bytes
+
+        Returns:
+            Plaintext size in bytes, or None if it depends on the content
+        """
+        return None
+
+
+class FernetFrameCipher(FrameCipher):
+    """Fernet tokens, as written by format version 2."""
+
+    name = CIPHER_FERNET
+
+    def __init__(self, key: bytes) -> None:
+        """
+        Initialize the cipher.
+
+        Args:
+            key: Base64-encoded Fernet key
+        """
+        self._fernet = Fernet(key)
+
+    def seal(self, index: int, chunk: BytesLike, final: bool) -> bytes:
+        """Encrypt one chunk into a Fernet token."""
+        return self._fernet.encrypt(bytes(chunk))
+
+    def open(self, index: int, frame: BytesLike, final: bool) -> bytes:
+        """Decrypt and authenticate one Fernet token."""
+        try:
+            return self._fernet.decrypt(bytes(frame))
+        except InvalidToken as e:
+            raise FrameAuthenticationError(index) from e
+
+    def frame_length(self, plaintext_length: int) -> int:
+        """Calculate the Fernet token length for a plaintext length."""
+        return fernet_token_length(plaintext_length)
+
+
+class AeadFrameCipher(FrameCipher):
+    """Raw AEAD frames with counter nonces and positional AAD."""
+
+    releases_gil = True
+    terminated = True
+
+    def __init__(self, key: bytes) -> None:
+        """
+        Initialize the cipher.
+
+        Args:
+            key: Raw 32-byte key
+        """
+        self._aead = self._create_aead(key)
+
+    @staticmethod
+    def _create_aead(key: bytes):
+        """Create the underlying AEAD primitive."""
+        raise NotImplementedError
+
+    def seal(self, index: int, chunk: BytesLike, final: bool) -> bytes:
+        """Encrypt one chunk into ciphertext followed by the tag."""
+        # Reason: cryptography accepts any buffer; stubs before 46 say bytes
+        return self._aead.encrypt(
+            frame_nonce(index), cast(bytes, chunk), frame_aad(index, final)
+        )
+
+    def open(self, index: int, frame: BytesLike, final: bool) -> bytes:
+        """Decrypt and authenticate one AEAD frame."""
+        try:
+            return self._aead.decrypt(
+                frame_nonce(index), cast(bytes, frame), frame_aad(index, final)
+            )
+        except InvalidTag as e:
+            raise FrameAuthenticationError(index) from e
+
+    def seal_into(
+        self, index: int, chunk: BytesLike, final: bool, out: memoryview
+    ) -> int:
+        """Encrypt one chunk straight into out when supported."""
+        length = self.frame_length(len(chunk))
+        if length > len(out):
+            raise ValueError("Output buffer is too small")
+
+        # Reason: encrypt_into (cryptography 46+) skips the frame copy
+        if not _AEAD_INTO:
+            return super().seal_into(index, chunk, final, out)
+        return self._aead.encrypt_into(
+            frame_nonce(index), chunk, frame_aad(index, final), out[:length]
+        )
+
+    def open_into(
+        self, index: int, frame: BytesLike, final: bool, out: memoryview
+    ) -> int:
+        """Decrypt one AEAD frame straight into out when supported."""
+        length = self.plaintext_length(len(frame))
+        if length > len(out):
+            raise ValueError("Output buffer is too small")
+
+        # Reason: decrypt_into (cryptography 46+) skips the plaintext copy
+        if not _AEAD_INTO:
+            return super().open_into(index, frame, final, out)
+        try:
+            return self._aead.decrypt_into(
+                frame_nonce(index), frame, frame_aad(index, final), out[:length]
+            )
+        except InvalidTag as e:
+            raise FrameAuthenticationError(index) from e
+
+    def frame_length(self, plaintext_length: int) -> int:
+        """Calculate the AEAD frame length for a plaintext length."""
+        return plaintext_length + AEAD_TAG_SIZE
+
+    def plaintext_length(self, frame_length: int) -> int:
+        """Calculate the plaintext length of an AEAD frame."""
+        return max(0, frame_length - AEAD_TAG_SIZE)
+
+
+class AesGcmFrameCipher(AeadFrameCipher):
+    """AES-256-GCM frames, fastest on CPUs with AES instructions."""
+
+    name = CIPHER_AES_256_GCM
+
+    def __init__(self, key: bytes) -> None:
+        """
+        Initialize the cipher.
+
+        Args:
+            key: Raw 32-byte key
+        """
+        super().__init__(key)
+        self._algorithm = algorithms.AES(key)
+
+    @staticmethod
+    def _create_aead(key: bytes) -> AESGCM:
+        """Create the AES-GCM primitive."""
+        return AESGCM(key)
+
+    def seal_into(
+        self, index: int, chunk: BytesLike, final: bool, out: memoryview
+    ) -> int:
+        """Encrypt one chunk in place, with update_into on older cryptography."""
+        length = self.frame_length(len(chunk))
+        if _AEAD_INTO or len(out) < length + INTO_BUFFER_SLACK:
+            return super().seal_into(index, chunk, final, out)
+
+        # Reason: the streaming GCM context produces the same frame as
+        # AESGCM.encrypt, but writes the ciphertext into out directly
+        encryptor = Cipher(self._algorithm, modes.GCM(frame_nonce(index))).encryptor()
+        encryptor.authenticate_additional_data(frame_aad(index, final))
+        written = encryptor.update_into(cast(bytes, chunk), cast(bytes, out))
+        encryptor.finalize()
+        out[written:length] = encryptor.tag
+        return length
+
+    def open_into(
+        self, index: int, frame: BytesLike, final: bool, out: memoryview
+    ) -> int:
+        """Decrypt one frame in place, with update_into on older cryptography."""
+        length = self.plaintext_length(len(frame))
+        if (
+            _AEAD_INTO
+            or len(frame) < AEAD_TAG_SIZE
+            or len(out) < length + INTO_BUFFER_SLACK
+        ):
+            return super().open_into(index, frame, final, out)
+
+        frame_view = memoryview(frame)
+        decryptor = Cipher(
+            self._algorithm,
+            modes.GCM(frame_nonce(index), bytes(frame_view[length:])),
+        ).decryptor()
+        decryptor.authenticate_additional_data(frame_aad(index, final))
+        decryptor.update_into(cast(bytes, frame_view[:length]), cast(bytes, out))
+        # Reason: out already holds unauthenticated plaintext here; the
+        # caller must discard it on failure
+        try:
+            decryptor.finalize()
+        except InvalidTag as e:
+            raise FrameAuthenticationError(index) from e
+        return length
+
+
+class ChaCha20Poly1305FrameCipher(AeadFrameCipher):
+    """ChaCha20-Poly1305 frames, fastest on CPUs without AES instructions."""
+
+    name = CIPHER_CHACHA20_POLY1305
+
+    @staticmethod
+    def _create_aead(key: bytes) -> ChaCha20Poly1305:
+        """Create the ChaCha20-Poly1305 primitive."""
+        return ChaCha20Poly1305(key)
+
+
+_CIPHERS: Dict[str, Callable[[bytes], FrameCipher]] = {
+    CIPHER_FERNET: FernetFrameCipher,
+    CIPHER_AES_256_GCM: AesGcmFrameCipher,
+    CIPHER_CHACHA20_POLY1305: ChaCha20Poly1305FrameCipher,
+}
+
+
+def create_frame_cipher(name: str, key: bytes) -> FrameCipher:
+    """
+    Create a frame cipher by name.
+
+    Args:
+        name: Cipher name (e.g. CIPHER_AES_256_GCM)
+        key: Key bytes in the form the cipher expects
+
+    Returns:
+        FrameCipher instance
+
+    Raises:
+        ValueError: If the cipher name is unknown
+    """
+    cipher_class = _CIPHERS.get(name)
+    if cipher_class is None:
+        raise ValueError(f"Unsupported cipher: {name}")
+    return cipher_class(key)
+
+
+def resolve_cipher(choice: Optional[CipherAlgorithm] = None) -> CipherAlgorithm:
+    """
+    Resolve a cipher choice to a concrete AEAD cipher.
+
+    Args:
+        choice: Requested cipher; None or AUTO selects the fastest cipher
+
+    Returns:
+        AES_256_GCM or CHACHA20_POLY1305
+    """
+    if choice is None or choice == CipherAlgorithm.AUTO:
+        return CipherAlgorithm(select_fastest_cipher())
+    return choice
+
+
+@lru_cache(maxsize=1)
+def select_fastest_cipher() -> str:
+    """
+    Pick the faster AEAD cipher on this machine with a short benchmark.
+
+    AES-GCM stays the default unless ChaCha20-Poly1305 beats it by
+    CIPHER_SELECTION_MARGIN, which only happens on hosts without AES
+    hardware support. The result is cached for the process lifetime.
+
+    Returns:
+        Name of the selected cipher
+    """
+    data = bytes(CIPHER_BENCHMARK_SIZE)
+    timings = {}
+    for name in (CIPHER_AES_256_GCM, CIPHER_CHACHA20_POLY1305):
+        cipher = create_frame_cipher(name, os.urandom(AEAD_KEY_SIZE))
+        cipher.seal(0, data, False)  # Warm up
+        start = time.perf_counter()
+        for index in range(CIPHER_BENCHMARK_ROUNDS):
+            cipher.seal(index, data, False)
+        timings[name] = time.perf_counter() - start
+
+    if (
+        timings[CIPHER_CHACHA20_POLY1305] * CIPHER_SELECTION_MARGIN
+        < timings[CIPHER_AES_256_GCM]
+    ):
+        return CIPHER_CHACHA20_POLY1305
+    return CIPHER_AES_256_GCM
@@ -0,0 +1,304 @@
+"""Per-chunk compression of format version 3 frames."""
+
+import lzma
+import math
+import zlib
+from collections import Counter
+from typing import Any, Optional
+
+from .ciphers import BytesLike, FrameCipher
+from ..config.constants import (
+    COMPRESSION_ENTROPY_THRESHOLD,
+    COMPRESSION_SAMPLE_SIZE,
+    COMPRESSION_SAMPLES,
+    LZMA_COMPRESSION_PRESET,
+    ZLIB_COMPRESSION_LEVEL,
+    ZSTD_COMPRESSION_LEVEL,
+)
+from ..config.models import CompressionCodec
+
+try:
+    import zstandard  # type: ignore[import-not-found, unused-ignore]
+except ImportError:  # Optional dependency
+    zstandard = None
+
+ZSTD_AVAILABLE = zstandard is not None
+
+# Errors the codecs raise for malformed input
+_CODEC_ERRORS = (zlib.error, lzma.LZMAError) + (
+    (zstandard.ZstdError,) if ZSTD_AVAILABLE else ()
+)
+
+CODEC_ZLIB = CompressionCodec.ZLIB.value
+CODEC_LZMA = CompressionCodec.LZMA.value
+CODEC_ZSTD = CompressionCodec.ZSTD.value
+
+# First byte of every frame plaintext of a compressed file
+_STORED = 0
+_COMPRESSED = 1
+
+# Signatures of formats whose contents are already compressed
+_COMPRESSED_MAGIC = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG\r\n\x1a\n",
+    b"GIF87a",
+    b"GIF89a",
+    b"PK\x03\x04",  # ZIP, and the Office, JAR and APK formats built on it
+    b"\x1f\x8b",  # gzip
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"\x28\xb5\x2f\xfd",  # Zstandard
+    b"7z\xbc\xaf\x27\x1c",
+    b"Rar!\x1a\x07",
+    b"OggS",
+    b"fLaC",
+    b"ID3",  # MP3
+)
+_FTYP_OFFSET = 4  # MP4, MOV and HEIC files have "ftyp" here
+
+# Bytes of a file needed by has_compressed_magic
+MAGIC_PROBE_SIZE = 16
+
+
+def resolve_compression(choice: Optional[CompressionCodec] = None) -> Optional[str]:
+    """
+    Resolve a compression choice to a codec name.
+
+    Args:
+        choice: Requested codec. None or NONE disables compression; AUTO
+            picks Zstandard when the zstandard package is installed,
+            otherwise zlib
+
+    Returns:
+        Codec name, or None for no compression
+
+    Raises:
+        ValueError: If Zstandard is requested but not installed
+    """
+    if choice is None or choice == CompressionCodec.NONE:
+        return None
+    if choice == CompressionCodec.AUTO:
+        return CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB
+    if choice == CompressionCodec.ZSTD and not ZSTD_AVAILABLE:
+        raise ValueError("Zstandard compression requires the zstandard package")
+    return choice.value
+
+
+def has_compressed_magic(prefix: Any) -> bool:
+    """
+    Check whether data starts with the signature of a compressed format.
+
+    Args:
+        prefix: First bytes of the data (MAGIC_PROBE_SIZE are enough)
+
+    Returns:
+        True for JPEG, PNG, ZIP, gzip and other compressed formats
+    """
+    prefix = bytes(prefix[:MAGIC_PROBE_SIZE])
+    if prefix[_FTYP_OFFSET : _FTYP_OFFSET + 4] == b"ftyp":
+        return True
+    if prefix.startswith(b"RIFF") and prefix[8:12] == b"WEBP":
+        return True
+    return prefix.startswith(_COMPRESSED_MAGIC)
+
+
+def sample_entropy(data: Any) -> float:
+    """
+    Estimate the Shannon entropy of data from a few evenly spread samples.
+
+    Args:
+        data: Bytes-like data
+
+    Returns:
+        Entropy in bits per byte (0 to 8)
+    """
+    view = memoryview(data).cast("B")
+    sample_total = COMPRESSION_SAMPLE_SIZE * COMPRESSION_SAMPLES
+    if len(view) <= sample_total:
+        sample = bytes(view)
+    else:
+        stride = (len(view) - COMPRESSION_SAMPLE_SIZE) // (COMPRESSION_SAMPLES - 1)
+        sample = b"".join(
+            view[start : start + COMPRESSION_SAMPLE_SIZE]
+            for start in range(0, stride * COMPRESSION_SAMPLES, stride)
+        )
+    if not sample:
+        return 0.0
+
+    total = len(sample)
+    return -sum(
+        count / total * math.log2(count / total) for count in Counter(sample).values()
+    )
+
+
+def is_incompressible(chunk: Any) -> bool:
+    """
+    Decide cheaply whether compressing a chunk would be wasted work.
+
+    Args:
+        chunk: Plaintext chunk
+
+    Returns:
+        True if the chunk starts with a compressed format's signature or
+        its sampled entropy reaches COMPRESSION_ENTROPY_THRESHOLD
+    """
+    return (
+        has_compressed_magic(chunk)
+        or sample_entropy(chunk) >= COMPRESSION_ENTROPY_THRESHOLD
+    )
+
+
+def with_compression(
+    cipher: FrameCipher, codec: Optional[str], chunk_size: int
+) -> FrameCipher:
+    """
+    Add per-chunk compression to a frame cipher.
+
+    Args:
+        cipher: Frame cipher of a format 3 file
+        codec: Codec name from the file header, or None
+        chunk_size: Plaintext size of every non-final chunk
+
+    Returns:
+        The cipher itself if codec is None, otherwise a CompressedFrameCipher
+
+    Raises:
+        ValueError: If the codec is unknown or the cipher has no final frame
+    """
+    if codec is None:
+        return cipher
+    return CompressedFrameCipher(cipher, codec, chunk_size)
+
+
+class CompressedFrameCipher(FrameCipher):
+    """
+    Frame cipher that compresses each chunk before encrypting it.
+
+    The frame plaintext is a marker byte followed by the chunk, compressed
+    or stored as is when compression would not make it smaller. Chunks
+    are compressed independently, so frames still decrypt in any order
+    and random access is unaffected; only the frame lengths vary.
+    """
+
+    fixed_frame_length = False
+
+    def __init__(self, cipher: FrameCipher, codec: str, chunk_size: int) -> None:
+        """
+        Wrap a frame cipher.
+
+        Args:
+            cipher: Frame cipher of a format 3 file
+            codec: Codec name (CODEC_ZLIB, CODEC_LZMA or CODEC_ZSTD)
+            chunk_size: Plaintext size of every non-final chunk
+
+        Raises:
+            ValueError: If the codec is unknown or unavailable, or the
+                cipher has no final frame
+        """
+        if codec not in (CODEC_ZLIB, CODEC_LZMA, CODEC_ZSTD):
+            raise ValueError(f"Unsupported compression: {codec}")
+        if codec == CODEC_ZSTD and not ZSTD_AVAILABLE:
+            raise ValueError("Zstandard compression requires the zstandard package")
+        if not cipher.terminated:
+            raise ValueError("Compression requires format version 3")
+        self._cipher = cipher
+        self._codec = codec
+        self._chunk_size = chunk_size
+        self.name = cipher.name
+        self.releases_gil = cipher.releases_gil
+        self.terminated = cipher.terminated
+
+    def seal(self, index: int, chunk: BytesLike, final: bool) -> bytes:
+        """Compress one chunk if worthwhile, then encrypt it into a frame."""
+        payload = None
+        if chunk and not is_incompressible(chunk):
+            compressed = _compress(self._codec, chunk)
+            if len(compressed) < len(chunk):
+                payload = bytes((_COMPRESSED,)) + compressed
+        if payload is None:
+            payload = bytes((_STORED,)) + bytes(chunk)
+        return self._cipher.seal(index, payload, final)
+
+    def open(self, index: int, frame: BytesLike, final: bool) -> bytes:
+        """
+        Decrypt one frame and decompress its chunk.
+
+        Raises:
+            ValueError: If the authenticated payload is malformed or a
+                non-final chunk is not exactly chunk_size bytes
+        """
+        payload = self._cipher.open(index, frame, final)
+        if not payload:
+            raise ValueError(f"Compressed frame {index} has no marker")
+        marker = payload[0]
+        if marker == _STORED:
+            chunk = payload[1:]
+        elif marker == _COMPRESSED:
+            chunk = _decompress(self._codec, payload[1:], self._chunk_size)
+        else:
+            raise ValueError(f"Compressed frame {index} has an unknown marker")
+        if len(chunk) > self._chunk_size:
+            raise ValueError("Encrypted frame exceeds the chunk size")
+        # Reason: readers locate chunk i at i * chunk_size in the plaintext
+        if not final and len(chunk) != self._chunk_size:
+            raise ValueError(f"Compressed frame {index} is not a full chunk")
+        return chunk
+
+    def frame_length(self, plaintext_length: int) -> int:
+        """Calculate the longest frame a chunk can need (stored as is)."""
+        return self._cipher.frame_length(plaintext_length + 1)
+
+
+def _compress(codec: str, chunk: BytesLike) -> bytes:
+    """
+    Compress one chunk.
+
+    Args:
+        codec: Codec name
+        chunk: Plaintext chunk
+
+    Returns:
+        Compressed bytes
+    """
+    if codec == CODEC_ZLIB:
+        return zlib.compress(chunk, ZLIB_COMPRESSION_LEVEL)
+    if codec == CODEC_LZMA:
+        return lzma.compress(chunk, preset=LZMA_COMPRESSION_PRESET)
+    return zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL).compress(chunk)
+
+
+def _decompress(codec: str, data: bytes, limit: int) -> bytes:
+    """
+    Decompress one chunk, refusing to expand it beyond a limit.
+
+    Args:
+        codec: Codec name
+        data: Compressed bytes
+        limit: Largest valid plaintext size
+
+    Returns:
+        Plaintext chunk
+
+    Raises:
+        ValueError: If the data is truncated, malformed or too large
+    """
+    try:
+        if codec == CODEC_ZLIB:
+            zlib_decompressor = zlib.decompressobj()
+            chunk = zlib_decompressor.decompress(data, limit + 1)
+            complete = zlib_decompressor.eof
+        elif codec == CODEC_LZMA:
+            lzma_decompressor = lzma.LZMADecompressor()
+            chunk = lzma_decompressor.decompress(data, max_length=limit + 1)
+            complete = lzma_decompressor.eof
+        else:
+            chunk = zstandard.ZstdDecompressor().decompress(
+                data, max_output_size=limit + 1
+            )
+            complete = True
+    except _CODEC_ERRORS as e:
+        raise ValueError(f"Compressed chunk is corrupt: {e}") from e
+
+    if not complete or len(chunk) > limit:
+        raise ValueError("Compressed chunk is corrupt")
+    return chunk
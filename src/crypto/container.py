@@ -0,0 +1,460 @@
+"""Binary container header for format version 3 and 4 encrypted files."""
+
+import hashlib
+import hmac
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Optional
+
+from .ciphers import CIPHER_AES_256_GCM, CIPHER_CHACHA20_POLY1305
+from .compression import CODEC_LZMA, CODEC_ZLIB, CODEC_ZSTD
+from .digest import DIGEST_BLAKE2B
+from .key_derivation import KdfParams, derive_subkey, validate_kdf_params
+from ..config.constants import (
+    AUTO_CHUNK_SIZE,
+    CHUNK_SIZE,
+    DIRECT_KEY_FORMAT_VERSION,
+    FILE_NONCE_SIZE,
+    FORMAT_VERSION,
+    KEY_CHECK_SIZE,
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    SALT_SIZE,
+    TARGET_CHUNK_COUNT,
+    WRAPPED_KEY_SIZE,
+)
+from ..config.models import EncryptionMode, KdfAlgorithm
+
+# Reason: the high-bit first byte keeps text files from ever matching, and
+# v2 files start with a random salt or a small big-endian JSON length
+MAGIC = b"\x89ENTRYPT"
+
+# magic, format version, encryption mode, cipher, log2(chunk size), KDF,
+# KDF time cost, KDF memory cost, KDF parallelism, plaintext digest,
+# compression codec, plaintext size, chunk count, salt, file nonce, extension length; followed
+# by the extension, the wrapped data key (format 4 only) and the key-check value
+_HEADER = struct.Struct(f">{len(MAGIC)}sBBBBBIIBBBQQ{SALT_SIZE}s{FILE_NONCE_SIZE}sB")
+_UNKNOWN_SIZE = 0xFFFFFFFFFFFFFFFF  # Plaintext size of streams of unknown length
+
+# Largest possible header, so one read of this size always covers it
+MAX_HEADER_SIZE = _HEADER.size + 255 + WRAPPED_KEY_SIZE + KEY_CHECK_SIZE
+
+_MODE_CODES = {EncryptionMode.PASSWORD: 1, EncryptionMode.KEYFILE: 2}
+_CIPHER_CODES = {CIPHER_AES_256_GCM: 1, CIPHER_CHACHA20_POLY1305: 2}
+_NO_KDF_CODE = 0  # Keyfile mode files
+_KDF_CODES = {KdfAlgorithm.PBKDF2: 1, KdfAlgorithm.SCRYPT: 2, KdfAlgorithm.ARGON2ID: 3}
+_NO_DIGEST_CODE = 0
+_DIGEST_CODES = {DIGEST_BLAKE2B: 1}
+_NO_COMPRESSION_CODE = 0
+_COMPRESSION_CODES = {CODEC_ZLIB: 1, CODEC_LZMA: 2, CODEC_ZSTD: 3}
+
+# HKDF context label for the key that computes the header key-check value
+_KEY_CHECK_INFO = b"entryptor v3 key check"
+
+
+@dataclass
+class ContainerHeader:
+    """Header of a format version 3 or 4 encrypted file."""
+
+    mode: EncryptionMode
+    cipher: str
+    salt: bytes
+    original_extension: str = ""
+    chunk_size: int = CHUNK_SIZE
+    # Reason: the file key is an HKDF subkey of a (possibly shared) master
+    # key, so every file needs its own random nonce
+    file_nonce: bytes = field(default_factory=lambda: os.urandom(FILE_NONCE_SIZE))
+    kdf: Optional[KdfParams] = None  # Password mode only
+    plaintext_size: Optional[int] = None  # None if unknown when written
+    # Reason: recorded here so that stripping the footer digest record is
+    # caught by the key check
+    digest: Optional[str] = None  # Plaintext digest in the footer, if any
+    compression: Optional[str] = None  # Per-chunk codec; None if uncompressed
+    # Reason: frames are sealed with a random data key stored wrapped by the
+    # credential's key, so changing the credential only rewrites the header
+    wrapped_key: Optional[bytes] = None  # Format 4 only
+    # Reason: an HMAC of the header under a subkey of the file key rejects a
+    # wrong password or keyfile before any frame is read or output created
+    key_check: bytes = b""
+
+    def pack(self) -> bytes:
+        """
+        Serialize the header.
+
+        Returns:
+            Header bytes, including the original extension and key check
+
+        Raises:
+            ValueError: If a field cannot be represented or the key check
+                has not been set
+        """
+        fields = self._pack_fields()
+        if len(self.key_check) != KEY_CHECK_SIZE:
+            raise ValueError("Header key check has not been set")
+        return fields + self.key_check
+
+    @property
+    def version(self) -> int:
+        """Format version: 4 for envelope files, 3 otherwise."""
+        if self.wrapped_key is None:
+            return DIRECT_KEY_FORMAT_VERSION
+        return FORMAT_VERSION
+
+    @property
+    def chunk_count(self) -> Optional[int]:
+        """Number of frames, or None if the plaintext size is unknown."""
+        if self.plaintext_size is None:
+            return None
+        # An empty file still has one (empty) final chunk
+        return max(1, -(-self.plaintext_size // self.chunk_size))
+
+    def set_key_check(self, key: bytes) -> None:
+        """
+        Compute the key-check value for the file key.
+
+        Call this after all other fields are final.
+
+        Args:
+            key: Frame cipher key of the file (the data key of format 4
+                files)
+        """
+        self.key_check = self._compute_key_check(key)
+
+    def verify_key(self, key: bytes) -> bool:
+        """
+        Check a derived file key against the header's key-check value.
+
+        This also detects modified header fields.
+
+        Args:
+            key: Candidate frame cipher key
+
+        Returns:
+            True if the key is the one the file was encrypted with
+        """
+        return hmac.compare_digest(self._compute_key_check(key), self.key_check)
+
+    def _compute_key_check(self, key: bytes) -> bytes:
+        """
+        Compute the key-check value of the header for a file key.
+
+        Args:
+            key: Frame cipher key
+
+        Returns:
+            KEY_CHECK_SIZE-byte HMAC-SHA256 of the other header fields
+        """
+        check_key = derive_subkey(key, self.file_nonce, _KEY_CHECK_INFO)
+        digest = hmac.new(check_key, self._pack_fields(), hashlib.sha256).digest()
+        return digest[:KEY_CHECK_SIZE]
+
+    def _pack_fields(self) -> bytes:
+        """
+        Serialize every header field except the key check.
+
+        Returns:
+            Header bytes up to and including the original extension
+
+        Raises:
+            ValueError: If a field cannot be represented
+        """
+        if len(self.salt) != SALT_SIZE:
+            raise ValueError(f"Salt must be {SALT_SIZE} bytes")
+        if len(self.file_nonce) != FILE_NONCE_SIZE:
+            raise ValueError(f"File nonce must be {FILE_NONCE_SIZE} bytes")
+        if self.wrapped_key is not None and len(self.wrapped_key) != WRAPPED_KEY_SIZE:
+            raise ValueError(f"Wrapped key must be {WRAPPED_KEY_SIZE} bytes")
+
+        extension = self.original_extension.encode("utf-8")
+        if len(extension) > 255:
+            raise ValueError("Original extension is too long")
+
+        cipher_code = _CIPHER_CODES.get(self.cipher)
+        if cipher_code is None:
+            raise ValueError(f"Unsupported cipher: {self.cipher}")
+
+        digest_code = (
+            _NO_DIGEST_CODE if self.digest is None else _DIGEST_CODES.get(self.digest)
+        )
+        if digest_code is None:
+            raise ValueError(f"Unsupported digest: {self.digest}")
+
+        compression_code = (
+            _NO_COMPRESSION_CODE
+            if self.compression is None
+            else _COMPRESSION_CODES.get(self.compression)
+        )
+        if compression_code is None:
+            raise ValueError(f"Unsupported compression: {self.compression}")
+
+        if self.mode == EncryptionMode.PASSWORD and self.kdf is None:
+            raise ValueError("Password mode headers need KDF parameters")
+        if self.kdf is None:
+            kdf_fields = (_NO_KDF_CODE, 0, 0, 0)
+        else:
+            kdf = validate_kdf_params(self.kdf)
+            kdf_fields = (
+                _KDF_CODES[kdf.algorithm],
+                kdf.time_cost,
+                kdf.memory_cost,
+                kdf.parallelism,
+            )
+
+        fixed = _HEADER.pack(
+            MAGIC,
+            self.version,
+            _MODE_CODES[self.mode],
+            cipher_code,
+            validate_chunk_size(self.chunk_size).bit_length() - 1,
+            *kdf_fields,
+            digest_code,
+            compression_code,
+            _UNKNOWN_SIZE if self.plaintext_size is None else self.plaintext_size,
+            0 if self.chunk_count is None else self.chunk_count,
+            self.salt,
+            self.file_nonce,
+            len(extension),
+        )
+        return fixed + extension + (self.wrapped_key or b"")
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """
+        Describe the header in the form returned by get_file_metadata.
+
+        Returns:
+            Metadata dictionary
+        """
+        return {
+            "original_extension": self.original_extension,
+            "version": f"{self.version}.0.0",
+            "encryption_mode": self.mode.value,
+            "cipher": self.cipher,
+            "chunk_size": self.chunk_size,
+            "kdf": None if self.kdf is None else self.kdf.algorithm.value,
+            "plaintext_size": self.plaintext_size,
+            "chunk_count": self.chunk_count,
+            "digest": self.digest,
+            "compression": self.compression,
+        }
+
+
+def choose_chunk_size(file_size: int) -> int:
+    """
+    Pick the chunk size for a file of the given size.
+
+    Small files keep MIN_CHUNK_SIZE chunks; larger files get larger chunks
+    so that the per-frame cost (tag, length prefix, index entry and one
+    cipher call) stays negligible.
+
+    Args:
+        file_size: Plaintext size in bytes
+
+    Returns:
+        Power-of-two chunk size between MIN_CHUNK_SIZE and MAX_CHUNK_SIZE
+    """
+    target = max(1, file_size // TARGET_CHUNK_COUNT)
+    # Reason: round down to a power of two so the size fits the header field
+    chunk_size = 1 << (target.bit_length() - 1)
+    return max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, chunk_size))
+
+
+def validate_chunk_size(chunk_size: int) -> int:
+    """
+    Check that a chunk size can be recorded in a container header.
+
+    Args:
+        chunk_size: Chunk size in bytes
+
+    Returns:
+        The chunk size
+
+    Raises:
+        ValueError: If the size is not a power of two between MIN_CHUNK_SIZE
+            and MAX_CHUNK_SIZE
+    """
+    if (
+        chunk_size < MIN_CHUNK_SIZE
+        or chunk_size > MAX_CHUNK_SIZE
+        or chunk_size & (chunk_size - 1)
+    ):
+        raise ValueError(
+            f"Chunk size must be a power of two between {MIN_CHUNK_SIZE} "
+            f"and {MAX_CHUNK_SIZE} bytes: {chunk_size}"
+        )
+    return chunk_size
+
+
+def resolve_chunk_size(chunk_size: Optional[int], file_size: int) -> int:
+    """
+    Resolve a requested chunk size.
+
+    Args:
+        chunk_size: Requested size; None or AUTO_CHUNK_SIZE picks one from
+            the file size
+        file_size: Plaintext size in bytes
+
+    Returns:
+        Chunk size in bytes
+
+    Raises:
+        ValueError: If an explicit size is not valid
+    """
+    if chunk_size is None or chunk_size == AUTO_CHUNK_SIZE:
+        return choose_chunk_size(file_size)
+    return validate_chunk_size(chunk_size)
+
+
+def has_magic(prefix: bytes) -> bool:
+    """
+    Check whether data starts with the container magic bytes.
+
+    Args:
+        prefix: First bytes of a file
+
+    Returns:
+        True if the bytes start a version 3 (or later) container
+    """
+    return prefix[: len(MAGIC)] == MAGIC
+
+
+def read_header(infile: BinaryIO) -> ContainerHeader:
+    """
+    Read and validate a container header.
+
+    Args:
+        infile: Binary stream positioned at the start of the file
+
+    Returns:
+        Parsed ContainerHeader; the stream is left at the first frame
+
+    Raises:
+        ValueError: If the header is missing, truncated or unsupported
+    """
+    fixed = infile.read(_HEADER.size)
+    if not has_magic(fixed):
+        raise ValueError("Not an Entryptor container")
+    if len(fixed) < _HEADER.size:
+        raise ValueError("Truncated container header")
+
+    # The extension length is the last fixed field
+    remaining = fixed[-1] + KEY_CHECK_SIZE
+    if fixed[len(MAGIC)] == FORMAT_VERSION:
+        remaining += WRAPPED_KEY_SIZE
+    return unpack_header(fixed + infile.read(remaining))
+
+
+def unpack_header(data: bytes) -> ContainerHeader:
+    """
+    Parse and validate a container header from the first bytes of a file.
+
+    Args:
+        data: Bytes starting at offset 0; reading MAX_HEADER_SIZE bytes is
+            always enough, and extra bytes are ignored
+
+    Returns:
+        Parsed ContainerHeader
+
+    Raises:
+        ValueError: If the header is missing, truncated or unsupported
+    """
+    if not has_magic(data):
+        raise ValueError("Not an Entryptor container")
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated container header")
+
+    (
+        _,
+        version,
+        mode_code,
+        cipher_code,
+        chunk_shift,
+        kdf_code,
+        kdf_time_cost,
+        kdf_memory_cost,
+        kdf_parallelism,
+        digest_code,
+        compression_code,
+        plaintext_size,
+        chunk_count,
+        salt,
+        file_nonce,
+        extension_length,
+    ) = _HEADER.unpack_from(data)
+    if version not in (DIRECT_KEY_FORMAT_VERSION, FORMAT_VERSION):
+        raise ValueError(f"Unsupported format version: {version}")
+    if chunk_shift >= MAX_CHUNK_SIZE.bit_length():
+        raise ValueError(f"Unsupported chunk size code: {chunk_shift}")
+    chunk_size = validate_chunk_size(1 << chunk_shift)
+
+    mode = _lookup(_MODE_CODES, mode_code, "encryption mode")
+    cipher = _lookup(_CIPHER_CODES, cipher_code, "cipher")
+    kdf = None
+    if kdf_code != _NO_KDF_CODE:
+        kdf = validate_kdf_params(
+            KdfParams(
+                _lookup(_KDF_CODES, kdf_code, "KDF"),
+                kdf_time_cost,
+                kdf_memory_cost,
+                kdf_parallelism,
+            )
+        )
+    elif mode == EncryptionMode.PASSWORD:
+        raise ValueError("Password mode header has no KDF parameters")
+
+    extension_end = _HEADER.size + extension_length
+    wrapped_key = None
+    key_check_start = extension_end
+    if version == FORMAT_VERSION:
+        key_check_start += WRAPPED_KEY_SIZE
+        wrapped_key = bytes(data[extension_end:key_check_start])
+    key_check = data[key_check_start : key_check_start + KEY_CHECK_SIZE]
+    if len(key_check) < KEY_CHECK_SIZE:
+        raise ValueError("Truncated container header")
+
+    header = ContainerHeader(
+        mode=mode,
+        cipher=cipher,
+        salt=salt,
+        original_extension=data[_HEADER.size : extension_end].decode("utf-8"),
+        chunk_size=chunk_size,
+        file_nonce=file_nonce,
+        kdf=kdf,
+        plaintext_size=None if plaintext_size == _UNKNOWN_SIZE else plaintext_size,
+        digest=(
+            None
+            if digest_code == _NO_DIGEST_CODE
+            else _lookup(_DIGEST_CODES, digest_code, "digest")
+        ),
+        compression=(
+            None
+            if compression_code == _NO_COMPRESSION_CODE
+            else _lookup(_COMPRESSION_CODES, compression_code, "compression")
+        ),
+        wrapped_key=wrapped_key,
+        key_check=bytes(key_check),
+    )
+    if (header.chunk_count or 0) != chunk_count:
+        raise ValueError("Header chunk count does not match the plaintext size")
+    return header
+
+
+def _lookup(codes: Dict[Any, int], code: int, field: str) -> Any:
+    """
+    Reverse-map a header code to its value.
+
+    Args:
+        codes: Mapping of values to codes
+        code: Code read from the header
+        field: Field name for the error message
+
+    Returns:
+        Value stored under the code
+
+    Raises:
+        ValueError: If the code is unknown
+    """
+    for value, value_code in codes.items():
+        if value_code == code:
+            return value
+    raise ValueError(f"Unknown {field} code: {code}")
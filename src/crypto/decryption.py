@@ -0,0 +1,307 @@
+"""Decryption of whole files and metadata probing of encrypted files."""
+
+import os
+from typing import Any, BinaryIO, Dict, Optional
+
+from .cancellation import CancellationToken, OperationCancelled
+from .digest import check_plaintext_digest, new_plaintext_hash
+from .engine import decrypt_frames
+from .file_format import (
+    METADATA_PROBE_SIZE,
+    FileKeyInfo,
+    derive_file_key,
+    detect_file_metadata,
+    read_file_header,
+)
+from .output import AtomicOutput, check_free_space
+from .progress import ProgressCallback, ProgressReporter, completed_result
+from .secure_memory import SecurePassword, SecureBytes
+from .stats import profiled
+from ..config.constants import CHUNK_SIZE, ENCRYPTED_EXTENSION
+from ..config.models import (
+    EncryptionMode,
+    EncryptionResult,
+    FsyncPolicy,
+    OperationStage,
+)
+
+
+@profiled
+def decrypt_file_with_password(
+    file_path: str,
+    password: SecurePassword,
+    output_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    in_flight_chunks: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancellationToken] = None,
+    fsync: Optional[FsyncPolicy] = None,
+) -> EncryptionResult:
+    """
+    Decrypt a file using password-based decryption.
+
+    Args:
+        file_path: Path to the encrypted file
+        password: Secure password wrapper
+        output_path: Optional output path. If None, uses original extension
+        workers: Number of workers (None uses the default, 0 uses one per
+            CPU core)
+        in_flight_chunks: Maximum chunks buffered by the large-file pipeline
+            (None uses PIPELINE_IN_FLIGHT_CHUNKS)
+        progress: Called with ProgressInfo snapshots, at most every
+            PROGRESS_INTERVAL seconds and at each stage change; the total
+            is unknown for format 2 files
+        cancel: Token stopping the call between chunks; the partial output
+            is removed and the result has cancelled set
+        fsync: Durability of the output before it atomically replaces
+            output_path (None uses FsyncPolicy.FILE)
+
+    Returns:
+        EncryptionResult with success status, output path and, on success,
+        OperationStats
+    """
+    try:
+        if not os.path.exists(file_path):
+            return EncryptionResult(
+                success=False, error_message=f"File not found: {file_path}"
+            )
+
+        with open(file_path, "rb") as infile:
+            metadata, key_info = read_file_header(infile, EncryptionMode.PASSWORD)
+
+            # Verify encryption mode
+            if metadata.get("encryption_mode") != EncryptionMode.PASSWORD.value:
+                return EncryptionResult(
+                    success=False,
+                    error_message="File was not encrypted with password mode",
+                )
+
+            # Derive key
+            reporter = ProgressReporter(
+                progress, metadata.get("plaintext_size"), cancel=cancel
+            )
+            reporter.set_stage(OperationStage.DERIVING_KEY)
+            key = derive_file_key(EncryptionMode.PASSWORD, key_info, password=password)
+
+            if output_path is None:
+                output_path = _default_output_path(file_path, metadata)
+
+            _decrypt_file(
+                infile,
+                file_path,
+                output_path,
+                key_info,
+                key,
+                metadata,
+                workers,
+                in_flight_chunks,
+                reporter,
+                fsync,
+            )
+
+        return completed_result(reporter, "decrypt", file_path, output_path)
+
+    except OperationCancelled as e:
+        return EncryptionResult(
+            success=False, error_message=f"Decryption {e}", cancelled=True
+        )
+    except Exception as e:
+        return EncryptionResult(
+            success=False, error_message=f"Decryption failed: {str(e)}"
+        )
+
+
+@profiled
+def decrypt_file_with_keyfile(
+    file_path: str,
+    keyfile_path: str,
+    output_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    in_flight_chunks: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancellationToken] = None,
+    fsync: Optional[FsyncPolicy] = None,
+) -> EncryptionResult:
+    """
+    Decrypt a file using keyfile-based decryption.
+
+    Args:
+        file_path: Path to the encrypted file
+        keyfile_path: Path to the keyfile
+        output_path: Optional output path. If None, uses original extension
+        workers: Number of workers (None uses the default, 0 uses one per
+            CPU core)
+        in_flight_chunks: Maximum chunks buffered by the large-file pipeline
+            (None uses PIPELINE_IN_FLIGHT_CHUNKS)
+        progress: Called with ProgressInfo snapshots, at most every
+            PROGRESS_INTERVAL seconds and at each stage change; the total
+            is unknown for format 2 files
+        cancel: Token stopping the call between chunks; the partial output
+            is removed and the result has cancelled set
+        fsync: Durability of the output before it atomically replaces
+            output_path (None uses FsyncPolicy.FILE)
+
+    Returns:
+        EncryptionResult with success status, output path and, on success,
+        OperationStats
+    """
+    try:
+        if not os.path.exists(file_path):
+            return EncryptionResult(
+                success=False, error_message=f"File not found: {file_path}"
+            )
+
+        with open(file_path, "rb") as infile:
+            metadata, key_info = read_file_header(infile, EncryptionMode.KEYFILE)
+
+            # Verify encryption mode
+            if metadata.get("encryption_mode") != EncryptionMode.KEYFILE.value:
+                return EncryptionResult(
+                    success=False,
+                    error_message="File was not encrypted with keyfile mode",
+                )
+
+            # Derive key from keyfile
+            reporter = ProgressReporter(
+                progress, metadata.get("plaintext_size"), cancel=cancel
+            )
+            reporter.set_stage(OperationStage.DERIVING_KEY)
+            key = derive_file_key(
+                EncryptionMode.KEYFILE, key_info, keyfile_path=keyfile_path
+            )
+
+            if output_path is None:
+                output_path = _default_output_path(file_path, metadata)
+
+            _decrypt_file(
+                infile,
+                file_path,
+                output_path,
+                key_info,
+                key,
+                metadata,
+                workers,
+                in_flight_chunks,
+                reporter,
+                fsync,
+            )
+
+        return completed_result(reporter, "decrypt", file_path, output_path)
+
+    except OperationCancelled as e:
+        return EncryptionResult(
+            success=False, error_message=f"Decryption {e}", cancelled=True
+        )
+    except Exception as e:
+        return EncryptionResult(
+            success=False, error_message=f"Decryption failed: {str(e)}"
+        )
+
+
+def get_file_metadata(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Extract metadata from an encrypted file.
+
+    Args:
+        file_path: Path to the encrypted file
+
+    Returns:
+        Metadata dictionary or None if file is not encrypted
+    """
+    try:
+        # Reason: one unbuffered read identifies the file, so scanning many
+        # files costs a single small read each
+        with open(file_path, "rb", buffering=0) as infile:
+            return detect_file_metadata(infile.read(METADATA_PROBE_SIZE))
+    except OSError:
+        return None
+
+
+def _decrypt_file(
+    infile: BinaryIO,
+    file_path: str,
+    output_path: str,
+    key_info: FileKeyInfo,
+    key: bytes,
+    metadata: Dict[str, Any],
+    workers: Optional[int],
+    in_flight_chunks: Optional[int],
+    progress: Optional[ProgressReporter] = None,
+    fsync: Optional[FsyncPolicy] = None,
+) -> None:
+    """
+    Decrypt the frames of a file and check its plaintext digest.
+
+    Args:
+        infile: Encrypted input stream positioned at the first frame
+        file_path: Path to the encrypted file
+        output_path: Plaintext output path
+        key_info: Header fields of the file
+        key: Frame cipher key
+        metadata: File metadata
+        workers: Requested worker count
+        in_flight_chunks: Requested pipeline in-flight chunk limit
+        progress: Reporter of the call, or None
+        fsync: Durability policy of the output
+
+    Raises:
+        ValueError: If a frame or the plaintext digest does not verify
+        OperationCancelled: If the call was cancelled
+    """
+    header = key_info.header
+    digest_nonce = None
+    plaintext_hash = None
+    if header is not None and header.digest is not None:
+        digest_nonce = header.file_nonce
+        plaintext_hash = new_plaintext_hash()
+
+    # Reason: only uncompressed frames are never smaller than their
+    # plaintext, so the encrypted size bounds the output of older files
+    predicted_size = metadata.get("plaintext_size")
+    if predicted_size is None and metadata.get("compression") is None:
+        predicted_size = os.path.getsize(file_path)
+
+    if progress is not None:
+        progress.set_stage(OperationStage.DECRYPTING)
+    with AtomicOutput(output_path, fsync) as output:
+        check_free_space(output.temp_path, predicted_size)
+        with SecureBytes(key) as secure_key:
+            decrypt_frames(
+                infile,
+                file_path,
+                output.temp_path,
+                key_info.cipher_name,
+                secure_key.get_bytes(),
+                workers,
+                in_flight_chunks,
+                metadata.get("chunk_size", CHUNK_SIZE),
+                plaintext_hash,
+                metadata.get("compression"),
+                progress,
+            )
+            if plaintext_hash is not None and digest_nonce is not None:
+                check_plaintext_digest(
+                    infile,
+                    secure_key.get_bytes(),
+                    digest_nonce,
+                    plaintext_hash.digest(),
+                )
+        output.commit()
+
+
+def _default_output_path(file_path: str, metadata: Dict[str, Any]) -> str:
+    """
+    Build the decrypted output path from the encrypted path and metadata.
+
+    Args:
+        file_path: Path to the encrypted file
+        metadata: File metadata holding the original extension
+
+    Returns:
+        Output path with the original extension restored
+    """
+    base_path = os.path.splitext(file_path)[0]
+    if file_path.endswith(ENCRYPTED_EXTENSION):
+        base_path = base_path[: -len(ENCRYPTED_EXTENSION)]
+    original_extension = metadata.get("original_extension", "")
+    return base_path + original_extension
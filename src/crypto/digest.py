@@ -0,0 +1,150 @@
+"""End-to-end plaintext digest stored in the footer of format 3 files."""
+
+import hashlib
+import hmac
+from typing import BinaryIO, Optional, cast
+
+from .framing import read_footer_record
+from .key_derivation import derive_subkey
+
+DIGEST_BLAKE2B = "blake2b-512"
+DIGEST_SIZE = 64  # BLAKE2b-512, the same value b2sum prints
+
+# Footer record: the digest followed by an HMAC-SHA256 of it
+_MAC_SIZE = 32
+DIGEST_RECORD_SIZE = DIGEST_SIZE + _MAC_SIZE
+
+# HKDF context label for the key that authenticates the digest record
+_DIGEST_INFO = b"entryptor v3 plaintext digest"
+
+_HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def new_plaintext_hash() -> "hashlib._Hash":
+    """
+    Start a running digest of a plaintext stream.
+
+    Returns:
+        BLAKE2b-512 hash object
+    """
+    # Reason: the stubs give blake2b its own class rather than hashlib._Hash,
+    # although it has the same interface
+    return cast("hashlib._Hash", hashlib.blake2b(digest_size=DIGEST_SIZE))
+
+
+def seal_digest(key: bytes, file_nonce: bytes, digest: bytes) -> bytes:
+    """
+    Build the authenticated footer record for a plaintext digest.
+
+    Args:
+        key: Frame cipher key of the file
+        file_nonce: File nonce from the header
+        digest: Plaintext digest
+
+    Returns:
+        DIGEST_RECORD_SIZE-byte record
+    """
+    return digest + _digest_mac(key, file_nonce, digest)
+
+
+def open_digest(key: bytes, file_nonce: bytes, record: Optional[bytes]) -> bytes:
+    """
+    Authenticate a footer record and return the digest it holds.
+
+    Args:
+        key: Frame cipher key of the file
+        file_nonce: File nonce from the header
+        record: Footer record, or None if the file has none
+
+    Returns:
+        Plaintext digest
+
+    Raises:
+        ValueError: If the record is missing or was modified
+    """
+    if record is None or len(record) != DIGEST_RECORD_SIZE:
+        raise ValueError("Plaintext digest record is missing")
+    digest = record[:DIGEST_SIZE]
+    if not hmac.compare_digest(
+        _digest_mac(key, file_nonce, digest), record[DIGEST_SIZE:]
+    ):
+        raise ValueError("Plaintext digest record was modified")
+    return digest
+
+
+def check_plaintext_digest(
+    infile: BinaryIO, key: bytes, file_nonce: bytes, digest: bytes
+) -> None:
+    """
+    Compare a recomputed plaintext digest with the one stored in a file.
+
+    Args:
+        infile: Seekable encrypted input stream (its position is changed)
+        key: Frame cipher key of the file
+        file_nonce: File nonce from the header
+        digest: Digest of the decrypted plaintext
+
+    Raises:
+        ValueError: If the stored digest is missing, modified or different
+    """
+    stored = open_digest(key, file_nonce, read_footer_record(infile))
+    if not hmac.compare_digest(stored, digest):
+        raise ValueError("Plaintext digest does not match")
+
+
+def hash_file(file_path: str) -> bytes:
+    """
+    Compute the plaintext digest of a file.
+
+    Args:
+        file_path: File to hash
+
+    Returns:
+        BLAKE2b-512 digest of the file contents
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    plaintext_hash = new_plaintext_hash()
+    update_hash_from_file(plaintext_hash, file_path)
+    return plaintext_hash.digest()
+
+
+def update_hash_from_file(plaintext_hash: "hashlib._Hash", file_path: str) -> None:
+    """
+    Feed the contents of a file into a running digest.
+
+    Args:
+        plaintext_hash: Hash to update
+        file_path: File to read
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    buffer = memoryview(bytearray(_HASH_BUFFER_SIZE))
+    try:
+        with open(file_path, "rb", buffering=0) as infile:
+            while True:
+                count = infile.readinto(buffer)
+                if not count:
+                    break
+                plaintext_hash.update(buffer[:count])
+    finally:
+        # Zeroize the plaintext buffer
+        buffer[:] = bytes(len(buffer))
+
+
+def _digest_mac(key: bytes, file_nonce: bytes, digest: bytes) -> bytes:
+    """
+    Compute the MAC of a digest under a subkey of the file key.
+
+    Args:
+        key: Frame cipher key of the file
+        file_nonce: File nonce from the header
+        digest: Plaintext digest
+
+    Returns:
+        32-byte HMAC-SHA256
+    """
+    mac_key = derive_subkey(key, file_nonce, _DIGEST_INFO)
+    return hmac.new(mac_key, digest, hashlib.sha256).digest()
@@ -1,15 +1,67 @@
-"""Core encryption and decryption functionality."""
+"""Core encryption functionality.
 
-import json
-import os
-from typing import Optional, Dict, Any
-
-from cryptography.fernet import Fernet
+The decryption entry points live in decryption.py and are re-exported here,
+so callers keep importing both directions from this module.
+"""
 
+import os
+from typing import Literal, Optional
+
+from .cancellation import CancellationToken, OperationCancelled
+from .checkpoint import (
+    CheckpointWriter,
+    ResumePoint,
+    remove_checkpoint,
+    restore_checkpoint,
+    resume_point,
+    start_partial,
+)
+from .ciphers import CIPHER_FERNET, resolve_cipher
+from .compression import (
+    MAGIC_PROBE_SIZE,
+    has_compressed_magic,
+    resolve_compression,
+)
+from .container import ContainerHeader, resolve_chunk_size
+from .decryption import (
+    decrypt_file_with_keyfile as decrypt_file_with_keyfile,
+    decrypt_file_with_password as decrypt_file_with_password,
+    get_file_metadata as get_file_metadata,
+)
+from .digest import (
+    DIGEST_BLAKE2B,
+    new_plaintext_hash,
+    seal_digest,
+)
+from .engine import encrypt_frames, encrypted_size_bound
+from .kdf_calibration import stored_kdf_params
+from .key_derivation import KdfParams
+from .file_format import (
+    create_data_key,
+    create_file_key,
+    derive_file_key,
+    write_legacy_header,
+)
+from .output import AtomicOutput, check_free_space
+from .progress import ProgressCallback, ProgressReporter, completed_result
 from .secure_memory import SecurePassword, SecureBytes
-from .key_derivation import derive_key_from_password, derive_key_from_keyfile
-from ..config.constants import ENCRYPTED_EXTENSION, CHUNK_SIZE
-from ..config.models import EncryptionResult, FileMetadata, EncryptionMode
+from .stats import profiled
+from ..config.constants import (
+    CHUNK_SIZE,
+    DIRECT_KEY_FORMAT_VERSION,
+    ENCRYPTED_EXTENSION,
+    FORMAT_VERSION,
+    LEGACY_FORMAT_VERSION,
+)
+from ..config.models import (
+    CipherAlgorithm,
+    CompressionCodec,
+    EncryptionResult,
+    FileMetadata,
+    EncryptionMode,
+    FsyncPolicy,
+    OperationStage,
+)
 
 
 class EncryptionError(Exception):
@@ -24,11 +76,23 @@ class DecryptionError(Exception):
     pass
 
 
+@profiled
 def encrypt_file_with_password(
     file_path: str,
     password: SecurePassword,
     output_path: Optional[str] = None,
     preserve_extension: bool = True,
+    workers: Optional[int] = None,
+    format_version: int = FORMAT_VERSION,
+    cipher: Optional[CipherAlgorithm] = None,
+    in_flight_chunks: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    kdf: Optional[KdfParams] = None,
+    compression: Optional[CompressionCodec] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancellationToken] = None,
+    fsync: Optional[FsyncPolicy] = None,
+    resumable: bool = False,
 ) -> EncryptionResult:
     """
     Encrypt a file using password-based encryption.
@@ -38,9 +102,35 @@ def encrypt_file_with_password(
         password: Secure password wrapper
         output_path: Optional output path. If None, uses input path + .enc
         preserve_extension: Whether to preserve original extension in metadata
+        workers: Number of workers (None uses the default, 0 uses one per
+            CPU core)
+        format_version: File format to write; DIRECT_KEY_FORMAT_VERSION
+            writes format 3 files (no wrapped data key, so no rekey_file)
+            and LEGACY_FORMAT_VERSION writes Fernet files, for older
+            Entryptor releases
+        cipher: AEAD cipher for format 3 files (None or AUTO picks the
+            fastest cipher on this machine)
+        in_flight_chunks: Maximum chunks buffered by the large-file pipeline
+            (None uses PIPELINE_IN_FLIGHT_CHUNKS)
+        chunk_size: Chunk size for format 3 files (None or AUTO_CHUNK_SIZE
+            picks one from the file size)
+        kdf: Password KDF and cost parameters for format 3 files (None uses
+            stored_kdf_params()); they are stored in the header
+        compression: Per-chunk compression codec for format 3 files (None
+            stores chunks as is)
+        progress: Called with ProgressInfo snapshots, at most every
+            PROGRESS_INTERVAL seconds and at each stage change
+        cancel: Token stopping the call between chunks; the partial output
+            is removed and the result has cancelled set
+        fsync: Durability of the output before it atomically replaces
+            output_path (None uses FsyncPolicy.FILE)
+        resumable: Write a format 3 file through output_path + ".partial"
+            with periodic checkpoints; an interrupted call repeated with
+            the same arguments resumes from its last checkpoint
 
     Returns:
-        EncryptionResult with success status and output path
+        EncryptionResult with success status, output path and, on success,
+        OperationStats
     """
     try:
         if not os.path.exists(file_path):
@@ -48,61 +138,73 @@ def encrypt_file_with_password(
                 success=False, error_message=f"File not found: {file_path}"
             )
 
-        # Generate key and salt
-        key, salt = derive_key_from_password(password)
+        reporter = ProgressReporter(progress, os.path.getsize(file_path), cancel=cancel)
+        reporter.set_stage(OperationStage.DERIVING_KEY)
 
-        # Prepare metadata
-        original_extension = (
-            os.path.splitext(file_path)[1] if preserve_extension else ""
+        # Derive the file key, salt and nonce
+        resume = resume_point(
+            file_path, output_path, EncryptionMode.PASSWORD, format_version, resumable
         )
-        metadata = FileMetadata(original_extension=original_extension, version="2.0.0")
-
-        # Determine output path
-        if output_path is None:
-            output_path = file_path + ENCRYPTED_EXTENSION
-
-        # Encrypt file
-        with SecureBytes(key) as secure_key:
-            fernet = Fernet(secure_key.get_bytes())
-
-            with open(file_path, "rb") as infile, open(output_path, "wb") as outfile:
-                # Write salt first
-                outfile.write(salt)
-
-                # Write metadata
-                metadata_json = json.dumps(
-                    {
-                        "original_extension": metadata.original_extension,
-                        "version": metadata.version,
-                        "encryption_mode": EncryptionMode.PASSWORD.value,
-                    }
-                ).encode("utf-8")
-                metadata_length = len(metadata_json)
-                outfile.write(metadata_length.to_bytes(4, byteorder="big"))
-                outfile.write(metadata_json)
-
-                # Encrypt file content in chunks
-                while True:
-                    chunk = infile.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    encrypted_chunk = fernet.encrypt(chunk)
-                    outfile.write(len(encrypted_chunk).to_bytes(4, byteorder="big"))
-                    outfile.write(encrypted_chunk)
+        if resume is not None:
+            key = derive_file_key(
+                EncryptionMode.PASSWORD, resume.key_info, password=password
+            )
+            header = resume.header
+            salt, file_nonce, kdf = header.salt, header.file_nonce, header.kdf
+        else:
+            legacy = format_version == LEGACY_FORMAT_VERSION
+            kdf = None if legacy else kdf or stored_kdf_params()
+            key, salt, file_nonce = create_file_key(
+                EncryptionMode.PASSWORD, password=password, legacy=legacy, kdf=kdf
+            )
 
-        return EncryptionResult(success=True, output_path=output_path)
+        return _encrypt_file(
+            file_path,
+            output_path,
+            EncryptionMode.PASSWORD,
+            key,
+            salt,
+            file_nonce,
+            preserve_extension,
+            workers,
+            format_version,
+            cipher,
+            in_flight_chunks,
+            chunk_size,
+            kdf,
+            compression,
+            reporter,
+            fsync,
+            resumable,
+            resume,
+        )
 
+    except OperationCancelled as e:
+        return EncryptionResult(
+            success=False, error_message=f"Encryption {e}", cancelled=True
+        )
     except Exception as e:
         return EncryptionResult(
             success=False, error_message=f"Encryption failed: {str(e)}"
         )
 
 
+@profiled
 def encrypt_file_with_keyfile(
     file_path: str,
     keyfile_path: str,
     output_path: Optional[str] = None,
     preserve_extension: bool = True,
+    workers: Optional[int] = None,
+    format_version: int = FORMAT_VERSION,
+    cipher: Optional[CipherAlgorithm] = None,
+    in_flight_chunks: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    compression: Optional[CompressionCodec] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[CancellationToken] = None,
+    fsync: Optional[FsyncPolicy] = None,
+    resumable: bool = False,
 ) -> EncryptionResult:
     """
     Encrypt a file using keyfile-based encryption.
@@ -112,9 +214,33 @@ def encrypt_file_with_keyfile(
         keyfile_path: Path to the keyfile
         output_path: Optional output path. If None, uses input path + .enc
         preserve_extension: Whether to preserve original extension in metadata
+        workers: Number of workers (None uses the default, 0 uses one per
+            CPU core)
+        format_version: File format to write; DIRECT_KEY_FORMAT_VERSION
+            writes format 3 files (no wrapped data key, so no rekey_file)
+            and LEGACY_FORMAT_VERSION writes Fernet files, for older
+            Entryptor releases
+        cipher: AEAD cipher for format 3 files (None or AUTO picks the
+            fastest cipher on this machine)
+        in_flight_chunks: Maximum chunks buffered by the large-file pipeline
+            (None uses PIPELINE_IN_FLIGHT_CHUNKS)
+        chunk_size: Chunk size for format 3 files (None or AUTO_CHUNK_SIZE
+            picks one from the file size)
+        compression: Per-chunk compression codec for format 3 files (None
+            stores chunks as is)
+        progress: Called with ProgressInfo snapshots, at most every
+            PROGRESS_INTERVAL seconds and at each stage change
+        cancel: Token stopping the call between chunks; the partial output
+            is removed and the result has cancelled set
+        fsync: Durability of the output before it atomically replaces
+            output_path (None uses FsyncPolicy.FILE)
+        resumable: Write a format 3 file through output_path + ".partial"
+            with periodic checkpoints; an interrupted call repeated with
+            the same arguments resumes from its last checkpoint
 
     Returns:
-        EncryptionResult with success status and output path
+        EncryptionResult with success status, output path and, on success,
+        OperationStats
     """
     try:
         if not os.path.exists(file_path):
@@ -122,239 +248,252 @@ def encrypt_file_with_keyfile(
                 success=False, error_message=f"File not found: {file_path}"
             )
 
-        # Derive key from keyfile
-        key = derive_key_from_keyfile(keyfile_path)
+        reporter = ProgressReporter(progress, os.path.getsize(file_path), cancel=cancel)
+        reporter.set_stage(OperationStage.DERIVING_KEY)
 
-        # Prepare metadata
-        original_extension = (
-            os.path.splitext(file_path)[1] if preserve_extension else ""
+        # Derive the file key from the keyfile
+        resume = resume_point(
+            file_path, output_path, EncryptionMode.KEYFILE, format_version, resumable
         )
-        metadata = FileMetadata(original_extension=original_extension, version="2.0.0")
-
-        # Determine output path
-        if output_path is None:
-            output_path = file_path + ENCRYPTED_EXTENSION
-
-        # Encrypt file
-        with SecureBytes(key) as secure_key:
-            fernet = Fernet(secure_key.get_bytes())
-
-            with open(file_path, "rb") as infile, open(output_path, "wb") as outfile:
-                # Write metadata (no salt for keyfile mode)
-                metadata_json = json.dumps(
-                    {
-                        "original_extension": metadata.original_extension,
-                        "version": metadata.version,
-                        "encryption_mode": EncryptionMode.KEYFILE.value,
-                    }
-                ).encode("utf-8")
-                metadata_length = len(metadata_json)
-                outfile.write(metadata_length.to_bytes(4, byteorder="big"))
-                outfile.write(metadata_json)
-
-                # Encrypt file content in chunks
-                while True:
-                    chunk = infile.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    encrypted_chunk = fernet.encrypt(chunk)
-                    outfile.write(len(encrypted_chunk).to_bytes(4, byteorder="big"))
-                    outfile.write(encrypted_chunk)
+        if resume is not None:
+            key = derive_file_key(
+                EncryptionMode.KEYFILE, resume.key_info, keyfile_path=keyfile_path
+            )
+            salt, file_nonce = resume.header.salt, resume.header.file_nonce
+        else:
+            key, salt, file_nonce = create_file_key(
+                EncryptionMode.KEYFILE,
+                keyfile_path=keyfile_path,
+                legacy=format_version == LEGACY_FORMAT_VERSION,
+            )
 
-        return EncryptionResult(success=True, output_path=output_path)
+        return _encrypt_file(
+            file_path,
+            output_path,
+            EncryptionMode.KEYFILE,
+            key,
+            salt,
+            file_nonce,
+            preserve_extension,
+            workers,
+            format_version,
+            cipher,
+            in_flight_chunks,
+            chunk_size,
+            None,
+            compression,
+            reporter,
+            fsync,
+            resumable,
+            resume,
+        )
 
-    except Exception as e:
+    except OperationCancelled as e:
         return EncryptionResult(
-            success=False, error_message=f"Encryption failed: {str(e)}"
+            success=False, error_message=f"Encryption {e}", cancelled=True
         )
-
-
-def decrypt_file_with_password(
-    file_path: str, password: SecurePassword, output_path: Optional[str] = None
-) -> EncryptionResult:
-    """
-    Decrypt a file using password-based decryption.
-
-    Args:
-        file_path: Path to the encrypted file
-        password: Secure password wrapper
-        output_path: Optional output path. If None, uses original extension
-
-    Returns:
-        EncryptionResult with success status and output path
-    """
-    try:
-        if not os.path.exists(file_path):
-            return EncryptionResult(
-                success=False, error_message=f"File not found: {file_path}"
-            )
-
-        with open(file_path, "rb") as infile:
-            # Read salt
-            salt = infile.read(16)  # 16 bytes salt
-
-            # Read metadata
-            metadata_length = int.from_bytes(infile.read(4), byteorder="big")
-            metadata_json = infile.read(metadata_length).decode("utf-8")
-            metadata = json.loads(metadata_json)
-
-            # Verify encryption mode
-            if metadata.get("encryption_mode") != EncryptionMode.PASSWORD.value:
-                return EncryptionResult(
-                    success=False,
-                    error_message="File was not encrypted with password mode",
-                )
-
-            # Derive key
-            key, _ = derive_key_from_password(password, salt)
-
-            # Determine output path
-            if output_path is None:
-                base_path = os.path.splitext(file_path)[0]
-                if file_path.endswith(ENCRYPTED_EXTENSION):
-                    base_path = base_path[: -len(ENCRYPTED_EXTENSION)]
-                original_extension = metadata.get("original_extension", "")
-                output_path = base_path + original_extension
-
-            # Decrypt file
-            with SecureBytes(key) as secure_key:
-                fernet = Fernet(secure_key.get_bytes())
-
-                with open(output_path, "wb") as outfile:
-                    # Read and decrypt chunks
-                    while True:
-                        chunk_length_bytes = infile.read(4)
-                        if not chunk_length_bytes:
-                            break
-
-                        chunk_length = int.from_bytes(
-                            chunk_length_bytes, byteorder="big"
-                        )
-                        encrypted_chunk = infile.read(chunk_length)
-
-                        if not encrypted_chunk:
-                            break
-
-                        decrypted_chunk = fernet.decrypt(encrypted_chunk)
-                        outfile.write(decrypted_chunk)
-
-        return EncryptionResult(success=True, output_path=output_path)
-
     except Exception as e:
         return EncryptionResult(
-            success=False, error_message=f"Decryption failed: {str(e)}"
+            success=False, error_message=f"Encryption failed: {str(e)}"
         )
 
 
-def decrypt_file_with_keyfile(
-    file_path: str, keyfile_path: str, output_path: Optional[str] = None
+def _encrypt_file(
+    file_path: str,
+    output_path: Optional[str],
+    mode: EncryptionMode,
+    key: bytes,
+    salt: bytes,
+    file_nonce: bytes,
+    preserve_extension: bool,
+    workers: Optional[int],
+    format_version: int,
+    cipher: Optional[CipherAlgorithm],
+    in_flight_chunks: Optional[int],
+    chunk_size: Optional[int],
+    kdf: Optional[KdfParams],
+    compression: Optional[CompressionCodec] = None,
+    progress: Optional[ProgressReporter] = None,
+    fsync: Optional[FsyncPolicy] = None,
+    resumable: bool = False,
+    resume: Optional[ResumePoint] = None,
 ) -> EncryptionResult:
     """
-    Decrypt a file using keyfile-based decryption.
+    Write the header and encrypted frames of a file.
 
     Args:
-        file_path: Path to the encrypted file
-        keyfile_path: Path to the keyfile
-        output_path: Optional output path. If None, uses original extension
+        file_path: Path to the file to encrypt
+        output_path: Optional output path. If None, uses input path + .enc
+        mode: Encryption mode recorded in the header
+        key: Fernet key (format 2) or raw credential key (formats 3 and 4)
+        salt: Key derivation salt
+        file_nonce: Per-file nonce for the key subkey (format 3)
+        preserve_extension: Whether to preserve original extension in metadata
+        workers: Requested worker count
+        format_version: File format to write
+        cipher: Requested AEAD cipher for format 3 files
+        in_flight_chunks: Requested pipeline in-flight chunk limit
+        chunk_size: Requested chunk size for format 3 files
+        kdf: Password KDF parameters recorded in format 3 headers
+        compression: Requested per-chunk compression codec
+        progress: Reporter of the call, or None
+        fsync: Durability policy of the output
+        resumable: Write through a kept partial output with checkpoints
+        resume: Checkpoint and header fields of the partial output to
+            continue, or None to start from the first chunk
 
     Returns:
         EncryptionResult with success status and output path
-    """
-    try:
-        if not os.path.exists(file_path):
-            return EncryptionResult(
-                success=False, error_message=f"File not found: {file_path}"
-            )
 
-        # Derive key from keyfile
-        key = derive_key_from_keyfile(keyfile_path)
-
-        with open(file_path, "rb") as infile:
-            # Read metadata
-            metadata_length = int.from_bytes(infile.read(4), byteorder="big")
-            metadata_json = infile.read(metadata_length).decode("utf-8")
-            metadata = json.loads(metadata_json)
-
-            # Verify encryption mode
-            if metadata.get("encryption_mode") != EncryptionMode.KEYFILE.value:
-                return EncryptionResult(
-                    success=False,
-                    error_message="File was not encrypted with keyfile mode",
+    Raises:
+        ValueError: If the format version is not supported, compression or
+            resumable output is requested for a format 2 file, or the input
+            changed since the checkpoint
+        OperationCancelled: If the call was cancelled
+    """
+    if format_version not in (
+        FORMAT_VERSION,
+        DIRECT_KEY_FORMAT_VERSION,
+        LEGACY_FORMAT_VERSION,
+    ):
+        raise ValueError(f"Unsupported format version: {format_version}")
+    codec = resolve_compression(compression)
+    if codec is not None and format_version == LEGACY_FORMAT_VERSION:
+        raise ValueError("Compression requires format version 3")
+    if resumable and format_version == LEGACY_FORMAT_VERSION:
+        raise ValueError("Resumable encryption requires format version 3")
+
+    original_extension = os.path.splitext(file_path)[1] if preserve_extension else ""
+
+    # Determine output path
+    if output_path is None:
+        output_path = file_path + ENCRYPTED_EXTENSION
+
+    # Reason: check before any file is created, so a call cancelled during
+    # key derivation leaves no trace
+    if progress is not None:
+        progress.check_cancelled()
+    wrapped_key = None
+    if resume is None and format_version == FORMAT_VERSION:
+        # Reason: a resumed partial output already holds its data key, and
+        # derive_file_key has unwrapped it
+        key, wrapped_key = create_data_key(key)
+
+    fixed_path = start_partial(output_path, resume) if resumable else None
+    with AtomicOutput(output_path, fsync, fixed_path) as output:
+        temp_path = output.temp_path
+        open_mode: Literal["wb", "r+b"] = "wb" if resume is None else "r+b"
+        with SecureBytes(key) as secure_key:
+            with open(file_path, "rb") as infile, open(temp_path, open_mode) as outfile:
+                source = os.fstat(infile.fileno())
+                file_size = source.st_size
+                header = None
+                plaintext_hash = new_plaintext_hash()
+                offsets = None
+                if resume is not None:
+                    checkpoint, header = resume.checkpoint, resume.header
+                    cipher_name, chunk_size = header.cipher, header.chunk_size
+                    codec = header.compression
+                    offsets, plaintext_hash = restore_checkpoint(
+                        infile, outfile, output_path, checkpoint, chunk_size, progress
+                    )
+                    data_offset = checkpoint.data_offset
+                elif format_version == LEGACY_FORMAT_VERSION:
+                    write_legacy_header(outfile, mode, salt, original_extension)
+                    cipher_name = CIPHER_FERNET
+                    chunk_size = CHUNK_SIZE
+                    data_offset = outfile.tell()
+                else:
+                    if codec is not None:
+                        prefix = infile.read(MAGIC_PROBE_SIZE)
+                        infile.seek(0)
+                        # Reason: a JPEG or ZIP file is skipped as a whole, so
+                        # its frames do not even carry the stored marker byte
+                        if has_compressed_magic(prefix):
+                            codec = None
+                    frame_cipher = resolve_cipher(cipher)
+                    metadata = FileMetadata(
+                        original_extension=original_extension,
+                        version=f"{format_version}.0.0",
+                        cipher=frame_cipher,
+                        chunk_size=resolve_chunk_size(chunk_size, file_size),
+                    )
+                    header = ContainerHeader(
+                        mode=mode,
+                        cipher=frame_cipher.value,
+                        salt=salt,
+                        original_extension=metadata.original_extension,
+                        chunk_size=metadata.chunk_size,
+                        file_nonce=file_nonce,
+                        kdf=kdf,
+                        plaintext_size=file_size,
+                        digest=DIGEST_BLAKE2B,
+                        compression=codec,
+                        wrapped_key=wrapped_key,
+                    )
+                    header.set_key_check(secure_key.get_bytes())
+                    outfile.write(header.pack())
+                    cipher_name = header.cipher
+                    chunk_size = header.chunk_size
+                    data_offset = outfile.tell()
+
+                write_index = format_version != LEGACY_FORMAT_VERSION
+                # Reason: the bound covers all frames, including the ones a
+                # resumed call has already written
+                check_free_space(
+                    temp_path,
+                    data_offset
+                    + encrypted_size_bound(
+                        cipher_name,
+                        secure_key.get_bytes(),
+                        chunk_size,
+                        file_size,
+                        write_index,
+                        codec,
+                    ),
                 )
 
-            # Determine output path
-            if output_path is None:
-                base_path = os.path.splitext(file_path)[0]
-                if file_path.endswith(ENCRYPTED_EXTENSION):
-                    base_path = base_path[: -len(ENCRYPTED_EXTENSION)]
-                original_extension = metadata.get("original_extension", "")
-                output_path = base_path + original_extension
-
-            # Decrypt file
-            with SecureBytes(key) as secure_key:
-                fernet = Fernet(secure_key.get_bytes())
-
-                with open(output_path, "wb") as outfile:
-                    # Read and decrypt chunks
-                    while True:
-                        chunk_length_bytes = infile.read(4)
-                        if not chunk_length_bytes:
-                            break
-
-                        chunk_length = int.from_bytes(
-                            chunk_length_bytes, byteorder="big"
+                # Encrypt file content in chunks
+                if progress is not None and resume is None:
+                    progress.set_stage(OperationStage.ENCRYPTING)
+                encrypt_frames(
+                    infile,
+                    outfile,
+                    cipher_name,
+                    secure_key.get_bytes(),
+                    workers,
+                    write_index=write_index,
+                    in_flight_chunks=in_flight_chunks,
+                    chunk_size=chunk_size,
+                    # Reason: format 2 files store no digest
+                    plaintext_hash=plaintext_hash if write_index else None,
+                    footer=lambda: seal_digest(
+                        secure_key.get_bytes(), file_nonce, plaintext_hash.digest()
+                    ),
+                    compression=codec,
+                    progress=progress,
+                    first_index=0 if offsets is None else len(offsets),
+                    offsets=offsets,
+                    checkpoint=(
+                        CheckpointWriter(
+                            output_path, outfile, plaintext_hash, data_offset, source
                         )
-                        encrypted_chunk = infile.read(chunk_length)
-
-                        if not encrypted_chunk:
-                            break
-
-                        decrypted_chunk = fernet.decrypt(encrypted_chunk)
-                        outfile.write(decrypted_chunk)
+                        if resumable
+                        else None
+                    ),
+                )
 
+                if header is not None and infile.tell() != header.plaintext_size:
+                    # Reason: the input changed size while it was read, so
+                    # record the size that was actually encrypted
+                    header.plaintext_size = infile.tell()
+                    header.set_key_check(secure_key.get_bytes())
+                    outfile.seek(0)
+                    outfile.write(header.pack())
+        output.commit()
+    if resumable:
+        remove_checkpoint(output_path)
+
+    if progress is None:
         return EncryptionResult(success=True, output_path=output_path)
-
-    except Exception as e:
-        return EncryptionResult(
-            success=False, error_message=f"Decryption failed: {str(e)}"
-        )
-
-
-def get_file_metadata(file_path: str) -> Optional[Dict[str, Any]]:
-    """
-    Extract metadata from an encrypted file.
-
-    Args:
-        file_path: Path to the encrypted file
-
-    Returns:
-        Metadata dictionary or None if file is not encrypted
-    """
-    try:
-        with open(file_path, "rb") as infile:
-            # Check if it's a password-encrypted file (starts with salt)
-            first_bytes = infile.read(4)
-            infile.seek(0)
-
-            if len(first_bytes) == 4 and first_bytes != b"\x00\x00\x00\x00":
-                # Could be metadata length, try keyfile format first
-                try:
-                    metadata_length = int.from_bytes(first_bytes, byteorder="big")
-                    if (
-                        metadata_length > 0 and metadata_length < 1024
-                    ):  # Reasonable limit
-                        metadata_json = infile.read(metadata_length).decode("utf-8")
-                        return json.loads(metadata_json)
-                except (ValueError, UnicodeDecodeError, json.JSONDecodeError):
-                    pass
-
-                # Try password format (skip salt)
-                infile.seek(16)  # Skip salt
-                metadata_length = int.from_bytes(infile.read(4), byteorder="big")
-                metadata_json = infile.read(metadata_length).decode("utf-8")
-                return json.loads(metadata_json)
-
-        return None
-
-    except Exception:
-        return None
+    return completed_result(progress, "encrypt", file_path, output_path)
@@ -0,0 +1,423 @@
+"""Chunk encryption engine shared by all container formats."""
+
+import hashlib
+import os
+from array import array
+from functools import partial
+from typing import (
+    BinaryIO,
+    Callable,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .ciphers import FrameCipher, create_frame_cipher
+from .compression import with_compression
+from .digest import update_hash_from_file
+from .framing import (
+    DecryptTask,
+    EncryptTask,
+    frame_stream_size,
+    iter_chunk_batches,
+    load_frame_index,
+    write_frame_index,
+)
+from .parallel import ordered_map, resolve_worker_count
+from .pipeline import BufferPool, split_in_flight_chunks
+from .progress import ProgressReporter
+from .serial import decrypt_serial, encrypt_serial
+from .stats import timed_call
+from .stages import (
+    FrameBatch,
+    PlaintextBatch,
+    decrypt_pipelined,
+    encrypt_pipelined,
+)
+from .workers import (
+    encrypt_in_processes,
+    init_frame_worker,
+    open_batch_to_file,
+    open_batch_to_file_in_worker,
+)
+from ..config.constants import (
+    CHUNK_SIZE,
+    PARALLEL_BATCH_CHUNKS,
+    PARALLEL_MIN_FILE_SIZE,
+)
+
+
+def encrypt_frames(
+    infile: BinaryIO,
+    outfile: BinaryIO,
+    cipher_name: str,
+    key: bytes,
+    workers: Optional[int],
+    write_index: bool = False,
+    in_flight_chunks: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    footer: Optional[Callable[[], bytes]] = None,
+    compression: Optional[str] = None,
+    progress: Optional[ProgressReporter] = None,
+    first_index: int = 0,
+    offsets: Optional[array] = None,
+    checkpoint: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Encrypt the remaining input stream into length-prefixed frames.
+
+    Large inputs go through a three-stage pipeline: a reader thread fills
+    batches of chunks, a worker pool encrypts them and a writer thread
+    writes the frames, so disk I/O overlaps with encryption. Frames are
+    always written in input order, so the output is identical in layout to
+    the serial path. Ciphers that release the GIL run on threads, the others
+    on worker processes.
+
+    Args:
+        infile: Plaintext input stream positioned at the first byte
+        outfile: Output stream positioned after the header
+        cipher_name: Frame cipher name
+        key: Cipher key
+        workers: Requested worker count (see resolve_worker_count)
+        write_index: Append the chunk offset index footer after the frames
+        in_flight_chunks: Maximum chunks buffered by the pipeline (see
+            resolve_in_flight_chunks)
+        chunk_size: Plaintext size of every non-final chunk
+        plaintext_hash: Running hash updated with the plaintext in order
+        footer: Builds the index footer record once every frame is written
+        compression: Codec compressing each chunk in the workers, or None
+        progress: Reporter counting the plaintext bytes encrypted
+        first_index: Chunk index of the first byte read, when resuming
+        offsets: Payload offsets of the frames already written, when resuming
+        checkpoint: Called with the number of frames written and the output
+            offset after them whenever whole non-final frames were written
+
+    Raises:
+        ValueError: If a checkpoint is requested for a cipher that runs on
+            worker processes
+    """
+    cipher = with_compression(
+        create_frame_cipher(cipher_name, key), compression, chunk_size
+    )
+    worker_count = resolve_worker_count(workers)
+    batch_chunks, batch_count = split_in_flight_chunks(in_flight_chunks, chunk_size)
+    remaining = os.fstat(infile.fileno()).st_size - infile.tell()
+
+    if offsets is None:
+        offsets = array("Q")
+    if remaining < PARALLEL_MIN_FILE_SIZE:
+        encrypt_serial(
+            infile,
+            outfile,
+            cipher,
+            chunk_size,
+            offsets,
+            plaintext_hash,
+            progress,
+            first_index,
+            checkpoint,
+        )
+    elif cipher.releases_gil or worker_count <= 1:
+        pool = BufferPool(
+            partial(
+                PlaintextBatch,
+                batch_chunks,
+                chunk_size,
+                cipher.frame_length(chunk_size),
+            ),
+            batch_count,
+        )
+        encrypt_pipelined(
+            infile,
+            outfile,
+            cipher,
+            worker_count,
+            pool,
+            offsets,
+            plaintext_hash,
+            progress,
+            first_index,
+            checkpoint,
+        )
+    else:
+        if first_index or checkpoint is not None:
+            raise ValueError("Resumable encryption requires format version 3")
+        tasks = iter_chunk_batches(infile, chunk_size, batch_chunks, cipher.terminated)
+        if plaintext_hash is not None or progress is not None:
+            tasks = _observe_tasks(tasks, plaintext_hash, progress)
+        encrypt_in_processes(
+            tasks, outfile, cipher, key, worker_count, batch_count, offsets, progress
+        )
+
+    if write_index:
+        write_frame_index(outfile, offsets, record=b"" if footer is None else footer())
+
+
+def encrypted_size_bound(
+    cipher_name: str,
+    key: bytes,
+    chunk_size: int,
+    plaintext_size: int,
+    write_index: bool = False,
+    compression: Optional[str] = None,
+) -> int:
+    """
+    Predict the largest output encrypt_frames can write for a plaintext.
+
+    Args:
+        cipher_name: Frame cipher name
+        key: Cipher key
+        chunk_size: Plaintext size of every non-final chunk
+        plaintext_size: Plaintext size in bytes
+        write_index: Whether the index footer is appended
+        compression: Codec compressing each chunk, or None
+
+    Returns:
+        Upper bound of the frames and footer, in bytes
+    """
+    cipher = with_compression(
+        create_frame_cipher(cipher_name, key), compression, chunk_size
+    )
+    return frame_stream_size(cipher, chunk_size, plaintext_size, write_index)
+
+
+def decrypt_frames(
+    infile: BinaryIO,
+    input_path: str,
+    output_path: str,
+    cipher_name: str,
+    key: bytes,
+    workers: Optional[int],
+    in_flight_chunks: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    compression: Optional[str] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
+    """
+    Decrypt the remaining length-prefixed frames into output_path.
+
+    With several workers, large inputs are first indexed for frame offsets
+    (from the index footer, or by reading only the length prefixes), then
+    pool workers decrypt batches of frames and write the plaintext into a
+    preallocated output file at fixed offsets. The hash then reads the
+    finished output back in order, since the workers finish out of order.
+    Other large inputs, such as files whose frames do not all hold full
+    chunks, are decrypted by the three-stage pipeline.
+
+    Args:
+        infile: Encrypted input stream positioned at the first frame
+        input_path: Path of the encrypted input file
+        output_path: Plaintext output path
+        cipher_name: Frame cipher name
+        key: Cipher key
+        workers: Requested worker count (see resolve_worker_count)
+        in_flight_chunks: Maximum chunks buffered by the pipeline (see
+            resolve_in_flight_chunks)
+        chunk_size: Chunk size recorded in the file header
+        plaintext_hash: Running hash updated with the plaintext in order
+        compression: Codec recorded in the file header, or None
+        progress: Reporter counting the plaintext bytes decrypted
+
+    Raises:
+        ValueError: If the frame stream is truncated or malformed
+    """
+    cipher = with_compression(
+        create_frame_cipher(cipher_name, key), compression, chunk_size
+    )
+    worker_count = resolve_worker_count(workers)
+    batch_chunks, batch_count = split_in_flight_chunks(in_flight_chunks, chunk_size)
+    data_offset = infile.tell()
+    remaining = os.fstat(infile.fileno()).st_size - data_offset
+
+    if (
+        worker_count > 1
+        and remaining >= PARALLEL_MIN_FILE_SIZE
+        and hasattr(os, "pwrite")
+    ):
+        offsets, lengths = load_frame_index(infile, data_offset)
+        full_length = cipher.frame_length(chunk_size)
+        if cipher.fixed_frame_length and all(
+            length == full_length for length in lengths[:-1]
+        ):
+            _decrypt_positional(
+                cipher,
+                chunk_size,
+                offsets,
+                lengths,
+                input_path,
+                output_path,
+                key,
+                worker_count,
+                progress,
+            )
+            if plaintext_hash is not None:
+                update_hash_from_file(plaintext_hash, output_path)
+            return
+        infile.seek(data_offset)
+
+    with open(output_path, "wb") as outfile:
+        if remaining < PARALLEL_MIN_FILE_SIZE:
+            decrypt_serial(
+                infile, outfile, cipher, chunk_size, plaintext_hash, progress
+            )
+            return
+        pool = BufferPool(
+            partial(
+                FrameBatch, batch_chunks, chunk_size, cipher.frame_length(chunk_size)
+            ),
+            batch_count,
+        )
+        # Reason: threads only add decryption throughput when the cipher
+        # releases the GIL; the pipeline still overlaps the I/O either way
+        decrypt_pipelined(
+            infile,
+            outfile,
+            cipher,
+            worker_count if cipher.releases_gil else 1,
+            pool,
+            plaintext_hash,
+            progress,
+        )
+
+
+def _observe_tasks(
+    tasks: Iterator[EncryptTask],
+    plaintext_hash: Optional["hashlib._Hash"],
+    progress: Optional[ProgressReporter],
+) -> Iterator[EncryptTask]:
+    """
+    Hash and count the chunks of encrypt tasks as they are read.
+
+    Args:
+        tasks: Chunk batches from iter_chunk_batches
+        plaintext_hash: Running hash updated with every chunk, or None
+        progress: Reporter counting the plaintext bytes read, or None
+
+    Yields:
+        The same tasks
+    """
+    for task in tasks:
+        for chunk in task[1]:
+            if plaintext_hash is not None:
+                plaintext_hash.update(chunk)
+            if progress is not None:
+                progress.update(len(chunk))
+        yield task
+
+
+def _decrypt_positional(
+    cipher: FrameCipher,
+    chunk_size: int,
+    offsets: array,
+    lengths: array,
+    input_path: str,
+    output_path: str,
+    key: bytes,
+    worker_count: int,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
+    """
+    Decrypt indexed frames in parallel into a preallocated output file.
+
+    Args:
+        cipher: Frame cipher
+        chunk_size: Chunk size recorded in the file header
+        offsets: Payload offset of every frame
+        lengths: Length of every frame
+        input_path: Path of the encrypted input file
+        output_path: Plaintext output path
+        key: Cipher key
+        worker_count: Number of workers
+        progress: Reporter counting the plaintext bytes decrypted
+
+    Raises:
+        ValueError: If a frame holds more than one chunk of plaintext
+    """
+    frame_count = len(offsets)
+    if frame_count == 0 and cipher.terminated:
+        raise ValueError("Encrypted file has no final frame")
+
+    capacity = frame_count * chunk_size
+    with open(output_path, "wb") as outfile:
+        outfile.truncate(capacity)
+        if capacity and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(outfile.fileno(), 0, capacity)
+            except OSError:
+                pass  # Filesystem without preallocation support
+
+    final_index = frame_count - 1
+    batch = max(1, PARALLEL_BATCH_CHUNKS * CHUNK_SIZE // chunk_size)
+    tasks: Iterator[DecryptTask] = (
+        (
+            start,
+            offsets[start : start + batch].tolist(),
+            lengths[start : start + batch].tolist(),
+            final_index,
+        )
+        for start in range(0, frame_count, batch)
+    )
+
+    input_fd: Optional[int] = None
+    output_fd: Optional[int] = None
+    try:
+        # Reason: workers read, decrypt and write each frame themselves, so
+        # their whole task time is recorded as cipher time
+        func: Callable[[DecryptTask], Tuple[float, List[int]]]
+        results: Generator[Tuple[float, List[int]], None, None]
+        if cipher.releases_gil:
+            input_fd = os.open(input_path, os.O_RDONLY)
+            output_fd = os.open(output_path, os.O_WRONLY)
+            func = partial(
+                timed_call,
+                partial(
+                    open_batch_to_file,
+                    cipher,
+                    input_fd,
+                    output_fd,
+                    chunk_size,
+                    cancel=None if progress is None else progress.cancel,
+                ),
+            )
+            results = ordered_map(func, tasks, worker_count, threads=True)
+        else:
+            results = ordered_map(
+                partial(timed_call, open_batch_to_file_in_worker),
+                tasks,
+                worker_count,
+                initializer=init_frame_worker,
+                initargs=(cipher.name, key, chunk_size, input_path, output_path),
+            )
+
+        last_length = 0
+        try:
+            for task_time, plaintext_lengths in results:
+                for last_length in plaintext_lengths:
+                    if last_length > chunk_size:
+                        raise ValueError("Encrypted frame exceeds the chunk size")
+                if progress is not None:
+                    progress.stats.add(len(plaintext_lengths), crypt_time=task_time)
+                    progress.update(sum(plaintext_lengths))
+        finally:
+            # Reason: stop the pool before its file descriptors are closed
+            results.close()
+    finally:
+        for fd in (input_fd, output_fd):
+            if fd is not None:
+                os.close(fd)
+
+    if progress is not None:
+        progress.stats.worker_count = worker_count
+        # Reason: each worker holds one frame and its plaintext at a time
+        progress.stats.note_buffers(
+            worker_count * (chunk_size + cipher.frame_length(chunk_size))
+        )
+
+    # Only the final frame may be short; trim the preallocated tail
+    if frame_count:
+        with open(output_path, "r+b") as outfile:
+            outfile.truncate((frame_count - 1) * chunk_size + last_length)
@@ -0,0 +1,373 @@
+"""Header parsing and file key derivation shared by all readers and writers."""
+
+import base64
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives.keywrap import (
+    InvalidUnwrap,
+    aes_key_unwrap,
+    aes_key_wrap,
+)
+
+from .ciphers import CIPHER_FERNET
+from .container import (
+    MAGIC,
+    MAX_HEADER_SIZE,
+    ContainerHeader,
+    has_magic,
+    read_header,
+    unpack_header,
+)
+from .key_cache import get_key_cache, password_fingerprint
+from .key_derivation import (
+    LEGACY_KDF_PARAMS,
+    KdfParams,
+    derive_key_from_keyfile,
+    derive_key_from_password,
+    derive_subkey,
+    generate_salt,
+)
+from .secure_memory import SecurePassword
+from ..config.constants import DATA_KEY_SIZE, FILE_NONCE_SIZE, SALT_SIZE
+from ..config.models import EncryptionMode, FileMetadata
+
+# Bytes read to identify a file: a whole version 3 header, or a version 2
+# password header with up to 1 KB of JSON metadata
+METADATA_PROBE_SIZE = max(MAX_HEADER_SIZE, SALT_SIZE + 4 + 1024)
+
+# HKDF context labels for per-file subkeys
+_PASSWORD_SUBKEY_INFO = b"entryptor v3 password"
+_KEYFILE_SUBKEY_INFO = b"entryptor v3 keyfile"
+
+
+def write_legacy_header(
+    outfile: BinaryIO, mode: EncryptionMode, salt: bytes, original_extension: str
+) -> None:
+    """
+    Write a format version 2 header (salt and JSON metadata).
+
+    Args:
+        outfile: Output stream positioned at the start of the file
+        mode: Encryption mode
+        salt: Password salt (not written in keyfile mode)
+        original_extension: Extension to restore on decryption
+    """
+    metadata = FileMetadata(original_extension=original_extension, version="2.0.0")
+
+    # Password files start with the salt; keyfile files have none
+    if mode == EncryptionMode.PASSWORD:
+        outfile.write(salt)
+
+    metadata_json = json.dumps(
+        {
+            "original_extension": metadata.original_extension,
+            "version": metadata.version,
+            "encryption_mode": mode.value,
+        }
+    ).encode("utf-8")
+    outfile.write(len(metadata_json).to_bytes(4, byteorder="big"))
+    outfile.write(metadata_json)
+
+
+@dataclass
+class FileKeyInfo:
+    """Header fields needed to derive the key of an existing file."""
+
+    cipher_name: str
+    salt: Optional[bytes]  # None for version 2 keyfile files
+    file_nonce: Optional[bytes] = None  # None for version 2 files
+    kdf: Optional[KdfParams] = None  # None for keyfile mode files
+    header: Optional[ContainerHeader] = None  # Key check; None for version 2
+
+
+def read_file_header(
+    infile: BinaryIO, mode: EncryptionMode
+) -> Tuple[Dict[str, Any], FileKeyInfo]:
+    """
+    Read the header of a format version 2 or 3 file.
+
+    Args:
+        infile: Encrypted input stream positioned at the start of the file
+        mode: Expected encryption mode, used to parse version 2 headers
+
+    Returns:
+        Tuple of (metadata, key derivation fields); the stream is left at
+        the first frame
+    """
+    prefix = infile.read(len(MAGIC))
+    infile.seek(0)
+    if has_magic(prefix):
+        header = read_header(infile)
+        key_info = FileKeyInfo(
+            header.cipher, header.salt, header.file_nonce, header.kdf, header
+        )
+        return header.to_metadata(), key_info
+
+    # Format version 2: password files start with the salt
+    salt = infile.read(SALT_SIZE) if mode == EncryptionMode.PASSWORD else None
+
+    metadata_length = int.from_bytes(infile.read(4), byteorder="big")
+    metadata_json = infile.read(metadata_length).decode("utf-8")
+    kdf = LEGACY_KDF_PARAMS if mode == EncryptionMode.PASSWORD else None
+    return json.loads(metadata_json), FileKeyInfo(CIPHER_FERNET, salt, None, kdf)
+
+
+def detect_file_metadata(prefix: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Identify an encrypted file from its first bytes.
+
+    Format 3 files are recognized by their magic bytes. Version 2 files
+    have no magic, so their JSON metadata must parse at the offset of its
+    encryption mode and name that mode; anything else is rejected.
+
+    Args:
+        prefix: First METADATA_PROBE_SIZE bytes of the file (or all of a
+            shorter file)
+
+    Returns:
+        Metadata dictionary, or None if the bytes are not an Entryptor file
+    """
+    if has_magic(prefix):
+        try:
+            return unpack_header(prefix).to_metadata()
+        except ValueError:
+            return None
+
+    # Keyfile files start with the metadata length, password files with salt
+    for mode, offset in (
+        (EncryptionMode.KEYFILE, 0),
+        (EncryptionMode.PASSWORD, SALT_SIZE),
+    ):
+        metadata = _legacy_metadata_at(prefix, offset)
+        if metadata is not None and metadata.get("encryption_mode") == mode.value:
+            return metadata
+    return None
+
+
+def _legacy_metadata_at(prefix: bytes, offset: int) -> Optional[Dict[str, Any]]:
+    """
+    Parse version 2 length-prefixed JSON metadata at an offset.
+
+    Args:
+        prefix: First bytes of the file
+        offset: Offset of the 4-byte metadata length
+
+    Returns:
+        Metadata dictionary, or None if no valid metadata is there
+    """
+    length_end = offset + 4
+    if len(prefix) < length_end:
+        return None
+    metadata_length = int.from_bytes(prefix[offset:length_end], byteorder="big")
+    if not 0 < metadata_length <= len(prefix) - length_end:
+        return None
+
+    try:
+        metadata = json.loads(
+            prefix[length_end : length_end + metadata_length].decode("utf-8")
+        )
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(metadata, dict) or "version" not in metadata:
+        return None
+    return metadata
+
+
+def create_file_key(
+    mode: EncryptionMode,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+    legacy: bool = False,
+    kdf: Optional[KdfParams] = None,
+    file_nonce: Optional[bytes] = None,
+) -> Tuple[bytes, bytes, bytes]:
+    """
+    Derive the credential key for a new file.
+
+    For format 3 files this is the frame cipher key; format 4 files use it
+    to wrap their data key (see create_data_key). Password files reuse the
+    session's cached master key and salt when there is one, so only the
+    first file of a batch runs PBKDF2; each file still gets its own key
+    through a random file nonce.
+
+    Args:
+        mode: Encryption mode of the new file
+        password: Password (password mode)
+        keyfile_path: Keyfile path (keyfile mode)
+        legacy: Return a Fernet key for a format version 2 file
+        kdf: Password KDF parameters for a format 3 or 4 file; version 2
+            files always use LEGACY_KDF_PARAMS
+        file_nonce: Nonce of an existing file whose credential is being
+            replaced (None generates one)
+
+    Returns:
+        Tuple of (key, salt, file nonce); the nonce is empty for version 2
+
+    Raises:
+        ValueError: If the credential or KDF parameters for the mode are
+            missing
+    """
+    if mode == EncryptionMode.PASSWORD:
+        if password is None:
+            raise ValueError("A password is required for password mode files")
+        if legacy:
+            # Reason: version 2 files have no nonce, so a shared salt would
+            # give every file of the batch the same key
+            master_key, salt = password_master_key(
+                password, LEGACY_KDF_PARAMS, generate_salt()
+            )
+            return base64.urlsafe_b64encode(master_key), salt, b""
+        if kdf is None:
+            raise ValueError("KDF parameters are required for password mode files")
+        master_key, salt = password_master_key(password, kdf)
+        file_nonce = file_nonce or os.urandom(FILE_NONCE_SIZE)
+        key = derive_subkey(master_key, file_nonce, _PASSWORD_SUBKEY_INFO)
+        return key, salt, file_nonce
+
+    if keyfile_path is None:
+        raise ValueError("A keyfile is required for keyfile mode files")
+    key = derive_key_from_keyfile(keyfile_path)
+    salt = generate_salt()
+    if legacy:
+        return key, salt, b""
+    file_nonce = file_nonce or os.urandom(FILE_NONCE_SIZE)
+    return keyfile_subkey(key, file_nonce), salt, file_nonce
+
+
+def derive_file_key(
+    mode: EncryptionMode,
+    key_info: FileKeyInfo,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+) -> bytes:
+    """
+    Derive the frame cipher key of an existing file from its header fields.
+
+    Password master keys come from the session cache when the same password
+    and salt were used recently. Format 3 keys are checked against the
+    header's key-check value, so a wrong credential fails here, before any
+    frame is decrypted or output is written.
+
+    Args:
+        mode: Encryption mode recorded in the header
+        key_info: Key derivation fields from read_file_header
+        password: Password (password mode)
+        keyfile_path: Keyfile path (keyfile mode)
+
+    Returns:
+        Fernet key for version 2 files, the unwrapped data key for format 4
+        files, raw AEAD key otherwise
+
+    Raises:
+        ValueError: If the credential for the mode is missing or wrong
+    """
+    legacy = key_info.cipher_name == CIPHER_FERNET
+    if mode == EncryptionMode.PASSWORD:
+        if password is None or key_info.salt is None or key_info.kdf is None:
+            raise ValueError("A password is required for password mode files")
+        master_key, _ = password_master_key(password, key_info.kdf, key_info.salt)
+        if legacy:
+            return base64.urlsafe_b64encode(master_key)
+    else:
+        if keyfile_path is None:
+            raise ValueError("A keyfile is required for keyfile mode files")
+        master_key = derive_key_from_keyfile(keyfile_path)
+        if legacy:
+            return master_key
+
+    # Only version 2 files lack a file nonce, and they returned above
+    if key_info.file_nonce is None:
+        raise ValueError("Encrypted file header has no file nonce")
+    if mode == EncryptionMode.PASSWORD:
+        key = derive_subkey(master_key, key_info.file_nonce, _PASSWORD_SUBKEY_INFO)
+    else:
+        key = keyfile_subkey(master_key, key_info.file_nonce)
+
+    if key_info.header is not None and key_info.header.wrapped_key is not None:
+        try:
+            key = aes_key_unwrap(key, key_info.header.wrapped_key)
+        except InvalidUnwrap:
+            raise ValueError(f"Incorrect {mode.value}") from None
+    if key_info.header is not None and not key_info.header.verify_key(key):
+        raise ValueError(f"Incorrect {mode.value}")
+    return key
+
+
+def create_data_key(credential_key: bytes) -> Tuple[bytes, bytes]:
+    """
+    Generate the random data key of a new format 4 file.
+
+    Args:
+        credential_key: Key from create_file_key that wraps the data key
+
+    Returns:
+        Tuple of (data key for the frame cipher, wrapped key for the header)
+    """
+    data_key = os.urandom(DATA_KEY_SIZE)
+    return data_key, wrap_data_key(credential_key, data_key)
+
+
+def wrap_data_key(credential_key: bytes, data_key: bytes) -> bytes:
+    """
+    Wrap a data key for the header with RFC 3394 AES key wrap.
+
+    The wrap is deterministic and carries its own integrity check, so a
+    wrong credential key is detected when unwrapping.
+
+    Args:
+        credential_key: Raw 32-byte key derived from the credential
+        data_key: Raw data key
+
+    Returns:
+        WRAPPED_KEY_SIZE-byte wrapped key
+    """
+    return aes_key_wrap(credential_key, data_key)
+
+
+def password_master_key(
+    password: SecurePassword, kdf: KdfParams, salt: Optional[bytes] = None
+) -> Tuple[bytes, bytes]:
+    """
+    Derive (or fetch from the session cache) a password's master key.
+
+    Args:
+        password: Password
+        kdf: KDF and cost parameters
+        salt: Key derivation salt; None reuses the salt of a cached key for
+            this password, or generates a new one
+
+    Returns:
+        Tuple of (raw 32-byte master key, salt)
+    """
+    cache = get_key_cache()
+    fingerprint = password_fingerprint(password)
+    if salt is None:
+        salt = cache.session_salt(fingerprint, kdf)
+    if salt is not None:
+        master_key = cache.get(fingerprint, salt, kdf)
+        if master_key is not None:
+            return master_key, salt
+
+    key, salt = derive_key_from_password(password, salt, kdf)
+    master_key = base64.urlsafe_b64decode(key)
+    cache.put(fingerprint, salt, kdf, master_key)
+    return master_key, salt
+
+
+def keyfile_subkey(keyfile_key: bytes, file_nonce: bytes) -> bytes:
+    """
+    Derive the per-file AEAD key from a keyfile key.
+
+    Args:
+        keyfile_key: Base64-encoded key from derive_key_from_keyfile
+        file_nonce: Per-file nonce from the header
+
+    Returns:
+        Raw 32-byte file key
+    """
+    return derive_subkey(
+        base64.urlsafe_b64decode(keyfile_key), file_nonce, _KEYFILE_SUBKEY_INFO
+    )
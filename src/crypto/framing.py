@@ -0,0 +1,358 @@
+"""Length-prefixed frame handling for encrypted chunk streams."""
+
+import io
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple, cast
+
+from .ciphers import FrameCipher
+
+FRAME_LENGTH_SIZE = 4  # Big-endian length prefix before every frame
+FRAME_LENGTH = struct.Struct(">I")
+
+# Reason: no cipher produces an empty frame, so a zero length prefix can end
+# the frame stream and introduce the chunk offset index
+END_OF_FRAMES = bytes(FRAME_LENGTH_SIZE)
+FRAME_INDEX_MAGIC = b"ENTIDX01"
+# index offset, frame count, magic; always the last bytes of the file
+_INDEX_TRAILER = struct.Struct(f">QQ{len(FRAME_INDEX_MAGIC)}s")
+_OFFSET_SIZE = 8
+# Largest footer record stored between the offsets and the trailer
+MAX_FOOTER_RECORD_SIZE = 1024
+
+# One encrypt task: (first chunk index, chunks, whether it holds the last chunk)
+EncryptTask = Tuple[int, List[bytes], bool]
+# One decrypt task: (first frame index, frame offsets, frame lengths, final index)
+DecryptTask = Tuple[int, List[int], List[int], int]
+
+
+def write_frame(outfile: BinaryIO, frame: bytes) -> None:
+    """
+    Write a single length-prefixed frame.
+
+    Args:
+        outfile: Binary output stream
+        frame: Encrypted frame bytes
+    """
+    outfile.write(len(frame).to_bytes(FRAME_LENGTH_SIZE, byteorder="big"))
+    outfile.write(frame)
+
+
+def read_frame(infile: BinaryIO) -> Optional[bytes]:
+    """
+    Read a single length-prefixed frame.
+
+    Args:
+        infile: Binary input stream positioned at a length prefix
+
+    Returns:
+        Frame bytes, or None at end of stream or at the end-of-frames marker
+
+    Raises:
+        ValueError: If the length prefix or frame is truncated
+    """
+    length_bytes = infile.read(FRAME_LENGTH_SIZE)
+    if not length_bytes or length_bytes == END_OF_FRAMES:
+        return None
+    if len(length_bytes) < FRAME_LENGTH_SIZE:
+        raise ValueError("Truncated frame header")
+
+    frame_length = int.from_bytes(length_bytes, byteorder="big")
+    frame = infile.read(frame_length)
+    if len(frame) < frame_length:
+        raise ValueError("Truncated frame")
+    return frame
+
+
+def read_into_full(infile: BinaryIO, view: memoryview) -> int:
+    """
+    Fill a buffer from a stream, stopping early only at end of stream.
+
+    Args:
+        infile: Binary input stream
+        view: Writable byte view to fill
+
+    Returns:
+        Number of bytes read
+    """
+    # Reason: typing.BinaryIO omits readinto, which binary files all provide
+    readinto = cast(io.BufferedIOBase, infile).readinto
+    filled = readinto(view) or 0
+    while 0 < filled < len(view):
+        count = readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+
+def read_frame_length(infile: BinaryIO, prefix: memoryview) -> Optional[int]:
+    """
+    Read a length prefix into a reusable buffer.
+
+    Args:
+        infile: Binary input stream positioned at a length prefix
+        prefix: Writable view of FRAME_LENGTH_SIZE bytes
+
+    Returns:
+        Frame length, or None at end of stream or at the end-of-frames marker
+
+    Raises:
+        ValueError: If the length prefix is truncated
+    """
+    count = read_into_full(infile, prefix)
+    if count == 0:
+        return None
+    if count < FRAME_LENGTH_SIZE:
+        raise ValueError("Truncated frame header")
+    frame_length = FRAME_LENGTH.unpack_from(prefix)[0]
+    return frame_length or None
+
+
+def iter_chunk_batches(
+    infile: BinaryIO, chunk_size: int, batch_chunks: int, terminated: bool
+) -> Iterator[EncryptTask]:
+    """
+    Read a stream as batches of fixed-size chunks.
+
+    The batch holding the last chunk is flagged so that ciphers can seal it
+    as the final frame. Terminated streams always contain at least one
+    (possibly empty) chunk.
+
+    Args:
+        infile: Binary input stream
+        chunk_size: Size of each chunk in bytes
+        batch_chunks: Number of chunks per batch
+        terminated: Whether an empty stream still needs a final chunk
+
+    Yields:
+        Tuples of (first chunk index, chunks, holds the last chunk)
+    """
+    index = 0
+    batch: List[bytes] = []
+    chunk = infile.read(chunk_size)
+    if not chunk and terminated:
+        yield 0, [b""], True
+        return
+
+    while chunk:
+        batch.append(chunk)
+        # Reason: one chunk of look-ahead tells us which chunk is final
+        chunk = infile.read(chunk_size)
+        if len(batch) >= batch_chunks or not chunk:
+            yield index, batch, not chunk
+            index += len(batch)
+            batch = []
+
+
+def scan_frames(infile: BinaryIO, data_offset: int) -> Tuple[array, array]:
+    """
+    Locate every frame by reading only the length prefixes.
+
+    Args:
+        infile: Seekable encrypted input stream
+        data_offset: Offset of the first frame's length prefix
+
+    Returns:
+        Tuple of (frame payload offsets, frame lengths) as unsigned arrays
+
+    Raises:
+        ValueError: If a length prefix or frame is truncated
+    """
+    file_size = infile.seek(0, os.SEEK_END)
+    offsets = array("Q")
+    lengths = array("Q")
+
+    position = data_offset
+    while position < file_size:
+        infile.seek(position)
+        length_bytes = infile.read(FRAME_LENGTH_SIZE)
+        if len(length_bytes) < FRAME_LENGTH_SIZE:
+            raise ValueError(f"Truncated frame header at offset {position}")
+
+        frame_length = int.from_bytes(length_bytes, byteorder="big")
+        if frame_length == 0:
+            break  # End-of-frames marker; the offset index follows
+        payload_offset = position + FRAME_LENGTH_SIZE
+        if payload_offset + frame_length > file_size:
+            raise ValueError(f"Truncated frame at offset {position}")
+
+        offsets.append(payload_offset)
+        lengths.append(frame_length)
+        position = payload_offset + frame_length
+
+    return offsets, lengths
+
+
+def frame_stream_size(
+    cipher: FrameCipher, chunk_size: int, plaintext_size: int, write_index: bool
+) -> int:
+    """
+    Calculate the largest frame stream a plaintext can encrypt to.
+
+    Args:
+        cipher: Frame cipher
+        chunk_size: Plaintext size of every non-final chunk
+        plaintext_size: Plaintext size in bytes
+        write_index: Whether the index footer follows the frames
+
+    Returns:
+        Upper bound of the frames plus the footer, in bytes
+    """
+    full_chunks, tail = divmod(plaintext_size, chunk_size)
+    frame_count = full_chunks + (1 if tail or cipher.terminated else 0)
+    size = full_chunks * (FRAME_LENGTH_SIZE + cipher.frame_length(chunk_size))
+    if frame_count > full_chunks:
+        size += FRAME_LENGTH_SIZE + cipher.frame_length(tail)
+    if write_index:
+        size += (
+            len(END_OF_FRAMES)
+            + frame_count * _OFFSET_SIZE
+            + MAX_FOOTER_RECORD_SIZE
+            + _INDEX_TRAILER.size
+        )
+    return size
+
+
+def write_frame_index(
+    outfile: BinaryIO,
+    offsets: Sequence[int],
+    position: Optional[int] = None,
+    record: bytes = b"",
+) -> None:
+    """
+    End the frame stream and append the chunk offset index footer.
+
+    The footer holds the payload offset of every frame, an optional record
+    and a fixed-size trailer, so readers can locate any chunk without
+    scanning the file. It is not authenticated: each frame's AEAD binds its
+    chunk index, so a tampered offset only makes the affected frame fail to
+    decrypt, and records carry their own authentication.
+
+    Args:
+        outfile: Output stream positioned after the last frame
+        offsets: Payload offset of every frame, in order
+        position: File offset of the stream position, for streams that
+            cannot tell() (default: outfile.tell())
+        record: Footer record stored before the trailer (see
+            read_footer_record)
+
+    Raises:
+        ValueError: If the record is larger than MAX_FOOTER_RECORD_SIZE
+    """
+    if len(record) > MAX_FOOTER_RECORD_SIZE:
+        raise ValueError("Footer record is too large")
+    if position is None:
+        position = outfile.tell()
+    outfile.write(END_OF_FRAMES)
+    index_offset = position + FRAME_LENGTH_SIZE
+
+    encoded = array("Q", offsets)
+    if sys.byteorder == "little":
+        encoded.byteswap()
+    outfile.write(encoded.tobytes())
+    outfile.write(record)
+    outfile.write(_INDEX_TRAILER.pack(index_offset, len(offsets), FRAME_INDEX_MAGIC))
+
+
+def read_frame_index(
+    infile: BinaryIO, data_offset: int
+) -> Optional[Tuple[array, array]]:
+    """
+    Load the chunk offset index footer, if the file has one.
+
+    Args:
+        infile: Seekable encrypted input stream
+        data_offset: Offset of the first frame's length prefix
+
+    Returns:
+        Tuple of (frame payload offsets, frame lengths) as unsigned arrays,
+        or None if the file has no index footer
+
+    Raises:
+        ValueError: If the index footer is inconsistent with the file
+    """
+    file_size = infile.seek(0, os.SEEK_END)
+    if file_size - data_offset < FRAME_LENGTH_SIZE + _INDEX_TRAILER.size:
+        return None
+
+    infile.seek(file_size - _INDEX_TRAILER.size)
+    index_offset, frame_count, magic = _INDEX_TRAILER.unpack(
+        infile.read(_INDEX_TRAILER.size)
+    )
+    if magic != FRAME_INDEX_MAGIC:
+        return None
+
+    marker_offset = index_offset - FRAME_LENGTH_SIZE
+    index_size = frame_count * _OFFSET_SIZE
+    record_size = file_size - _INDEX_TRAILER.size - index_offset - index_size
+    if marker_offset < data_offset or not 0 <= record_size <= MAX_FOOTER_RECORD_SIZE:
+        raise ValueError("Corrupt chunk offset index")
+
+    infile.seek(index_offset)
+    offsets = array("Q")
+    offsets.frombytes(infile.read(index_size))
+    if sys.byteorder == "little":
+        offsets.byteswap()
+
+    # Frame i ends where the length prefix of frame i + 1 starts
+    ends = offsets[1:] + array("Q", [marker_offset + FRAME_LENGTH_SIZE])
+    lengths = array("Q")
+    expected_offset = data_offset + FRAME_LENGTH_SIZE
+    for offset, end in zip(offsets, ends):
+        if offset != expected_offset or end - FRAME_LENGTH_SIZE < offset:
+            raise ValueError("Corrupt chunk offset index")
+        lengths.append(end - FRAME_LENGTH_SIZE - offset)
+        expected_offset = end
+    if expected_offset != marker_offset + FRAME_LENGTH_SIZE:
+        raise ValueError("Corrupt chunk offset index")
+
+    return offsets, lengths
+
+
+def read_footer_record(infile: BinaryIO) -> Optional[bytes]:
+    """
+    Read the record stored between the offset index and its trailer.
+
+    Args:
+        infile: Seekable encrypted input stream
+
+    Returns:
+        Record bytes (empty if none was written), or None if the file has
+        no index footer
+    """
+    file_size = infile.seek(0, os.SEEK_END)
+    if file_size < _INDEX_TRAILER.size:
+        return None
+    infile.seek(file_size - _INDEX_TRAILER.size)
+    index_offset, frame_count, magic = _INDEX_TRAILER.unpack(
+        infile.read(_INDEX_TRAILER.size)
+    )
+    record_start = index_offset + frame_count * _OFFSET_SIZE
+    record_size = file_size - _INDEX_TRAILER.size - record_start
+    if magic != FRAME_INDEX_MAGIC or not 0 <= record_size <= MAX_FOOTER_RECORD_SIZE:
+        return None
+    infile.seek(record_start)
+    return infile.read(record_size)
+
+
+def load_frame_index(infile: BinaryIO, data_offset: int) -> Tuple[array, array]:
+    """
+    Locate every frame, from the index footer or by scanning.
+
+    Args:
+        infile: Seekable encrypted input stream
+        data_offset: Offset of the first frame's length prefix
+
+    Returns:
+        Tuple of (frame payload offsets, frame lengths) as unsigned arrays
+
+    Raises:
+        ValueError: If the index footer or a frame is corrupt or truncated
+    """
+    index = read_frame_index(infile, data_offset)
+    if index is None:
+        index = scan_frames(infile, data_offset)
+    return index
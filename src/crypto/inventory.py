@@ -0,0 +1,318 @@
+"""Bulk inventory of encrypted files in large directory trees."""
+
+import csv
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO, Tuple
+
+from .file_format import METADATA_PROBE_SIZE, detect_file_metadata
+from .pipeline import run_pipeline
+from ..config.constants import (
+    INVENTORY_PROGRESS_INTERVAL,
+    INVENTORY_QUEUE_SIZE,
+    INVENTORY_WORKERS,
+)
+
+INVENTORY_FORMATS = ("jsonl", "csv")
+
+# Bytes read from the end of an existing output to find the resume point
+_RESUME_TAIL_SIZE = 64 * 1024
+
+_PathKey = Tuple[str, ...]
+
+
+@dataclass
+class InventoryEntry:
+    """One scanned file; header fields are None for unencrypted files."""
+
+    path: str
+    size: Optional[int] = None
+    encrypted: bool = False
+    format_version: Optional[int] = None
+    encryption_mode: Optional[str] = None
+    cipher: Optional[str] = None  # None for version 2 (Fernet) files
+    kdf: Optional[str] = None
+    plaintext_size: Optional[int] = None  # None if unknown or version 2
+    chunk_count: Optional[int] = None
+    compression: Optional[str] = None  # Per-chunk codec of format 3 files
+    original_extension: Optional[str] = None
+    error: Optional[str] = None  # Why the file or directory could not be read
+
+
+@dataclass
+class InventoryStats:
+    """Counters of an inventory scan."""
+
+    files: int = 0
+    encrypted_files: int = 0
+    errors: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    resumed_after: Optional[str] = None  # Last path of the previous run
+
+    @property
+    def files_per_second(self) -> float:
+        """Scan throughput in files per second."""
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def probe_file(path: str) -> InventoryEntry:
+    """
+    Identify one file from a single read of its first bytes.
+
+    Unlike get_file_metadata, read errors are reported in the entry rather
+    than treated as "not encrypted".
+
+    Args:
+        path: File path
+
+    Returns:
+        InventoryEntry for the file
+    """
+    entry = InventoryEntry(path=path)
+    try:
+        with open(path, "rb", buffering=0) as infile:
+            entry.size = os.fstat(infile.fileno()).st_size
+            metadata = detect_file_metadata(infile.read(METADATA_PROBE_SIZE))
+    except OSError as e:
+        entry.error = e.strerror or str(e)
+        return entry
+
+    if metadata is not None:
+        entry.encrypted = True
+        entry.format_version = int(str(metadata["version"]).split(".")[0])
+        entry.encryption_mode = metadata.get("encryption_mode")
+        entry.cipher = metadata.get("cipher")
+        entry.kdf = metadata.get("kdf")
+        entry.plaintext_size = metadata.get("plaintext_size")
+        entry.chunk_count = metadata.get("chunk_count")
+        entry.compression = metadata.get("compression")
+        entry.original_extension = metadata.get("original_extension")
+    return entry
+
+
+def walk_files(
+    root: str, resume_after: Optional[_PathKey] = None
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Walk a tree with os.scandir in a stable, sorted order.
+
+    Entries of each directory are sorted by name, so files come out in
+    lexicographic order of their path components and a scan can resume
+    after any path without revisiting the subtrees before it. Symbolic
+    links and special files are skipped.
+
+    Args:
+        root: Directory to walk
+        resume_after: Path components (relative to root) of the last file
+            already scanned; it and everything before it are skipped
+
+    Yields:
+        Tuples of (path, error); error is set for unreadable directories
+    """
+    yield from _walk(root, (), resume_after)
+
+
+def scan_inventory(
+    root: str,
+    output_path: str,
+    output_format: str = "jsonl",
+    workers: int = INVENTORY_WORKERS,
+    resume: bool = False,
+    progress: Optional[Callable[[InventoryStats], None]] = None,
+) -> InventoryStats:
+    """
+    Scan a directory tree and write one record per file.
+
+    Directories are walked on a reader thread, headers are read by a thread
+    pool and records are written in walk order on a writer thread. Bounded
+    queues between the stages keep memory flat however large the tree is.
+
+    Args:
+        root: Directory to scan
+        output_path: JSON lines or CSV file receiving the records
+        output_format: "jsonl" or "csv"
+        workers: Concurrent header reads
+        resume: Continue after the last record of an existing output file
+            instead of overwriting it; a partly written last record is
+            dropped and rescanned
+        progress: Called with the running stats every
+            INVENTORY_PROGRESS_INTERVAL files and once at the end
+
+    Returns:
+        InventoryStats of this run
+
+    Raises:
+        ValueError: If the output format or worker count is invalid
+        OSError: If the output cannot be written
+    """
+    if output_format not in INVENTORY_FORMATS:
+        raise ValueError(f"Unsupported inventory format: {output_format}")
+    if workers < 1:
+        raise ValueError("Worker count must be positive")
+
+    stats = InventoryStats()
+    resume_key = None
+    if resume:
+        stats.resumed_after = _last_scanned_path(output_path, output_format)
+        if stats.resumed_after is not None:
+            relative = os.path.relpath(stats.resumed_after, root)
+            resume_key = tuple(relative.split(os.sep))
+
+    start = time.perf_counter()
+    with open(
+        output_path, "a" if resume else "w", encoding="utf-8", newline=""
+    ) as output:
+        write_record = _record_writer(output, output_format)
+
+        # Runs on the single writer thread, so the stats need no lock
+        def consume(entry: InventoryEntry) -> None:
+            write_record(entry)
+            stats.files += 1
+            stats.encrypted_files += int(entry.encrypted)
+            stats.errors += int(entry.error is not None)
+            stats.bytes_read += min(entry.size or 0, METADATA_PROBE_SIZE)
+            if progress is not None and stats.files % INVENTORY_PROGRESS_INTERVAL == 0:
+                stats.elapsed = time.perf_counter() - start
+                progress(stats)
+
+        run_pipeline(
+            walk_files(root, resume_key),
+            _probe_item,
+            consume,
+            workers,
+            INVENTORY_QUEUE_SIZE,
+            max_pending=workers * 4,
+        )
+
+    stats.elapsed = time.perf_counter() - start
+    if progress is not None:
+        progress(stats)
+    return stats
+
+
+def _walk(
+    directory: str, key: _PathKey, resume_after: Optional[_PathKey]
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Recursively yield the files of one directory (see walk_files).
+
+    Args:
+        directory: Directory path
+        key: Path components of the directory relative to the root
+        resume_after: Resume point, or None
+
+    Yields:
+        Tuples of (path, error)
+    """
+    try:
+        with os.scandir(directory) as it:
+            # Reason: only the names and types of one directory are held, so
+            # memory is bounded by the largest directory, not the tree
+            entries = sorted(
+                (entry.name, entry.path, entry.is_dir(follow_symlinks=False))
+                for entry in it
+                if entry.is_dir(follow_symlinks=False)
+                or entry.is_file(follow_symlinks=False)
+            )
+    except OSError as e:
+        yield directory, e.strerror or str(e)
+        return
+
+    for name, path, is_dir in entries:
+        entry_key = key + (name,)
+        if resume_after is not None and entry_key <= resume_after:
+            # Reason: a directory before the resume point is only entered
+            # if the resume point lies inside it
+            if not is_dir or resume_after[: len(entry_key)] != entry_key:
+                continue
+        if is_dir:
+            yield from _walk(path, entry_key, resume_after)
+        else:
+            yield path, None
+
+
+def _probe_item(item: Tuple[str, Optional[str]]) -> InventoryEntry:
+    """
+    Probe a walked file, or pass a directory error through.
+
+    Args:
+        item: Tuple of (path, error) from walk_files
+
+    Returns:
+        InventoryEntry
+    """
+    path, error = item
+    if error is not None:
+        return InventoryEntry(path=path, error=error)
+    return probe_file(path)
+
+
+def _record_writer(
+    output: TextIO, output_format: str
+) -> Callable[[InventoryEntry], None]:
+    """
+    Create a function writing one record per entry.
+
+    Args:
+        output: Text stream opened with newline=""
+        output_format: "jsonl" or "csv"
+
+    Returns:
+        Record writing function
+    """
+    if output_format == "jsonl":
+
+        def write_json_line(entry: InventoryEntry) -> None:
+            output.write(json.dumps(asdict(entry)) + "\n")
+
+        return write_json_line
+
+    field_names = [field.name for field in fields(InventoryEntry)]
+    writer = csv.DictWriter(output, field_names, lineterminator="\n")
+    if output.tell() == 0:
+        writer.writeheader()
+    return lambda entry: writer.writerow(asdict(entry))
+
+
+def _last_scanned_path(output_path: str, output_format: str) -> Optional[str]:
+    """
+    Find the last complete record of an earlier scan, dropping a partial one.
+
+    Only the tail of the output is read. CSV resumption assumes paths do
+    not contain newlines.
+
+    Args:
+        output_path: Existing output file
+        output_format: "jsonl" or "csv"
+
+    Returns:
+        Path of the last record, or None if there is none
+    """
+    if not os.path.exists(output_path):
+        return None
+
+    with open(output_path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = max(0, size - _RESUME_TAIL_SIZE)
+        f.seek(tail_start)
+        tail = f.read()
+        line_end = tail.rfind(b"\n")
+        # Reason: a run killed mid-write leaves a partial record; drop it so
+        # the file is appended to at a record boundary
+        f.truncate(tail_start + line_end + 1)
+        if line_end < 0:
+            return None
+        last_line = tail[:line_end].rsplit(b"\n", 1)[-1].decode("utf-8")
+
+    record: Dict[str, Any]
+    if output_format == "jsonl":
+        record = json.loads(last_line)
+    else:
+        row = next(csv.reader([last_line]))
+        if row == [field.name for field in fields(InventoryEntry)]:
+            return None
+        record = {"path": row[0]}
+    return record["path"]
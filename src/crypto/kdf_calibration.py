@@ -0,0 +1,348 @@
+"""Calibration of password KDF costs to a target unlock time on this machine."""
+
+import json
+import math
+import os
+import platform
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, Optional
+
+from .key_derivation import (
+    TEST_KDF_PARAMS,
+    KdfParams,
+    default_kdf_params,
+    derive_key_from_password,
+    is_test_profile_active,
+    resolve_kdf_algorithm,
+    validate_kdf_params,
+)
+from .secure_memory import SecurePassword
+from ..config.constants import (
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    KDF_ARCHIVAL_TARGET,
+    KDF_INTERACTIVE_TARGET,
+    KDF_MIN_MEMORY_COST,
+    KDF_MIN_PBKDF2_ITERATIONS,
+    MAX_KDF_MEMORY_COST,
+    MAX_KDF_TIME_COST,
+    SCRYPT_PARALLELISM,
+)
+from ..config.models import KdfAlgorithm, KdfProfile
+from ..utils.file_utils import ensure_directory_exists
+from ..utils.resources import get_kdf_calibration_file_path
+
+_PROFILE_TARGETS = {
+    KdfProfile.INTERACTIVE: KDF_INTERACTIVE_TARGET,
+    KdfProfile.ARCHIVAL: KDF_ARCHIVAL_TARGET,
+}
+
+# Costs measured before extrapolating to the target
+_PBKDF2_PROBE_ITERATIONS = 20000
+_SCRYPT_PROBE_MEMORY = 16 * 1024  # N = 2**14
+
+_calibrated: Dict[str, KdfParams] = {}
+_lock = threading.Lock()
+
+
+def calibrate_kdf(
+    algorithm: Optional[KdfAlgorithm] = None,
+    target_seconds: float = KDF_INTERACTIVE_TARGET,
+) -> KdfParams:
+    """
+    Measure this machine and pick KDF costs that take about target_seconds.
+
+    One derivation is timed at a probe cost and the cost is scaled linearly
+    to the target. Costs never drop below the configured floors, so a slow
+    machine may take longer than the target.
+
+    Args:
+        algorithm: KDF to calibrate (see resolve_kdf_algorithm)
+        target_seconds: Desired derivation time
+
+    Returns:
+        Calibrated KdfParams
+
+    Raises:
+        ValueError: If the target is not positive
+    """
+    if target_seconds <= 0:
+        raise ValueError("KDF calibration target must be positive")
+
+    algorithm = resolve_kdf_algorithm(algorithm)
+    if algorithm == KdfAlgorithm.ARGON2ID:
+        # Reason: prefer shrinking memory over dropping below one pass, as
+        # one pass at the default memory may already exceed a short target
+        probe = KdfParams(algorithm, 1, ARGON2_MEMORY_COST, ARGON2_PARALLELISM)
+        elapsed = _time_kdf(probe)
+        while elapsed > target_seconds and probe.memory_cost > KDF_MIN_MEMORY_COST:
+            probe = replace(probe, memory_cost=probe.memory_cost // 2)
+            elapsed /= 2
+        time_cost = round(target_seconds / elapsed)
+        params = replace(probe, time_cost=max(1, min(MAX_KDF_TIME_COST, time_cost)))
+    elif algorithm == KdfAlgorithm.SCRYPT:
+        probe = KdfParams(algorithm, 1, _SCRYPT_PROBE_MEMORY, SCRYPT_PARALLELISM)
+        # Reason: scrypt's N must be a power of two, so round in log space
+        doublings = round(math.log2(target_seconds / _time_kdf(probe)))
+        memory_cost = _SCRYPT_PROBE_MEMORY << max(0, doublings)
+        memory_cost = max(KDF_MIN_MEMORY_COST, min(MAX_KDF_MEMORY_COST, memory_cost))
+        params = replace(probe, memory_cost=memory_cost)
+    else:
+        probe = KdfParams(algorithm, _PBKDF2_PROBE_ITERATIONS)
+        iterations = int(_PBKDF2_PROBE_ITERATIONS * target_seconds / _time_kdf(probe))
+        iterations = max(KDF_MIN_PBKDF2_ITERATIONS, min(MAX_KDF_TIME_COST, iterations))
+        params = replace(probe, time_cost=iterations)
+
+    return validate_kdf_params(params)
+
+
+def get_calibrated_kdf_params(
+    algorithm: Optional[KdfAlgorithm] = None,
+    profile: KdfProfile = KdfProfile.INTERACTIVE,
+    calibration_path: Optional[str] = None,
+) -> KdfParams:
+    """
+    Get KDF costs calibrated for this machine, calibrating on first use.
+
+    Results are persisted in the app data directory and reused until the
+    file is deleted or the host changes (e.g. a synced profile directory).
+    The first call measures for up to a second or so, so interactive
+    callers should run it off the UI thread (see start_calibration).
+
+    Args:
+        algorithm: KDF to use (see resolve_kdf_algorithm)
+        profile: Target unlock time; TEST returns minimal costs without
+            measuring, as does an active test profile (KDF_PROFILE_ENV)
+        calibration_path: Calibration file (None uses the app data file)
+
+    Returns:
+        KdfParams for new files
+    """
+    algorithm = resolve_kdf_algorithm(algorithm)
+    if profile == KdfProfile.TEST or is_test_profile_active():
+        return TEST_KDF_PARAMS[algorithm]
+
+    if calibration_path is None:
+        calibration_path = get_kdf_calibration_file_path()
+    params = _stored_params(algorithm, profile, calibration_path)
+    if params is not None:
+        return params
+
+    # Reason: measure without holding the lock, so stored_kdf_params never
+    # waits for a calibration; concurrent first calls may both measure
+    target_seconds = _PROFILE_TARGETS[profile]
+    params = calibrate_kdf(algorithm, target_seconds)
+    entry_key = f"{algorithm.value}/{profile.value}"
+    with _lock:
+        data = _load_calibration(calibration_path)
+        data["entries"][entry_key] = {
+            "time_cost": params.time_cost,
+            "memory_cost": params.memory_cost,
+            "parallelism": params.parallelism,
+            "target_seconds": target_seconds,
+        }
+        _save_calibration(calibration_path, data)
+        _calibrated[f"{calibration_path}:{entry_key}"] = params
+    return params
+
+
+def stored_kdf_params(
+    algorithm: Optional[KdfAlgorithm] = None,
+    profile: KdfProfile = KdfProfile.INTERACTIVE,
+    calibration_path: Optional[str] = None,
+) -> KdfParams:
+    """
+    Get the stored calibration of this machine, without ever measuring.
+
+    This is the default of the library calls: a machine that was calibrated
+    (by the GUI or get_calibrated_kdf_params) gets its calibrated costs,
+    any other machine gets the fixed default_kdf_params(), so no call pays
+    for a calibration it did not ask for.
+
+    Args:
+        algorithm: KDF to use (see resolve_kdf_algorithm)
+        profile: Target unlock time of the calibration to look up
+        calibration_path: Calibration file (None uses the app data file)
+
+    Returns:
+        Calibrated KdfParams, or default_kdf_params() if there are none
+    """
+    algorithm = resolve_kdf_algorithm(algorithm)
+    if profile == KdfProfile.TEST or is_test_profile_active():
+        return TEST_KDF_PARAMS[algorithm]
+
+    if calibration_path is None:
+        calibration_path = get_kdf_calibration_file_path()
+    params = _stored_params(algorithm, profile, calibration_path)
+    return params if params is not None else default_kdf_params(algorithm)
+
+
+def start_calibration(
+    algorithm: Optional[KdfAlgorithm] = None,
+    profile: KdfProfile = KdfProfile.INTERACTIVE,
+    calibration_path: Optional[str] = None,
+) -> threading.Thread:
+    """
+    Calibrate in a background thread, if this machine is not calibrated yet.
+
+    Calls made before the thread finishes use stored_kdf_params() and so
+    fall back to the fixed defaults.
+
+    Args:
+        algorithm: KDF to calibrate (see resolve_kdf_algorithm)
+        profile: Target unlock time
+        calibration_path: Calibration file (None uses the app data file)
+
+    Returns:
+        The started daemon thread
+    """
+
+    def run() -> None:
+        try:
+            get_calibrated_kdf_params(algorithm, profile, calibration_path)
+        except Exception as e:
+            print(f"Warning: KDF calibration failed: {e}")
+
+    thread = threading.Thread(target=run, name="kdf-calibration", daemon=True)
+    thread.start()
+    return thread
+
+
+def clear_calibration_cache() -> None:
+    """Forget calibrations loaded in this process (the file is kept)."""
+    with _lock:
+        _calibrated.clear()
+
+
+def _stored_params(
+    algorithm: KdfAlgorithm, profile: KdfProfile, calibration_path: str
+) -> Optional[KdfParams]:
+    """
+    Look up a calibration in the process cache or the calibration file.
+
+    Args:
+        algorithm: Concrete KDF
+        profile: Target unlock time
+        calibration_path: Calibration file
+
+    Returns:
+        Stored KdfParams, or None if this machine is not calibrated
+    """
+    entry_key = f"{algorithm.value}/{profile.value}"
+    cache_key = f"{calibration_path}:{entry_key}"
+    with _lock:
+        params = _calibrated.get(cache_key)
+        if params is None:
+            data = _load_calibration(calibration_path)
+            params = _entry_params(data["entries"].get(entry_key), algorithm)
+            if params is not None:
+                _calibrated[cache_key] = params
+        return params
+
+
+def _time_kdf(params: KdfParams) -> float:
+    """
+    Time one key derivation.
+
+    Args:
+        params: KDF parameters to measure
+
+    Returns:
+        Elapsed wall time in seconds (never zero)
+    """
+    password = SecurePassword("entryptor calibration")
+    try:
+        start = time.perf_counter()
+        derive_key_from_password(password, None, params)
+        return max(time.perf_counter() - start, 1e-6)
+    finally:
+        password.clear()
+
+
+def _host_id() -> Dict[str, Any]:
+    """
+    Describe this machine, to detect calibrations copied from another host.
+
+    Returns:
+        Host description dictionary
+    """
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _load_calibration(path: str) -> Dict[str, Any]:
+    """
+    Load the calibration file, discarding it if it belongs to another host.
+
+    Args:
+        path: Calibration file path
+
+    Returns:
+        Calibration data with "host" and "entries" keys
+    """
+    empty: Dict[str, Any] = {"host": _host_id(), "entries": {}}
+    if not os.path.exists(path):
+        return empty
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("host") != empty["host"] or not isinstance(
+            data.get("entries"), dict
+        ):
+            return empty
+        return data
+
+    except (json.JSONDecodeError, OSError, AttributeError) as e:
+        print(f"Warning: Failed to load KDF calibration: {e}. Recalibrating.")
+        return empty
+
+
+def _entry_params(
+    entry: Optional[Dict[str, Any]], algorithm: KdfAlgorithm
+) -> Optional[KdfParams]:
+    """
+    Parse a stored calibration entry.
+
+    Args:
+        entry: Stored entry, or None
+        algorithm: Expected KDF
+
+    Returns:
+        KdfParams, or None if the entry is missing or invalid
+    """
+    if entry is None:
+        return None
+    try:
+        return validate_kdf_params(
+            KdfParams(
+                algorithm,
+                int(entry["time_cost"]),
+                int(entry["memory_cost"]),
+                int(entry["parallelism"]),
+            )
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _save_calibration(path: str, data: Dict[str, Any]) -> None:
+    """
+    Persist calibration data; failures only cost a recalibration later.
+
+    Args:
+        path: Calibration file path
+        data: Calibration data
+    """
+    try:
+        if not ensure_directory_exists(os.path.dirname(path)):
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Failed to save KDF calibration: {e}")
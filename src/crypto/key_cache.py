@@ -0,0 +1,193 @@
+"""Session cache of password-derived master keys."""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .key_derivation import KdfParams
+from .secure_memory import SecurePassword
+from ..config.constants import KEY_CACHE_MAX_ENTRIES, KEY_CACHE_TTL
+
+# Reason: a per-process HMAC key keeps cache keys from doubling as an
+# offline-crackable password hash if process memory is dumped
+_FINGERPRINT_KEY = os.urandom(32)
+
+_CacheKey = Tuple[bytes, bytes, KdfParams]
+
+
+def password_fingerprint(password: SecurePassword) -> bytes:
+    """
+    Compute a process-local fingerprint of a password.
+
+    Args:
+        password: Secure password wrapper
+
+    Returns:
+        32-byte HMAC-SHA256 of the password under a per-process key
+    """
+    return hmac.new(_FINGERPRINT_KEY, password.get_bytes(), hashlib.sha256).digest()
+
+
+class KeyCache:
+    """
+    In-memory cache of master keys, keyed by password fingerprint, salt and
+    KDF parameters.
+
+    Entries expire ttl seconds after they were stored and are zeroized when
+    they expire, are evicted or the cache is cleared. A timer thread wipes
+    expired entries even when the cache is idle.
+    """
+
+    def __init__(
+        self, ttl: float = KEY_CACHE_TTL, max_entries: int = KEY_CACHE_MAX_ENTRIES
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Lifetime of an entry in seconds (0 disables caching)
+            max_entries: Maximum number of cached keys
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[_CacheKey, Tuple[bytearray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def get(
+        self, fingerprint: bytes, salt: bytes, params: KdfParams
+    ) -> Optional[bytes]:
+        """
+        Look up a live master key.
+
+        Args:
+            fingerprint: Password fingerprint
+            salt: Key derivation salt
+            params: KDF and cost parameters
+
+        Returns:
+            Copy of the master key, or None if it is not cached
+        """
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get((fingerprint, salt, params))
+            return None if entry is None else bytes(entry[0])
+
+    def put(
+        self, fingerprint: bytes, salt: bytes, params: KdfParams, key: bytes
+    ) -> None:
+        """
+        Store a master key.
+
+        Args:
+            fingerprint: Password fingerprint
+            salt: Key derivation salt
+            params: KDF and cost parameters
+            key: Master key
+        """
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._purge_expired()
+            cache_key = (fingerprint, salt, params)
+            if cache_key in self._entries:
+                _zeroize(self._entries.pop(cache_key)[0])
+            self._entries[cache_key] = (bytearray(key), time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                _zeroize(self._entries.popitem(last=False)[1][0])
+            self._schedule_purge()
+
+    def session_salt(self, fingerprint: bytes, params: KdfParams) -> Optional[bytes]:
+        """
+        Find the salt of the newest live key for a password and KDF.
+
+        Encrypting with this salt reuses the cached master key, so a batch of
+        files pays for one slow key derivation.
+
+        Args:
+            fingerprint: Password fingerprint
+            params: KDF and cost parameters
+
+        Returns:
+            Salt, or None if no key for the password is cached
+        """
+        with self._lock:
+            self._purge_expired()
+            for cached_fingerprint, salt, cached_params in reversed(self._entries):
+                if cached_params == params and hmac.compare_digest(
+                    cached_fingerprint, fingerprint
+                ):
+                    return salt
+            return None
+
+    def clear(self) -> None:
+        """Zeroize and drop every cached key."""
+        with self._lock:
+            for key, _ in self._entries.values():
+                _zeroize(key)
+            self._entries.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def __len__(self) -> int:
+        """Return the number of live entries."""
+        with self._lock:
+            self._purge_expired()
+            return len(self._entries)
+
+    def _purge_expired(self) -> None:
+        """Zeroize and drop expired entries (caller holds the lock)."""
+        now = time.monotonic()
+        for cache_key in [
+            k for k, (_, expiry) in self._entries.items() if expiry <= now
+        ]:
+            _zeroize(self._entries.pop(cache_key)[0])
+
+    def _schedule_purge(self) -> None:
+        """Start the expiry timer if it is not running (caller holds the lock)."""
+        if self._timer is not None or not self._entries:
+            return
+        delay = min(expiry for _, expiry in self._entries.values()) - time.monotonic()
+        self._timer = threading.Timer(max(0.0, delay), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        """Wipe expired entries and re-arm the timer for the remaining ones."""
+        with self._lock:
+            self._timer = None
+            self._purge_expired()
+            self._schedule_purge()
+
+
+def _zeroize(buffer: bytearray) -> None:
+    """
+    Overwrite a key buffer with zeros.
+
+    Args:
+        buffer: Buffer to wipe
+    """
+    buffer[:] = bytes(len(buffer))
+
+
+_key_cache = KeyCache()
+
+
+def get_key_cache() -> KeyCache:
+    """
+    Get the process-wide key cache.
+
+    Returns:
+        KeyCache instance
+    """
+    return _key_cache
+
+
+def clear_key_cache() -> None:
+    """Zeroize every cached master key, e.g. when the application exits."""
+    _key_cache.clear()
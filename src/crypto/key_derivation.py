@@ -2,14 +2,152 @@
 
 import os
 import base64
-from typing import Tuple, Optional
+from dataclasses import dataclass
+from typing import Tuple, Optional, Union
 
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from cryptography.hazmat.backends import default_backend
 
 from .secure_memory import SecurePassword
-from ..config.constants import SALT_SIZE, PBKDF2_ITERATIONS
+from ..config.constants import (
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    ARGON2_TIME_COST,
+    KDF_PROFILE_ENV,
+    MAX_KDF_MEMORY_COST,
+    MAX_KDF_PARALLELISM,
+    MAX_KDF_TIME_COST,
+    SALT_SIZE,
+    PBKDF2_ITERATIONS,
+    SCRYPT_MEMORY_COST,
+    SCRYPT_PARALLELISM,
+)
+from ..config.models import KdfAlgorithm, KdfProfile
+
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+
+    ARGON2_AVAILABLE = True
+except ImportError:  # cryptography < 44
+    ARGON2_AVAILABLE = False
+
+_SCRYPT_BLOCK_SIZE = 8  # scrypt r; N * 128 * r bytes = N KiB
+
+
+@dataclass(frozen=True)
+class KdfParams:
+    """Password KDF and its cost parameters, as stored in file headers."""
+
+    algorithm: KdfAlgorithm
+    time_cost: int  # PBKDF2 iterations or Argon2id passes (1 for scrypt)
+    memory_cost: int = 0  # KiB; scrypt N or Argon2id memory (0 for PBKDF2)
+    parallelism: int = 1  # scrypt p or Argon2id lanes
+
+
+# Parameters of format version 2 files, which do not record them
+LEGACY_KDF_PARAMS = KdfParams(KdfAlgorithm.PBKDF2, PBKDF2_ITERATIONS)
+
+# Minimal costs of the test profile; only for test suites
+TEST_KDF_PARAMS = {
+    KdfAlgorithm.PBKDF2: KdfParams(KdfAlgorithm.PBKDF2, 1000),
+    KdfAlgorithm.SCRYPT: KdfParams(KdfAlgorithm.SCRYPT, 1, 1024),
+    KdfAlgorithm.ARGON2ID: KdfParams(KdfAlgorithm.ARGON2ID, 1, 1024),
+}
+
+
+def resolve_kdf_algorithm(algorithm: Optional[KdfAlgorithm] = None) -> KdfAlgorithm:
+    """
+    Resolve a KDF choice to a concrete algorithm.
+
+    Args:
+        algorithm: Requested KDF. None or AUTO picks Argon2id when the
+            installed cryptography package supports it, otherwise scrypt
+
+    Returns:
+        Concrete KdfAlgorithm
+    """
+    if algorithm is None or algorithm == KdfAlgorithm.AUTO:
+        return KdfAlgorithm.ARGON2ID if ARGON2_AVAILABLE else KdfAlgorithm.SCRYPT
+    return algorithm
+
+
+def is_test_profile_active() -> bool:
+    """
+    Check whether the low-cost test profile is selected.
+
+    Returns:
+        True if the KDF_PROFILE_ENV environment variable is "test"
+    """
+    return os.environ.get(KDF_PROFILE_ENV) == KdfProfile.TEST.value
+
+
+def default_kdf_params(algorithm: Optional[KdfAlgorithm] = None) -> KdfParams:
+    """
+    Get the default cost parameters for a password KDF.
+
+    These are fixed costs. get_calibrated_kdf_params() tunes them to this
+    machine, and calls without explicit parameters use stored_kdf_params(),
+    which prefers such a stored calibration over these values. With the
+    test profile active, minimal costs are returned.
+
+    Args:
+        algorithm: KDF to use (see resolve_kdf_algorithm)
+
+    Returns:
+        KdfParams with the configured default costs
+    """
+    algorithm = resolve_kdf_algorithm(algorithm)
+    if is_test_profile_active():
+        return TEST_KDF_PARAMS[algorithm]
+
+    if algorithm == KdfAlgorithm.ARGON2ID:
+        return KdfParams(
+            algorithm, ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM
+        )
+    if algorithm == KdfAlgorithm.SCRYPT:
+        return KdfParams(algorithm, 1, SCRYPT_MEMORY_COST, SCRYPT_PARALLELISM)
+    return LEGACY_KDF_PARAMS
+
+
+def validate_kdf_params(params: KdfParams) -> KdfParams:
+    """
+    Check that KDF parameters are usable and within sane bounds.
+
+    Parameters read from a file header are checked too, so a crafted file
+    cannot request an unbounded amount of memory or time.
+
+    Args:
+        params: Parameters to check
+
+    Returns:
+        The parameters
+
+    Raises:
+        ValueError: If a parameter is out of range
+    """
+    if params.algorithm == KdfAlgorithm.AUTO:
+        raise ValueError("KDF parameters need a concrete algorithm")
+    if not 1 <= params.time_cost <= MAX_KDF_TIME_COST:
+        raise ValueError(f"Invalid KDF time cost: {params.time_cost}")
+    if not 1 <= params.parallelism <= MAX_KDF_PARALLELISM:
+        raise ValueError(f"Invalid KDF parallelism: {params.parallelism}")
+    if params.memory_cost > MAX_KDF_MEMORY_COST:
+        raise ValueError(f"KDF memory cost is too large: {params.memory_cost} KiB")
+
+    if params.algorithm == KdfAlgorithm.SCRYPT:
+        memory = params.memory_cost
+        if params.time_cost != 1 or memory < 2 or memory & (memory - 1):
+            raise ValueError(f"Invalid scrypt parameters: {params}")
+    elif params.algorithm == KdfAlgorithm.ARGON2ID:
+        if params.memory_cost < 8 * params.parallelism:
+            raise ValueError(f"Invalid Argon2id parameters: {params}")
+    elif params.memory_cost != 0 or params.parallelism != 1:
+        raise ValueError(f"Invalid PBKDF2 parameters: {params}")
+
+    return params
 
 
 def generate_salt(length: int = SALT_SIZE) -> bytes:
@@ -26,20 +164,25 @@ def generate_salt(length: int = SALT_SIZE) -> bytes:
 
 
 def derive_key_from_password(
-    password: SecurePassword, salt: Optional[bytes] = None
+    password: SecurePassword,
+    salt: Optional[bytes] = None,
+    params: Optional[KdfParams] = None,
 ) -> Tuple[bytes, bytes]:
     """
-    Derive encryption key from password using PBKDF2.
+    Derive encryption key from password using PBKDF2, scrypt or Argon2id.
 
     Args:
         password: Secure password wrapper
         salt: Optional salt bytes. If None, generates random salt
+        params: KDF and cost parameters (None uses PBKDF2 with
+            PBKDF2_ITERATIONS, as in format version 2 files)
 
     Returns:
         Tuple of (key, salt) as bytes
 
     Raises:
-        ValueError: If password is empty
+        ValueError: If password is empty, the parameters are invalid or the
+            KDF is not supported by the installed cryptography package
     """
     password_bytes = password.get_bytes()
     if not password_bytes:
@@ -48,13 +191,35 @@ def derive_key_from_password(
     if salt is None:
         salt = os.urandom(SALT_SIZE)
 
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,  # 256 bits
-        salt=salt,
-        iterations=PBKDF2_ITERATIONS,
-        backend=default_backend(),
-    )
+    params = validate_kdf_params(params or LEGACY_KDF_PARAMS)
+    kdf: Union["Argon2id", Scrypt, PBKDF2HMAC]
+    if params.algorithm == KdfAlgorithm.ARGON2ID:
+        if not ARGON2_AVAILABLE:
+            raise ValueError("Argon2id requires cryptography 44 or later")
+        kdf = Argon2id(
+            salt=salt,
+            length=32,
+            iterations=params.time_cost,
+            lanes=params.parallelism,
+            memory_cost=params.memory_cost,
+        )
+    elif params.algorithm == KdfAlgorithm.SCRYPT:
+        kdf = Scrypt(
+            salt=salt,
+            length=32,
+            n=params.memory_cost,
+            r=_SCRYPT_BLOCK_SIZE,
+            p=params.parallelism,
+            backend=default_backend(),
+        )
+    else:
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,  # 256 bits
+            salt=salt,
+            iterations=params.time_cost,
+            backend=default_backend(),
+        )
 
     key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
     return key, salt
@@ -95,6 +260,37 @@ def derive_key_from_keyfile(keyfile_path: str) -> bytes:
     return base64.urlsafe_b64encode(key_material)
 
 
+def derive_subkey(
+    key_material: bytes, salt: bytes, info: bytes, length: int = 32
+) -> bytes:
+    """
+    Derive a subkey from existing key material using HKDF-SHA256.
+
+    Args:
+        key_material: Raw input key material
+        salt: Per-file salt
+        info: Context label separating different uses of the same material
+        length: Length of the subkey in bytes (default: 32)
+
+    Returns:
+        Raw subkey bytes
+
+    Raises:
+        ValueError: If key material is empty
+    """
+    if not key_material:
+        raise ValueError("Key material cannot be empty")
+
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=length,
+        salt=salt,
+        info=info,
+        backend=default_backend(),
+    )
+    return hkdf.derive(key_material)
+
+
 def generate_keyfile(output_path: str) -> None:
     """
     Generate a new keyfile with random data.
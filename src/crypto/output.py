@@ -0,0 +1,142 @@
+"""Crash-safe output files: temp file, fsync policy and atomic rename."""
+
+import os
+import secrets
+import shutil
+import stat
+from types import TracebackType
+from typing import Optional, Type
+
+from ..config.models import FsyncPolicy
+
+
+def check_free_space(path: str, required: Optional[int]) -> None:
+    """
+    Fail early if a file system cannot hold a predicted output size.
+
+    Args:
+        path: Path on the target file system
+        required: Predicted output size in bytes, or None if unknown
+
+    Raises:
+        OSError: If less than required bytes are free
+    """
+    if required is None:
+        return
+    free = shutil.disk_usage(os.path.dirname(os.path.abspath(path))).free
+    if free < required:
+        raise OSError(
+            f"Not enough free space: {required} bytes needed, {free} available"
+        )
+
+
+class AtomicOutput:
+    """
+    Output file written under a temporary name and renamed into place.
+
+    The temp file lives in the output's directory, so os.replace() is an
+    atomic rename: readers see either the old file or the complete new one,
+    and a crash or failure never leaves a truncated file under the final
+    name. Durability is paid once per file according to the fsync policy,
+    never per chunk. If commit() is not reached, the temp file is deleted,
+    unless a fixed temp path was given: that file is kept so a resumable
+    call can continue it.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        fsync: Optional[FsyncPolicy] = None,
+        temp_path: Optional[str] = None,
+    ) -> None:
+        """
+        Initialize the output.
+
+        Args:
+            output_path: Final output path
+            fsync: Durability policy (None uses FsyncPolicy.FILE)
+            temp_path: Fixed temp path in the output's directory, opened
+                without truncation and kept on failure (None picks a
+                unique name that is deleted on failure)
+        """
+        self.output_path = output_path
+        self.fsync = FsyncPolicy.FILE if fsync is None else fsync
+        directory, name = os.path.split(os.path.abspath(output_path))
+        self._directory = directory
+        self._name = name
+        self.temp_path = temp_path or ""
+        self._keep = temp_path is not None
+        self._committed = False
+
+    def __enter__(self) -> "AtomicOutput":
+        """
+        Create the empty temp file, or open the fixed one.
+
+        Returns:
+            This output, with temp_path set
+        """
+        if self._keep:
+            os.close(os.open(self.temp_path, os.O_WRONLY | os.O_CREAT, 0o666))
+        else:
+            while True:
+                temp_path = os.path.join(
+                    self._directory, f".{self._name}.{secrets.token_hex(4)}.tmp"
+                )
+                try:
+                    # Reason: O_EXCL never reuses a file, and mode 0o666 lets
+                    # the umask apply as it would to a plain open(path, "wb")
+                    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+                except FileExistsError:
+                    continue
+                os.close(fd)
+                break
+            self.temp_path = temp_path
+
+        try:
+            mode = stat.S_IMODE(os.stat(self.output_path).st_mode)
+        except OSError:
+            pass  # New file; keep the umask default
+        else:
+            os.chmod(self.temp_path, mode)
+        return self
+
+    def commit(self) -> None:
+        """
+        Flush the finished temp file and rename it over the output path.
+
+        Raises:
+            OSError: If syncing or renaming fails
+        """
+        if self.fsync != FsyncPolicy.NONE:
+            fd = os.open(self.temp_path, os.O_RDWR)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        os.replace(self.temp_path, self.output_path)
+        self._committed = True
+
+        # Reason: the rename itself is only durable once the directory entry
+        # is flushed; Windows has no directory handles for this
+        directory_flag = getattr(os, "O_DIRECTORY", None)
+        if self.fsync == FsyncPolicy.FILE_AND_DIRECTORY and directory_flag:
+            fd = os.open(self._directory, os.O_RDONLY | directory_flag)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Delete the temp file unless it was committed or is kept."""
+        if self._committed or self._keep or not self.temp_path:
+            return
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass  # Already removed
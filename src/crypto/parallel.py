@@ -0,0 +1,115 @@
+"""Worker pool helpers for parallel chunk processing."""
+
+import os
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Generator,
+    Iterable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from ..config.constants import DEFAULT_WORKER_COUNT
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def resolve_worker_count(workers: Optional[int] = None) -> int:
+    """
+    Resolve the effective number of worker processes.
+
+    Args:
+        workers: Requested worker count. None uses DEFAULT_WORKER_COUNT,
+            0 means one worker per CPU core
+
+    Returns:
+        Worker count of at least 1
+
+    Raises:
+        ValueError: If workers is negative
+    """
+    if workers is None:
+        workers = DEFAULT_WORKER_COUNT
+
+    if workers < 0:
+        raise ValueError("Worker count cannot be negative")
+
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    return max(1, workers)
+
+
+def ordered_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    initializer: Optional[Callable[..., Any]] = None,
+    initargs: Tuple[Any, ...] = (),
+    max_pending: Optional[int] = None,
+    threads: bool = False,
+) -> Generator[R, None, None]:
+    """
+    Apply a function to items in a worker pool, yielding results in order.
+
+    Items are pulled from the iterable lazily, so at most max_pending tasks
+    (and their inputs and outputs) are held in memory at any time.
+
+    Args:
+        func: Function applied to each item (picklable unless threads is set)
+        items: Iterable of work items (picklable unless threads is set)
+        workers: Number of workers (1 runs in the calling thread)
+        initializer: Optional per-worker setup function
+        initargs: Arguments passed to the initializer
+        max_pending: Maximum tasks in flight (default: 2 * workers)
+        threads: Use a thread pool, for work that releases the GIL
+
+    Yields:
+        Results of func in the same order as items
+
+    Raises:
+        Exception: Any exception raised by func is re-raised here
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield func(item)
+        return
+
+    if max_pending is None:
+        max_pending = workers * 2
+
+    executor: Executor
+    if threads:
+        executor = ThreadPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        )
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=initializer, initargs=initargs
+        )
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            # Reason: waiting on the oldest task both preserves output order
+            # and applies backpressure to the producer
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
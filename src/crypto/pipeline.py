@@ -0,0 +1,267 @@
+"""Three-stage overlapped pipeline: reader thread, worker pool, writer thread."""
+
+import queue
+import threading
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .parallel import ordered_map
+from ..config.constants import (
+    CHUNK_SIZE,
+    PARALLEL_BATCH_CHUNKS,
+    PIPELINE_IN_FLIGHT_CHUNKS,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()  # End-of-stream marker passed between stages
+_POLL_INTERVAL = 0.1  # Seconds between stop checks while a stage is blocked
+
+
+def resolve_in_flight_chunks(in_flight_chunks: Optional[int] = None) -> int:
+    """
+    Resolve the maximum number of chunks buffered across pipeline stages.
+
+    Args:
+        in_flight_chunks: Requested limit. None uses PIPELINE_IN_FLIGHT_CHUNKS
+
+    Returns:
+        In-flight chunk limit of at least 1
+
+    Raises:
+        ValueError: If the limit is not positive
+    """
+    if in_flight_chunks is None:
+        in_flight_chunks = PIPELINE_IN_FLIGHT_CHUNKS
+
+    if in_flight_chunks < 1:
+        raise ValueError("In-flight chunk limit must be positive")
+
+    return in_flight_chunks
+
+
+def split_in_flight_chunks(
+    in_flight_chunks: Optional[int], chunk_size: int
+) -> Tuple[int, int]:
+    """
+    Split the in-flight limit into pooled batches of chunks.
+
+    The limit is counted in CHUNK_SIZE units, so files with larger chunks
+    get proportionally fewer chunks in flight and the memory cap holds.
+
+    Args:
+        in_flight_chunks: Requested limit (see resolve_in_flight_chunks)
+        chunk_size: Chunk size of the file
+
+    Returns:
+        Tuple of (chunks per batch, number of pooled batches); at least three
+        batches are pooled so that every stage can hold one
+    """
+    limit = max(
+        1, resolve_in_flight_chunks(in_flight_chunks) * CHUNK_SIZE // chunk_size
+    )
+    largest_batch = max(1, PARALLEL_BATCH_CHUNKS * CHUNK_SIZE // chunk_size)
+    batch_chunks = max(1, min(largest_batch, limit // 4))
+    return batch_chunks, max(3, limit // batch_chunks)
+
+
+class BufferPool(Generic[T]):
+    """
+    Fixed set of reusable buffers shared by the pipeline stages.
+
+    The reader acquires a buffer per batch and the writer releases it once
+    the batch is written, so the pool size caps the batches in flight and
+    blocks the reader when the downstream stages fall behind.
+    """
+
+    def __init__(self, factory: Callable[[], T], count: int) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            factory: Creates one buffer
+            count: Number of buffers
+        """
+        self.items: List[T] = [factory() for _ in range(count)]
+        self._free: "queue.Queue[T]" = queue.Queue()
+        for item in self.items:
+            self._free.put(item)
+
+    def acquire(self, stop: threading.Event) -> Optional[T]:
+        """
+        Take a free buffer, waiting until one is released.
+
+        Args:
+            stop: Event set when the pipeline is shutting down
+
+        Returns:
+            Buffer, or None if the pipeline stopped while waiting
+        """
+        item = _get(self._free, stop)
+        return None if item is _DONE else item
+
+    def release(self, item: T) -> None:
+        """
+        Return a buffer to the pool.
+
+        Args:
+            item: Buffer from acquire()
+        """
+        self._free.put(item)
+
+
+def run_pipeline(
+    items: Iterable[T],
+    func: Callable[[T], R],
+    consume: Callable[[R], None],
+    workers: int,
+    queue_size: int,
+    max_pending: Optional[int] = None,
+    threads: bool = True,
+    initializer: Optional[Callable[..., Any]] = None,
+    initargs: Tuple[Any, ...] = (),
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Overlap reading, processing and writing of a stream of work items.
+
+    A reader thread pulls items (typically doing the input I/O), the calling
+    thread maps func over them in a worker pool with ordered_map, and a
+    writer thread passes the results to consume in order. Bounded queues
+    between the stages apply backpressure, so at most about
+    2 * queue_size + max_pending items are held at any time.
+
+    Args:
+        items: Work items; iterated on the reader thread
+        func: Function applied to each item in the worker pool
+        consume: Called with each result, in order, on the writer thread
+        workers: Number of pool workers (1 runs func in the calling thread)
+        queue_size: Capacity of each queue between stages
+        max_pending: Maximum items in the worker pool (see ordered_map)
+        threads: Use a thread pool rather than worker processes
+        initializer: Optional per-worker setup function
+        initargs: Arguments passed to the initializer
+        stop: Event to share with other pipeline parts (e.g. a BufferPool);
+            set when any stage fails
+
+    Raises:
+        Exception: The first exception raised by any stage
+    """
+    if stop is None:
+        stop = threading.Event()
+    read_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    write_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    errors: List[BaseException] = []
+
+    def fail(error: BaseException) -> None:
+        errors.append(error)
+        stop.set()
+
+    def read() -> None:
+        try:
+            for item in items:
+                if not _put(read_queue, item, stop):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            _put(read_queue, _DONE, stop)
+
+    def write() -> None:
+        try:
+            while not stop.is_set():
+                result = _get(write_queue, stop)
+                if result is _DONE:
+                    return
+                consume(result)
+        except BaseException as e:
+            fail(e)
+
+    def inputs() -> Iterator[T]:
+        while True:
+            item = _get(read_queue, stop)
+            if item is _DONE:
+                return
+            yield item
+
+    reader = threading.Thread(target=read, name="pipeline-reader", daemon=True)
+    writer = threading.Thread(target=write, name="pipeline-writer", daemon=True)
+    reader.start()
+    writer.start()
+    try:
+        results = ordered_map(
+            func,
+            inputs(),
+            workers,
+            initializer=initializer,
+            initargs=initargs,
+            max_pending=max_pending,
+            threads=threads,
+        )
+        try:
+            for result in results:
+                if not _put(write_queue, result, stop):
+                    break
+        finally:
+            results.close()
+    except BaseException as e:
+        fail(e)
+    finally:
+        # Reason: after a failure stop is set, which also wakes a reader
+        # blocked on a full queue or an exhausted BufferPool
+        _put(write_queue, _DONE, stop)
+        writer.join()
+        reader.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _put(target: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    """
+    Put an item on a bounded queue unless the pipeline stops.
+
+    Args:
+        target: Queue to put the item on
+        item: Item to put
+        stop: Pipeline stop event
+
+    Returns:
+        True if the item was queued, False if the pipeline stopped
+    """
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source: "queue.Queue[Any]", stop: threading.Event) -> Any:
+    """
+    Take an item from a queue unless the pipeline stops.
+
+    Args:
+        source: Queue to take the item from
+        stop: Pipeline stop event
+
+    Returns:
+        Item, or the end-of-stream marker if the pipeline stopped
+    """
+    while True:
+        try:
+            return source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
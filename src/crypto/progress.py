@@ -0,0 +1,236 @@
+"""Rate-limited progress reporting for encrypt, decrypt and verify calls."""
+
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from .cancellation import CancellationToken
+from .stats import StatsRecorder, report_stats
+from ..config.constants import PROGRESS_INTERVAL
+from ..config.models import (
+    EncryptionResult,
+    OperationStage,
+    OperationStats,
+    ProgressInfo,
+)
+
+ProgressCallback = Callable[[ProgressInfo], None]
+
+# Stages that process file data, as opposed to deriving keys
+_DATA_STAGES = (
+    OperationStage.ENCRYPTING,
+    OperationStage.DECRYPTING,
+    OperationStage.VERIFYING,
+)
+
+
+class ProgressReporter:
+    """
+    Count processed bytes and pass snapshots to a progress callback.
+
+    update() is called once per chunk or batch from the thread that writes
+    the output, so it only adds a counter and a clock read per call; the
+    callback runs at most once every PROGRESS_INTERVAL seconds, plus once
+    per stage change. Without a callback nothing is reported.
+    The callback runs on the calling thread or the pipeline's writer
+    thread; an exception it raises aborts the operation.
+
+    The reporter also times each stage, carries the StatsRecorder the
+    engine fills and checks the call's cancellation token on every update
+    and stage change, so one object instruments a whole call.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[ProgressCallback] = None,
+        total_bytes: Optional[int] = None,
+        interval: Optional[float] = None,
+        cancel: Optional[CancellationToken] = None,
+    ) -> None:
+        """
+        Initialize the reporter.
+
+        Args:
+            callback: Function receiving ProgressInfo snapshots, or None
+            total_bytes: Plaintext size, or None if unknown
+            interval: Minimum seconds between rate-limited reports (None
+                uses PROGRESS_INTERVAL)
+            cancel: Cancellation token of the call, or None
+        """
+        self._callback = callback
+        self._interval = PROGRESS_INTERVAL if interval is None else interval
+        self._start = time.monotonic()
+        self._data_start: Optional[float] = None
+        self._last_report = 0.0
+        self._stage_start = self._start
+        self.stage = OperationStage.DERIVING_KEY
+        self.total_bytes = total_bytes
+        self.bytes_done = 0
+        self.stage_times: Dict[OperationStage, float] = {}
+        self.stats = StatsRecorder()
+        self.cancel = cancel
+
+    def set_stage(self, stage: OperationStage) -> None:
+        """
+        Enter a stage and report it immediately.
+
+        The throughput clock starts with the first data stage, so key
+        derivation does not dilute it.
+
+        Args:
+            stage: New stage
+
+        Raises:
+            OperationCancelled: If the call was cancelled (except when
+                entering FINISHED)
+        """
+        if stage != OperationStage.FINISHED:
+            self.check_cancelled()
+        now = time.monotonic()
+        self.stage_times[self.stage] = (
+            self.stage_times.get(self.stage, 0.0) + now - self._stage_start
+        )
+        self._stage_start = now
+        self.stage = stage
+        if self._data_start is None and stage in _DATA_STAGES:
+            self._data_start = now
+        if self._callback is not None:
+            self._report(time.monotonic())
+
+    def update(self, count: int) -> None:
+        """
+        Add processed plaintext bytes, reporting if the interval has passed.
+
+        Args:
+            count: Bytes processed since the last update
+
+        Raises:
+            OperationCancelled: If the call was cancelled
+        """
+        self.bytes_done += count
+        self.check_cancelled()
+        if self._callback is None:
+            return
+        now = time.monotonic()
+        if now - self._last_report >= self._interval:
+            self._report(now)
+
+    def check_cancelled(self) -> None:
+        """
+        Stop the call if its cancellation token has fired.
+
+        Raises:
+            OperationCancelled: If the call was cancelled
+        """
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def finish(self) -> None:
+        """Report the finished stage with the final byte count."""
+        if self.total_bytes is None:
+            self.total_bytes = self.bytes_done
+        self.set_stage(OperationStage.FINISHED)
+
+    def operation_stats(
+        self, operation: str, bytes_in: int, bytes_out: int
+    ) -> OperationStats:
+        """
+        Summarize a finished call.
+
+        Args:
+            operation: "encrypt" or "decrypt"
+            bytes_in: Size of the input file
+            bytes_out: Size of the output file
+
+        Returns:
+            OperationStats built from the stage times and engine totals
+        """
+        stats = self.stats
+        data_time = sum(self.stage_times.get(stage, 0.0) for stage in _DATA_STAGES)
+        utilization = None
+        if data_time > 0 and stats.crypt_time > 0:
+            utilization = min(1.0, stats.crypt_time / (data_time * stats.worker_count))
+        return OperationStats(
+            operation=operation,
+            elapsed=time.monotonic() - self._start,
+            kdf_time=self.stage_times.get(OperationStage.DERIVING_KEY, 0.0),
+            bytes_in=bytes_in,
+            bytes_out=bytes_out,
+            read_time=stats.read_time,
+            crypt_time=stats.crypt_time,
+            write_time=stats.write_time,
+            chunk_count=stats.chunk_count,
+            peak_buffer_bytes=stats.peak_buffer_bytes,
+            worker_count=stats.worker_count,
+            worker_utilization=utilization,
+        )
+
+    def snapshot(self) -> ProgressInfo:
+        """
+        Describe the current progress.
+
+        Returns:
+            ProgressInfo with throughput and ETA
+        """
+        return self._snapshot(time.monotonic())
+
+    def _snapshot(self, now: float) -> ProgressInfo:
+        """
+        Describe the progress at a point in time.
+
+        Args:
+            now: time.monotonic() value
+
+        Returns:
+            ProgressInfo
+        """
+        info = ProgressInfo(
+            stage=self.stage,
+            bytes_done=self.bytes_done,
+            total_bytes=self.total_bytes,
+            elapsed=now - self._start,
+        )
+        if self._data_start is not None and now > self._data_start:
+            info.throughput = self.bytes_done / (now - self._data_start)
+        if self.total_bytes is not None:
+            left = max(0, self.total_bytes - self.bytes_done)
+            if left == 0:
+                info.eta = 0.0
+            elif info.throughput > 0:
+                info.eta = left / info.throughput
+        return info
+
+    def _report(self, now: float) -> None:
+        """
+        Send a snapshot to the callback.
+
+        Args:
+            now: time.monotonic() value
+        """
+        self._last_report = now
+        callback = self._callback
+        if callback is not None:
+            callback(self._snapshot(now))
+
+
+def completed_result(
+    reporter: ProgressReporter, operation: str, file_path: str, output_path: str
+) -> EncryptionResult:
+    """
+    Finish a successful call and attach its stats to the result.
+
+    Args:
+        reporter: Reporter of the call
+        operation: "encrypt" or "decrypt"
+        file_path: Input path
+        output_path: Output path
+
+    Returns:
+        Successful EncryptionResult with stats
+    """
+    reporter.finish()
+    stats = reporter.operation_stats(
+        operation, os.path.getsize(file_path), os.path.getsize(output_path)
+    )
+    report_stats(stats)
+    return EncryptionResult(success=True, output_path=output_path, stats=stats)
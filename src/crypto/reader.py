@@ -0,0 +1,335 @@
+"""Random-access reading of encrypted files."""
+
+import io
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, BinaryIO, Optional, Tuple
+
+from .ciphers import FrameAuthenticationError, FrameCipher, create_frame_cipher
+from .compression import with_compression
+from .encryption import DecryptionError
+from .file_format import derive_file_key, read_file_header
+from .framing import read_frame_index, scan_frames
+from .secure_memory import SecurePassword
+from ..config.constants import (
+    CHUNK_SIZE,
+    READER_CACHE_SIZE,
+    READER_INDEX_CACHE_ENTRIES,
+)
+from ..config.models import EncryptionMode
+
+# Scanned frame indexes of files without an index footer, keyed by file
+# identity so that a modified file is rescanned
+_IndexKey = Tuple[str, int, int, int]
+_scan_cache: "OrderedDict[_IndexKey, Tuple[array, array]]" = OrderedDict()
+_scan_cache_lock = threading.Lock()
+
+
+class ChunkCache:
+    """Size-bounded LRU cache of decrypted chunks, zeroized on eviction."""
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of cached chunks; the most recently
+                used chunk is always kept
+        """
+        self.max_bytes = max_bytes
+        self._chunks: "OrderedDict[int, bytearray]" = OrderedDict()
+        self._size = 0
+
+    def get(self, index: int) -> Optional[bytearray]:
+        """
+        Look up a chunk and mark it as most recently used.
+
+        Args:
+            index: Chunk index
+
+        Returns:
+            Decrypted chunk, or None if it is not cached
+        """
+        chunk = self._chunks.get(index)
+        if chunk is not None:
+            self._chunks.move_to_end(index)
+        return chunk
+
+    def put(self, index: int, chunk: bytearray) -> None:
+        """
+        Add a chunk, evicting least recently used chunks over the size limit.
+
+        Args:
+            index: Chunk index
+            chunk: Decrypted chunk; the cache takes ownership and zeroizes it
+        """
+        previous = self._chunks.pop(index, None)
+        if previous is not None:
+            self._evict(previous)
+        self._chunks[index] = chunk
+        self._size += len(chunk)
+
+        while self._size > self.max_bytes and len(self._chunks) > 1:
+            _, evicted = self._chunks.popitem(last=False)
+            self._evict(evicted)
+
+    def clear(self) -> None:
+        """Zeroize and drop every cached chunk."""
+        while self._chunks:
+            _, chunk = self._chunks.popitem()
+            self._evict(chunk)
+
+    def __len__(self) -> int:
+        """Return the number of cached chunks."""
+        return len(self._chunks)
+
+    def _evict(self, chunk: bytearray) -> None:
+        """
+        Zeroize a chunk that is leaving the cache.
+
+        Args:
+            chunk: Decrypted chunk
+        """
+        self._size -= len(chunk)
+        chunk[:] = bytes(len(chunk))
+
+
+class EncryptedFileReader(io.RawIOBase):
+    """
+    Seekable, read-only view of the plaintext of an encrypted file.
+
+    Only the chunks covering each read are decrypted. Chunks are located
+    through the chunk offset index footer, or for files without one
+    (format version 2) through a length-prefix scan that is cached per
+    process.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        password: Optional[SecurePassword] = None,
+        keyfile_path: Optional[str] = None,
+        cache_size: int = READER_CACHE_SIZE,
+    ) -> None:
+        """
+        Open an encrypted file for reading.
+
+        Args:
+            file_path: Path to the encrypted file
+            password: Password for password mode files
+            keyfile_path: Keyfile path for keyfile mode files
+            cache_size: Maximum bytes of decrypted chunks to keep in memory
+
+        Raises:
+            ValueError: If the credentials do not match the file's mode or
+                the file is not a chunked encrypted file
+            DecryptionError: If the credentials are wrong or the final chunk
+                cannot be decrypted
+        """
+        super().__init__()
+        mode = (
+            EncryptionMode.PASSWORD if password is not None else EncryptionMode.KEYFILE
+        )
+        self._cache = ChunkCache(cache_size)
+        self._cipher: Optional[FrameCipher] = None
+        self._position = 0
+        self._size = 0
+        self._chunk_size = CHUNK_SIZE
+        self._file: Optional[BinaryIO] = None
+        try:
+            self._file = open(file_path, "rb")
+            self.metadata, key_info = read_file_header(self._file, mode)
+            if self.metadata.get("encryption_mode") != mode.value:
+                raise ValueError(f"File was not encrypted with {mode.value} mode")
+
+            try:
+                key = derive_file_key(mode, key_info, password, keyfile_path)
+            except ValueError as e:
+                # A wrong credential fails the header key check
+                raise DecryptionError(str(e)) from e
+            self._chunk_size = self.metadata.get("chunk_size", CHUNK_SIZE)
+            self._cipher = with_compression(
+                create_frame_cipher(key_info.cipher_name, key),
+                self.metadata.get("compression"),
+                self._chunk_size,
+            )
+            self._offsets, self._lengths = _load_index(
+                file_path, self._file, self._file.tell()
+            )
+
+            full_length = self._cipher.frame_length(self._chunk_size)
+            if self._cipher.fixed_frame_length and any(
+                length != full_length for length in self._lengths[:-1]
+            ):
+                raise ValueError("Encrypted file does not use fixed-size chunks")
+
+            # Reason: decrypting the final chunk both gives the plaintext size
+            # and rejects a wrong key before the first read
+            frame_count = len(self._offsets)
+            if frame_count == 0 and self._cipher.terminated:
+                raise ValueError("Encrypted file has no final frame")
+            if frame_count:
+                last_chunk = self._chunk(frame_count - 1)
+                self._size = (frame_count - 1) * self._chunk_size + len(last_chunk)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def size(self) -> int:
+        """Plaintext size of the file in bytes."""
+        return self._size
+
+    def readable(self) -> bool:
+        """Return True; the reader supports reading."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return True; the reader supports random access."""
+        return True
+
+    def tell(self) -> int:
+        """Return the current plaintext position."""
+        self._checkClosed()
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """
+        Move to a plaintext position.
+
+        Args:
+            offset: Offset relative to whence
+            whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END
+
+        Returns:
+            New absolute position
+
+        Raises:
+            ValueError: If whence is invalid or the position is negative
+        """
+        self._checkClosed()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+
+    def readinto(self, buffer: Any) -> int:
+        """
+        Read plaintext into a writable buffer.
+
+        Args:
+            buffer: Writable bytes-like object
+
+        Returns:
+            Number of bytes read (0 at end of file)
+
+        Raises:
+            DecryptionError: If a chunk fails authentication
+        """
+        self._checkClosed()
+        view = memoryview(buffer).cast("B")
+        count = 0
+        while count < len(view) and self._position < self._size:
+            index, chunk_offset = divmod(self._position, self._chunk_size)
+            chunk = self._chunk(index)
+            length = min(len(view) - count, len(chunk) - chunk_offset)
+            view[count : count + length] = chunk[chunk_offset : chunk_offset + length]
+            count += length
+            self._position += length
+        return count
+
+    def close(self) -> None:
+        """Zeroize cached plaintext and close the encrypted file."""
+        if not self.closed:
+            self._cache.clear()
+            self._cipher = None
+            if self._file is not None:
+                self._file.close()
+        super().close()
+
+    def _chunk(self, index: int) -> bytearray:
+        """
+        Return a decrypted chunk, from the cache when possible.
+
+        Args:
+            index: Chunk index
+
+        Returns:
+            Decrypted chunk
+
+        Raises:
+            ValueError: If the reader is closed
+            DecryptionError: If the chunk is truncated or fails
+                authentication
+        """
+        chunk = self._cache.get(index)
+        if chunk is not None:
+            return chunk
+        if self._file is None or self._cipher is None:
+            raise ValueError("I/O operation on closed file")
+
+        length = self._lengths[index]
+        self._file.seek(self._offsets[index])
+        frame = self._file.read(length)
+        if len(frame) < length:
+            raise DecryptionError(f"Truncated frame at chunk {index}")
+
+        final = index == len(self._offsets) - 1
+        try:
+            chunk = bytearray(self._cipher.open(index, frame, final))
+        except FrameAuthenticationError as e:
+            raise DecryptionError(str(e)) from e
+
+        self._cache.put(index, chunk)
+        return chunk
+
+
+def _load_index(
+    file_path: str, infile: BinaryIO, data_offset: int
+) -> Tuple[array, array]:
+    """
+    Locate every frame, reusing earlier scans of unchanged files.
+
+    Args:
+        file_path: Path of the encrypted file
+        infile: Encrypted input stream
+        data_offset: Offset of the first frame's length prefix
+
+    Returns:
+        Tuple of (frame payload offsets, frame lengths)
+    """
+    index = read_frame_index(infile, data_offset)
+    if index is not None:
+        return index
+
+    stat = os.fstat(infile.fileno())
+    key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns, data_offset)
+    with _scan_cache_lock:
+        cached = _scan_cache.get(key)
+        if cached is not None:
+            _scan_cache.move_to_end(key)
+            return cached
+
+    index = scan_frames(infile, data_offset)
+    with _scan_cache_lock:
+        _scan_cache[key] = index
+        while len(_scan_cache) > READER_INDEX_CACHE_ENTRIES:
+            _scan_cache.popitem(last=False)
+    return index
+
+
+def clear_index_cache() -> None:
+    """Drop every cached frame scan."""
+    with _scan_cache_lock:
+        _scan_cache.clear()
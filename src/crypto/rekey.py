@@ -0,0 +1,125 @@
+"""Credential changes of envelope files by rewrapping the header's data key."""
+
+import os
+from typing import Optional
+
+from .container import read_header
+from .file_format import (
+    FileKeyInfo,
+    create_file_key,
+    derive_file_key,
+    wrap_data_key,
+)
+from .kdf_calibration import stored_kdf_params
+from .key_derivation import KdfParams
+from .secure_memory import SecureBytes, SecurePassword
+from .stats import profiled
+from ..config.models import EncryptionMode, EncryptionResult, FsyncPolicy
+
+
+@profiled
+def rekey_file(
+    file_path: str,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+    new_password: Optional[SecurePassword] = None,
+    new_keyfile_path: Optional[str] = None,
+    kdf: Optional[KdfParams] = None,
+    fsync: Optional[FsyncPolicy] = None,
+) -> EncryptionResult:
+    """
+    Replace the password or keyfile of a format 4 file in place.
+
+    The frames are sealed with a random data key that the header stores
+    wrapped by the credential's key, so only the header is rewritten: the
+    current credential unwraps the data key and the new one wraps it again.
+    The frames, index and digest record are untouched, so the cost does not
+    depend on the file size. The mode may change, e.g. from a password to
+    a keyfile. The header keeps its size, so it is overwritten with a
+    single write within the first disk sector.
+
+    Args:
+        file_path: Path to the encrypted file
+        password: Current password of a password mode file
+        keyfile_path: Current keyfile of a keyfile mode file
+        new_password: New password; the file becomes a password mode file
+        new_keyfile_path: New keyfile (used if no new password); the file
+            becomes a keyfile mode file
+        kdf: Password KDF and cost parameters for the new password (None
+            uses stored_kdf_params())
+        fsync: Durability of the new header (None uses FsyncPolicy.FILE;
+            there is no rename, so FILE_AND_DIRECTORY equals FILE)
+
+    Returns:
+        EncryptionResult with success status and the file path
+    """
+    try:
+        if not os.path.exists(file_path):
+            return EncryptionResult(
+                success=False, error_message=f"File not found: {file_path}"
+            )
+        if new_password is None and new_keyfile_path is None:
+            return EncryptionResult(
+                success=False, error_message="A new password or keyfile is required"
+            )
+
+        with open(file_path, "r+b") as f:
+            header = read_header(f)
+            header_size = f.tell()
+            if header.wrapped_key is None:
+                return EncryptionResult(
+                    success=False,
+                    error_message=(
+                        f"Rekeying requires format version 4; this is a format "
+                        f"{header.version} file, re-encrypt it once instead"
+                    ),
+                )
+
+            key_info = FileKeyInfo(
+                header.cipher, header.salt, header.file_nonce, header.kdf, header
+            )
+            data_key = derive_file_key(
+                header.mode, key_info, password=password, keyfile_path=keyfile_path
+            )
+
+            mode = (
+                EncryptionMode.PASSWORD
+                if new_password is not None
+                else EncryptionMode.KEYFILE
+            )
+            if mode == EncryptionMode.PASSWORD:
+                kdf = kdf or stored_kdf_params()
+            else:
+                kdf = None
+            # Reason: the file nonce also keys the key check and the digest
+            # record, so it stays; only the wrapping key changes
+            credential_key, salt, _ = create_file_key(
+                mode,
+                password=new_password,
+                keyfile_path=new_keyfile_path,
+                kdf=kdf,
+                file_nonce=header.file_nonce,
+            )
+
+            with SecureBytes(data_key) as secure_key:
+                header.mode = mode
+                header.salt = salt
+                header.kdf = kdf
+                header.wrapped_key = wrap_data_key(
+                    credential_key, secure_key.get_bytes()
+                )
+                header.set_key_check(secure_key.get_bytes())
+            header_bytes = header.pack()
+            if len(header_bytes) != header_size:
+                raise ValueError("Rewrapped header changed size")
+
+            f.seek(0)
+            f.write(header_bytes)
+            f.flush()
+            if fsync != FsyncPolicy.NONE:
+                os.fsync(f.fileno())
+
+        return EncryptionResult(success=True, output_path=file_path)
+
+    except Exception as e:
+        return EncryptionResult(success=False, error_message=f"Rekey failed: {str(e)}")
@@ -0,0 +1,170 @@
+"""Single-threaded frame loops with preallocated buffers."""
+
+import hashlib
+import time
+from array import array
+from typing import BinaryIO, Callable, Optional
+
+from .ciphers import INTO_BUFFER_SLACK, FrameCipher
+from .framing import FRAME_LENGTH, FRAME_LENGTH_SIZE, read_frame_length, read_into_full
+from .progress import ProgressReporter
+
+
+def encrypt_serial(
+    infile: BinaryIO,
+    outfile: BinaryIO,
+    cipher: FrameCipher,
+    chunk_size: int,
+    offsets: array,
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    progress: Optional[ProgressReporter] = None,
+    first_index: int = 0,
+    checkpoint: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Encrypt a stream on the calling thread with preallocated buffers.
+
+    Chunks are read with readinto and sealed with seal_into into a reused
+    frame buffer that also holds the length prefix, so the steady state
+    allocates no per-chunk buffers. Read, seal and write times are summed
+    into the reporter's stats.
+
+    Args:
+        infile: Plaintext input stream
+        outfile: Output stream positioned after the header
+        cipher: Frame cipher
+        chunk_size: Plaintext size of every non-final chunk
+        offsets: Array receiving the payload offset of every frame
+        plaintext_hash: Running hash updated with every chunk
+        progress: Reporter counting the plaintext bytes encrypted
+        first_index: Chunk index of the first byte read
+        checkpoint: Called after every non-final frame (see encrypt_frames)
+    """
+    # Reason: two read buffers give one chunk of look-ahead for the final flag
+    current = memoryview(bytearray(chunk_size))
+    upcoming = memoryview(bytearray(chunk_size))
+    full_length = cipher.frame_length(chunk_size)
+    frame = memoryview(bytearray(FRAME_LENGTH_SIZE + full_length + INTO_BUFFER_SLACK))
+    frame_body = frame[FRAME_LENGTH_SIZE:]
+    full_frame = frame[: FRAME_LENGTH_SIZE + full_length]
+
+    clock = time.perf_counter
+    read_time = crypt_time = write_time = 0.0
+    position = outfile.tell()
+    index = first_index
+    started = clock()
+    count = read_into_full(infile, current)
+    read_time += clock() - started
+    try:
+        if count == 0 and not cipher.terminated:
+            return
+        while True:
+            started = clock()
+            next_count = read_into_full(infile, upcoming) if count == chunk_size else 0
+            read_done = clock()
+            chunk = current if count == chunk_size else current[:count]
+            if plaintext_hash is not None:
+                plaintext_hash.update(chunk)
+            sealing = clock()
+            length = cipher.seal_into(index, chunk, next_count == 0, frame_body)
+            sealed = clock()
+
+            FRAME_LENGTH.pack_into(frame, 0, length)
+            outfile.write(
+                full_frame
+                if length == full_length
+                else frame[: FRAME_LENGTH_SIZE + length]
+            )
+            read_time += read_done - started
+            crypt_time += sealed - sealing
+            write_time += clock() - sealed
+            offsets.append(position + FRAME_LENGTH_SIZE)
+            position += FRAME_LENGTH_SIZE + length
+            if checkpoint is not None and next_count != 0:
+                checkpoint(index + 1, position)
+            if progress is not None:
+                progress.update(count)
+
+            if next_count == 0:
+                break
+            current, upcoming = upcoming, current
+            count = next_count
+            index += 1
+        if progress is not None:
+            progress.stats.note_buffers(2 * chunk_size + len(frame))
+            progress.stats.add(
+                index - first_index + 1, read_time, crypt_time, write_time
+            )
+    finally:
+        # Zeroize the plaintext buffers
+        current[:] = bytes(chunk_size)
+        upcoming[:] = bytes(chunk_size)
+
+
+def decrypt_serial(
+    infile: BinaryIO,
+    outfile: BinaryIO,
+    cipher: FrameCipher,
+    chunk_size: int,
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
+    """
+    Decrypt a frame stream on the calling thread with preallocated buffers.
+
+    Args:
+        infile: Encrypted input stream positioned at the first frame
+        outfile: Plaintext output stream
+        cipher: Frame cipher
+        chunk_size: Chunk size recorded in the file header
+        plaintext_hash: Running hash updated with every chunk
+        progress: Reporter counting the plaintext bytes decrypted
+
+    Raises:
+        ValueError: If the frame stream is truncated or malformed
+    """
+    prefix = memoryview(bytearray(FRAME_LENGTH_SIZE))
+    frame_buffer = memoryview(bytearray(cipher.frame_length(chunk_size)))
+    plaintext = memoryview(bytearray(chunk_size + INTO_BUFFER_SLACK))
+
+    clock = time.perf_counter
+    read_time = crypt_time = write_time = 0.0
+    index = 0
+    length = read_frame_length(infile, prefix)
+    if length is None and cipher.terminated:
+        raise ValueError("Encrypted file has no final frame")
+
+    try:
+        while length is not None:
+            started = clock()
+            if length > len(frame_buffer):
+                frame_buffer = memoryview(bytearray(length))
+            frame = (
+                frame_buffer if length == len(frame_buffer) else frame_buffer[:length]
+            )
+            if read_into_full(infile, frame) < length:
+                raise ValueError("Truncated frame")
+
+            # Reason: the frame is final exactly when no frame follows it
+            next_length = read_frame_length(infile, prefix)
+            opening = clock()
+            count = cipher.open_into(index, frame, next_length is None, plaintext)
+            opened = clock()
+            chunk = plaintext if count == len(plaintext) else plaintext[:count]
+            if plaintext_hash is not None:
+                plaintext_hash.update(chunk)
+            writing = clock()
+            outfile.write(chunk)
+            read_time += opening - started
+            crypt_time += opened - opening
+            write_time += clock() - writing
+            if progress is not None:
+                progress.update(count)
+            length = next_length
+            index += 1
+        if progress is not None:
+            progress.stats.note_buffers(len(frame_buffer) + len(plaintext))
+            progress.stats.add(index, read_time, crypt_time, write_time)
+    finally:
+        # Zeroize the plaintext buffer
+        plaintext[:] = bytes(len(plaintext))
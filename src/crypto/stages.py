@@ -0,0 +1,436 @@
+"""Pooled batch buffers and stage functions for the pipelined engine."""
+
+import hashlib
+import threading
+import time
+from array import array
+from functools import partial
+from typing import BinaryIO, Callable, Iterator, Optional
+
+from .cancellation import CancellationToken
+from .ciphers import INTO_BUFFER_SLACK, FrameCipher
+from .framing import (
+    FRAME_LENGTH,
+    FRAME_LENGTH_SIZE,
+    read_frame_length,
+    read_into_full,
+)
+from .pipeline import BufferPool, run_pipeline
+from .progress import ProgressReporter
+
+
+class PlaintextBatch:
+    """Reusable buffers for a batch of chunks on its way to encryption."""
+
+    def __init__(self, batch_chunks: int, chunk_size: int, frame_length: int) -> None:
+        """
+        Allocate the batch buffers.
+
+        Args:
+            batch_chunks: Maximum chunks per batch
+            chunk_size: Plaintext size of every non-final chunk
+            frame_length: Frame length of a full chunk
+        """
+        self.plaintext = memoryview(bytearray(batch_chunks * chunk_size))
+        self.frames = memoryview(
+            bytearray(
+                batch_chunks * (FRAME_LENGTH_SIZE + frame_length) + INTO_BUFFER_SLACK
+            )
+        )
+        self.frame_lengths = array("Q", bytes(8 * batch_chunks))
+        self.chunk_size = chunk_size
+        self.first_index = 0
+        self.length = 0
+        self.chunk_count = 0
+        self.final = False
+        self.frames_length = 0
+        self.read_time = 0.0
+        self.crypt_time = 0.0
+
+    @property
+    def size(self) -> int:
+        """Bytes of the batch buffers."""
+        return len(self.plaintext) + len(self.frames)
+
+    def fill(self, infile: BinaryIO) -> int:
+        """
+        Read the next batch of plaintext.
+
+        Args:
+            infile: Plaintext input stream
+
+        Returns:
+            Number of bytes read
+        """
+        started = time.perf_counter()
+        self.length = read_into_full(infile, self.plaintext)
+        self.read_time = time.perf_counter() - started
+        # An empty batch still carries one (empty) final chunk
+        self.chunk_count = max(1, -(-self.length // self.chunk_size))
+        return self.length
+
+
+class FrameBatch:
+    """Reusable buffers for a batch of frames on its way to decryption."""
+
+    def __init__(self, batch_chunks: int, chunk_size: int, frame_length: int) -> None:
+        """
+        Allocate the batch buffers.
+
+        Args:
+            batch_chunks: Maximum frames per batch
+            chunk_size: Plaintext size of every non-final chunk
+            frame_length: Frame length of a full chunk
+        """
+        self.frames = memoryview(bytearray(batch_chunks * frame_length))
+        self.plaintext = memoryview(
+            bytearray(batch_chunks * chunk_size + INTO_BUFFER_SLACK)
+        )
+        self.frame_offsets = array("Q", bytes(8 * batch_chunks))
+        self.frame_lengths = array("Q", bytes(8 * batch_chunks))
+        self.batch_chunks = batch_chunks
+        self.first_index = 0
+        self.frame_count = 0
+        self.final = False
+        self.plaintext_length = 0
+        self.read_time = 0.0
+        self.crypt_time = 0.0
+
+    @property
+    def size(self) -> int:
+        """Bytes of the batch buffers."""
+        return len(self.frames) + len(self.plaintext)
+
+
+def read_plaintext_batches(
+    infile: BinaryIO,
+    pool: "BufferPool[PlaintextBatch]",
+    stop: threading.Event,
+    terminated: bool,
+    first_index: int = 0,
+) -> Iterator[PlaintextBatch]:
+    """
+    Read a plaintext stream into pooled batches.
+
+    One batch of look-ahead tells whether a full batch is the last one.
+
+    Args:
+        infile: Plaintext input stream
+        pool: Pool of PlaintextBatch buffers
+        stop: Pipeline stop event
+        terminated: Whether an empty stream still needs a final chunk
+        first_index: Chunk index of the first byte read
+
+    Yields:
+        Filled batches, the last one flagged as final
+    """
+    batch = pool.acquire(stop)
+    if batch is None:
+        return
+    if batch.fill(infile) == 0 and not terminated:
+        pool.release(batch)
+        return
+
+    index = first_index
+    while True:
+        upcoming = None
+        if batch.length == len(batch.plaintext):
+            upcoming = pool.acquire(stop)
+            if upcoming is None:
+                return
+            if upcoming.fill(infile) == 0:
+                pool.release(upcoming)
+                upcoming = None
+
+        batch.first_index = index
+        batch.final = upcoming is None
+        index += batch.chunk_count
+        yield batch
+
+        if upcoming is None:
+            return
+        batch = upcoming
+
+
+def seal_plaintext_batch(
+    cipher: FrameCipher,
+    batch: PlaintextBatch,
+    cancel: Optional[CancellationToken] = None,
+) -> PlaintextBatch:
+    """
+    Encrypt a batch into length-prefixed frames in its frame buffer.
+
+    Args:
+        cipher: Frame cipher
+        batch: Filled plaintext batch
+        cancel: Token checked before each chunk, or None
+
+    Returns:
+        The same batch, with frames and frames_length set
+
+    Raises:
+        OperationCancelled: If the token fires
+    """
+    started = time.perf_counter()
+    frames = batch.frames
+    chunk_size = batch.chunk_size
+    last = batch.chunk_count - 1
+    position = 0
+    for number in range(batch.chunk_count):
+        if cancel is not None:
+            cancel.check()
+        start = number * chunk_size
+        chunk = batch.plaintext[start : min(start + chunk_size, batch.length)]
+        length = cipher.seal_into(
+            batch.first_index + number,
+            chunk,
+            batch.final and number == last,
+            frames[position + FRAME_LENGTH_SIZE :],
+        )
+        FRAME_LENGTH.pack_into(frames, position, length)
+        batch.frame_lengths[number] = length
+        position += FRAME_LENGTH_SIZE + length
+
+    batch.frames_length = position
+    batch.crypt_time = time.perf_counter() - started
+    return batch
+
+
+def read_frame_batches(
+    infile: BinaryIO,
+    pool: "BufferPool[FrameBatch]",
+    stop: threading.Event,
+    terminated: bool,
+) -> Iterator[FrameBatch]:
+    """
+    Read a frame stream into pooled batches.
+
+    Args:
+        infile: Encrypted input stream positioned at the first frame
+        pool: Pool of FrameBatch buffers
+        stop: Pipeline stop event
+        terminated: Whether the stream must contain a final frame
+
+    Yields:
+        Filled batches, the last one flagged as final
+
+    Raises:
+        ValueError: If the frame stream is truncated or a frame is larger
+            than a full chunk's frame
+    """
+    prefix = memoryview(bytearray(FRAME_LENGTH_SIZE))
+    length = read_frame_length(infile, prefix)
+    if length is None and terminated:
+        raise ValueError("Encrypted file has no final frame")
+
+    index = 0
+    while length is not None:
+        batch = pool.acquire(stop)
+        if batch is None:
+            return
+
+        started = time.perf_counter()
+        count = 0
+        position = 0
+        while length is not None and count < batch.batch_chunks:
+            if position + length > len(batch.frames):
+                raise ValueError("Encrypted frame exceeds the chunk size")
+            frame = batch.frames[position : position + length]
+            if read_into_full(infile, frame) < length:
+                raise ValueError("Truncated frame")
+            batch.frame_offsets[count] = position
+            batch.frame_lengths[count] = length
+            position += length
+            count += 1
+            # Reason: the frame is final exactly when no frame follows it
+            length = read_frame_length(infile, prefix)
+
+        batch.first_index = index
+        batch.frame_count = count
+        batch.final = length is None
+        batch.read_time = time.perf_counter() - started
+        index += count
+        yield batch
+
+
+def open_frame_batch(
+    cipher: FrameCipher,
+    batch: FrameBatch,
+    cancel: Optional[CancellationToken] = None,
+) -> FrameBatch:
+    """
+    Decrypt a batch of frames into its plaintext buffer.
+
+    Args:
+        cipher: Frame cipher
+        batch: Filled frame batch
+        cancel: Token checked before each frame, or None
+
+    Returns:
+        The same batch, with plaintext and plaintext_length set
+
+    Raises:
+        OperationCancelled: If the token fires
+    """
+    started = time.perf_counter()
+    last = batch.frame_count - 1
+    position = 0
+    for number in range(batch.frame_count):
+        if cancel is not None:
+            cancel.check()
+        offset = batch.frame_offsets[number]
+        frame = batch.frames[offset : offset + batch.frame_lengths[number]]
+        position += cipher.open_into(
+            batch.first_index + number,
+            frame,
+            batch.final and number == last,
+            batch.plaintext[position:],
+        )
+
+    batch.plaintext_length = position
+    batch.crypt_time = time.perf_counter() - started
+    return batch
+
+
+def encrypt_pipelined(
+    infile: BinaryIO,
+    outfile: BinaryIO,
+    cipher: FrameCipher,
+    worker_count: int,
+    pool: "BufferPool[PlaintextBatch]",
+    offsets: array,
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    progress: Optional[ProgressReporter] = None,
+    first_index: int = 0,
+    checkpoint: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Encrypt a stream through the pipeline with pooled batch buffers.
+
+    Args:
+        infile: Plaintext input stream
+        outfile: Output stream positioned after the header
+        cipher: Frame cipher
+        worker_count: Number of worker threads
+        pool: Pool of batch buffers
+        offsets: Array receiving the payload offset of every frame
+        plaintext_hash: Running hash updated with the plaintext in order
+        progress: Reporter counting the plaintext bytes encrypted
+        first_index: Chunk index of the first byte read
+        checkpoint: Called after every non-final batch is written, with the
+            number of frames written and the output offset after them
+    """
+    batch_count = len(pool.items)
+    stop = threading.Event()
+    position = outfile.tell()
+
+    def write(batch: PlaintextBatch) -> None:
+        nonlocal position
+        # Reason: the writer sees batches in order, and the plaintext is
+        # still in the batch until it is released
+        if plaintext_hash is not None:
+            plaintext_hash.update(batch.plaintext[: batch.length])
+        started = time.perf_counter()
+        outfile.write(batch.frames[: batch.frames_length])
+        write_time = time.perf_counter() - started
+        for number in range(batch.chunk_count):
+            offsets.append(position + FRAME_LENGTH_SIZE)
+            position += FRAME_LENGTH_SIZE + batch.frame_lengths[number]
+        if checkpoint is not None and not batch.final:
+            checkpoint(batch.first_index + batch.chunk_count, position)
+        if progress is not None:
+            progress.stats.add(
+                batch.chunk_count, batch.read_time, batch.crypt_time, write_time
+            )
+            progress.update(batch.length)
+        pool.release(batch)
+
+    if progress is not None:
+        progress.stats.worker_count = worker_count
+        progress.stats.note_buffers(sum(batch.size for batch in pool.items))
+
+    try:
+        run_pipeline(
+            read_plaintext_batches(infile, pool, stop, cipher.terminated, first_index),
+            partial(
+                seal_plaintext_batch,
+                cipher,
+                cancel=None if progress is None else progress.cancel,
+            ),
+            write,
+            worker_count,
+            queue_size=batch_count,
+            # Reason: the reader holds up to two batches for look-ahead, so
+            # leave it room in the pool to keep the stages moving
+            max_pending=max(1, min(2 * worker_count, batch_count - 2)),
+            stop=stop,
+        )
+    finally:
+        # Zeroize the plaintext buffers
+        for batch in pool.items:
+            batch.plaintext[:] = bytes(len(batch.plaintext))
+
+
+def decrypt_pipelined(
+    infile: BinaryIO,
+    outfile: BinaryIO,
+    cipher: FrameCipher,
+    worker_count: int,
+    pool: "BufferPool[FrameBatch]",
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
+    """
+    Decrypt a frame stream through the pipeline with pooled batch buffers.
+
+    Args:
+        infile: Encrypted input stream positioned at the first frame
+        outfile: Plaintext output stream
+        cipher: Frame cipher
+        worker_count: Number of worker threads
+        pool: Pool of batch buffers
+        plaintext_hash: Running hash updated with the plaintext in order
+        progress: Reporter counting the plaintext bytes decrypted
+
+    Raises:
+        ValueError: If the frame stream is truncated or malformed
+    """
+    batch_count = len(pool.items)
+    stop = threading.Event()
+
+    def write(batch: FrameBatch) -> None:
+        plaintext = batch.plaintext[: batch.plaintext_length]
+        if plaintext_hash is not None:
+            plaintext_hash.update(plaintext)
+        started = time.perf_counter()
+        outfile.write(plaintext)
+        write_time = time.perf_counter() - started
+        if progress is not None:
+            progress.stats.add(
+                batch.frame_count, batch.read_time, batch.crypt_time, write_time
+            )
+            progress.update(batch.plaintext_length)
+        pool.release(batch)
+
+    if progress is not None:
+        progress.stats.worker_count = worker_count
+        progress.stats.note_buffers(sum(batch.size for batch in pool.items))
+
+    try:
+        run_pipeline(
+            read_frame_batches(infile, pool, stop, cipher.terminated),
+            partial(
+                open_frame_batch,
+                cipher,
+                cancel=None if progress is None else progress.cancel,
+            ),
+            write,
+            worker_count,
+            queue_size=batch_count,
+            max_pending=max(1, min(2 * worker_count, batch_count - 1)),
+            stop=stop,
+        )
+    finally:
+        # Zeroize the plaintext buffers
+        for batch in pool.items:
+            batch.plaintext[:] = bytes(len(batch.plaintext))
@@ -0,0 +1,149 @@
+"""Per-operation statistics, a pluggable stats hook and optional profiling."""
+
+import cProfile
+import functools
+import os
+import time
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from ..config.constants import PROFILE_DIR_ENV
+from ..config.models import OperationStats
+
+F = TypeVar("F", bound=Callable[..., Any])
+R = TypeVar("R")
+
+StatsHook = Callable[[OperationStats], None]
+
+_stats_hook: Optional[StatsHook] = None
+
+
+class StatsRecorder:
+    """
+    Accumulate the stage timings of one encrypt or decrypt call.
+
+    The engine adds per-batch totals from a single thread (the calling
+    thread or the pipeline's writer thread), so no locking is needed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty totals."""
+        self.read_time = 0.0
+        self.crypt_time = 0.0
+        self.write_time = 0.0
+        self.chunk_count = 0
+        self.peak_buffer_bytes = 0
+        self.worker_count = 1
+
+    def add(
+        self,
+        chunks: int,
+        read_time: float = 0.0,
+        crypt_time: float = 0.0,
+        write_time: float = 0.0,
+    ) -> None:
+        """
+        Add the totals of a batch of chunks.
+
+        Args:
+            chunks: Chunks in the batch
+            read_time: Seconds spent reading the batch
+            crypt_time: Seconds of cipher work on the batch
+            write_time: Seconds spent writing the batch
+        """
+        self.chunk_count += chunks
+        self.read_time += read_time
+        self.crypt_time += crypt_time
+        self.write_time += write_time
+
+    def note_buffers(self, size: int) -> None:
+        """
+        Record a chunk buffer allocation.
+
+        Args:
+            size: Bytes of buffers allocated together
+        """
+        self.peak_buffer_bytes = max(self.peak_buffer_bytes, size)
+
+
+def set_stats_hook(hook: Optional[StatsHook]) -> Optional[StatsHook]:
+    """
+    Install a function receiving the stats of every successful operation.
+
+    Args:
+        hook: Function called with OperationStats, or None to remove it
+
+    Returns:
+        The previously installed hook
+    """
+    global _stats_hook
+    previous = _stats_hook
+    _stats_hook = hook
+    return previous
+
+
+def report_stats(stats: OperationStats) -> None:
+    """
+    Pass operation stats to the installed hook.
+
+    A failing hook does not fail the operation it reports on.
+
+    Args:
+        stats: Stats of a finished operation
+    """
+    if _stats_hook is None:
+        return
+    try:
+        _stats_hook(stats)
+    except Exception as e:
+        print(f"Warning: Stats hook failed: {e}")
+
+
+def timed_call(func: Callable[[Any], R], arg: Any) -> Tuple[float, R]:
+    """
+    Call a function and measure it; picklable for worker processes.
+
+    Args:
+        func: Module-level function
+        arg: Its argument
+
+    Returns:
+        Tuple of (seconds taken, result)
+    """
+    start = time.perf_counter()
+    result = func(arg)
+    return time.perf_counter() - start, result
+
+
+def profiled(func: F) -> F:
+    """
+    Run a function under cProfile when PROFILE_DIR_ENV names a directory.
+
+    Each call dumps <function>-<timestamp>-<pid>.pstats into the directory,
+    readable with the pstats module or snakeviz. Only the calling thread is
+    profiled; pipeline and pool threads show up as waits.
+
+    Args:
+        func: Operation to wrap
+
+    Returns:
+        Wrapped function
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        directory = os.environ.get(PROFILE_DIR_ENV)
+        if not directory:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            name = f"{func.__name__}-{time.time_ns()}-{os.getpid()}.pstats"
+            try:
+                os.makedirs(directory, exist_ok=True)
+                profiler.dump_stats(os.path.join(directory, name))
+            except OSError as e:
+                print(f"Warning: Could not write profile: {e}")
+
+    return wrapper  # type: ignore[return-value]
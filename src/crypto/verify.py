@@ -0,0 +1,451 @@
+"""Verification of encrypted files without writing any plaintext."""
+
+import hashlib
+import hmac
+import os
+import time
+from functools import partial
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .ciphers import (
+    INTO_BUFFER_SLACK,
+    FrameAuthenticationError,
+    FrameCipher,
+    create_frame_cipher,
+)
+from .compression import with_compression
+from .digest import check_plaintext_digest, hash_file, new_plaintext_hash
+from .file_format import derive_file_key, read_file_header
+from .framing import DecryptTask, load_frame_index
+from .parallel import ordered_map, resolve_worker_count
+from .progress import ProgressCallback, ProgressReporter
+from .stats import profiled
+from .secure_memory import SecureBytes, SecurePassword
+from ..config.constants import (
+    CHUNK_SIZE,
+    PARALLEL_BATCH_CHUNKS,
+    PARALLEL_MIN_FILE_SIZE,
+)
+from ..config.models import EncryptionMode, OperationStage, VerificationResult
+
+# Bad chunk indices, authenticated plaintext bytes and kept plaintext of a batch
+_BatchResult = Tuple[List[int], int, List[bytes]]
+
+# Per-process state, set by _init_verify_worker in pool worker processes
+_worker_state: Dict[str, Any] = {}
+
+
+@profiled
+def verify_file(
+    file_path: str,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> VerificationResult:
+    """
+    Authenticate every chunk of an encrypted file without decrypting it to disk.
+
+    The framing is checked first (truncated frames, a corrupt index footer,
+    a chunk count disagreeing with the header), then every frame is
+    authenticated in the worker pool and its plaintext discarded in memory.
+    Frames that fail do not stop the check, so all bad chunks are reported.
+    Files that store a plaintext digest also have it recomputed in the same
+    pass and compared.
+
+    Args:
+        file_path: Path to the encrypted file
+        password: Password of a password mode file
+        keyfile_path: Keyfile of a keyfile mode file (used if no password)
+        workers: Number of workers (None uses the default, 0 uses one per
+            CPU core)
+        progress: Called with ProgressInfo snapshots, at most every
+            PROGRESS_INTERVAL seconds and at each stage change
+
+    Returns:
+        VerificationResult; success is True only if every chunk verified
+    """
+    return _verify(file_path, password, keyfile_path, workers, progress=progress)
+
+
+@profiled
+def compare_file(
+    file_path: str,
+    source_path: str,
+    password: Optional[SecurePassword] = None,
+    keyfile_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> VerificationResult:
+    """
+    Check that an encrypted file decrypts to the contents of a source file.
+
+    Nothing is written: the encrypted file is verified as by verify_file
+    while its plaintext digest is computed, and the result is compared with
+    the digest of the source file. A size recorded in the header that
+    differs from the source fails before any frame is read.
+
+    Args:
+        file_path: Path to the encrypted file
+        source_path: Plaintext file it should match
+        password: Password of a password mode file
+        keyfile_path: Keyfile of a keyfile mode file (used if no password)
+        workers: Number of workers (None uses the default, 0 uses one per
+            CPU core)
+        progress: Called with ProgressInfo snapshots, at most every
+            PROGRESS_INTERVAL seconds and at each stage change
+
+    Returns:
+        VerificationResult; success is True only if the file verified and
+        its plaintext equals the source
+    """
+    return _verify(file_path, password, keyfile_path, workers, source_path, progress)
+
+
+def _verify(
+    file_path: str,
+    password: Optional[SecurePassword],
+    keyfile_path: Optional[str],
+    workers: Optional[int],
+    source_path: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> VerificationResult:
+    """
+    Verify an encrypted file, optionally against a plaintext source.
+
+    Args:
+        file_path: Path to the encrypted file
+        password: Password of a password mode file
+        keyfile_path: Keyfile of a keyfile mode file (used if no password)
+        workers: Requested worker count (see resolve_worker_count)
+        source_path: Plaintext file to compare with, or None
+        progress: Progress callback, or None
+
+    Returns:
+        VerificationResult
+    """
+    start = time.perf_counter()
+    try:
+        for path in (file_path, source_path):
+            if path is not None and not os.path.exists(path):
+                return VerificationResult(
+                    success=False, error_message=f"File not found: {path}"
+                )
+
+        mode = (
+            EncryptionMode.PASSWORD if password is not None else EncryptionMode.KEYFILE
+        )
+        with open(file_path, "rb") as infile:
+            metadata, key_info = read_file_header(infile, mode)
+            if metadata.get("encryption_mode") != mode.value:
+                return VerificationResult(
+                    success=False,
+                    error_message=f"File was not encrypted with {mode.value} mode",
+                )
+
+            expected_size = metadata.get("plaintext_size")
+            if (
+                source_path is not None
+                and expected_size is not None
+                and expected_size != os.path.getsize(source_path)
+            ):
+                return VerificationResult(
+                    success=False,
+                    error_message=(
+                        f"Encrypted file holds {expected_size} bytes but the "
+                        f"source has {os.path.getsize(source_path)}"
+                    ),
+                    elapsed=time.perf_counter() - start,
+                )
+
+            header = key_info.header
+            # The file nonce keys the stored digest record, if there is one
+            digest_nonce = None
+            if header is not None and header.digest is not None:
+                digest_nonce = header.file_nonce
+            plaintext_hash = None
+            if digest_nonce is not None or source_path is not None:
+                plaintext_hash = new_plaintext_hash()
+
+            reporter = ProgressReporter(progress, expected_size)
+            reporter.set_stage(OperationStage.DERIVING_KEY)
+            key = derive_file_key(
+                mode, key_info, password=password, keyfile_path=keyfile_path
+            )
+            reporter.set_stage(OperationStage.VERIFYING)
+            with SecureBytes(key) as secure_key:
+                chunk_count, bad_chunks, bytes_verified = verify_frames(
+                    infile,
+                    file_path,
+                    key_info.cipher_name,
+                    secure_key.get_bytes(),
+                    workers,
+                    metadata.get("chunk_size", CHUNK_SIZE),
+                    plaintext_hash,
+                    metadata.get("compression"),
+                    reporter,
+                )
+                result = VerificationResult(
+                    success=not bad_chunks,
+                    chunk_count=chunk_count,
+                    bad_chunks=bad_chunks,
+                    bytes_verified=bytes_verified,
+                )
+                expected_count = metadata.get("chunk_count")
+                if bad_chunks:
+                    result.error_message = (
+                        f"{len(bad_chunks)} chunk(s) failed authentication"
+                    )
+                elif expected_count is not None and expected_count != chunk_count:
+                    result.success = False
+                    result.error_message = (
+                        f"Expected {expected_count} chunks but found {chunk_count}"
+                    )
+                elif plaintext_hash is not None:
+                    digest = plaintext_hash.digest()
+                    result.plaintext_digest = digest.hex()
+                    if digest_nonce is not None:
+                        check_plaintext_digest(
+                            infile, secure_key.get_bytes(), digest_nonce, digest
+                        )
+                    if source_path is not None and not hmac.compare_digest(
+                        digest, hash_file(source_path)
+                    ):
+                        result.success = False
+                        result.error_message = "Plaintext differs from the source file"
+
+        reporter.finish()
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    except Exception as e:
+        return VerificationResult(
+            success=False,
+            error_message=f"Verification failed: {str(e)}",
+            elapsed=time.perf_counter() - start,
+        )
+
+
+def verify_frames(
+    infile: BinaryIO,
+    input_path: str,
+    cipher_name: str,
+    key: bytes,
+    workers: Optional[int],
+    chunk_size: int = CHUNK_SIZE,
+    plaintext_hash: Optional["hashlib._Hash"] = None,
+    compression: Optional[str] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> Tuple[int, List[int], int]:
+    """
+    Authenticate the remaining frames of a file, discarding the plaintext.
+
+    Frames are located from the index footer or by scanning the length
+    prefixes, then verified in batches like positional decryption. Version
+    2 files have no final-frame flag, so a file cut at a frame boundary
+    is only detected for format 3 files.
+
+    With plaintext_hash, every authenticated plaintext chunk is also fed
+    to the hash in order. The plaintext of each batch then travels back
+    from the workers, so threads are used instead of worker processes.
+
+    Args:
+        infile: Encrypted input stream positioned at the first frame
+        input_path: Path of the encrypted input file
+        cipher_name: Frame cipher name
+        key: Cipher key
+        workers: Requested worker count (see resolve_worker_count)
+        chunk_size: Chunk size recorded in the file header
+        plaintext_hash: Optional running digest of the plaintext
+        compression: Codec recorded in the file header, or None
+        progress: Reporter counting the plaintext bytes verified
+
+    Returns:
+        Tuple of (frame count, indices of frames that failed, plaintext
+        bytes authenticated)
+
+    Raises:
+        ValueError: If the frame stream is truncated or malformed
+    """
+    cipher = with_compression(
+        create_frame_cipher(cipher_name, key), compression, chunk_size
+    )
+    worker_count = resolve_worker_count(workers)
+    data_offset = infile.tell()
+    remaining = os.fstat(infile.fileno()).st_size - data_offset
+    offsets, lengths = load_frame_index(infile, data_offset)
+
+    frame_count = len(offsets)
+    if frame_count == 0 and cipher.terminated:
+        raise ValueError("Encrypted file has no final frame")
+
+    batch = max(1, PARALLEL_BATCH_CHUNKS * CHUNK_SIZE // chunk_size)
+    tasks: Iterator[DecryptTask] = (
+        (
+            start,
+            offsets[start : start + batch].tolist(),
+            lengths[start : start + batch].tolist(),
+            frame_count - 1,
+        )
+        for start in range(0, frame_count, batch)
+    )
+
+    if remaining < PARALLEL_MIN_FILE_SIZE or not hasattr(os, "pread"):
+        worker_count = 1
+
+    keep = plaintext_hash is not None
+    input_fd: Optional[int] = None
+    bad_chunks: List[int] = []
+    bytes_verified = 0
+    try:
+        if worker_count == 1 and not hasattr(os, "pread"):
+            read_at = partial(_read_at, infile)
+            func = partial(_verify_batch, cipher, read_at, chunk_size, keep=keep)
+            results = ordered_map(func, tasks, 1)
+        elif worker_count == 1 or cipher.releases_gil or keep:
+            input_fd = os.open(input_path, os.O_RDONLY)
+            func = partial(
+                _verify_batch,
+                cipher,
+                partial(os.pread, input_fd),
+                chunk_size,
+                keep=keep,
+            )
+            results = ordered_map(func, tasks, worker_count, threads=True)
+        else:
+            results = ordered_map(
+                _verify_batch_in_worker,
+                tasks,
+                worker_count,
+                initializer=_init_verify_worker,
+                initargs=(cipher.name, key, chunk_size, input_path),
+            )
+
+        try:
+            for batch_bad, batch_bytes, plaintext in results:
+                bad_chunks.extend(batch_bad)
+                bytes_verified += batch_bytes
+                if progress is not None:
+                    progress.update(batch_bytes)
+                if plaintext_hash is not None:
+                    for chunk in plaintext:
+                        plaintext_hash.update(chunk)
+        finally:
+            # Reason: stop the pool before its file descriptor is closed
+            results.close()
+    finally:
+        if input_fd is not None:
+            os.close(input_fd)
+
+    return frame_count, bad_chunks, bytes_verified
+
+
+def _verify_batch(
+    cipher: FrameCipher,
+    read_at: Callable[[int, int], bytes],
+    chunk_size: int,
+    task: DecryptTask,
+    keep: bool = False,
+) -> _BatchResult:
+    """
+    Authenticate a batch of frames into a scratch buffer.
+
+    Args:
+        cipher: Frame cipher
+        read_at: Reads (length, offset) bytes from the encrypted file
+        chunk_size: Plaintext size of every non-final frame
+        task: Tuple of (first frame index, offsets, lengths, final index)
+        keep: Return copies of the authenticated plaintext chunks
+
+    Returns:
+        Tuple of (indices of frames that failed, plaintext bytes verified,
+        plaintext chunks if keep is set)
+    """
+    first_index, offsets, lengths, final_index = task
+    full_length = cipher.frame_length(chunk_size)
+    scratch = memoryview(bytearray(chunk_size + INTO_BUFFER_SLACK))
+    bad_chunks = []
+    plaintext: List[bytes] = []
+    bytes_verified = 0
+    try:
+        for position, (offset, length) in enumerate(zip(offsets, lengths)):
+            index = first_index + position
+            final = index == final_index
+            # Reason: a frame of the wrong size is malformed whether or not
+            # it authenticates, and oversized frames would not fit scratch
+            if length > full_length or (
+                cipher.fixed_frame_length and not final and length != full_length
+            ):
+                bad_chunks.append(index)
+                continue
+            try:
+                count = cipher.open_into(index, read_at(length, offset), final, scratch)
+            except FrameAuthenticationError:
+                bad_chunks.append(index)
+                continue
+            bytes_verified += count
+            if keep:
+                plaintext.append(bytes(scratch[:count]))
+    finally:
+        # Zeroize the plaintext buffer
+        scratch[:] = bytes(len(scratch))
+
+    return bad_chunks, bytes_verified, plaintext
+
+
+def _read_at(infile: BinaryIO, length: int, offset: int) -> bytes:
+    """
+    Read bytes at an offset through a file object, where pread is missing.
+
+    Args:
+        infile: Seekable encrypted input stream
+        length: Number of bytes
+        offset: Absolute file offset
+
+    Returns:
+        Bytes read
+    """
+    infile.seek(offset)
+    return infile.read(length)
+
+
+def _init_verify_worker(
+    cipher_name: str, key: bytes, chunk_size: int, input_path: str
+) -> None:
+    """
+    Initialize the cipher and input descriptor of a pool worker process.
+
+    Args:
+        cipher_name: Frame cipher name
+        key: Cipher key
+        chunk_size: Plaintext size of every non-final frame
+        input_path: Encrypted input file
+    """
+    _worker_state["cipher"] = create_frame_cipher(cipher_name, key)
+    _worker_state["chunk_size"] = chunk_size
+    # Reason: the descriptor lives for the worker's lifetime and closes on exit
+    _worker_state["input_fd"] = os.open(input_path, os.O_RDONLY)
+
+
+def _verify_batch_in_worker(task: DecryptTask) -> _BatchResult:
+    """
+    Authenticate a batch of frames inside a pool worker process.
+
+    Args:
+        task: Tuple of (first frame index, offsets, lengths, final index)
+
+    Returns:
+        Tuple of (indices of frames that failed, plaintext bytes verified,
+        no plaintext chunks)
+
+    Raises:
+        RuntimeError: If the worker was not initialized
+    """
+    if "input_fd" not in _worker_state:
+        raise RuntimeError("Worker cipher has not been initialized")
+    return _verify_batch(
+        _worker_state["cipher"],
+        partial(os.pread, _worker_state["input_fd"]),
+        _worker_state["chunk_size"],
+        task,
+    )
@@ -0,0 +1,236 @@
+"""Frame batch work run on pool threads and worker processes."""
+
+import os
+import time
+from array import array
+from functools import partial
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .cancellation import CancellationToken
+from .ciphers import FrameCipher, create_frame_cipher
+from .framing import FRAME_LENGTH_SIZE, DecryptTask, EncryptTask, write_frame
+from .pipeline import run_pipeline
+from .progress import ProgressReporter
+from .stats import timed_call
+
+# Per-process state, set by init_frame_worker in pool worker processes
+_worker_state: Dict[str, Any] = {}
+
+
+def seal_batch(cipher: FrameCipher, task: EncryptTask) -> List[bytes]:
+    """
+    Encrypt a batch of chunks into frames.
+
+    Args:
+        cipher: Frame cipher
+        task: Tuple of (first chunk index, chunks, holds the last chunk)
+
+    Returns:
+        Frames in the same order as the chunks
+    """
+    first_index, chunks, has_last = task
+    last_position = len(chunks) - 1
+    return [
+        cipher.seal(
+            first_index + position, chunk, has_last and position == last_position
+        )
+        for position, chunk in enumerate(chunks)
+    ]
+
+
+def open_batch_to_file(
+    cipher: FrameCipher,
+    input_fd: int,
+    output_fd: int,
+    chunk_size: int,
+    task: DecryptTask,
+    cancel: Optional[CancellationToken] = None,
+) -> List[int]:
+    """
+    Decrypt a batch of frames and write them at their plaintext offsets.
+
+    Frame i is written at i * chunk_size, which is where the serial writer
+    placed it, so the batch can be written independently of its neighbours.
+
+    Args:
+        cipher: Frame cipher
+        input_fd: Encrypted input file descriptor
+        output_fd: Preallocated plaintext output file descriptor
+        chunk_size: Plaintext size of every non-final frame
+        task: Tuple of (first frame index, offsets, lengths, final index)
+        cancel: Token checked before each frame, or None
+
+    Returns:
+        Plaintext length of every frame in the batch
+
+    Raises:
+        OperationCancelled: If the token fires
+    """
+    first_index, offsets, lengths, final_index = task
+    plaintext_lengths = []
+    for position, (offset, length) in enumerate(zip(offsets, lengths)):
+        if cancel is not None:
+            cancel.check()
+        index = first_index + position
+        frame = os.pread(input_fd, length, offset)
+        plaintext = cipher.open(index, frame, index == final_index)
+        _pwrite_all(output_fd, plaintext, index * chunk_size)
+        plaintext_lengths.append(len(plaintext))
+
+    return plaintext_lengths
+
+
+def init_frame_worker(
+    cipher_name: str,
+    key: bytes,
+    chunk_size: int = 0,
+    input_path: Optional[str] = None,
+    output_path: Optional[str] = None,
+) -> None:
+    """
+    Initialize the cipher and file descriptors of a pool worker process.
+
+    Args:
+        cipher_name: Frame cipher name
+        key: Cipher key
+        chunk_size: Plaintext size of every non-final frame (decrypt only)
+        input_path: Encrypted input file (decrypt only)
+        output_path: Preallocated plaintext output file (decrypt only)
+    """
+    _worker_state["cipher"] = create_frame_cipher(cipher_name, key)
+    _worker_state["chunk_size"] = chunk_size
+    # Reason: descriptors live for the worker's lifetime and close on exit
+    if input_path is not None:
+        _worker_state["input_fd"] = os.open(input_path, os.O_RDONLY)
+    if output_path is not None:
+        _worker_state["output_fd"] = os.open(output_path, os.O_WRONLY)
+
+
+def seal_batch_in_worker(task: EncryptTask) -> List[bytes]:
+    """
+    Encrypt a batch of chunks inside a pool worker process.
+
+    Args:
+        task: Tuple of (first chunk index, chunks, holds the last chunk)
+
+    Returns:
+        Frames in the same order as the chunks
+
+    Raises:
+        RuntimeError: If the worker was not initialized
+    """
+    if "cipher" not in _worker_state:
+        raise RuntimeError("Worker cipher has not been initialized")
+    return seal_batch(_worker_state["cipher"], task)
+
+
+def open_batch_to_file_in_worker(task: DecryptTask) -> List[int]:
+    """
+    Decrypt a batch of frames to the output file inside a pool worker process.
+
+    Args:
+        task: Tuple of (first frame index, offsets, lengths, final index)
+
+    Returns:
+        Plaintext length of every frame in the batch
+
+    Raises:
+        RuntimeError: If the worker was not initialized for decryption
+    """
+    if "output_fd" not in _worker_state:
+        raise RuntimeError("Worker cipher has not been initialized")
+    return open_batch_to_file(
+        _worker_state["cipher"],
+        _worker_state["input_fd"],
+        _worker_state["output_fd"],
+        _worker_state["chunk_size"],
+        task,
+    )
+
+
+def encrypt_in_processes(
+    tasks: Iterator[EncryptTask],
+    outfile: BinaryIO,
+    cipher: FrameCipher,
+    key: bytes,
+    worker_count: int,
+    batch_count: int,
+    offsets: array,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
+    """
+    Encrypt batches of chunks through the pipeline on worker processes.
+
+    Args:
+        tasks: Chunk batches from iter_chunk_batches
+        outfile: Output stream positioned after the header
+        cipher: Frame cipher
+        key: Cipher key, for worker processes
+        worker_count: Number of worker processes
+        batch_count: Maximum batches held across the stages
+        offsets: Array receiving the payload offset of every frame
+        progress: Reporter whose stats receive the stage timings
+    """
+    position = outfile.tell()
+    read_time = 0.0
+    largest_batch = 0
+
+    def timed_tasks() -> Iterator[EncryptTask]:
+        nonlocal read_time
+        iterator = iter(tasks)
+        while True:
+            started = time.perf_counter()
+            task = next(iterator, None)
+            read_time += time.perf_counter() - started
+            if task is None:
+                return
+            yield task
+
+    def write(result: Tuple[float, List[bytes]]) -> None:
+        nonlocal position, largest_batch
+        crypt_time, frames = result
+        started = time.perf_counter()
+        for frame in frames:
+            write_frame(outfile, frame)
+            offsets.append(position + FRAME_LENGTH_SIZE)
+            position += FRAME_LENGTH_SIZE + len(frame)
+        if progress is not None:
+            progress.stats.add(
+                len(frames), 0.0, crypt_time, time.perf_counter() - started
+            )
+        largest_batch = max(largest_batch, sum(len(frame) for frame in frames))
+
+    queue_size = max(1, batch_count // 4)
+    run_pipeline(
+        timed_tasks(),
+        partial(timed_call, seal_batch_in_worker),
+        write,
+        worker_count,
+        queue_size=queue_size,
+        max_pending=max(1, batch_count - 2 * queue_size),
+        threads=False,
+        initializer=init_frame_worker,
+        initargs=(cipher.name, key),
+    )
+
+    if progress is not None:
+        progress.stats.add(0, read_time=read_time)
+        progress.stats.worker_count = worker_count
+        # Reason: each batch in flight holds its plaintext and its frames
+        progress.stats.note_buffers(2 * batch_count * largest_batch)
+
+
+def _pwrite_all(fd: int, data: bytes, offset: int) -> None:
+    """
+    Write all of data at offset, retrying on short writes.
+
+    Args:
+        fd: Output file descriptor
+        data: Bytes to write
+        offset: Absolute file offset
+    """
+    view = memoryview(data)
+    while view:
+        written = os.pwrite(fd, view, offset)
+        view = view[written:]
+        offset += written
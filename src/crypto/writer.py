@@ -0,0 +1,250 @@
+"""Streaming encryption into any binary sink."""
+
+import io
+from array import array
+from typing import Any, BinaryIO, Optional, Tuple
+
+from .ciphers import FrameCipher, create_frame_cipher, resolve_cipher
+from .compression import resolve_compression, with_compression
+from .container import ContainerHeader, validate_chunk_size
+from .digest import DIGEST_BLAKE2B, new_plaintext_hash, seal_digest
+from .file_format import create_data_key, create_file_key
+from .kdf_calibration import stored_kdf_params
+from .key_derivation import KdfParams
+from .framing import FRAME_LENGTH_SIZE, write_frame, write_frame_index
+from .secure_memory import SecurePassword
+from ..config.constants import CHUNK_SIZE
+from ..config.models import CipherAlgorithm, CompressionCodec, EncryptionMode
+
+
+class EncryptedFileWriter(io.RawIOBase):
+    """
+    Writable file object that encrypts everything written to it.
+
+    Data is buffered up to one chunk, then sealed into a frame and written
+    to the sink, so plaintext never touches the disk and the output is a
+    regular format 4 file. The sink only needs a write() method; it does
+    not have to be seekable, so pipes and sockets work. The plaintext size
+    is recorded in the header only when the sink is seekable.
+    """
+
+    def __init__(
+        self,
+        sink: BinaryIO,
+        password: Optional[SecurePassword] = None,
+        keyfile_path: Optional[str] = None,
+        original_extension: str = "",
+        cipher: Optional[CipherAlgorithm] = None,
+        close_sink: bool = False,
+        chunk_size: int = CHUNK_SIZE,
+        kdf: Optional[KdfParams] = None,
+        compression: Optional[CompressionCodec] = None,
+    ) -> None:
+        """
+        Write the container header and prepare for streaming.
+
+        Args:
+            sink: Binary stream receiving the encrypted file
+            password: Password for password mode
+            keyfile_path: Keyfile path for keyfile mode (used if no password)
+            original_extension: Extension to restore on decryption
+            cipher: AEAD cipher (None or AUTO picks the fastest cipher on
+                this machine)
+            close_sink: Close the sink when the writer is closed
+            chunk_size: Chunk size recorded in the header; the total size
+                of a stream is unknown up front, so it is not chosen
+                adaptively
+            kdf: Password KDF and cost parameters (None uses
+                stored_kdf_params())
+            compression: Per-chunk compression codec (None stores chunks
+                as is); chunks that look incompressible are stored anyway
+
+        Raises:
+            ValueError: If no credential is given, the chunk size is
+                invalid or the codec is unavailable
+        """
+        super().__init__()
+        self._cipher: Optional[FrameCipher] = None
+        self._sink = sink
+        self._close_sink = close_sink
+        self._buffer = bytearray()
+        self._chunk_size = validate_chunk_size(chunk_size)
+        self._offsets = array("Q")
+        self._index = 0
+
+        mode = (
+            EncryptionMode.PASSWORD if password is not None else EncryptionMode.KEYFILE
+        )
+        if mode == EncryptionMode.PASSWORD:
+            kdf = kdf or stored_kdf_params()
+        else:
+            kdf = None
+        credential_key, salt, file_nonce = create_file_key(
+            mode, password, keyfile_path, kdf=kdf
+        )
+        key, wrapped_key = create_data_key(credential_key)
+        header = ContainerHeader(
+            mode=mode,
+            cipher=resolve_cipher(cipher).value,
+            salt=salt,
+            original_extension=original_extension,
+            chunk_size=chunk_size,
+            file_nonce=file_nonce,
+            kdf=kdf,
+            digest=DIGEST_BLAKE2B,
+            compression=resolve_compression(compression),
+            wrapped_key=wrapped_key,
+        )
+        header.set_key_check(key)
+        self._cipher = with_compression(
+            create_frame_cipher(header.cipher, key), header.compression, chunk_size
+        )
+        self._header = header
+        self._key: Optional[bytes] = key
+        self._plaintext_size = 0
+        self._plaintext_hash = new_plaintext_hash()
+
+        header_bytes = header.pack()
+        sink.write(header_bytes)
+        # Reason: tracked here rather than with tell() so unseekable sinks work
+        self._position = len(header_bytes)
+
+    def writable(self) -> bool:
+        """Return True; the writer supports writing."""
+        return True
+
+    def write(self, data: Any) -> int:
+        """
+        Encrypt data into the sink.
+
+        Args:
+            data: Bytes-like object
+
+        Returns:
+            Number of bytes accepted (always all of data)
+        """
+        self._checkClosed()
+        view = memoryview(data).cast("B")
+        accepted = len(view)
+        while view:
+            # Reason: a full chunk is only sealed once more data proves that
+            # it is not the final chunk
+            if len(self._buffer) == self._chunk_size:
+                self._seal(final=False)
+            take = min(self._chunk_size - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+        return accepted
+
+    def flush(self) -> None:
+        """
+        Flush the sink.
+
+        Buffered data below one chunk stays buffered: only the final chunk
+        may be short, so it is written by close().
+        """
+        self._checkClosed()
+        self._sink.flush()
+
+    def close(self) -> None:
+        """Seal the final chunk, append the chunk index and close the writer."""
+        if self.closed:
+            return
+        try:
+            if self._cipher is not None:
+                self._seal(final=True)
+                _, key = self._open_state()
+                write_frame_index(
+                    self._sink,
+                    self._offsets,
+                    position=self._position,
+                    record=seal_digest(
+                        key,
+                        self._header.file_nonce,
+                        self._plaintext_hash.digest(),
+                    ),
+                )
+                self._record_plaintext_size()
+                self._sink.flush()
+        finally:
+            self._release()
+
+    def abort(self) -> None:
+        """
+        Close the writer without sealing a final chunk.
+
+        The output then has no final frame, so decryption rejects it as
+        truncated instead of accepting partial data as complete.
+        """
+        if not self.closed:
+            self._release()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Context manager exit; aborts the output if the block raised."""
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def _release(self) -> None:
+        """Zeroize buffered plaintext, drop the key and close the sink."""
+        self._buffer[:] = bytes(len(self._buffer))
+        self._cipher = None
+        self._key = None
+        try:
+            super().close()
+        finally:
+            if self._close_sink:
+                self._sink.close()
+
+    def _open_state(self) -> Tuple[FrameCipher, bytes]:
+        """
+        Return the cipher and key, which are dropped once the writer closes.
+
+        Raises:
+            ValueError: If the writer has been released
+        """
+        if self._cipher is None or self._key is None:
+            raise ValueError("I/O operation on closed file")
+        return self._cipher, self._key
+
+    def _record_plaintext_size(self) -> None:
+        """
+        Rewrite the header with the plaintext size if the sink is seekable.
+
+        The size is unknown when the header is written; unseekable sinks
+        such as pipes keep it marked as unknown.
+        """
+        try:
+            if not self._sink.seekable():
+                return
+        except AttributeError:
+            return
+
+        _, key = self._open_state()
+        self._header.plaintext_size = self._plaintext_size
+        self._header.set_key_check(key)
+        end = self._sink.tell()
+        self._sink.seek(0)
+        self._sink.write(self._header.pack())
+        self._sink.seek(end)
+
+    def _seal(self, final: bool) -> None:
+        """
+        Encrypt the buffered chunk and write its frame.
+
+        Args:
+            final: Whether this is the last chunk of the stream
+        """
+        cipher, _ = self._open_state()
+        self._plaintext_hash.update(self._buffer)
+        frame = cipher.seal(self._index, self._buffer, final)
+        write_frame(self._sink, frame)
+        self._plaintext_size += len(self._buffer)
+        self._offsets.append(self._position + FRAME_LENGTH_SIZE)
+        self._position += FRAME_LENGTH_SIZE + len(frame)
+        self._index += 1
+
+        # Zeroize the plaintext before reusing the buffer
+        self._buffer[:] = bytes(len(self._buffer))
+        del self._buffer[:]
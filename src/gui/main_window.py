@@ -23,12 +23,9 @@ from .components.dialogs import (
     show_error_dialog,
     show_info_dialog,
 )
-from ..crypto.encryption import (
-    encrypt_file_with_password,
-    encrypt_file_with_keyfile,
-    decrypt_file_with_password,
-    decrypt_file_with_keyfile,
-)
+from ..crypto.decryption import decrypt_file_with_keyfile, decrypt_file_with_password
+from ..crypto.encryption import encrypt_file_with_keyfile, encrypt_file_with_password
+from ..crypto.kdf_calibration import start_calibration, stored_kdf_params
 from ..crypto.secure_memory import SecurePassword
 from ..config.models import EncryptionMode, ExtensionOption
 from ..config.constants import APP_NAME, VERSION
@@ -45,6 +42,9 @@ class MainWindow(QMainWindow):
 
         # Application state - load from settings
         self.current_settings = load_settings()
+        # Reason: calibrating measures for up to a second, so it runs in the
+        # background; encryptions before it finishes use the fixed defaults
+        start_calibration(self.current_settings.kdf, self.current_settings.kdf_profile)
 
         # File paths
         self.encrypt_file_path: Optional[str] = None
@@ -439,6 +439,15 @@ class MainWindow(QMainWindow):
                 self.encrypt_file_path,
                 secure_password,
                 preserve_extension=preserve_extension,
+                workers=self.current_settings.worker_count,
+                in_flight_chunks=self.current_settings.in_flight_chunks,
+                cipher=self.current_settings.cipher,
+                chunk_size=self.current_settings.chunk_size,
+                compression=self.current_settings.compression,
+                fsync=self.current_settings.fsync_policy,
+                kdf=stored_kdf_params(
+                    self.current_settings.kdf, self.current_settings.kdf_profile
+                ),
             )
 
         if result.success:
@@ -464,6 +473,12 @@ class MainWindow(QMainWindow):
             self.encrypt_file_path,
             self.keyfile_path,
             preserve_extension=preserve_extension,
+            workers=self.current_settings.worker_count,
+            in_flight_chunks=self.current_settings.in_flight_chunks,
+            cipher=self.current_settings.cipher,
+            chunk_size=self.current_settings.chunk_size,
+            compression=self.current_settings.compression,
+            fsync=self.current_settings.fsync_policy,
         )
 
         if result.success:
@@ -500,7 +515,13 @@ class MainWindow(QMainWindow):
         password_text = self.decrypt_password_input.get_password()
 
         with SecurePassword(password_text) as secure_password:
-            result = decrypt_file_with_password(self.decrypt_file_path, secure_password)
+            result = decrypt_file_with_password(
+                self.decrypt_file_path,
+                secure_password,
+                workers=self.current_settings.worker_count,
+                in_flight_chunks=self.current_settings.in_flight_chunks,
+                fsync=self.current_settings.fsync_policy,
+            )
 
         if result.success:
             show_info_dialog(
@@ -518,7 +539,11 @@ class MainWindow(QMainWindow):
             return
 
         result = decrypt_file_with_keyfile(
-            self.decrypt_file_path, self.decrypt_keyfile_path
+            self.decrypt_file_path,
+            self.decrypt_keyfile_path,
+            workers=self.current_settings.worker_count,
+            in_flight_chunks=self.current_settings.in_flight_chunks,
+            fsync=self.current_settings.fsync_policy,
         )
 
         if result.success:
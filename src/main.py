@@ -1,5 +1,6 @@
 """Main application entry point for Entryptor."""
 
+import multiprocessing
 import sys
 import os
 
@@ -9,6 +10,7 @@ from PyQt6.QtGui import QIcon
 
 from .gui.main_window import MainWindow
 from .config.constants import APP_NAME
+from .crypto.key_cache import clear_key_cache
 from .utils.resources import get_icon_path
 
 
@@ -91,6 +93,8 @@ def main() -> int:
 
         # Create application
         app = setup_application()
+        # Wipe cached master keys on exit
+        app.aboutToQuit.connect(clear_key_cache)
 
         # Create and show main window
         main_window = MainWindow()
@@ -115,4 +119,6 @@ def main() -> int:
 
 
 if __name__ == "__main__":
+    # Required for encryption worker processes in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     sys.exit(main())
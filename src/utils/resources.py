@@ -5,6 +5,8 @@ import sys
 from pathlib import Path
 from typing import Optional
 
+from ..config.constants import KDF_CALIBRATION_FILE
+
 
 def get_resource_path(relative_path: str) -> str:
     """
@@ -54,6 +56,16 @@ def get_settings_file_path() -> str:
     return os.path.join(get_app_data_directory(), "settings.json")
 
 
+def get_kdf_calibration_file_path() -> str:
+    """
+    Get path to the KDF calibration file.
+
+    Returns:
+        Path to KDF calibration file
+    """
+    return os.path.join(get_app_data_directory(), KDF_CALIBRATION_FILE)
+
+
 def get_icon_path(icon_name: str) -> Optional[str]:
     """
     Get path to application icon.
@@ -0,0 +1,39 @@
+"""Shared pytest configuration."""
+
+import itertools
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+import pytest
+
+from src.config.constants import KDF_PROFILE_ENV
+
+# Reason: derive password keys with minimal KDF costs so the suite measures
+# the code under test rather than Argon2id/scrypt; tests that need real
+# costs pass explicit KdfParams
+os.environ.setdefault(KDF_PROFILE_ENV, "test")
+
+
+@pytest.fixture
+def temp_file(tmp_path: Path) -> Callable[..., str]:
+    """
+    Provide a factory of files in the test's temporary directory.
+
+    pytest removes the directory, together with any outputs written next
+    to the files, so tests need no cleanup of their own.
+
+    Returns:
+        Function taking (content=b"", suffix="", name=None) that creates a
+        file and returns its path; without a name, each call gets a new one
+    """
+    counter = itertools.count()
+
+    def create(
+        content: bytes = b"", suffix: str = "", name: Optional[str] = None
+    ) -> str:
+        path = tmp_path / (name or f"file{next(counter)}{suffix}")
+        path.write_bytes(content)
+        return str(path)
+
+    return create
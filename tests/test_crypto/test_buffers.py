@@ -0,0 +1,153 @@
+"""Tests for in-memory encryption and decryption."""
+
+import os
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.crypto.buffers import (
+    decrypt_bytes,
+    decrypt_into,
+    encrypt_bytes,
+    get_plaintext_size,
+)
+from src.crypto.encryption import (
+    DecryptionError,
+    EncryptionError,
+    decrypt_file_with_password,
+    encrypt_file_with_password,
+)
+from src.crypto.secure_memory import SecurePassword
+
+
+class TestBufferEncryption:
+    """Test bytes and buffer encryption APIs."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 2 + 999)
+        self.password = SecurePassword("test_password")
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def test_bytes_roundtrip(self):
+        """Test encrypting and decrypting a bytes payload."""
+        encrypted = encrypt_bytes(self.test_content, self.password)
+        assert encrypted != self.test_content
+        assert decrypt_bytes(encrypted, self.password) == self.test_content
+
+    def test_accepts_memoryview_and_bytearray(self):
+        """Test that any bytes-like input is accepted."""
+        encrypted = encrypt_bytes(memoryview(self.test_content)[100:], self.password)
+        assert (
+            decrypt_bytes(bytearray(encrypted), self.password)
+            == self.test_content[100:]
+        )
+
+    def test_same_format_as_files(self):
+        """Test that in-memory and file encryption are interchangeable."""
+        encrypted_path = self._temp_path(
+            encrypt_bytes(self.test_content, self.password)
+        )
+        decrypted_path = self._temp_path()
+        result = decrypt_file_with_password(
+            encrypted_path, self.password, decrypted_path
+        )
+        assert result.success is True
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+        input_path = self._temp_path(self.test_content)
+        assert encrypt_file_with_password(
+            input_path, self.password, encrypted_path
+        ).success
+        with open(encrypted_path, "rb") as f:
+            assert decrypt_bytes(f.read(), self.password) == self.test_content
+
+    def test_legacy_data_decrypts(self):
+        """Test that format version 2 contents are accepted."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path,
+            self.password,
+            encrypted_path,
+            format_version=LEGACY_FORMAT_VERSION,
+        ).success
+
+        with open(encrypted_path, "rb") as f:
+            encrypted = f.read()
+        assert get_plaintext_size(encrypted) is None
+        assert decrypt_bytes(encrypted, self.password) == self.test_content
+
+    def test_decrypt_into_buffer(self):
+        """Test decrypting into a preallocated buffer at an offset."""
+        encrypted = encrypt_bytes(self.test_content, self.password)
+        size = get_plaintext_size(encrypted)
+        assert size == len(self.test_content)
+
+        buffer = bytearray(size + 20)
+        written = decrypt_into(encrypted, memoryview(buffer)[10:], self.password)
+        assert written == size
+        assert buffer[10 : 10 + size] == self.test_content
+        assert buffer[:10] == bytes(10)
+
+    def test_decrypt_into_small_buffer_fails(self):
+        """Test that a buffer without room for the plaintext is rejected."""
+        encrypted = encrypt_bytes(self.test_content, self.password)
+        buffer = bytearray(len(self.test_content) - 1)
+        with pytest.raises(DecryptionError, match="too small"):
+            decrypt_into(encrypted, buffer, self.password)
+        assert buffer == bytes(len(buffer))
+
+    def test_tampering_zeroizes_buffer(self):
+        """Test that partially decrypted output is wiped on failure."""
+        encrypted = bytearray(encrypt_bytes(self.test_content, self.password))
+        encrypted[-200] ^= 1  # Inside the final frame
+
+        buffer = bytearray(len(self.test_content))
+        with pytest.raises(DecryptionError):
+            decrypt_into(encrypted, buffer, self.password)
+        assert buffer == bytes(len(buffer))
+
+    def test_custom_chunk_size(self):
+        """Test sizing and decrypting data with a larger chunk size."""
+        encrypted = encrypt_bytes(
+            self.test_content, self.password, chunk_size=CHUNK_SIZE * 2
+        )
+        assert get_plaintext_size(encrypted) == len(self.test_content)
+        assert decrypt_bytes(encrypted, self.password) == self.test_content
+
+    def test_empty_payload(self):
+        """Test an empty payload."""
+        encrypted = encrypt_bytes(b"", self.password)
+        assert get_plaintext_size(encrypted) == 0
+        assert decrypt_bytes(encrypted, self.password) == b""
+
+    def test_keyfile_mode(self):
+        """Test in-memory keyfile encryption."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted = encrypt_bytes(self.test_content, keyfile_path=keyfile_path)
+        assert decrypt_bytes(encrypted, keyfile_path=keyfile_path) == self.test_content
+
+    def test_wrong_password_fails(self):
+        """Test that a wrong password raises DecryptionError."""
+        encrypted = encrypt_bytes(self.test_content, self.password)
+        with pytest.raises(DecryptionError, match="Decryption failed"):
+            decrypt_bytes(encrypted, SecurePassword("wrong_password"))
+
+    @pytest.mark.parametrize("data", [b"garbage", b"", os.urandom(4096)])
+    def test_other_data_fails(self, data):
+        """Test that data that is not an encrypted buffer is named as such."""
+        with pytest.raises(DecryptionError, match="Not an Entryptor buffer"):
+            decrypt_bytes(data, self.password)
+        with pytest.raises(DecryptionError, match="Not an Entryptor buffer"):
+            decrypt_into(data, bytearray(4096), self.password)
+
+    def test_missing_credentials_fail(self):
+        """Test that encryption without a password or keyfile fails."""
+        with pytest.raises(EncryptionError, match="Encryption failed"):
+            encrypt_bytes(self.test_content)
@@ -0,0 +1,180 @@
+"""Tests for cancellation tokens and deadlines."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import OperationStage
+from src.crypto.cancellation import CancellationToken, OperationCancelled
+from src.crypto.checkpoint import partial_path
+from src.crypto.ciphers import CIPHER_AES_256_GCM, create_frame_cipher
+from src.crypto.encryption import (
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.stages import PlaintextBatch, seal_plaintext_batch
+
+
+class TestCancellationToken:
+    """Test the token itself."""
+
+    def test_cancel(self):
+        """Test that cancel() fires the token."""
+        token = CancellationToken()
+        assert not token.cancelled
+        token.check()
+        token.cancel()
+        assert token.cancelled
+        with pytest.raises(OperationCancelled, match="cancelled"):
+            token.check()
+
+    def test_deadline(self):
+        """Test that a passed deadline fires the token."""
+        assert not CancellationToken(timeout=3600).cancelled
+        token = CancellationToken(timeout=0)
+        assert token.deadline_exceeded
+        with pytest.raises(OperationCancelled, match="deadline exceeded"):
+            token.check()
+
+    def test_pool_task_checks_token(self):
+        """Test that a worker stops sealing a batch once the token fires."""
+        batch = PlaintextBatch(4, CHUNK_SIZE, CHUNK_SIZE + 64)
+        batch.length = batch.chunk_count = 1
+        token = CancellationToken()
+        token.cancel()
+        cipher = create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32))
+        with pytest.raises(OperationCancelled):
+            seal_plaintext_batch(cipher, batch, cancel=token)
+
+
+class TestCancelledOperations:
+    """Test cancelling encrypt and decrypt calls."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 40 + 3)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _assert_untouched(self, output_path: str) -> None:
+        """Check that the output kept its old contents and no temp file is left."""
+        with open(output_path, "rb") as f:
+            assert f.read() == b"previous"
+        directory, name = os.path.split(output_path)
+        assert not [n for n in os.listdir(directory) if n.startswith(f".{name}.")]
+
+    def _cancel_midway(self, token: CancellationToken):
+        """Build a progress callback cancelling once data has been processed."""
+
+        def callback(info):
+            if info.bytes_done > 0 and info.stage != OperationStage.FINISHED:
+                token.cancel()
+
+        return callback
+
+    @pytest.mark.parametrize("resumable", [False, True])
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_cancel_encryption(self, workers, resumable):
+        """Test that a cancelled encryption leaves the existing output alone."""
+        token = CancellationToken()
+        output_path = self._temp_path(b"previous")
+        with (
+            patch("src.crypto.progress.PROGRESS_INTERVAL", 0),
+            patch(
+                "src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0 if workers > 1 else 2**40
+            ),
+        ):
+            result = encrypt_file_with_password(
+                self._temp_path(self.test_content),
+                self.password,
+                output_path,
+                workers=workers,
+                chunk_size=CHUNK_SIZE,
+                in_flight_chunks=4,
+                progress=self._cancel_midway(token),
+                cancel=token,
+                resumable=resumable,
+            )
+        assert result.success is False
+        assert result.cancelled is True
+        assert result.error_message == "Encryption cancelled"
+        self._assert_untouched(output_path)
+        # A resumable call keeps its partial output for the next attempt
+        assert os.path.exists(partial_path(output_path)) is resumable
+
+    @pytest.mark.parametrize(
+        "format_version,workers",
+        [(None, 1), (None, 2), (LEGACY_FORMAT_VERSION, 2)],
+    )
+    def test_cancel_decryption(self, format_version, workers):
+        """Test cancelling the serial, pipelined and positional decrypt paths."""
+        encrypted_path = self._temp_path()
+        kwargs = {} if format_version is None else {"format_version": format_version}
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            encrypted_path,
+            chunk_size=CHUNK_SIZE,
+            **kwargs,
+        ).success
+
+        token = CancellationToken()
+        output_path = self._temp_path(b"previous")
+        with (
+            patch("src.crypto.progress.PROGRESS_INTERVAL", 0),
+            patch(
+                "src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0 if workers > 1 else 2**40
+            ),
+        ):
+            result = decrypt_file_with_password(
+                encrypted_path,
+                self.password,
+                output_path,
+                workers=workers,
+                in_flight_chunks=4,
+                progress=self._cancel_midway(token),
+                cancel=token,
+            )
+        assert result.cancelled is True
+        assert result.error_message == "Decryption cancelled"
+        self._assert_untouched(output_path)
+
+    @pytest.mark.parametrize("resumable", [False, True])
+    def test_deadline_before_start_keeps_existing_output(self, resumable):
+        """Test that an expired deadline stops the call before any writes."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        output_path = self._temp_path(b"previous")
+        result = encrypt_file_with_keyfile(
+            self._temp_path(self.test_content),
+            keyfile_path,
+            output_path,
+            cancel=CancellationToken(timeout=0),
+            resumable=resumable,
+        )
+        assert result.cancelled is True
+        assert result.error_message == "Encryption deadline exceeded"
+        self._assert_untouched(output_path)
+        assert not os.path.exists(partial_path(output_path))
+
+    def test_unused_token_completes(self):
+        """Test that a token that never fires does not affect the call."""
+        result = encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            self._temp_path(),
+            cancel=CancellationToken(timeout=3600),
+        )
+        assert result.success is True
+        assert result.cancelled is False
@@ -0,0 +1,177 @@
+"""Tests for per-chunk frame ciphers."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from src.config.models import CipherAlgorithm
+from src.crypto.ciphers import (
+    AEAD_TAG_SIZE,
+    CIPHER_AES_256_GCM,
+    CIPHER_CHACHA20_POLY1305,
+    CIPHER_FERNET,
+    INTO_BUFFER_SLACK,
+    FrameAuthenticationError,
+    create_frame_cipher,
+    fernet_token_length,
+    frame_nonce,
+    resolve_cipher,
+    select_fastest_cipher,
+)
+
+
+class TestFrameCiphers:
+    """Test frame sealing, opening and positional binding."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cipher = create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32))
+
+    def test_aes_gcm_roundtrip(self):
+        """Test sealing and opening a frame."""
+        frame = self.cipher.seal(5, b"chunk data", final=False)
+        assert len(frame) == len(b"chunk data") + AEAD_TAG_SIZE
+        assert self.cipher.open(5, frame, final=False) == b"chunk data"
+
+    def test_aes_gcm_frame_length(self):
+        """Test that frames add exactly one tag of overhead."""
+        assert self.cipher.frame_length(1000) == 1000 + AEAD_TAG_SIZE
+
+    def test_aes_gcm_wrong_index_fails(self):
+        """Test that a frame moved to another position is rejected."""
+        frame = self.cipher.seal(1, b"chunk data", final=False)
+        with pytest.raises(
+            FrameAuthenticationError, match="Authentication failed for chunk 2"
+        ):
+            self.cipher.open(2, frame, final=False)
+
+    def test_aes_gcm_wrong_final_flag_fails(self):
+        """Test that truncation at a frame boundary is detected."""
+        frame = self.cipher.seal(3, b"chunk data", final=False)
+        with pytest.raises(FrameAuthenticationError):
+            self.cipher.open(3, frame, final=True)
+
+    def test_frame_nonces_are_unique(self):
+        """Test that consecutive chunk indices give distinct nonces."""
+        assert len({frame_nonce(index) for index in range(1000)}) == 1000
+        assert len(frame_nonce(0)) == 12
+
+    def test_fernet_cipher_roundtrip(self):
+        """Test the format version 2 cipher adapter."""
+        cipher = create_frame_cipher(CIPHER_FERNET, Fernet.generate_key())
+        frame = cipher.seal(0, b"legacy", final=True)
+        assert len(frame) == fernet_token_length(len(b"legacy"))
+        assert cipher.open(7, frame, final=False) == b"legacy"
+
+    def test_chacha20_roundtrip(self):
+        """Test sealing and opening a ChaCha20-Poly1305 frame."""
+        cipher = create_frame_cipher(CIPHER_CHACHA20_POLY1305, os.urandom(32))
+        frame = cipher.seal(9, b"chunk data", final=True)
+        assert len(frame) == cipher.frame_length(len(b"chunk data"))
+        assert cipher.open(9, frame, final=True) == b"chunk data"
+
+    def test_ciphers_are_not_interchangeable(self):
+        """Test that a frame only opens with the cipher that sealed it."""
+        key = os.urandom(32)
+        frame = create_frame_cipher(CIPHER_AES_256_GCM, key).seal(0, b"x", True)
+        chacha = create_frame_cipher(CIPHER_CHACHA20_POLY1305, key)
+        with pytest.raises(FrameAuthenticationError):
+            chacha.open(0, frame, True)
+
+    @pytest.mark.parametrize("name", [CIPHER_AES_256_GCM, CIPHER_FERNET])
+    def test_open_into(self, name):
+        """Test decrypting a frame into part of a larger buffer."""
+        key = Fernet.generate_key() if name == CIPHER_FERNET else os.urandom(32)
+        cipher = create_frame_cipher(name, key)
+        frame = cipher.seal(2, b"chunk data", final=False)
+
+        buffer = bytearray(20)
+        assert cipher.open_into(2, frame, False, memoryview(buffer)[5:]) == 10
+        assert buffer[5:15] == b"chunk data"
+        with pytest.raises(ValueError, match="too small"):
+            cipher.open_into(2, frame, False, memoryview(bytearray(9)))
+
+    @pytest.mark.parametrize(
+        "into_api",
+        [
+            pytest.param(
+                True,
+                marks=pytest.mark.skipif(
+                    not hasattr(AESGCM, "encrypt_into"),
+                    reason="encrypt_into needs cryptography 46+",
+                ),
+            ),
+            False,
+        ],
+    )
+    def test_seal_into_matches_seal(self, into_api):
+        """Test in-place sealing with and without the *_into AEAD API."""
+        cipher = create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32))
+        chunk = os.urandom(1000)
+        frame_buffer = bytearray(cipher.frame_length(len(chunk)) + INTO_BUFFER_SLACK)
+        plaintext_buffer = bytearray(len(chunk) + INTO_BUFFER_SLACK)
+
+        with patch("src.crypto.ciphers._AEAD_INTO", into_api):
+            length = cipher.seal_into(4, chunk, True, memoryview(frame_buffer))
+            frame = memoryview(frame_buffer)[:length]
+            assert frame == cipher.seal(4, chunk, True)
+
+            count = cipher.open_into(4, frame, True, memoryview(plaintext_buffer))
+            assert plaintext_buffer[:count] == chunk
+            with pytest.raises(FrameAuthenticationError):
+                cipher.open_into(4, frame, False, memoryview(plaintext_buffer))
+
+    def test_plaintext_length(self):
+        """Test plaintext sizes known without decrypting."""
+        aead = create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32))
+        assert aead.plaintext_length(aead.frame_length(1000)) == 1000
+        fernet = create_frame_cipher(CIPHER_FERNET, Fernet.generate_key())
+        assert fernet.plaintext_length(fernet.frame_length(1000)) is None
+
+    def test_unknown_cipher_fails(self):
+        """Test that unknown cipher names are rejected."""
+        with pytest.raises(ValueError, match="Unsupported cipher"):
+            create_frame_cipher("rot13", b"key")
+
+
+class TestCipherSelection:
+    """Test automatic cipher selection."""
+
+    def setup_method(self):
+        """Reset the cached benchmark result."""
+        select_fastest_cipher.cache_clear()
+
+    def teardown_method(self):
+        """Reset the cached benchmark result."""
+        select_fastest_cipher.cache_clear()
+
+    def test_selects_chacha_when_clearly_faster(self):
+        """Test that hosts without fast AES pick ChaCha20-Poly1305."""
+        # AES-GCM takes 10s, ChaCha20-Poly1305 takes 1s
+        with patch("src.crypto.ciphers.time.perf_counter", side_effect=[0, 10, 0, 1]):
+            assert select_fastest_cipher() == CIPHER_CHACHA20_POLY1305
+
+    def test_keeps_aes_within_margin(self):
+        """Test that AES-GCM stays the default when timings are close."""
+        with patch("src.crypto.ciphers.time.perf_counter", side_effect=[0, 11, 0, 10]):
+            assert select_fastest_cipher() == CIPHER_AES_256_GCM
+
+    def test_selection_is_cached(self):
+        """Test that the benchmark only runs once per process."""
+        first = select_fastest_cipher()
+        with patch("src.crypto.ciphers.create_frame_cipher") as create:
+            assert select_fastest_cipher() == first
+            create.assert_not_called()
+
+    def test_resolve_cipher(self):
+        """Test resolving explicit and automatic cipher choices."""
+        explicit = CipherAlgorithm.CHACHA20_POLY1305
+        assert resolve_cipher(explicit) == explicit
+        assert resolve_cipher(CipherAlgorithm.AUTO) in (
+            CipherAlgorithm.AES_256_GCM,
+            CipherAlgorithm.CHACHA20_POLY1305,
+        )
+        assert resolve_cipher(None) != CipherAlgorithm.AUTO
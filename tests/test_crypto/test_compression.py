@@ -0,0 +1,265 @@
+"""Tests for per-chunk compression of format 3 files."""
+
+import io
+import os
+import zlib
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import CompressionCodec
+from src.crypto.buffers import (
+    decrypt_bytes,
+    decrypt_into,
+    encrypt_bytes,
+    get_plaintext_size,
+)
+from src.crypto.ciphers import CIPHER_AES_256_GCM, create_frame_cipher
+from src.crypto.compression import (
+    CODEC_LZMA,
+    CODEC_ZLIB,
+    ZSTD_AVAILABLE,
+    CompressedFrameCipher,
+    has_compressed_magic,
+    resolve_compression,
+    sample_entropy,
+)
+from src.crypto.encryption import (
+    decrypt_file_with_password,
+    encrypt_file_with_password,
+    get_file_metadata,
+)
+from src.crypto.reader import EncryptedFileReader
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.verify import verify_file
+from src.crypto.writer import EncryptedFileWriter
+
+
+def _log_lines(size: int) -> bytes:
+    """Build compressible log-like text of exactly size bytes."""
+    lines = (
+        f"2024-05-01T12:{i % 60:02d}:{i % 59:02d}Z INFO worker-{i % 8} "
+        f"processed request {i} in {i % 97} ms\n"
+        for i in range(size // 40 + 1)
+    )
+    return "".join(lines).encode("ascii")[:size]
+
+
+class TestCompressionHelpers:
+    """Test codec selection and the incompressibility checks."""
+
+    def test_resolve_compression(self):
+        """Test mapping settings choices to codec names."""
+        assert resolve_compression(None) is None
+        assert resolve_compression(CompressionCodec.NONE) is None
+        assert resolve_compression(CompressionCodec.ZLIB) == CODEC_ZLIB
+        assert resolve_compression(CompressionCodec.LZMA) == CODEC_LZMA
+        assert resolve_compression(CompressionCodec.AUTO) in ("zstd", CODEC_ZLIB)
+
+    @pytest.mark.skipif(ZSTD_AVAILABLE, reason="zstandard is installed")
+    def test_zstd_requires_package(self):
+        """Test that an explicit Zstandard choice needs the package."""
+        assert resolve_compression(CompressionCodec.AUTO) == CODEC_ZLIB
+        with pytest.raises(ValueError, match="zstandard"):
+            resolve_compression(CompressionCodec.ZSTD)
+
+    @pytest.mark.parametrize(
+        "prefix",
+        [
+            b"\xff\xd8\xff\xe0\x00\x10JFIF",
+            b"PK\x03\x04\x14\x00",
+            b"\x1f\x8b\x08\x00",
+            b"\x00\x00\x00\x20ftypisom",
+            b"RIFF\x00\x00\x00\x00WEBPVP8 ",
+        ],
+    )
+    def test_compressed_magic(self, prefix):
+        """Test recognizing already compressed formats."""
+        assert has_compressed_magic(prefix)
+
+    def test_plain_formats_have_no_magic(self):
+        """Test that text and uncompressed audio are not skipped."""
+        assert not has_compressed_magic(b"timestamp,level,message\n")
+        assert not has_compressed_magic(b"RIFF\x00\x00\x00\x00WAVEfmt ")
+
+    def test_sample_entropy(self):
+        """Test the entropy estimate of random, text and constant data."""
+        assert sample_entropy(os.urandom(CHUNK_SIZE)) > 7.5
+        assert sample_entropy(_log_lines(CHUNK_SIZE)) < 6
+        assert sample_entropy(bytes(CHUNK_SIZE)) == 0
+        assert sample_entropy(b"") == 0
+
+    def test_oversized_payload_is_rejected(self):
+        """Test that a chunk expanding beyond the chunk size fails."""
+        inner = create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32))
+        payload = b"\x01" + zlib.compress(bytes(CHUNK_SIZE + 1))
+        frame = inner.seal(0, payload, True)
+        cipher = CompressedFrameCipher(inner, CODEC_ZLIB, CHUNK_SIZE)
+        with pytest.raises(ValueError, match="Compressed chunk is corrupt"):
+            cipher.open(0, frame, True)
+
+    def test_short_inner_chunk_is_rejected(self):
+        """Test that a non-final frame must hold a full chunk."""
+        cipher = CompressedFrameCipher(
+            create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32)),
+            CODEC_ZLIB,
+            CHUNK_SIZE,
+        )
+        frame = cipher.seal(0, b"short", False)
+        with pytest.raises(ValueError, match="not a full chunk"):
+            cipher.open(0, frame, False)
+        assert cipher.open(0, cipher.seal(0, b"short", True), True) == b"short"
+
+    def test_unknown_codec_fails(self):
+        """Test that unknown codec names are rejected."""
+        inner = create_frame_cipher(CIPHER_AES_256_GCM, os.urandom(32))
+        with pytest.raises(ValueError, match="Unsupported compression"):
+            CompressedFrameCipher(inner, "brotli", CHUNK_SIZE)
+
+
+class TestCompressedFiles:
+    """Test encrypting and decrypting compressed files."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.text = _log_lines(CHUNK_SIZE * 6 + 1234)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt(self, content: bytes, **kwargs) -> str:
+        """Encrypt content with the password and return the path."""
+        encrypted_path = self._temp_path()
+        kwargs.setdefault("chunk_size", CHUNK_SIZE)
+        result = encrypt_file_with_password(
+            self._temp_path(content), self.password, encrypted_path, **kwargs
+        )
+        assert result.success is True, result.error_message
+        return encrypted_path
+
+    def _decrypt(self, encrypted_path: str, workers: int = 1) -> bytes:
+        """Decrypt a password file and return its plaintext."""
+        decrypted_path = self._temp_path()
+        result = decrypt_file_with_password(
+            encrypted_path, self.password, decrypted_path, workers=workers
+        )
+        assert result.success is True, result.error_message
+        with open(decrypted_path, "rb") as f:
+            return f.read()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    @pytest.mark.parametrize("codec", [CompressionCodec.ZLIB, CompressionCodec.LZMA])
+    def test_text_roundtrip_shrinks(self, codec, workers):
+        """Test that logs compress and decrypt back on every engine path."""
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            encrypted_path = self._encrypt(
+                self.text, compression=codec, workers=workers
+            )
+            assert self._decrypt(encrypted_path, workers) == self.text
+        assert os.path.getsize(encrypted_path) < len(self.text) // 4
+        assert get_file_metadata(encrypted_path)["compression"] == codec.value
+
+    def test_random_data_is_stored(self):
+        """Test that high-entropy chunks are stored with one byte of overhead."""
+        content = os.urandom(CHUNK_SIZE * 3)
+        plain_size = os.path.getsize(self._encrypt(content))
+        encrypted_path = self._encrypt(content, compression=CompressionCodec.ZLIB)
+        assert os.path.getsize(encrypted_path) == plain_size + 3
+        assert self._decrypt(encrypted_path) == content
+
+    def test_mixed_chunks_roundtrip(self):
+        """Test files mixing compressible and incompressible chunks."""
+        content = self.text[: CHUNK_SIZE * 2] + os.urandom(CHUNK_SIZE) + self.text
+        encrypted_path = self._encrypt(content, compression=CompressionCodec.ZLIB)
+        assert self._decrypt(encrypted_path) == content
+
+    def test_compressed_format_skips_whole_file(self):
+        """Test that a file with a JPEG signature is not compressed at all."""
+        content = b"\xff\xd8\xff\xe0" + self.text
+        encrypted_path = self._encrypt(content, compression=CompressionCodec.ZLIB)
+        assert get_file_metadata(encrypted_path)["compression"] is None
+        assert self._decrypt(encrypted_path) == content
+
+    def test_empty_file_roundtrip(self):
+        """Test compressing an empty file."""
+        encrypted_path = self._encrypt(b"", compression=CompressionCodec.ZLIB)
+        assert self._decrypt(encrypted_path) == b""
+
+    def test_random_access(self):
+        """Test that the reader seeks within compressed files."""
+        encrypted_path = self._encrypt(self.text, compression=CompressionCodec.ZLIB)
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            assert reader.size == len(self.text)
+            reader.seek(CHUNK_SIZE * 3 - 10)
+            assert (
+                reader.read(100) == self.text[CHUNK_SIZE * 3 - 10 : CHUNK_SIZE * 3 + 90]
+            )
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_verify(self, workers):
+        """Test verifying compressed files."""
+        encrypted_path = self._encrypt(self.text, compression=CompressionCodec.ZLIB)
+        with patch("src.crypto.verify.PARALLEL_MIN_FILE_SIZE", 0):
+            result = verify_file(encrypted_path, self.password, workers=workers)
+        assert result.success is True, result.error_message
+        assert result.bytes_verified == len(self.text)
+
+    def test_buffers(self):
+        """Test in-memory encryption with compression."""
+        encrypted = encrypt_bytes(
+            self.text, self.password, compression=CompressionCodec.ZLIB
+        )
+        assert len(encrypted) < len(self.text) // 4
+        assert get_plaintext_size(encrypted) == len(self.text)
+        assert decrypt_bytes(encrypted, self.password) == self.text
+        output = bytearray(len(self.text))
+        assert decrypt_into(encrypted, output, self.password) == len(self.text)
+        assert output == self.text
+
+    def test_writer_to_pipe(self):
+        """Test a compressed stream whose size is not known up front."""
+        sink = _PipeSink()
+        with EncryptedFileWriter(
+            sink, self.password, compression=CompressionCodec.ZLIB
+        ) as writer:
+            writer.write(self.text)
+        assert get_plaintext_size(bytes(sink.data)) is None
+        assert decrypt_bytes(bytes(sink.data), self.password) == self.text
+
+    def test_legacy_format_rejects_compression(self):
+        """Test that Fernet files cannot be compressed."""
+        result = encrypt_file_with_password(
+            self._temp_path(self.text),
+            self.password,
+            self._temp_path(),
+            format_version=LEGACY_FORMAT_VERSION,
+            compression=CompressionCodec.ZLIB,
+        )
+        assert result.success is False
+        assert "format version 3" in result.error_message
+
+
+class _PipeSink(io.RawIOBase):
+    """Write-only, unseekable sink that records everything written."""
+
+    def __init__(self):
+        """Initialize the sink."""
+        super().__init__()
+        self.data = bytearray()
+
+    def writable(self):
+        """Return True; the sink accepts writes."""
+        return True
+
+    def write(self, data):
+        """Record written data."""
+        self.data += data
+        return len(data)
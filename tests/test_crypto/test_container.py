@@ -0,0 +1,255 @@
+"""Tests for the version 3 and 4 container header."""
+
+import io
+import os
+
+import pytest
+
+from src.config.constants import (
+    CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    WRAPPED_KEY_SIZE,
+)
+from src.config.models import EncryptionMode, KdfAlgorithm
+from src.crypto.ciphers import CIPHER_AES_256_GCM
+from src.crypto.container import (
+    MAGIC,
+    ContainerHeader,
+    choose_chunk_size,
+    MAX_HEADER_SIZE,
+    has_magic,
+    read_header,
+    resolve_chunk_size,
+    unpack_header,
+)
+from src.crypto.digest import DIGEST_BLAKE2B
+from src.crypto.key_derivation import KdfParams
+
+
+class TestContainerHeader:
+    """Test header serialization and validation."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.header = ContainerHeader(
+            mode=EncryptionMode.PASSWORD,
+            cipher=CIPHER_AES_256_GCM,
+            salt=os.urandom(16),
+            original_extension=".txt",
+            kdf=KdfParams(KdfAlgorithm.SCRYPT, 1, 1024, 2),
+        )
+        self.key = os.urandom(32)
+        self.header.set_key_check(self.key)
+
+    def test_pack_read_roundtrip(self):
+        """Test that a packed header reads back unchanged."""
+        stream = io.BytesIO(self.header.pack() + b"frames")
+        assert read_header(stream) == self.header
+        assert stream.read() == b"frames"
+
+    def test_packed_header_starts_with_magic(self):
+        """Test magic byte detection."""
+        packed = self.header.pack()
+        assert packed.startswith(MAGIC)
+        assert has_magic(packed)
+        assert not has_magic(b"plain text file")
+
+    def test_to_metadata(self):
+        """Test the metadata dictionary view of a header."""
+        metadata = self.header.to_metadata()
+        assert metadata["original_extension"] == ".txt"
+        assert metadata["encryption_mode"] == "password"
+        assert metadata["cipher"] == CIPHER_AES_256_GCM
+        assert metadata["version"].startswith("3")
+        assert metadata["chunk_size"] == CHUNK_SIZE
+        assert metadata["kdf"] == "scrypt"
+
+    @pytest.mark.parametrize(
+        "kdf",
+        [
+            KdfParams(KdfAlgorithm.PBKDF2, 600000),
+            KdfParams(KdfAlgorithm.ARGON2ID, 2, 19 * 1024, 1),
+        ],
+    )
+    def test_kdf_roundtrip(self, kdf):
+        """Test that KDF parameters are recorded in the header."""
+        self.header.kdf = kdf
+        assert read_header(io.BytesIO(self.header.pack())).kdf == kdf
+
+    def test_keyfile_header_has_no_kdf(self):
+        """Test that keyfile headers carry no KDF parameters."""
+        self.header.mode = EncryptionMode.KEYFILE
+        self.header.kdf = None
+        assert read_header(io.BytesIO(self.header.pack())) == self.header
+
+    def test_key_check(self):
+        """Test that the key check accepts only the file key."""
+        header = read_header(io.BytesIO(self.header.pack()))
+        assert header.verify_key(self.key)
+        assert not header.verify_key(os.urandom(32))
+
+    def test_key_check_covers_fields(self):
+        """Test that changing a header field invalidates the key check."""
+        self.header.chunk_size = CHUNK_SIZE * 2
+        assert not self.header.verify_key(self.key)
+
+    def test_pack_without_key_check_fails(self):
+        """Test that a header cannot be written before its key check."""
+        self.header.key_check = b""
+        with pytest.raises(ValueError, match="key check"):
+            self.header.pack()
+
+    def test_pack_password_without_kdf_fails(self):
+        """Test that password headers must record their KDF."""
+        self.header.kdf = None
+        with pytest.raises(ValueError, match="KDF parameters"):
+            self.header.pack()
+
+    def test_read_excessive_kdf_cost_fails(self):
+        """Test that a header asking for too much memory is rejected."""
+        packed = bytearray(self.header.pack())
+        # Reason: the memory cost follows the KDF code and 4-byte time cost
+        packed[len(MAGIC) + 9 : len(MAGIC) + 13] = b"\xff\xff\xff\xff"
+        with pytest.raises(ValueError, match="memory cost"):
+            read_header(io.BytesIO(bytes(packed)))
+
+    def test_chunk_size_roundtrip(self):
+        """Test that a non-default chunk size is recorded in the header."""
+        self.header.chunk_size = 1024 * 1024
+        assert read_header(io.BytesIO(self.header.pack())).chunk_size == 1024 * 1024
+
+    @pytest.mark.parametrize(
+        "chunk_size", [MIN_CHUNK_SIZE // 2, MAX_CHUNK_SIZE * 2, 100000]
+    )
+    def test_pack_invalid_chunk_size_fails(self, chunk_size):
+        """Test that sizes outside the range or not a power of two fail."""
+        self.header.chunk_size = chunk_size
+        with pytest.raises(ValueError, match="Chunk size must be"):
+            self.header.pack()
+
+    def test_read_unsupported_chunk_size_fails(self):
+        """Test that a chunk size code outside the range is rejected."""
+        packed = bytearray(self.header.pack())
+        packed[len(MAGIC) + 3] = 40
+        with pytest.raises(ValueError, match="chunk size"):
+            read_header(io.BytesIO(bytes(packed)))
+
+    @pytest.mark.parametrize(
+        "size, count", [(0, 1), (1, 1), (CHUNK_SIZE, 1), (CHUNK_SIZE * 2 + 1, 3)]
+    )
+    def test_plaintext_size_roundtrip(self, size, count):
+        """Test that the plaintext size and chunk count are recorded."""
+        self.header.plaintext_size = size
+        self.header.set_key_check(self.key)
+        header = read_header(io.BytesIO(self.header.pack()))
+        assert header.plaintext_size == size
+        assert header.to_metadata()["chunk_count"] == count
+
+    def test_digest_roundtrip(self):
+        """Test that the digest algorithm is recorded in the header."""
+        assert read_header(io.BytesIO(self.header.pack())).digest is None
+        self.header.digest = DIGEST_BLAKE2B
+        self.header.set_key_check(self.key)
+        header = read_header(io.BytesIO(self.header.pack()))
+        assert header.to_metadata()["digest"] == DIGEST_BLAKE2B
+
+    def test_pack_unknown_digest_fails(self):
+        """Test that unsupported digest names are rejected."""
+        self.header.digest = "md5"
+        with pytest.raises(ValueError, match="Unsupported digest"):
+            self.header.pack()
+
+    def test_unknown_plaintext_size(self):
+        """Test that streams of unknown length have no size or count."""
+        metadata = read_header(io.BytesIO(self.header.pack())).to_metadata()
+        assert metadata["plaintext_size"] is None
+        assert metadata["chunk_count"] is None
+
+    def test_read_chunk_count_mismatch_fails(self):
+        """Test that a chunk count disagreeing with the size is rejected."""
+        self.header.plaintext_size = CHUNK_SIZE * 3
+        self.header.set_key_check(self.key)
+        packed = bytearray(self.header.pack())
+        size_offset = packed.index((CHUNK_SIZE * 3).to_bytes(8, "big"))
+        packed[size_offset : size_offset + 8] = (1).to_bytes(8, "big")
+        with pytest.raises(ValueError, match="chunk count"):
+            unpack_header(bytes(packed))
+
+    def test_unpack_from_probe(self):
+        """Test parsing a header from a fixed-size read with frame data."""
+        probe = (self.header.pack() + os.urandom(MAX_HEADER_SIZE))[:MAX_HEADER_SIZE]
+        assert unpack_header(probe) == self.header
+        self.header.original_extension = "." + "x" * 254
+        self.header.wrapped_key = os.urandom(WRAPPED_KEY_SIZE)
+        self.header.set_key_check(self.key)
+        assert len(self.header.pack()) == MAX_HEADER_SIZE
+        assert unpack_header(self.header.pack()) == self.header
+
+    def test_unicode_extension(self):
+        """Test that non-ASCII extensions survive a roundtrip."""
+        self.header.original_extension = ".dökümän"
+        assert read_header(io.BytesIO(self.header.pack())) == self.header
+
+    def test_read_non_container_fails(self):
+        """Test that files without the magic bytes are rejected."""
+        with pytest.raises(ValueError, match="Not an Entryptor container"):
+            read_header(io.BytesIO(b"\x00\x00\x00\x10{}"))
+
+    def test_read_truncated_header_fails(self):
+        """Test that a truncated header is rejected."""
+        packed = self.header.pack()
+        with pytest.raises(ValueError, match="Truncated container header"):
+            read_header(io.BytesIO(packed[:-2]))
+
+    def test_read_unsupported_version_fails(self):
+        """Test that an unknown format version is rejected."""
+        packed = bytearray(self.header.pack())
+        packed[len(MAGIC)] = 99
+        with pytest.raises(ValueError, match="Unsupported format version"):
+            read_header(io.BytesIO(bytes(packed)))
+
+    def test_read_unknown_cipher_fails(self):
+        """Test that an unknown cipher code is rejected."""
+        packed = bytearray(self.header.pack())
+        packed[len(MAGIC) + 2] = 200
+        with pytest.raises(ValueError, match="Unknown cipher code"):
+            read_header(io.BytesIO(bytes(packed)))
+
+    def test_pack_long_extension_fails(self):
+        """Test that extensions longer than 255 bytes are rejected."""
+        self.header.original_extension = "." + "x" * 300
+        with pytest.raises(ValueError, match="too long"):
+            self.header.pack()
+
+    def test_pack_bad_salt_fails(self):
+        """Test that a salt of the wrong size is rejected."""
+        self.header.salt = b"short"
+        with pytest.raises(ValueError, match="Salt must be"):
+            self.header.pack()
+
+
+class TestChunkSizeSelection:
+    """Test the adaptive chunk size."""
+
+    def test_small_files_use_minimum(self):
+        """Test that small files keep the minimum chunk size."""
+        assert choose_chunk_size(0) == MIN_CHUNK_SIZE
+        assert choose_chunk_size(10 * 1024 * 1024) == MIN_CHUNK_SIZE
+
+    def test_grows_with_file_size(self):
+        """Test that larger files get larger power-of-two chunks."""
+        assert choose_chunk_size(1024**3) == 1024 * 1024
+        assert choose_chunk_size(3 * 1024**3) == 2 * 1024 * 1024
+
+    def test_capped_at_maximum(self):
+        """Test that huge files stop at the maximum chunk size."""
+        assert choose_chunk_size(1024**4) == MAX_CHUNK_SIZE
+
+    def test_resolve_override(self):
+        """Test that an explicit size overrides the selection."""
+        assert resolve_chunk_size(None, 1024**3) == 1024 * 1024
+        assert resolve_chunk_size(0, 1024**3) == 1024 * 1024
+        assert resolve_chunk_size(256 * 1024, 0) == 256 * 1024
+        with pytest.raises(ValueError):
+            resolve_chunk_size(1000, 0)
@@ -0,0 +1,375 @@
+"""Tests for encrypting and decrypting container format files."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.crypto.container import MAGIC, read_header
+from src.crypto.encryption import (
+    encrypt_file_with_password,
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    decrypt_file_with_keyfile,
+    get_file_metadata,
+)
+from src.crypto.key_cache import clear_key_cache
+from src.crypto.key_derivation import (
+    ARGON2_AVAILABLE,
+    KdfParams,
+    default_kdf_params,
+)
+from src.crypto.secure_memory import SecurePassword
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import CipherAlgorithm, KdfAlgorithm
+
+
+class TestContainerFormat:
+    """Test the version 3 AES-256-GCM container format."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 3 + 500)
+        self.password = SecurePassword("test_password")
+        self.keyfile_data = b"test_keyfile_data_must_be_at_least_32_bytes_long"
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt(self, **kwargs) -> str:
+        """Encrypt the test content with the password and return the path."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        result = encrypt_file_with_password(
+            input_path, self.password, encrypted_path, **kwargs
+        )
+        assert result.success is True
+        return encrypted_path
+
+    def _decrypt(self, encrypted_path: str, **kwargs):
+        """Decrypt with the test password and return (result, plaintext)."""
+        decrypted_path = self._temp_path()
+        result = decrypt_file_with_password(
+            encrypted_path, self.password, decrypted_path, **kwargs
+        )
+        with open(decrypted_path, "rb") as f:
+            return result, f.read()
+
+    def _strip_index(self, path):
+        """Remove the chunk offset index footer, leaving only the frames."""
+        with open(path, "r+b") as f:
+            f.seek(-24, os.SEEK_END)
+            index_offset = int.from_bytes(f.read(8), byteorder="big")
+            f.truncate(index_offset - 4)
+
+    def test_new_files_use_container_format(self):
+        """Test that encryption writes the version 3 magic bytes."""
+        with open(self._encrypt(), "rb") as f:
+            assert f.read(len(MAGIC)) == MAGIC
+
+    def test_container_password_roundtrip(self):
+        """Test a multi-chunk password roundtrip."""
+        result, plaintext = self._decrypt(self._encrypt())
+        assert result.success is True
+        assert plaintext == self.test_content
+
+    def test_container_keyfile_roundtrip(self):
+        """Test a multi-chunk keyfile roundtrip."""
+        input_path = self._temp_path(self.test_content)
+        keyfile_path = self._temp_path(self.keyfile_data)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+
+        assert encrypt_file_with_keyfile(
+            input_path, keyfile_path, encrypted_path
+        ).success
+        result = decrypt_file_with_keyfile(encrypted_path, keyfile_path, decrypted_path)
+        assert result.success is True
+
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    def test_container_is_smaller_than_legacy(self):
+        """Test that raw GCM frames avoid the Fernet base64 expansion."""
+        container_size = os.path.getsize(self._encrypt())
+        legacy_size = os.path.getsize(
+            self._encrypt(format_version=LEGACY_FORMAT_VERSION)
+        )
+        assert container_size < len(self.test_content) + 512
+        assert container_size < legacy_size * 0.8
+
+    def test_legacy_format_still_decrypts(self):
+        """Test that format version 2 files remain readable."""
+        encrypted_path = self._encrypt(format_version=LEGACY_FORMAT_VERSION)
+        result, plaintext = self._decrypt(encrypted_path)
+        assert result.success is True
+        assert plaintext == self.test_content
+
+    def test_container_parallel_roundtrip(self):
+        """Test threaded encryption and positional decryption of GCM frames."""
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            encrypted_path = self._encrypt(workers=3)
+            result, plaintext = self._decrypt(encrypted_path, workers=3)
+        assert result.success is True
+        assert plaintext == self.test_content
+
+    def test_container_roundtrip_without_into_api(self):
+        """Test the update_into fallback used with older cryptography."""
+        with patch("src.crypto.ciphers._AEAD_INTO", False):
+            encrypted_path = self._encrypt(cipher=CipherAlgorithm.AES_256_GCM)
+            result, plaintext = self._decrypt(encrypted_path)
+        assert result.success is True
+        assert plaintext == self.test_content
+
+    def test_container_chunk_aligned_roundtrip(self):
+        """Test inputs ending exactly on a chunk boundary."""
+        self.test_content = os.urandom(CHUNK_SIZE * 2)
+        result, plaintext = self._decrypt(self._encrypt())
+        assert result.success is True
+        assert plaintext == self.test_content
+
+    def test_container_truncated_at_frame_boundary_fails(self):
+        """Test that dropping the final frame is detected."""
+        encrypted_path = self._encrypt()
+        self._strip_index(encrypted_path)
+        final_frame_size = 4 + (len(self.test_content) % CHUNK_SIZE) + 16
+        with open(encrypted_path, "r+b") as f:
+            f.truncate(os.path.getsize(encrypted_path) - final_frame_size)
+
+        result, _ = self._decrypt(encrypted_path)
+        assert result.success is False
+        assert "Decryption failed" in result.error_message
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_container_modified_frame_names_chunk(self, workers):
+        """Test that a tampered frame is reported by its chunk index."""
+        encrypted_path = self._encrypt()
+        with open(encrypted_path, "r+b") as f:
+            f.seek(CHUNK_SIZE * 3 // 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes((byte[0] ^ 1,)))
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result, _ = self._decrypt(encrypted_path, workers=workers)
+        assert result.success is False
+        assert result.error_message == (
+            "Decryption failed: Authentication failed for chunk 1"
+        )
+
+    def test_container_empty_file_roundtrip(self):
+        """Test that empty files get a single authenticated final frame."""
+        self.test_content = b""
+        encrypted_path = self._encrypt()
+        result, plaintext = self._decrypt(encrypted_path)
+        assert result.success is True
+        assert plaintext == b""
+
+    def test_container_header_only_fails(self):
+        """Test that a container with no frames is rejected."""
+        self.test_content = b""
+        encrypted_path = self._encrypt()
+        self._strip_index(encrypted_path)
+        with open(encrypted_path, "r+b") as f:
+            f.truncate(os.path.getsize(encrypted_path) - 4 - 16)
+
+        result, _ = self._decrypt(encrypted_path)
+        assert result.success is False
+        assert "no final frame" in result.error_message
+
+    def test_container_wrong_mode_fails(self):
+        """Test decrypting a password container with a keyfile."""
+        keyfile_path = self._temp_path(self.keyfile_data)
+        result = decrypt_file_with_keyfile(
+            self._encrypt(), keyfile_path, self._temp_path()
+        )
+        assert result.success is False
+        assert "not encrypted with keyfile mode" in result.error_message
+
+    def test_unsupported_format_version_fails(self):
+        """Test that unknown format versions are rejected."""
+        input_path = self._temp_path(self.test_content)
+        result = encrypt_file_with_password(
+            input_path, self.password, self._temp_path(), format_version=7
+        )
+        assert result.success is False
+        assert "Unsupported format version" in result.error_message
+
+    def test_chacha20_roundtrip_records_cipher(self):
+        """Test that the cipher choice is stored and honoured on decrypt."""
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            encrypted_path = self._encrypt(
+                cipher=CipherAlgorithm.CHACHA20_POLY1305, workers=2
+            )
+            result, plaintext = self._decrypt(encrypted_path, workers=2)
+
+        assert result.success is True
+        assert plaintext == self.test_content
+        assert get_file_metadata(encrypted_path)["cipher"] == "chacha20-poly1305"
+
+    def test_auto_cipher_selection(self):
+        """Test that AUTO records a concrete cipher in the header."""
+        encrypted_path = self._encrypt(cipher=CipherAlgorithm.AUTO)
+        assert get_file_metadata(encrypted_path)["cipher"] in (
+            "aes-256-gcm",
+            "chacha20-poly1305",
+        )
+
+    def test_get_file_metadata_container(self):
+        """Test reading metadata from a version 3 file."""
+        input_path = self._temp_path(self.test_content, suffix=".csv")
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path,
+            self.password,
+            encrypted_path,
+            cipher=CipherAlgorithm.AES_256_GCM,
+        ).success
+
+        metadata = get_file_metadata(encrypted_path)
+        assert metadata["original_extension"] == ".csv"
+        assert metadata["encryption_mode"] == "password"
+        assert metadata["cipher"] == "aes-256-gcm"
+
+    def test_get_file_metadata_records_size(self):
+        """Test that the header records the plaintext size and chunk count."""
+        metadata = get_file_metadata(self._encrypt())
+        assert metadata["plaintext_size"] == len(self.test_content)
+        assert metadata["chunk_count"] == 4
+
+    def test_get_file_metadata_legacy(self):
+        """Test that version 2 files are still identified."""
+        encrypted_path = self._encrypt(format_version=LEGACY_FORMAT_VERSION)
+        metadata = get_file_metadata(encrypted_path)
+        assert metadata["version"] == "2.0.0"
+        assert metadata["encryption_mode"] == "password"
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            b"",
+            b"plain text that is not encrypted\n" * 10,
+            b'\x00\x00\x00\x0f{"version": 1}',
+            os.urandom(4096),
+            b"\x89ENTRYPT" + os.urandom(200),
+        ],
+    )
+    def test_get_file_metadata_rejects_other_files(self, content):
+        """Test that files which are not Entryptor files are rejected."""
+        assert get_file_metadata(self._temp_path(content)) is None
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_custom_chunk_size_roundtrip(self, workers):
+        """Test that a chunk size override is recorded and honoured."""
+        self.test_content = os.urandom(CHUNK_SIZE * 20 + 77)
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            encrypted_path = self._encrypt(chunk_size=CHUNK_SIZE * 4, workers=workers)
+            result, plaintext = self._decrypt(encrypted_path, workers=workers)
+        assert result.success is True
+        assert plaintext == self.test_content
+        assert get_file_metadata(encrypted_path)["chunk_size"] == CHUNK_SIZE * 4
+
+    def test_custom_chunk_size_serial_roundtrip(self):
+        """Test a large chunk size on the serial path."""
+        encrypted_path = self._encrypt(chunk_size=CHUNK_SIZE * 2)
+        result, plaintext = self._decrypt(encrypted_path)
+        assert result.success is True
+        assert plaintext == self.test_content
+
+    def test_adaptive_chunk_size(self):
+        """Test that the chunk size is chosen from the file size."""
+        with patch("src.crypto.container.TARGET_CHUNK_COUNT", 1):
+            encrypted_path = self._encrypt()
+            result, plaintext = self._decrypt(encrypted_path)
+        assert result.success is True
+        assert plaintext == self.test_content
+        assert get_file_metadata(encrypted_path)["chunk_size"] == CHUNK_SIZE * 2
+
+    def test_invalid_chunk_size_fails(self):
+        """Test that an unsupported chunk size override is reported."""
+        input_path = self._temp_path(self.test_content)
+        result = encrypt_file_with_password(
+            input_path, self.password, self._temp_path(), chunk_size=1000
+        )
+        assert result.success is False
+        assert "Chunk size must be" in result.error_message
+
+    @pytest.mark.parametrize(
+        "kdf",
+        [
+            KdfParams(KdfAlgorithm.PBKDF2, 1000),
+            KdfParams(KdfAlgorithm.SCRYPT, 1, 1024, 2),
+            KdfParams(KdfAlgorithm.ARGON2ID, 1, 1024, 2),
+        ],
+    )
+    def test_kdf_parameters_roundtrip(self, kdf):
+        """Test that decryption uses the KDF parameters stored in the file."""
+        if kdf.algorithm == KdfAlgorithm.ARGON2ID and not ARGON2_AVAILABLE:
+            pytest.skip("Argon2id is not supported by this cryptography")
+        encrypted_path = self._encrypt(kdf=kdf)
+        clear_key_cache()
+        result, plaintext = self._decrypt(encrypted_path)
+        assert result.success is True
+        assert plaintext == self.test_content
+        with open(encrypted_path, "rb") as f:
+            assert read_header(f).kdf == kdf
+
+    def test_default_kdf_recorded(self):
+        """Test that new password files record a memory-hard KDF."""
+        metadata = get_file_metadata(self._encrypt())
+        assert metadata["kdf"] == default_kdf_params().algorithm.value
+        assert metadata["kdf"] in ("argon2id", "scrypt")
+
+    def test_wrong_password_creates_no_output(self):
+        """Test that the key check rejects a wrong password up front."""
+        encrypted_path = self._encrypt()
+        output_path = self._temp_path()
+        os.unlink(output_path)
+
+        with patch("src.crypto.decryption.decrypt_frames") as decrypt:
+            result = decrypt_file_with_password(
+                encrypted_path, SecurePassword("wrong_password"), output_path
+            )
+        assert result.success is False
+        assert "Incorrect password" in result.error_message
+        assert not decrypt.called
+        assert not os.path.exists(output_path)
+
+    def test_wrong_keyfile_creates_no_output(self):
+        """Test that the key check rejects a wrong keyfile up front."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_keyfile(
+            input_path, self._temp_path(self.keyfile_data), encrypted_path
+        ).success
+        output_path = self._temp_path()
+        os.unlink(output_path)
+
+        result = decrypt_file_with_keyfile(
+            encrypted_path, self._temp_path(os.urandom(64)), output_path
+        )
+        assert result.success is False
+        assert "Incorrect keyfile" in result.error_message
+        assert not os.path.exists(output_path)
+
+    def test_modified_header_fails_key_check(self):
+        """Test that the key check also authenticates the header fields."""
+        input_path = self._temp_path(self.test_content, suffix=".txt")
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path, self.password, encrypted_path
+        ).success
+        with open(encrypted_path, "r+b") as f:
+            data = f.read()
+            f.seek(data.index(b".txt"))
+            f.write(b".exe")
+
+        result, _ = self._decrypt(encrypted_path)
+        assert result.success is False
+        assert "Incorrect password" in result.error_message
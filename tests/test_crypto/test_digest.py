@@ -0,0 +1,175 @@
+"""Tests for the end-to-end plaintext digest."""
+
+import hashlib
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.crypto.buffers import decrypt_bytes, decrypt_into, encrypt_bytes
+from src.crypto.digest import (
+    DIGEST_BLAKE2B,
+    DIGEST_RECORD_SIZE,
+    hash_file,
+    open_digest,
+    seal_digest,
+)
+from src.crypto.encryption import (
+    DecryptionError,
+    decrypt_file_with_password,
+    encrypt_file_with_password,
+    get_file_metadata,
+)
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.verify import compare_file, verify_file
+from src.crypto.writer import EncryptedFileWriter
+
+# Footer trailer after the digest record: index offset, frame count, magic
+_TRAILER_SIZE = 24
+
+
+class TestPlaintextDigest:
+    """Test computing, storing and checking the plaintext digest."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 3 + 99)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt(self, **kwargs) -> str:
+        """Encrypt the test content with the password and return the path."""
+        encrypted_path = self._temp_path()
+        kwargs.setdefault("chunk_size", CHUNK_SIZE)
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content), self.password, encrypted_path, **kwargs
+        ).success
+        return encrypted_path
+
+    def _tamper_record(self, path: str) -> None:
+        """Flip one byte of the stored digest."""
+        with open(path, "r+b") as f:
+            f.seek(-(_TRAILER_SIZE + DIGEST_RECORD_SIZE), os.SEEK_END)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 1]))
+
+    def test_record_roundtrip(self):
+        """Test sealing and opening a digest record."""
+        key, nonce = os.urandom(32), os.urandom(16)
+        digest = hashlib.blake2b(b"data").digest()
+        record = seal_digest(key, nonce, digest)
+        assert len(record) == DIGEST_RECORD_SIZE
+        assert open_digest(key, nonce, record) == digest
+        with pytest.raises(ValueError, match="modified"):
+            open_digest(os.urandom(32), nonce, record)
+        with pytest.raises(ValueError, match="missing"):
+            open_digest(key, nonce, None)
+
+    def test_hash_file_matches_hashlib(self):
+        """Test that hash_file equals a BLAKE2b-512 of the contents."""
+        path = self._temp_path(self.test_content)
+        assert hash_file(path) == hashlib.blake2b(self.test_content).digest()
+
+    def test_header_records_digest(self):
+        """Test that new files announce their digest algorithm."""
+        assert get_file_metadata(self._encrypt())["digest"] == DIGEST_BLAKE2B
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_decrypt_checks_digest(self, workers):
+        """Test that decryption recomputes and checks the stored digest."""
+        encrypted_path = self._encrypt()
+        decrypted_path = self._temp_path()
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, workers=workers
+            )
+        assert result.success is True, result.error_message
+
+        self._tamper_record(encrypted_path)
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, workers=workers
+            )
+        assert result.success is False
+        assert "digest" in result.error_message
+
+    def test_buffers_check_digest(self):
+        """Test the digest check of in-memory decryption."""
+        encrypted = bytearray(encrypt_bytes(self.test_content, self.password))
+        assert decrypt_bytes(encrypted, self.password) == self.test_content
+
+        encrypted[-(_TRAILER_SIZE + DIGEST_RECORD_SIZE)] ^= 1
+        output = bytearray(len(self.test_content))
+        with pytest.raises(DecryptionError, match="digest"):
+            decrypt_into(encrypted, output, self.password)
+        assert output == bytearray(len(output))
+
+    def test_writer_stores_digest(self):
+        """Test that streamed output stores the digest of all writes."""
+        sink = io.BytesIO()
+        with EncryptedFileWriter(sink, self.password) as writer:
+            writer.write(self.test_content[:1000])
+            writer.write(self.test_content[1000:])
+        result = verify_file(self._temp_path(sink.getvalue()), self.password)
+        assert result.success is True, result.error_message
+        expected = hashlib.blake2b(self.test_content).hexdigest()
+        assert result.plaintext_digest == expected
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_verify_detects_modified_digest(self, workers):
+        """Test that verification fails on a modified digest record."""
+        encrypted_path = self._encrypt()
+        self._tamper_record(encrypted_path)
+        with patch("src.crypto.verify.PARALLEL_MIN_FILE_SIZE", 0):
+            result = verify_file(encrypted_path, self.password, workers=workers)
+        assert result.success is False
+        assert "digest" in result.error_message
+
+    def test_compare_matching_source(self):
+        """Test comparing an encrypted file with its original."""
+        source_path = self._temp_path(self.test_content)
+        result = compare_file(self._encrypt(), source_path, self.password)
+        assert result.success is True, result.error_message
+        assert result.bytes_verified == len(self.test_content)
+
+    def test_compare_different_source(self):
+        """Test that a same-sized but different source fails."""
+        changed = bytearray(self.test_content)
+        changed[CHUNK_SIZE + 5] ^= 1
+        source_path = self._temp_path(bytes(changed))
+        result = compare_file(self._encrypt(), source_path, self.password)
+        assert result.success is False
+        assert "differs from the source" in result.error_message
+
+    def test_compare_size_mismatch_fails_fast(self):
+        """Test that a source of another size fails before any frame is read."""
+        source_path = self._temp_path(self.test_content[:-1])
+        result = compare_file(self._encrypt(), source_path, self.password)
+        assert result.success is False
+        assert "source has" in result.error_message
+        assert result.bytes_verified == 0
+
+    def test_compare_legacy_file(self):
+        """Test comparing a version 2 file, which stores no digest."""
+        encrypted_path = self._encrypt(format_version=LEGACY_FORMAT_VERSION)
+        source_path = self._temp_path(self.test_content)
+        assert compare_file(encrypted_path, source_path, self.password).success
+        other_path = self._temp_path(os.urandom(len(self.test_content)))
+        assert not compare_file(encrypted_path, other_path, self.password).success
+
+    def test_compare_missing_source_fails(self):
+        """Test that a missing source file is reported."""
+        result = compare_file(self._encrypt(), "/nonexistent/file", self.password)
+        assert result.success is False
+        assert "File not found" in result.error_message
@@ -0,0 +1,193 @@
+"""Tests for encrypted frame helpers."""
+
+import io
+import os
+import tempfile
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.crypto.ciphers import fernet_token_length
+from src.crypto.framing import (
+    iter_chunk_batches,
+    load_frame_index,
+    read_frame,
+    read_frame_index,
+    read_frame_length,
+    read_into_full,
+    scan_frames,
+    write_frame,
+    write_frame_index,
+)
+
+
+class TestFraming:
+    """Test frame writing, batching and scanning."""
+
+    def test_fernet_token_length_matches_fernet(self):
+        """Test the token length formula against real tokens."""
+        fernet = Fernet(Fernet.generate_key())
+        for length in (0, 1, 15, 16, 17, 1000, 64 * 1024):
+            token = fernet.encrypt(b"x" * length)
+            assert fernet_token_length(length) == len(token)
+
+    def test_iter_chunk_batches(self):
+        """Test batching a stream into indexed fixed-size chunks."""
+        stream = io.BytesIO(b"abcdefghij")
+        batches = list(iter_chunk_batches(stream, 3, 2, terminated=False))
+        assert batches == [(0, [b"abc", b"def"], False), (2, [b"ghi", b"j"], True)]
+
+    def test_iter_chunk_batches_flags_last_full_batch(self):
+        """Test that the last batch is flagged when it ends on a boundary."""
+        stream = io.BytesIO(b"abcdef")
+        batches = list(iter_chunk_batches(stream, 3, 2, terminated=True))
+        assert batches == [(0, [b"abc", b"def"], True)]
+
+    def test_iter_chunk_batches_empty(self):
+        """Test batching an empty stream."""
+        assert list(iter_chunk_batches(io.BytesIO(b""), 3, 2, False)) == []
+
+    def test_iter_chunk_batches_empty_terminated(self):
+        """Test that terminated streams always yield a final chunk."""
+        batches = list(iter_chunk_batches(io.BytesIO(b""), 3, 2, terminated=True))
+        assert batches == [(0, [b""], True)]
+
+    def test_read_frame(self):
+        """Test reading frames back until end of stream."""
+        stream = io.BytesIO()
+        write_frame(stream, b"first")
+        write_frame(stream, b"second")
+        stream.seek(0)
+        assert read_frame(stream) == b"first"
+        assert read_frame(stream) == b"second"
+        assert read_frame(stream) is None
+
+    def test_read_frame_stops_at_index(self):
+        """Test that the end-of-frames marker ends the frame stream."""
+        stream = io.BytesIO()
+        write_frame(stream, b"only")
+        write_frame_index(stream, [4])
+        stream.seek(0)
+        assert read_frame(stream) == b"only"
+        assert read_frame(stream) is None
+
+    def test_read_into_full_handles_short_reads(self):
+        """Test that short reads are retried until the buffer is full."""
+
+        class Trickle(io.RawIOBase):
+            def __init__(self, data):
+                self.data = io.BytesIO(data)
+
+            def readinto(self, buffer):
+                return self.data.readinto(memoryview(buffer)[:3])
+
+        buffer = bytearray(10)
+        assert read_into_full(Trickle(b"abcdefgh"), memoryview(buffer)) == 8
+        assert buffer[:8] == b"abcdefgh"
+
+    def test_read_frame_length(self):
+        """Test reading length prefixes into a reused buffer."""
+        stream = io.BytesIO()
+        write_frame(stream, b"x" * 300)
+        write_frame_index(stream, [4])
+        stream.seek(0)
+        prefix = memoryview(bytearray(4))
+        assert read_frame_length(stream, prefix) == 300
+        stream.seek(304)
+        assert read_frame_length(stream, prefix) is None
+        with pytest.raises(ValueError, match="Truncated frame header"):
+            read_frame_length(io.BytesIO(b"\x00\x01"), prefix)
+
+    def test_read_frame_truncated_fails(self):
+        """Test that a frame shorter than its length prefix is rejected."""
+        stream = io.BytesIO()
+        write_frame(stream, b"complete frame")
+        stream.truncate(8)
+        stream.seek(0)
+        with pytest.raises(ValueError, match="Truncated frame"):
+            read_frame(stream)
+
+    def test_scan_frames(self):
+        """Test locating frames from their length prefixes."""
+        with tempfile.TemporaryFile() as f:
+            f.write(b"HEADER")
+            for frame in (b"one", b"two", b"three"):
+                write_frame(f, frame)
+            f.flush()
+
+            offsets, lengths = scan_frames(f, data_offset=6)
+
+            assert list(lengths) == [3, 3, 5]
+            for offset, length, frame in zip(
+                offsets, lengths, (b"one", b"two", b"three")
+            ):
+                f.seek(offset)
+                assert f.read(length) == frame
+
+    def test_scan_frames_truncated_payload_fails(self):
+        """Test that a frame running past the end of file is rejected."""
+        with tempfile.TemporaryFile() as f:
+            write_frame(f, os.urandom(20))
+            f.truncate(10)
+            with pytest.raises(ValueError, match="Truncated frame"):
+                scan_frames(f, data_offset=0)
+
+    def test_scan_frames_truncated_length_fails(self):
+        """Test that a partial length prefix is rejected."""
+        with tempfile.TemporaryFile() as f:
+            write_frame(f, b"abc")
+            f.write(b"\x00\x00")
+            f.flush()
+            with pytest.raises(ValueError, match="Truncated frame header"):
+                scan_frames(f, data_offset=0)
+
+
+class TestFrameIndex:
+    """Test the chunk offset index footer."""
+
+    def _write_frames(self, f, frames):
+        """Write a header and frames followed by the index footer."""
+        f.write(b"HEADER")
+        offsets = []
+        for frame in frames:
+            offsets.append(f.tell() + 4)
+            write_frame(f, frame)
+        write_frame_index(f, offsets)
+        f.flush()
+        return offsets
+
+    def test_index_roundtrip(self):
+        """Test that the footer matches a length-prefix scan."""
+        with tempfile.TemporaryFile() as f:
+            offsets = self._write_frames(f, [b"one", b"two", b"three"])
+
+            index_offsets, lengths = read_frame_index(f, data_offset=6)
+            assert list(index_offsets) == offsets
+            assert list(lengths) == [3, 3, 5]
+            assert scan_frames(f, data_offset=6) == (index_offsets, lengths)
+
+    def test_missing_index_falls_back_to_scan(self):
+        """Test that files without a footer are scanned instead."""
+        with tempfile.TemporaryFile() as f:
+            f.write(b"HEADER")
+            write_frame(f, b"one")
+            f.flush()
+
+            assert read_frame_index(f, data_offset=6) is None
+            _, lengths = load_frame_index(f, data_offset=6)
+            assert list(lengths) == [3]
+
+    def test_empty_index(self):
+        """Test a footer with no frames."""
+        with tempfile.TemporaryFile() as f:
+            self._write_frames(f, [])
+            offsets, lengths = read_frame_index(f, data_offset=6)
+            assert len(offsets) == 0
+            assert len(lengths) == 0
+
+    def test_inconsistent_index_fails(self):
+        """Test that a footer pointing outside the frames is rejected."""
+        with tempfile.TemporaryFile() as f:
+            self._write_frames(f, [b"one", b"two"])
+            with pytest.raises(ValueError, match="Corrupt chunk offset index"):
+                read_frame_index(f, data_offset=2)
@@ -0,0 +1,172 @@
+"""Tests for the bulk inventory scanner."""
+
+import csv
+import json
+import os
+
+import pytest
+
+from src.config.constants import DIRECT_KEY_FORMAT_VERSION, LEGACY_FORMAT_VERSION
+from src.crypto.encryption import (
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.inventory import probe_file, scan_inventory, walk_files
+from src.crypto.secure_memory import SecurePassword
+
+
+class TestInventoryScanner:
+    """Test scanning directory trees for encrypted files."""
+
+    @pytest.fixture(autouse=True)
+    def _build_tree(self, tmp_path, temp_file):
+        """Build a tree of plain and encrypted files in a temporary directory."""
+        self.directory = str(tmp_path)
+        self.root = os.path.join(self.directory, "tree")
+        self.password = SecurePassword("test_password")
+        self.content = os.urandom(5000)
+
+        plain_path = self._write("a/plain.txt", b"not encrypted")
+        self._write("a/b/empty.dat", b"")
+        self._write("c/notes.json", b'{"version": "2.0.0"}')
+        for name, kwargs in (
+            ("a/b/v3.enc", {"format_version": DIRECT_KEY_FORMAT_VERSION}),
+            ("c/v2.enc", {"format_version": LEGACY_FORMAT_VERSION}),
+        ):
+            source = self._write(name + ".src", self.content)
+            assert encrypt_file_with_password(
+                source, self.password, os.path.join(self.root, name), **kwargs
+            ).success
+            os.unlink(source)
+        keyfile_path = temp_file(b"k" * 64, name="test.key")
+        assert encrypt_file_with_keyfile(
+            plain_path, keyfile_path, os.path.join(self.root, "z.enc")
+        ).success
+        self.output = os.path.join(self.directory, "inventory.jsonl")
+        yield
+        self.password.clear()
+
+    def _write(self, relative: str, content: bytes) -> str:
+        """Create a file in the tree and return its path."""
+        path = os.path.join(self.root, *relative.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _records(self):
+        """Read the JSON lines output."""
+        with open(self.output, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def _relative(self, records):
+        """Paths of records relative to the tree root."""
+        return [
+            os.path.relpath(r["path"], self.root).replace(os.sep, "/") for r in records
+        ]
+
+    def test_walk_is_sorted_and_complete(self):
+        """Test that every file is walked once in sorted order."""
+        paths = [os.path.relpath(p, self.root) for p, _ in walk_files(self.root)]
+        assert [p.replace(os.sep, "/") for p in paths] == [
+            "a/b/empty.dat",
+            "a/b/v3.enc",
+            "a/plain.txt",
+            "c/notes.json",
+            "c/v2.enc",
+            "z.enc",
+        ]
+
+    def test_probe_identifies_files(self):
+        """Test the fields reported for each kind of file."""
+        v3 = probe_file(os.path.join(self.root, "a", "b", "v3.enc"))
+        assert v3.encrypted and v3.format_version == 3
+        assert v3.encryption_mode == "password"
+        assert v3.plaintext_size == len(self.content)
+        assert v3.chunk_count == 1
+
+        v2 = probe_file(os.path.join(self.root, "c", "v2.enc"))
+        assert v2.encrypted and v2.format_version == 2
+        assert v2.plaintext_size is None
+
+        keyfile = probe_file(os.path.join(self.root, "z.enc"))
+        assert keyfile.encryption_mode == "keyfile"
+
+        notes = probe_file(os.path.join(self.root, "c", "notes.json"))
+        assert notes.encrypted is False
+        assert notes.size == len(b'{"version": "2.0.0"}')
+
+    def test_probe_reports_errors(self):
+        """Test that unreadable files are reported instead of skipped."""
+        entry = probe_file(os.path.join(self.root, "missing"))
+        assert entry.encrypted is False
+        assert entry.error
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_scan_jsonl(self, workers):
+        """Test a full scan to JSON lines."""
+        reports = []
+        stats = scan_inventory(
+            self.root, self.output, workers=workers, progress=reports.append
+        )
+        records = self._records()
+        assert len(records) == stats.files == 6
+        assert stats.encrypted_files == 3
+        assert stats.errors == 0
+        assert reports[-1] is stats and stats.files_per_second > 0
+        assert self._relative(records)[0] == "a/b/empty.dat"
+        assert sum(r["encrypted"] for r in records) == 3
+
+    def test_scan_csv(self):
+        """Test a full scan to CSV."""
+        self.output = os.path.join(self.directory, "inventory.csv")
+        scan_inventory(self.root, self.output, output_format="csv")
+        with open(self.output, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 6
+        assert {row["format_version"] for row in rows} == {"", "2", "3", "4"}
+
+    def test_resume_continues_after_last_record(self):
+        """Test that an interrupted scan resumes without duplicates."""
+        scan_inventory(self.root, self.output)
+        with open(self.output, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        # Simulate a run killed in the middle of its fourth record
+        with open(self.output, "w", encoding="utf-8") as f:
+            f.writelines(lines[:3])
+            f.write(lines[3][:10])
+
+        stats = scan_inventory(self.root, self.output, resume=True)
+        assert stats.files == 3
+        assert self._relative([{"path": stats.resumed_after}]) == ["a/plain.txt"]
+        assert [json.loads(line) for line in lines] == self._records()
+
+    def test_resume_csv_keeps_single_header(self):
+        """Test resuming a CSV inventory."""
+        self.output = os.path.join(self.directory, "inventory.csv")
+        scan_inventory(self.root, self.output, output_format="csv")
+        with open(self.output, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        with open(self.output, "w", encoding="utf-8") as f:
+            f.writelines(lines[:2])
+
+        scan_inventory(self.root, self.output, output_format="csv", resume=True)
+        with open(self.output, "r", encoding="utf-8") as f:
+            assert f.readlines() == lines
+
+    def test_resume_without_output_scans_everything(self):
+        """Test that resuming with no earlier output is a full scan."""
+        stats = scan_inventory(self.root, self.output, resume=True)
+        assert stats.files == 6
+        assert stats.resumed_after is None
+
+    def test_unreadable_directory_is_reported(self):
+        """Test that a missing root is reported as an error record."""
+        stats = scan_inventory(os.path.join(self.root, "missing"), self.output)
+        assert stats.errors == 1
+        assert self._records()[0]["error"]
+
+    def test_invalid_format_fails(self):
+        """Test that unknown output formats are rejected."""
+        with pytest.raises(ValueError, match="Unsupported inventory format"):
+            scan_inventory(self.root, self.output, output_format="xml")
@@ -0,0 +1,214 @@
+"""Tests for KDF cost calibration."""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import KDF_MIN_PBKDF2_ITERATIONS, KDF_PROFILE_ENV
+from src.config.models import KdfAlgorithm, KdfProfile
+from src.crypto.container import read_header
+from src.crypto.encryption import encrypt_file_with_password
+from src.crypto.kdf_calibration import (
+    calibrate_kdf,
+    clear_calibration_cache,
+    get_calibrated_kdf_params,
+    start_calibration,
+    stored_kdf_params,
+)
+from src.crypto.key_derivation import TEST_KDF_PARAMS, KdfParams, default_kdf_params
+from src.crypto.secure_memory import SecurePassword
+
+
+def _model_time(params: KdfParams) -> float:
+    """Simulated derivation time of a machine, linear in the cost."""
+    if params.algorithm == KdfAlgorithm.PBKDF2:
+        return params.time_cost / 1_000_000
+    # 100ms per pass over 64MB
+    return params.time_cost * params.memory_cost / (64 * 1024) * 0.1
+
+
+class TestCalibrateKdf:
+    """Test picking costs for a target time."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.timer = patch(
+            "src.crypto.kdf_calibration._time_kdf", side_effect=_model_time
+        )
+        self.timer.start()
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.timer.stop()
+
+    @pytest.mark.parametrize(
+        "algorithm", [KdfAlgorithm.PBKDF2, KdfAlgorithm.SCRYPT, KdfAlgorithm.ARGON2ID]
+    )
+    @pytest.mark.parametrize("target", [0.25, 1.0])
+    def test_hits_target(self, algorithm, target):
+        """Test that calibrated costs take about the target time."""
+        params = calibrate_kdf(algorithm, target)
+        assert params.algorithm == algorithm
+        assert target / 2 <= _model_time(params) <= target * 1.5
+
+    def test_longer_target_costs_more(self):
+        """Test that the archival target raises the cost."""
+        interactive = calibrate_kdf(KdfAlgorithm.ARGON2ID, 0.25)
+        archival = calibrate_kdf(KdfAlgorithm.ARGON2ID, 1.0)
+        assert archival.time_cost > interactive.time_cost
+
+    def test_slow_machine_keeps_floor(self):
+        """Test that costs are not calibrated below the floor."""
+        self.timer.stop()
+        with patch("src.crypto.kdf_calibration._time_kdf", return_value=100.0):
+            params = calibrate_kdf(KdfAlgorithm.PBKDF2, 0.25)
+            argon2 = calibrate_kdf(KdfAlgorithm.ARGON2ID, 0.25)
+        self.timer.start()
+        assert params.time_cost == KDF_MIN_PBKDF2_ITERATIONS
+        assert argon2.time_cost == 1
+
+    def test_invalid_target_fails(self):
+        """Test that a non-positive target is rejected."""
+        with pytest.raises(ValueError, match="target must be positive"):
+            calibrate_kdf(KdfAlgorithm.SCRYPT, 0)
+
+
+class TestCalibrationPersistence:
+    """Test storing and reusing calibrations."""
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, tmp_path, temp_file):
+        """Keep each test's calibration file in its own temporary directory."""
+        self.path = str(tmp_path / "kdf_calibration.json")
+        self._temp_path = temp_file
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        clear_calibration_cache()
+        self.env = patch.dict(os.environ, {KDF_PROFILE_ENV: ""})
+        self.env.start()
+        self.timer = patch(
+            "src.crypto.kdf_calibration._time_kdf", side_effect=_model_time
+        )
+        self.measure = self.timer.start()
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.timer.stop()
+        self.env.stop()
+        clear_calibration_cache()
+
+    def test_persisted_and_reused(self):
+        """Test that a calibration is measured once and read back later."""
+        params = get_calibrated_kdf_params(
+            KdfAlgorithm.SCRYPT, KdfProfile.INTERACTIVE, self.path
+        )
+        assert os.path.exists(self.path)
+        clear_calibration_cache()
+        calls = self.measure.call_count
+
+        again = get_calibrated_kdf_params(
+            KdfAlgorithm.SCRYPT, KdfProfile.INTERACTIVE, self.path
+        )
+        assert again == params
+        assert self.measure.call_count == calls
+
+    def test_profiles_are_stored_separately(self):
+        """Test that each profile gets its own entry."""
+        interactive = get_calibrated_kdf_params(
+            KdfAlgorithm.PBKDF2, KdfProfile.INTERACTIVE, self.path
+        )
+        archival = get_calibrated_kdf_params(
+            KdfAlgorithm.PBKDF2, KdfProfile.ARCHIVAL, self.path
+        )
+        assert archival.time_cost > interactive.time_cost
+        with open(self.path, "r", encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+        assert set(entries) == {"pbkdf2-sha256/interactive", "pbkdf2-sha256/archival"}
+
+    def test_other_host_recalibrates(self):
+        """Test that a calibration copied from another machine is ignored."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "host": {"node": "elsewhere"},
+                    "entries": {
+                        "pbkdf2-sha256/interactive": {
+                            "time_cost": 5000000,
+                            "memory_cost": 0,
+                            "parallelism": 1,
+                        }
+                    },
+                },
+                f,
+            )
+        params = get_calibrated_kdf_params(
+            KdfAlgorithm.PBKDF2, KdfProfile.INTERACTIVE, self.path
+        )
+        assert params.time_cost != 5000000
+        assert self.measure.called
+
+    def test_corrupted_file_recalibrates(self):
+        """Test that an unreadable calibration file is replaced."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        params = get_calibrated_kdf_params(
+            KdfAlgorithm.SCRYPT, KdfProfile.INTERACTIVE, self.path
+        )
+        assert params.algorithm == KdfAlgorithm.SCRYPT
+        with open(self.path, "r", encoding="utf-8") as f:
+            assert "scrypt/interactive" in json.load(f)["entries"]
+
+    def test_test_profile_skips_measuring(self):
+        """Test that the test profile returns minimal costs immediately."""
+        params = get_calibrated_kdf_params(
+            KdfAlgorithm.SCRYPT, KdfProfile.TEST, self.path
+        )
+        assert params == TEST_KDF_PARAMS[KdfAlgorithm.SCRYPT]
+        assert not self.measure.called
+        assert not os.path.exists(self.path)
+
+    def test_stored_params_never_measure(self):
+        """Test that lookups fall back to the defaults until calibrated."""
+        params = stored_kdf_params(KdfAlgorithm.SCRYPT, calibration_path=self.path)
+        assert params == default_kdf_params(KdfAlgorithm.SCRYPT)
+        assert not self.measure.called
+        assert not os.path.exists(self.path)
+
+        calibrated = get_calibrated_kdf_params(
+            KdfAlgorithm.SCRYPT, calibration_path=self.path
+        )
+        clear_calibration_cache()
+        again = stored_kdf_params(KdfAlgorithm.SCRYPT, calibration_path=self.path)
+        assert again == calibrated
+
+    def test_start_calibration_stores_result(self):
+        """Test that a background calibration is stored for later calls."""
+        thread = start_calibration(KdfAlgorithm.PBKDF2, calibration_path=self.path)
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        with open(self.path, "r", encoding="utf-8") as f:
+            assert "pbkdf2-sha256/interactive" in json.load(f)["entries"]
+
+    def test_library_default_uses_calibration(self):
+        """Test that encrypting without kdf records the stored calibration."""
+        self.timer.stop()
+        with patch("src.crypto.kdf_calibration._time_kdf", return_value=100.0):
+            calibrated = get_calibrated_kdf_params(calibration_path=self.path)
+        self.timer.start()
+        assert calibrated != default_kdf_params()
+
+        input_path = self._temp_path(b"calibrated", suffix=".txt")
+        with (
+            patch(
+                "src.crypto.kdf_calibration.get_kdf_calibration_file_path",
+                return_value=self.path,
+            ),
+            SecurePassword("test_password") as password,
+        ):
+            result = encrypt_file_with_password(input_path, password)
+        assert result.success is True
+        with open(result.output_path, "rb") as f:
+            assert read_header(f).kdf == calibrated
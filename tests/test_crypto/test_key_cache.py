@@ -0,0 +1,176 @@
+"""Tests for the session master key cache."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.models import KdfAlgorithm
+from src.crypto.container import read_header
+from src.crypto.encryption import (
+    decrypt_file_with_password,
+    encrypt_file_with_password,
+)
+from src.crypto.key_cache import (
+    KeyCache,
+    clear_key_cache,
+    get_key_cache,
+    password_fingerprint,
+)
+from src.crypto.key_derivation import (
+    LEGACY_KDF_PARAMS,
+    KdfParams,
+    derive_key_from_password,
+)
+from src.crypto.secure_memory import SecurePassword
+
+
+KDF = LEGACY_KDF_PARAMS
+
+
+class TestKeyCache:
+    """Test cache expiry, eviction and zeroization."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.now = 1000.0
+        self.clock = patch(
+            "src.crypto.key_cache.time.monotonic", side_effect=lambda: self.now
+        )
+        self.clock.start()
+        self.cache = KeyCache(ttl=60, max_entries=2)
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.cache.clear()
+        self.clock.stop()
+
+    def test_get_and_put(self):
+        """Test storing and looking up a key."""
+        self.cache.put(b"fp", b"salt", KDF, b"k" * 32)
+        assert self.cache.get(b"fp", b"salt", KDF) == b"k" * 32
+        assert self.cache.get(b"fp", b"other", KDF) is None
+        assert self.cache.get(b"other", b"salt", KDF) is None
+
+    def test_entries_expire_and_are_zeroized(self):
+        """Test that entries vanish and are wiped after the TTL."""
+        self.cache.put(b"fp", b"salt", KDF, b"k" * 32)
+        stored = self.cache._entries[(b"fp", b"salt", KDF)][0]
+
+        self.now += 61
+        assert self.cache.get(b"fp", b"salt", KDF) is None
+        assert stored == bytes(32)
+        assert len(self.cache) == 0
+
+    def test_oldest_entry_is_evicted(self):
+        """Test the entry limit."""
+        for salt in (b"a", b"b", b"c"):
+            self.cache.put(b"fp", salt, KDF, salt * 32)
+        assert self.cache.get(b"fp", b"a", KDF) is None
+        assert self.cache.get(b"fp", b"c", KDF) == b"c" * 32
+
+    def test_session_salt_is_newest_live_salt(self):
+        """Test that the newest salt of a password is reused."""
+        assert self.cache.session_salt(b"fp", KDF) is None
+        self.cache.put(b"fp", b"a", KDF, b"k" * 32)
+        self.cache.put(b"other", b"b", KDF, b"k" * 32)
+        assert self.cache.session_salt(b"fp", KDF) == b"a"
+
+    def test_keys_are_separated_by_kdf(self):
+        """Test that different KDF parameters do not share entries."""
+        other = KdfParams(KdfAlgorithm.SCRYPT, 1, 1024)
+        self.cache.put(b"fp", b"salt", KDF, b"k" * 32)
+        assert self.cache.get(b"fp", b"salt", other) is None
+        assert self.cache.session_salt(b"fp", other) is None
+
+    def test_clear_zeroizes(self):
+        """Test that clearing wipes the stored keys."""
+        self.cache.put(b"fp", b"salt", KDF, b"k" * 32)
+        stored = self.cache._entries[(b"fp", b"salt", KDF)][0]
+        self.cache.clear()
+        assert stored == bytes(32)
+        assert len(self.cache) == 0
+
+    def test_zero_ttl_disables_cache(self):
+        """Test that a zero TTL stores nothing."""
+        cache = KeyCache(ttl=0)
+        cache.put(b"fp", b"salt", KDF, b"k" * 32)
+        assert cache.get(b"fp", b"salt", KDF) is None
+
+    def test_fingerprint_depends_on_password(self):
+        """Test that fingerprints identify passwords without revealing them."""
+        first = password_fingerprint(SecurePassword("one"))
+        assert first == password_fingerprint(SecurePassword("one"))
+        assert first != password_fingerprint(SecurePassword("two"))
+        assert b"one" not in first
+
+
+class TestSessionKeys:
+    """Test key derivation reuse across a batch of files."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        clear_key_cache()
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        clear_key_cache()
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt_batch(self, count):
+        """Encrypt count small files and return their paths."""
+        encrypted_paths = []
+        for number in range(count):
+            input_path = self._temp_path(os.urandom(1000 + number))
+            encrypted_path = self._temp_path()
+            assert encrypt_file_with_password(
+                input_path, self.password, encrypted_path
+            ).success
+            encrypted_paths.append(encrypted_path)
+        return encrypted_paths
+
+    def test_batch_runs_one_key_derivation(self):
+        """Test that a batch derives the password key once."""
+        with patch(
+            "src.crypto.file_format.derive_key_from_password",
+            wraps=derive_key_from_password,
+        ) as derive:
+            encrypted_paths = self._encrypt_batch(5)
+            for encrypted_path in encrypted_paths:
+                assert decrypt_file_with_password(
+                    encrypted_path, self.password, self._temp_path()
+                ).success
+        assert derive.call_count == 1
+
+    def test_batch_files_get_distinct_keys(self):
+        """Test that files sharing a session salt differ by file nonce."""
+        headers = []
+        for encrypted_path in self._encrypt_batch(3):
+            with open(encrypted_path, "rb") as f:
+                headers.append(read_header(f))
+        assert len({header.salt for header in headers}) == 1
+        assert len({header.file_nonce for header in headers}) == 3
+
+    def test_decrypt_without_cache(self):
+        """Test that files decrypt after the cache has been cleared."""
+        encrypted_path = self._encrypt_batch(1)[0]
+        clear_key_cache()
+        decrypted_path = self._temp_path()
+        assert decrypt_file_with_password(
+            encrypted_path, self.password, decrypted_path
+        ).success
+        assert len(get_key_cache()) == 1
+
+    def test_wrong_password_is_not_cached_as_valid(self):
+        """Test that a wrong password does not reuse the right key."""
+        encrypted_path = self._encrypt_batch(1)[0]
+        result = decrypt_file_with_password(
+            encrypted_path, SecurePassword("wrong_password"), self._temp_path()
+        )
+        assert result.success is False
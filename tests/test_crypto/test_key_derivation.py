@@ -5,10 +5,18 @@ import tempfile
 import pytest
 from unittest.mock import patch
 
+from src.config.constants import KDF_PROFILE_ENV
+from src.config.models import KdfAlgorithm
 from src.crypto.key_derivation import (
+    ARGON2_AVAILABLE,
+    LEGACY_KDF_PARAMS,
+    TEST_KDF_PARAMS,
+    KdfParams,
+    default_kdf_params,
     derive_key_from_password,
     derive_key_from_keyfile,
     generate_salt,
+    validate_kdf_params,
 )
 from src.crypto.secure_memory import SecurePassword
 
@@ -229,3 +237,87 @@ class TestKeyDerivation:
 
         with pytest.raises(RuntimeError, match="Password has been cleared"):
             derive_key_from_password(password, salt)
+
+
+class TestKdfParams:
+    """Test the pluggable password KDFs."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.password = SecurePassword("test_password")
+        self.salt = b"test_salt_16byte"
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    def test_default_is_legacy_pbkdf2(self):
+        """Test that omitting parameters keeps the version 2 derivation."""
+        key, _ = derive_key_from_password(self.password, self.salt)
+        legacy_key, _ = derive_key_from_password(
+            self.password, self.salt, LEGACY_KDF_PARAMS
+        )
+        assert key == legacy_key
+
+    def test_scrypt(self):
+        """Test scrypt derivation and its dependence on the cost."""
+        key, _ = derive_key_from_password(
+            self.password, self.salt, KdfParams(KdfAlgorithm.SCRYPT, 1, 1024)
+        )
+        other, _ = derive_key_from_password(
+            self.password, self.salt, KdfParams(KdfAlgorithm.SCRYPT, 1, 2048)
+        )
+        assert len(key) == 44
+        assert key != other
+
+    @pytest.mark.skipif(not ARGON2_AVAILABLE, reason="Argon2id not supported")
+    def test_argon2id(self):
+        """Test Argon2id derivation and its dependence on the cost."""
+        key, _ = derive_key_from_password(
+            self.password, self.salt, KdfParams(KdfAlgorithm.ARGON2ID, 1, 1024, 2)
+        )
+        other, _ = derive_key_from_password(
+            self.password, self.salt, KdfParams(KdfAlgorithm.ARGON2ID, 2, 1024, 2)
+        )
+        assert len(key) == 44
+        assert key != other
+
+    def test_argon2id_unavailable(self):
+        """Test the error on cryptography releases without Argon2id."""
+        params = KdfParams(KdfAlgorithm.ARGON2ID, 1, 1024, 2)
+        with patch("src.crypto.key_derivation.ARGON2_AVAILABLE", False):
+            with pytest.raises(ValueError, match="Argon2id requires"):
+                derive_key_from_password(self.password, self.salt, params)
+
+    def test_auto_default(self):
+        """Test that AUTO resolves to a memory-hard KDF."""
+        expected = KdfAlgorithm.ARGON2ID if ARGON2_AVAILABLE else KdfAlgorithm.SCRYPT
+        assert default_kdf_params().algorithm == expected
+        assert default_kdf_params(KdfAlgorithm.AUTO).algorithm == expected
+        with patch.dict(os.environ, {KDF_PROFILE_ENV: "interactive"}):
+            assert default_kdf_params(KdfAlgorithm.PBKDF2) == LEGACY_KDF_PARAMS
+
+    def test_test_profile_lowers_costs(self):
+        """Test that the test profile selects minimal costs."""
+        with patch.dict(os.environ, {KDF_PROFILE_ENV: "test"}):
+            params = default_kdf_params(KdfAlgorithm.SCRYPT)
+        assert params == TEST_KDF_PARAMS[KdfAlgorithm.SCRYPT]
+        with patch.dict(os.environ, {KDF_PROFILE_ENV: "interactive"}):
+            assert default_kdf_params(KdfAlgorithm.SCRYPT).memory_cost > 1024
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            KdfParams(KdfAlgorithm.AUTO, 1),
+            KdfParams(KdfAlgorithm.PBKDF2, 0),
+            KdfParams(KdfAlgorithm.PBKDF2, 1000, 1024),
+            KdfParams(KdfAlgorithm.SCRYPT, 1, 1000),
+            KdfParams(KdfAlgorithm.SCRYPT, 2, 1024),
+            KdfParams(KdfAlgorithm.ARGON2ID, 1, 8, 4),
+            KdfParams(KdfAlgorithm.ARGON2ID, 1, 2**30, 1),
+        ],
+    )
+    def test_invalid_params(self, params):
+        """Test that unusable or excessive parameters are rejected."""
+        with pytest.raises(ValueError):
+            validate_kdf_params(params)
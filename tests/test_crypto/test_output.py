@@ -0,0 +1,198 @@
+"""Tests for atomic output files, the fsync policy and the space preflight."""
+
+import os
+import stat
+from collections import namedtuple
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import CompressionCodec, FsyncPolicy
+from src.crypto.encryption import (
+    decrypt_file_with_password,
+    encrypt_file_with_password,
+)
+from src.crypto.output import AtomicOutput, check_free_space
+from src.crypto.secure_memory import SecurePassword
+
+_DiskUsage = namedtuple("_DiskUsage", "total used free")
+
+
+class TestAtomicOutput:
+    """Test the temp file and rename handling."""
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_directory(self, tmp_path):
+        """Write each test's output in its own temporary directory."""
+        self.directory = str(tmp_path)
+        self.output_path = os.path.join(self.directory, "out.bin")
+
+    def _write(self, data: bytes, fsync=None) -> None:
+        """Write data through an AtomicOutput and commit it."""
+        with AtomicOutput(self.output_path, fsync) as output:
+            with open(output.temp_path, "wb") as f:
+                f.write(data)
+            assert not os.path.exists(self.output_path) or data != b"new"
+            output.commit()
+
+    def test_commit_replaces_output(self):
+        """Test that commit renames the temp file over the output."""
+        self._write(b"new")
+        with open(self.output_path, "rb") as f:
+            assert f.read() == b"new"
+        assert os.listdir(self.directory) == ["out.bin"]
+
+    def test_failure_keeps_existing_output(self):
+        """Test that an error before commit leaves the old file in place."""
+        self._write(b"old")
+        with pytest.raises(RuntimeError):
+            with AtomicOutput(self.output_path) as output:
+                with open(output.temp_path, "wb") as f:
+                    f.write(b"partial")
+                raise RuntimeError("crash")
+        with open(self.output_path, "rb") as f:
+            assert f.read() == b"old"
+        assert os.listdir(self.directory) == ["out.bin"]
+
+    def test_failure_keeps_fixed_temp_path(self):
+        """Test that a fixed temp path survives a failure for resuming."""
+        self._write(b"old")
+        os.chmod(self.output_path, 0o640)
+        fixed_path = os.path.join(self.directory, "out.bin.partial")
+        with pytest.raises(RuntimeError):
+            with AtomicOutput(self.output_path, temp_path=fixed_path) as output:
+                assert output.temp_path == fixed_path
+                with open(fixed_path, "ab") as f:
+                    f.write(b"partial")
+                raise RuntimeError("crash")
+        with open(self.output_path, "rb") as f:
+            assert f.read() == b"old"
+        assert stat.S_IMODE(os.stat(fixed_path).st_mode) == 0o640
+
+        with AtomicOutput(self.output_path, temp_path=fixed_path) as output:
+            with open(fixed_path, "ab") as f:
+                f.write(b" resumed")
+            output.commit()
+        with open(self.output_path, "rb") as f:
+            assert f.read() == b"partial resumed"
+        assert os.listdir(self.directory) == ["out.bin"]
+
+    def test_existing_mode_is_kept(self):
+        """Test that replacing a file keeps its permissions."""
+        self._write(b"old")
+        os.chmod(self.output_path, 0o640)
+        self._write(b"newer")
+        assert stat.S_IMODE(os.stat(self.output_path).st_mode) == 0o640
+
+    @pytest.mark.parametrize(
+        "policy,calls",
+        [
+            (FsyncPolicy.NONE, 0),
+            (FsyncPolicy.FILE, 1),
+            (FsyncPolicy.FILE_AND_DIRECTORY, 2 if hasattr(os, "O_DIRECTORY") else 1),
+        ],
+    )
+    def test_fsync_policy(self, policy, calls):
+        """Test the number of fsync calls of each policy."""
+        with patch("src.crypto.output.os.fsync") as fsync:
+            self._write(b"data", policy)
+        assert fsync.call_count == calls
+
+    def test_free_space_preflight(self):
+        """Test that a predicted size above the free space fails."""
+        check_free_space(self.output_path, None)
+        check_free_space(self.output_path, 1)
+        with patch(
+            "src.crypto.output.shutil.disk_usage", return_value=_DiskUsage(100, 90, 10)
+        ):
+            with pytest.raises(OSError, match="Not enough free space"):
+                check_free_space(self.output_path, 11)
+
+
+class TestCrashSafeOperations:
+    """Test encrypt and decrypt calls writing through AtomicOutput."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 5 + 11)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {},
+            {"format_version": LEGACY_FORMAT_VERSION},
+            {"compression": CompressionCodec.ZLIB},
+        ],
+    )
+    def test_size_bound_covers_output(self, kwargs):
+        """Test that the preflight prediction is an upper bound."""
+        encrypted_path = self._temp_path()
+        with patch("src.crypto.encryption.check_free_space") as check:
+            assert encrypt_file_with_password(
+                self._temp_path(self.test_content),
+                self.password,
+                encrypted_path,
+                chunk_size=CHUNK_SIZE,
+                **kwargs,
+            ).success
+        predicted = check.call_args[0][1]
+        actual = os.path.getsize(encrypted_path)
+        assert actual <= predicted < actual + 2048
+
+    def test_failed_decrypt_keeps_existing_file(self):
+        """Test that a corrupt file does not overwrite the output."""
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content), self.password, encrypted_path
+        ).success
+        with open(encrypted_path, "r+b") as f:
+            f.seek(os.path.getsize(encrypted_path) // 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 1]))
+
+        output_path = self._temp_path(b"precious")
+        result = decrypt_file_with_password(encrypted_path, self.password, output_path)
+        assert result.success is False
+        with open(output_path, "rb") as f:
+            assert f.read() == b"precious"
+
+    def test_no_space_fails_before_writing(self):
+        """Test that the preflight stops an encryption that cannot fit."""
+        output_path = self._temp_path() + ".enc"
+        with patch(
+            "src.crypto.output.shutil.disk_usage", return_value=_DiskUsage(100, 90, 10)
+        ):
+            result = encrypt_file_with_password(
+                self._temp_path(self.test_content), self.password, output_path
+            )
+        assert result.success is False
+        assert "Not enough free space" in result.error_message
+        assert not os.path.exists(output_path)
+
+    def test_fsync_option_is_applied(self):
+        """Test passing the fsync policy through the public functions."""
+        encrypted_path = self._temp_path()
+        with patch("src.crypto.output.os.fsync") as fsync:
+            assert encrypt_file_with_password(
+                self._temp_path(self.test_content),
+                self.password,
+                encrypted_path,
+                fsync=FsyncPolicy.NONE,
+            ).success
+            assert fsync.call_count == 0
+            assert decrypt_file_with_password(
+                encrypted_path, self.password, self._temp_path()
+            ).success
+            assert fsync.call_count == 1
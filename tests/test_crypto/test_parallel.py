@@ -0,0 +1,343 @@
+"""Tests for parallel worker pool helpers and pooled file encryption."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.crypto import engine
+from src.crypto.digest import check_plaintext_digest, hash_file
+from src.crypto.encryption import (
+    decrypt_file_with_keyfile,
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.key_derivation import derive_key_from_password
+from src.crypto.parallel import ordered_map, resolve_worker_count
+from src.crypto.secure_memory import SecurePassword
+
+_offset = 0
+
+
+def _set_offset(value):
+    """Worker initializer used by the tests."""
+    global _offset
+    _offset = value
+
+
+def _add_offset(value):
+    """Worker task used by the tests."""
+    return value + _offset
+
+
+def _fail_on_three(value):
+    """Worker task that fails for one specific input."""
+    if value == 3:
+        raise ValueError("bad item")
+    return value
+
+
+class TestResolveWorkerCount:
+    """Test worker count resolution."""
+
+    def test_explicit_count(self):
+        """Test that an explicit count is returned unchanged."""
+        assert resolve_worker_count(3) == 3
+
+    def test_zero_uses_cpu_count(self):
+        """Test that zero resolves to the number of CPU cores."""
+        assert resolve_worker_count(0) == (os.cpu_count() or 1)
+
+    def test_none_uses_default(self):
+        """Test that None resolves to at least one worker."""
+        assert resolve_worker_count(None) >= 1
+
+    def test_negative_count_fails(self):
+        """Test that a negative worker count is rejected."""
+        with pytest.raises(ValueError, match="cannot be negative"):
+            resolve_worker_count(-1)
+
+
+class TestOrderedMap:
+    """Test order-preserving pool mapping."""
+
+    def test_results_preserve_order_with_pool(self):
+        """Test that pooled results come back in submission order."""
+        results = list(
+            ordered_map(
+                _add_offset,
+                range(50),
+                workers=2,
+                initializer=_set_offset,
+                initargs=(100,),
+                max_pending=3,
+            )
+        )
+        assert results == [value + 100 for value in range(50)]
+
+    def test_single_worker_runs_in_process(self):
+        """Test the in-process path used for one worker."""
+        results = list(
+            ordered_map(
+                _add_offset,
+                [1, 2, 3],
+                workers=1,
+                initializer=_set_offset,
+                initargs=(10,),
+            )
+        )
+        assert results == [11, 12, 13]
+
+    def test_empty_input(self):
+        """Test mapping over no items."""
+        assert list(ordered_map(_add_offset, [], workers=2)) == []
+
+    def test_worker_exception_is_raised(self):
+        """Test that an exception in a worker reaches the caller."""
+        with pytest.raises(ValueError, match="bad item"):
+            list(ordered_map(_fail_on_three, range(10), workers=2))
+
+
+class TestParallelEncryption:
+    """Test the multi-process chunk encryption engine."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        # Reason: odd size spans several worker batches and a short final chunk
+        self.test_content = os.urandom(CHUNK_SIZE * 40 + 123)
+        self.password = SecurePassword("test_password")
+        self.keyfile_data = b"test_keyfile_data_must_be_at_least_32_bytes_long"
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def test_parallel_password_roundtrip(self):
+        """Test that pooled encryption decrypts with the standard reader."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = encrypt_file_with_password(
+                input_path, self.password, encrypted_path, workers=2
+            )
+        assert result.success is True
+
+        result = decrypt_file_with_password(
+            encrypted_path, self.password, decrypted_path
+        )
+        assert result.success is True
+
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    def test_parallel_keyfile_roundtrip(self):
+        """Test pooled encryption in keyfile mode."""
+        input_path = self._temp_path(self.test_content)
+        keyfile_path = self._temp_path(self.keyfile_data)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = encrypt_file_with_keyfile(
+                input_path, keyfile_path, encrypted_path, workers=3
+            )
+        assert result.success is True
+
+        result = decrypt_file_with_keyfile(encrypted_path, keyfile_path, decrypted_path)
+        assert result.success is True
+
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    def test_parallel_frames_are_in_order(self):
+        """Test that frames are written in input order, one per chunk."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = encrypt_file_with_password(
+                input_path,
+                self.password,
+                encrypted_path,
+                workers=2,
+                format_version=LEGACY_FORMAT_VERSION,
+            )
+        assert result.success is True
+
+        with open(encrypted_path, "rb") as f:
+            salt = f.read(16)
+            metadata_length = int.from_bytes(f.read(4), byteorder="big")
+            f.read(metadata_length)
+            key, _ = derive_key_from_password(self.password, salt)
+            fernet = Fernet(key)
+
+            offset = 0
+            while True:
+                length_bytes = f.read(4)
+                if not length_bytes:
+                    break
+                token = f.read(int.from_bytes(length_bytes, byteorder="big"))
+                chunk = fernet.decrypt(token)
+                assert chunk == self.test_content[offset : offset + CHUNK_SIZE]
+                offset += len(chunk)
+
+        assert offset == len(self.test_content)
+
+    def test_parallel_encrypt_negative_workers_fails(self):
+        """Test that an invalid worker count is reported as a failure."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+
+        result = encrypt_file_with_password(
+            input_path, self.password, encrypted_path, workers=-2
+        )
+        assert result.success is False
+        assert "Encryption failed" in result.error_message
+
+    def test_parallel_decrypt_roundtrip(self):
+        """Test positional parallel decryption of a serially encrypted file."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path(b"stale content that must be replaced")
+
+        result = encrypt_file_with_password(
+            input_path, self.password, encrypted_path, workers=1
+        )
+        assert result.success is True
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, workers=2
+            )
+        assert result.success is True
+
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    def test_parallel_decrypt_checks_digest(self):
+        """Test that positional decryption also verifies the plaintext digest."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path, self.password, encrypted_path
+        ).success
+
+        with (
+            patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0),
+            patch(
+                "src.crypto.engine._decrypt_positional",
+                wraps=engine._decrypt_positional,
+            ) as positional,
+            patch(
+                "src.crypto.decryption.check_plaintext_digest",
+                wraps=check_plaintext_digest,
+            ) as check_digest,
+        ):
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, workers=2
+            )
+        assert result.success is True
+        assert positional.called
+        assert check_digest.call_args.args[3] == hash_file(input_path)
+
+    def test_parallel_decrypt_exact_chunk_multiple(self):
+        """Test that a file of whole chunks is not padded or trimmed."""
+        content = os.urandom(CHUNK_SIZE * 20)
+        input_path = self._temp_path(content)
+        keyfile_path = self._temp_path(self.keyfile_data)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            assert encrypt_file_with_keyfile(
+                input_path, keyfile_path, encrypted_path, workers=2
+            ).success
+            result = decrypt_file_with_keyfile(
+                encrypted_path, keyfile_path, decrypted_path, workers=2
+            )
+        assert result.success is True
+
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == content
+
+    def test_parallel_decrypt_irregular_frames_falls_back(self):
+        """Test that frames of varying size still decrypt correctly."""
+        key, salt = derive_key_from_password(self.password)
+        fernet = Fernet(key)
+        chunks = [b"a" * 100, b"b" * CHUNK_SIZE, b"c" * 7]
+
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+        with open(encrypted_path, "wb") as f:
+            f.write(salt)
+            metadata = b'{"original_extension": "", "version": "2.0.0", '
+            metadata += b'"encryption_mode": "password"}'
+            f.write(len(metadata).to_bytes(4, byteorder="big"))
+            f.write(metadata)
+            for chunk in chunks:
+                token = fernet.encrypt(chunk)
+                f.write(len(token).to_bytes(4, byteorder="big"))
+                f.write(token)
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, workers=2
+            )
+        assert result.success is True
+
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == b"".join(chunks)
+
+    def test_parallel_decrypt_wrong_password_fails(self):
+        """Test that pooled decryption reports authentication failures."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path, self.password, encrypted_path
+        ).success
+
+        wrong_password = SecurePassword("wrong_password")
+        try:
+            with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+                result = decrypt_file_with_password(
+                    encrypted_path, wrong_password, decrypted_path, workers=2
+                )
+        finally:
+            wrong_password.clear()
+
+        assert result.success is False
+        assert "Decryption failed" in result.error_message
+
+    def test_parallel_decrypt_truncated_file_fails(self):
+        """Test that a truncated final frame is detected by the scan."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path,
+            self.password,
+            encrypted_path,
+            format_version=LEGACY_FORMAT_VERSION,
+        ).success
+
+        with open(encrypted_path, "r+b") as f:
+            f.truncate(os.path.getsize(encrypted_path) - 10)
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, workers=2
+            )
+        assert result.success is False
+        assert "Truncated frame" in result.error_message
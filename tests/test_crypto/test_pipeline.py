@@ -0,0 +1,236 @@
+"""Tests for the three-stage reader/worker/writer pipeline."""
+
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import CipherAlgorithm
+from src.crypto.encryption import (
+    decrypt_file_with_keyfile,
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.pipeline import (
+    BufferPool,
+    resolve_in_flight_chunks,
+    run_pipeline,
+    split_in_flight_chunks,
+)
+from src.crypto.secure_memory import SecurePassword
+
+
+class TestRunPipeline:
+    """Test the generic pipeline runner."""
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_results_in_order(self, workers):
+        """Test that results reach the writer in input order."""
+        results = []
+        run_pipeline(range(200), lambda x: x * 2, results.append, workers, 4)
+        assert results == [x * 2 for x in range(200)]
+
+    def test_reader_error_propagates(self):
+        """Test that an exception in the reader stage is re-raised."""
+
+        def items():
+            yield 1
+            raise OSError("read failed")
+
+        with pytest.raises(OSError, match="read failed"):
+            run_pipeline(items(), lambda x: x, lambda x: None, 2, 2)
+
+    def test_worker_error_propagates(self):
+        """Test that an exception in the worker stage is re-raised."""
+
+        def work(x):
+            if x == 50:
+                raise ValueError("bad item")
+            return x
+
+        with pytest.raises(ValueError, match="bad item"):
+            run_pipeline(range(1000), work, lambda x: None, 2, 2)
+
+    def test_writer_error_stops_reader(self):
+        """Test that a writer failure stops a reader blocked on a full queue."""
+        produced = []
+
+        def items():
+            for x in range(100000):
+                produced.append(x)
+                yield x
+
+        def consume(x):
+            raise OSError("disk full")
+
+        with pytest.raises(OSError, match="disk full"):
+            run_pipeline(items(), lambda x: x, consume, 2, 2)
+        assert len(produced) < 100
+
+    def test_pool_bounds_items_in_flight(self):
+        """Test that a buffer pool caps the items held across stages."""
+        pool = BufferPool(list, 4)
+        stop = threading.Event()
+        held = []
+        peak = []
+        lock = threading.Lock()
+
+        def items():
+            for x in range(100):
+                buffer = pool.acquire(stop)
+                if buffer is None:
+                    return
+                with lock:
+                    held.append(buffer)
+                    peak.append(len(held))
+                yield (x, buffer)
+
+        def consume(item):
+            with lock:
+                held.remove(item[1])
+            pool.release(item[1])
+
+        run_pipeline(
+            items(), lambda item: item, consume, 2, 4, max_pending=2, stop=stop
+        )
+        assert max(peak) <= 4
+
+
+class TestInFlightLimit:
+    """Test resolving the in-flight chunk limit."""
+
+    def test_default_limit(self):
+        """Test that None uses the configured default."""
+        assert resolve_in_flight_chunks(None) >= 1
+
+    def test_non_positive_limit_fails(self):
+        """Test that a zero limit is rejected."""
+        with pytest.raises(ValueError):
+            resolve_in_flight_chunks(0)
+
+    def test_split_respects_limit(self):
+        """Test that batches times batch size stays within the limit."""
+        assert split_in_flight_chunks(128, CHUNK_SIZE) == (16, 8)
+        batch_chunks, batch_count = split_in_flight_chunks(16, CHUNK_SIZE)
+        assert batch_chunks * batch_count <= 16
+        assert split_in_flight_chunks(1, CHUNK_SIZE) == (1, 3)
+
+    def test_split_scales_with_chunk_size(self):
+        """Test that larger chunks keep the memory cap, not the chunk count."""
+        batch_chunks, batch_count = split_in_flight_chunks(128, CHUNK_SIZE * 16)
+        assert batch_chunks * batch_count * CHUNK_SIZE * 16 <= 128 * CHUNK_SIZE
+
+
+class TestPipelinedEncryption:
+    """Test file encryption through the pipeline."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        # Reason: odd size spans several pipeline batches and a short chunk
+        self.test_content = os.urandom(CHUNK_SIZE * 40 + 123)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _roundtrip(self, encrypt_kwargs=None, decrypt_kwargs=None):
+        """Encrypt and decrypt the test content through the pipeline."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            result = encrypt_file_with_password(
+                input_path, self.password, encrypted_path, **(encrypt_kwargs or {})
+            )
+            assert result.success is True, result.error_message
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, decrypted_path, **(decrypt_kwargs or {})
+            )
+        assert result.success is True, result.error_message
+        with open(decrypted_path, "rb") as f:
+            return f.read()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    @pytest.mark.parametrize(
+        "cipher", [CipherAlgorithm.AES_256_GCM, CipherAlgorithm.CHACHA20_POLY1305]
+    )
+    def test_roundtrip(self, workers, cipher):
+        """Test pipelined encryption and decryption with each AEAD cipher."""
+        kwargs = {"workers": workers, "cipher": cipher}
+        assert self._roundtrip(kwargs, {"workers": 1}) == self.test_content
+
+    @pytest.mark.parametrize("in_flight_chunks", [1, 5, 64])
+    def test_small_in_flight_limits(self, in_flight_chunks):
+        """Test that tight buffering limits neither deadlock nor reorder."""
+        kwargs = {"workers": 2, "in_flight_chunks": in_flight_chunks}
+        assert self._roundtrip(kwargs, kwargs) == self.test_content
+
+    @pytest.mark.parametrize("size", [0, CHUNK_SIZE * 16, CHUNK_SIZE * 32])
+    def test_batch_aligned_sizes(self, size):
+        """Test empty input and inputs ending exactly on a batch boundary."""
+        self.test_content = os.urandom(size)
+        kwargs = {"workers": 1, "in_flight_chunks": 64}
+        assert self._roundtrip(kwargs, kwargs) == self.test_content
+
+    def test_legacy_format(self):
+        """Test Fernet frames through the thread and process pipelines."""
+        self.test_content = self.test_content[: CHUNK_SIZE * 20 + 9]
+        for workers in (1, 2):
+            kwargs = {"workers": workers, "format_version": LEGACY_FORMAT_VERSION}
+            assert self._roundtrip(kwargs, {"workers": 1}) == self.test_content
+
+    def test_keyfile_roundtrip(self):
+        """Test the keyfile functions with an explicit in-flight limit."""
+        input_path = self._temp_path(self.test_content)
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted_path = self._temp_path()
+        decrypted_path = self._temp_path()
+
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            assert encrypt_file_with_keyfile(
+                input_path, keyfile_path, encrypted_path, in_flight_chunks=8
+            ).success
+            assert decrypt_file_with_keyfile(
+                encrypted_path, keyfile_path, decrypted_path, in_flight_chunks=8
+            ).success
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    def test_tampered_frame_fails(self):
+        """Test that a modified frame fails pipelined decryption."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            assert encrypt_file_with_password(
+                input_path, self.password, encrypted_path
+            ).success
+            with open(encrypted_path, "r+b") as f:
+                f.seek(CHUNK_SIZE * 20)
+                byte = f.read(1)
+                f.seek(CHUNK_SIZE * 20)
+                f.write(bytes([byte[0] ^ 1]))
+
+            result = decrypt_file_with_password(
+                encrypted_path, self.password, self._temp_path(), workers=1
+            )
+        assert result.success is False
+        assert "Decryption failed" in result.error_message
+
+    def test_invalid_in_flight_limit_fails(self):
+        """Test that a non-positive in-flight limit is reported."""
+        input_path = self._temp_path(self.test_content)
+        result = encrypt_file_with_password(
+            input_path, self.password, self._temp_path(), in_flight_chunks=0
+        )
+        assert result.success is False
+        assert "In-flight chunk limit" in result.error_message
@@ -0,0 +1,194 @@
+"""Tests for progress reporting of encrypt, decrypt and verify calls."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import OperationStage
+from src.crypto.encryption import (
+    decrypt_file_with_keyfile,
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.progress import ProgressReporter
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.verify import verify_file
+
+
+class TestProgressReporter:
+    """Test the rate-limited reporter."""
+
+    def test_rate_limited(self):
+        """Test that updates within the interval are not reported."""
+        reports = []
+        reporter = ProgressReporter(reports.append, 1000, interval=3600)
+        reporter.set_stage(OperationStage.ENCRYPTING)
+        for _ in range(100):
+            reporter.update(10)
+        assert [r.stage for r in reports] == [OperationStage.ENCRYPTING]
+        reporter.finish()
+        assert reports[-1].stage == OperationStage.FINISHED
+        assert reports[-1].bytes_done == 1000
+        assert reports[-1].fraction == 1.0
+        assert reports[-1].eta == 0.0
+
+    def test_throughput_and_eta(self):
+        """Test the derived rate and remaining time."""
+        reporter = ProgressReporter(None, 1000)
+        reporter.set_stage(OperationStage.DECRYPTING)
+        reporter.update(250)
+        with patch("src.crypto.progress.time.monotonic", return_value=1e12):
+            info = reporter.snapshot()
+        assert info.throughput > 0
+        assert info.eta == pytest.approx(750 / info.throughput)
+        assert info.fraction == 0.25
+
+    def test_unknown_total(self):
+        """Test snapshots of streams of unknown size."""
+        reporter = ProgressReporter(None)
+        reporter.set_stage(OperationStage.DECRYPTING)
+        reporter.update(5)
+        info = reporter.snapshot()
+        assert info.total_bytes is None
+        assert info.fraction is None
+        assert info.eta is None
+        reporter.finish()
+        assert reporter.snapshot().fraction == 1.0
+
+
+class TestOperationProgress:
+    """Test progress callbacks of the public entry points."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 8 + 5)
+        self.password = SecurePassword("test_password")
+        self.reports = []
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _check_reports(self, data_stage: OperationStage) -> None:
+        """Check the stage order and the byte counts of the reports."""
+        stages = [r.stage for r in self.reports]
+        assert stages[0] == OperationStage.DERIVING_KEY
+        assert stages[-1] == OperationStage.FINISHED
+        assert data_stage in stages
+        done = [r.bytes_done for r in self.reports]
+        assert done == sorted(done)
+        assert done[-1] == len(self.test_content)
+        assert self.reports[-1].total_bytes == len(self.test_content)
+        # Reason: the interval is patched to 0, so every chunk is reported
+        assert len(self.reports) > 3
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_password_roundtrip(self, workers):
+        """Test reports on the serial and pipelined paths."""
+        encrypted_path = self._temp_path()
+        with (
+            patch("src.crypto.progress.PROGRESS_INTERVAL", 0),
+            patch(
+                "src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0 if workers > 1 else 2**40
+            ),
+        ):
+            assert encrypt_file_with_password(
+                self._temp_path(self.test_content),
+                self.password,
+                encrypted_path,
+                workers=workers,
+                chunk_size=CHUNK_SIZE,
+                progress=self.reports.append,
+            ).success
+            self._check_reports(OperationStage.ENCRYPTING)
+
+            self.reports.clear()
+            assert decrypt_file_with_password(
+                encrypted_path,
+                self.password,
+                self._temp_path(),
+                workers=workers,
+                progress=self.reports.append,
+            ).success
+            self._check_reports(OperationStage.DECRYPTING)
+
+    def test_keyfile_roundtrip(self):
+        """Test reports of the keyfile entry points."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted_path = self._temp_path()
+        with patch("src.crypto.progress.PROGRESS_INTERVAL", 0):
+            assert encrypt_file_with_keyfile(
+                self._temp_path(self.test_content),
+                keyfile_path,
+                encrypted_path,
+                chunk_size=CHUNK_SIZE,
+                progress=self.reports.append,
+            ).success
+            self._check_reports(OperationStage.ENCRYPTING)
+
+            self.reports.clear()
+            assert decrypt_file_with_keyfile(
+                encrypted_path,
+                keyfile_path,
+                self._temp_path(),
+                progress=self.reports.append,
+            ).success
+            self._check_reports(OperationStage.DECRYPTING)
+
+    def test_legacy_total_unknown_until_finished(self):
+        """Test that format 2 files report their total only at the end."""
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            encrypted_path,
+            format_version=LEGACY_FORMAT_VERSION,
+        ).success
+        assert decrypt_file_with_password(
+            encrypted_path,
+            self.password,
+            self._temp_path(),
+            progress=self.reports.append,
+        ).success
+        assert self.reports[0].total_bytes is None
+        assert self.reports[-1].total_bytes == len(self.test_content)
+
+    def test_verify_reports(self):
+        """Test reports of verify_file."""
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            encrypted_path,
+            chunk_size=CHUNK_SIZE,
+        ).success
+        result = verify_file(
+            encrypted_path, self.password, progress=self.reports.append
+        )
+        assert result.success is True, result.error_message
+        assert OperationStage.VERIFYING in [r.stage for r in self.reports]
+        assert self.reports[-1].bytes_done == len(self.test_content)
+
+    def test_callback_error_aborts(self):
+        """Test that an exception in the callback fails the call."""
+
+        def stop(info):
+            if info.stage == OperationStage.ENCRYPTING:
+                raise RuntimeError("stop requested")
+
+        result = encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            self._temp_path(),
+            progress=stop,
+        )
+        assert result.success is False
+        assert "stop requested" in result.error_message
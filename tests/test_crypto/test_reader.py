@@ -0,0 +1,219 @@
+"""Tests for the random-access encrypted file reader."""
+
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.crypto.encryption import (
+    DecryptionError,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.reader import ChunkCache, EncryptedFileReader, clear_index_cache
+from src.crypto.secure_memory import SecurePassword
+
+
+class TestChunkCache:
+    """Test the decrypted chunk cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest chunk is evicted over the size limit."""
+        cache = ChunkCache(max_bytes=8)
+        first = bytearray(b"aaaa")
+        cache.put(0, first)
+        cache.put(1, bytearray(b"bbbb"))
+        assert cache.get(0) is first  # 0 is now most recently used
+
+        cache.put(2, bytearray(b"cccc"))
+        assert cache.get(1) is None
+        assert cache.get(0) == b"aaaa"
+        assert len(cache) == 2
+
+    def test_evicted_chunks_are_zeroized(self):
+        """Test that chunks leaving the cache are overwritten."""
+        cache = ChunkCache(max_bytes=4)
+        evicted = bytearray(b"secret")
+        cache.put(0, evicted)
+        cache.put(1, bytearray(b"next"))
+        assert evicted == bytes(6)
+
+        kept = cache.get(1)
+        cache.clear()
+        assert kept == bytes(4)
+        assert len(cache) == 0
+
+    def test_keeps_most_recent_chunk(self):
+        """Test that a chunk larger than the limit is still cached."""
+        cache = ChunkCache(max_bytes=0)
+        cache.put(0, bytearray(b"data"))
+        assert cache.get(0) == b"data"
+
+
+class TestEncryptedFileReader:
+    """Test seeking and reading encrypted files."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 4 + 123)
+        self.password = SecurePassword("test_password")
+        clear_index_cache()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt(self, **kwargs):
+        """Encrypt the test content with the test password."""
+        input_path = self._temp_path(self.test_content)
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            input_path, self.password, encrypted_path, **kwargs
+        ).success
+        return encrypted_path
+
+    def test_read_all(self):
+        """Test reading the whole plaintext."""
+        with EncryptedFileReader(self._encrypt(), self.password) as reader:
+            assert reader.size == len(self.test_content)
+            assert reader.readall() == self.test_content
+            assert reader.read(10) == b""
+
+    def test_seek_and_read_across_chunks(self):
+        """Test random reads spanning chunk boundaries."""
+        with EncryptedFileReader(self._encrypt(), self.password) as reader:
+            for start, length in ((0, 5), (CHUNK_SIZE - 3, 10), (3 * CHUNK_SIZE, 500)):
+                assert reader.seek(start) == start
+                assert reader.read(length) == self.test_content[start : start + length]
+                assert reader.tell() == start + length
+
+            reader.seek(-50, io.SEEK_END)
+            assert reader.read() == self.test_content[-50:]
+            reader.seek(-100, io.SEEK_CUR)
+            assert reader.read(20) == self.test_content[-100:-80]
+
+    def test_larger_chunk_size(self):
+        """Test random access into a file with a non-default chunk size."""
+        encrypted_path = self._encrypt(chunk_size=CHUNK_SIZE * 2)
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            assert reader.size == len(self.test_content)
+            for start in (CHUNK_SIZE * 2 - 5, CHUNK_SIZE * 4 + 100):
+                reader.seek(start)
+                assert reader.read(20) == self.test_content[start : start + 20]
+
+    def test_readinto(self):
+        """Test filling a caller-provided buffer."""
+        with EncryptedFileReader(self._encrypt(), self.password) as reader:
+            reader.seek(CHUNK_SIZE * 2 - 7)
+            buffer = bytearray(CHUNK_SIZE)
+            assert reader.readinto(buffer) == CHUNK_SIZE
+            start = CHUNK_SIZE * 2 - 7
+            assert buffer == self.test_content[start : start + CHUNK_SIZE]
+
+    def test_buffered_line_reads(self):
+        """Test that the reader works under io.BufferedReader."""
+        self.test_content = b"".join(b"record %d\n" % i for i in range(20000))
+        with io.BufferedReader(
+            EncryptedFileReader(self._encrypt(), self.password)
+        ) as reader:
+            reader.seek(self.test_content.index(b"record 15000\n"))
+            assert reader.readline() == b"record 15000\n"
+
+    def test_only_needed_chunks_are_decrypted(self):
+        """Test that a small read decrypts a single chunk."""
+        with EncryptedFileReader(self._encrypt(), self.password) as reader:
+            with patch.object(
+                reader._cipher, "open", wraps=reader._cipher.open
+            ) as open_frame:
+                reader.seek(CHUNK_SIZE + 10)
+                reader.read(100)
+                reader.seek(CHUNK_SIZE + 500)
+                reader.read(100)
+            assert open_frame.call_count == 1
+
+    def test_legacy_file_scan_is_cached(self):
+        """Test that version 2 files are scanned once per process."""
+        encrypted_path = self._encrypt(format_version=LEGACY_FORMAT_VERSION)
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            reader.seek(CHUNK_SIZE * 3)
+            assert reader.read(100) == self.test_content[CHUNK_SIZE * 3 :][:100]
+
+        with patch("src.crypto.reader.scan_frames") as scan:
+            with EncryptedFileReader(encrypted_path, self.password) as reader:
+                assert reader.read() == self.test_content
+            scan.assert_not_called()
+
+    def test_keyfile_file(self):
+        """Test reading a keyfile-encrypted file."""
+        input_path = self._temp_path(self.test_content)
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_keyfile(
+            input_path, keyfile_path, encrypted_path
+        ).success
+
+        with EncryptedFileReader(encrypted_path, keyfile_path=keyfile_path) as reader:
+            reader.seek(12345)
+            assert reader.read(10) == self.test_content[12345:12355]
+
+    def test_empty_file(self):
+        """Test reading an empty file."""
+        self.test_content = b""
+        with EncryptedFileReader(self._encrypt(), self.password) as reader:
+            assert reader.size == 0
+            assert reader.read() == b""
+
+    def test_wrong_password_fails_on_open(self):
+        """Test that a wrong password is rejected when opening."""
+        encrypted_path = self._encrypt()
+        with pytest.raises(DecryptionError):
+            EncryptedFileReader(encrypted_path, SecurePassword("wrong_password"))
+
+    def test_wrong_mode_fails(self):
+        """Test that keyfile credentials are rejected for password files."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        with pytest.raises(ValueError, match="not encrypted with keyfile mode"):
+            EncryptedFileReader(self._encrypt(), keyfile_path=keyfile_path)
+
+    def test_tampered_chunk_fails(self):
+        """Test that a modified chunk fails authentication when read."""
+        encrypted_path = self._encrypt()
+        with open(encrypted_path, "r+b") as f:
+            f.seek(CHUNK_SIZE + 200)
+            byte = f.read(1)
+            f.seek(CHUNK_SIZE + 200)
+            f.write(bytes([byte[0] ^ 1]))
+
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            assert reader.read(100) == self.test_content[:100]
+            reader.seek(CHUNK_SIZE)
+            with pytest.raises(DecryptionError, match="chunk 1"):
+                reader.read(100)
+
+    def test_truncated_chunk_fails(self):
+        """Test that a file cut short after opening fails with DecryptionError."""
+        encrypted_path = self._encrypt()
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            os.truncate(encrypted_path, reader._offsets[1] + 10)
+            reader.seek(CHUNK_SIZE)
+            with pytest.raises(DecryptionError, match="Truncated frame at chunk 1"):
+                reader.read(100)
+
+    def test_close_zeroizes_cache(self):
+        """Test that closing the reader wipes cached plaintext."""
+        reader = EncryptedFileReader(self._encrypt(), self.password)
+        reader.read(10)
+        chunk = reader._cache.get(0)
+        reader.close()
+        assert chunk == bytes(len(chunk))
+        with pytest.raises(ValueError):
+            reader.read(1)
+
+    def test_negative_seek_fails(self):
+        """Test that seeking before the start is rejected."""
+        with EncryptedFileReader(self._encrypt(), self.password) as reader:
+            with pytest.raises(ValueError, match="Negative seek position"):
+                reader.seek(-1)
@@ -0,0 +1,165 @@
+"""Tests for envelope files and in-place rekeying."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, DIRECT_KEY_FORMAT_VERSION
+from src.config.models import FsyncPolicy
+from src.crypto.container import read_header
+from src.crypto.encryption import (
+    decrypt_file_with_keyfile,
+    decrypt_file_with_password,
+    encrypt_file_with_password,
+    get_file_metadata,
+)
+from src.crypto.rekey import rekey_file
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.verify import verify_file
+
+
+class TestRekeyFile:
+    """Test rewrapping the data key of format 4 files."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 3 + 17)
+        self.password = SecurePassword("test_password")
+        self.new_password = SecurePassword("new_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+        self.new_password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt(self, **kwargs) -> str:
+        """Encrypt the test content with the current password."""
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            encrypted_path,
+            **kwargs,
+        ).success
+        return encrypted_path
+
+    def _read(self, path: str) -> bytes:
+        """Return the contents of a file."""
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _decrypted(self, encrypted_path: str, **credential) -> bytes:
+        """Decrypt a file with a credential and return the plaintext."""
+        output_path = self._temp_path()
+        if "keyfile_path" in credential:
+            result = decrypt_file_with_keyfile(
+                encrypted_path, credential["keyfile_path"], output_path
+            )
+        else:
+            result = decrypt_file_with_password(
+                encrypted_path, credential["password"], output_path
+            )
+        assert result.success, result.error_message
+        return self._read(output_path)
+
+    def test_new_files_are_envelope_files(self):
+        """Test that files are written in format 4 by default."""
+        encrypted_path = self._encrypt()
+        assert get_file_metadata(encrypted_path)["version"] == "4.0.0"
+        with open(encrypted_path, "rb") as f:
+            assert read_header(f).wrapped_key is not None
+
+    def test_rekey_password(self):
+        """Test that only the header changes and the new password works."""
+        encrypted_path = self._encrypt()
+        before = self._read(encrypted_path)
+        with open(encrypted_path, "rb") as f:
+            header_size = len(read_header(f).pack())
+
+        result = rekey_file(
+            encrypted_path, password=self.password, new_password=self.new_password
+        )
+        assert result.success is True
+        after = self._read(encrypted_path)
+        assert len(after) == len(before)
+        assert after[header_size:] == before[header_size:]
+        assert after[:header_size] != before[:header_size]
+
+        assert self._decrypted(encrypted_path, password=self.new_password) == (
+            self.test_content
+        )
+        assert verify_file(encrypted_path, password=self.new_password).success
+        old = decrypt_file_with_password(
+            encrypted_path, self.password, self._temp_path()
+        )
+        assert old.success is False
+        assert "Incorrect password" in old.error_message
+
+    def test_rekey_to_keyfile(self):
+        """Test switching a password file to keyfile mode."""
+        encrypted_path = self._encrypt()
+        keyfile_path = self._temp_path(b"k" * 64)
+        assert rekey_file(
+            encrypted_path, password=self.password, new_keyfile_path=keyfile_path
+        ).success
+        assert get_file_metadata(encrypted_path)["encryption_mode"] == "keyfile"
+        assert self._decrypted(encrypted_path, keyfile_path=keyfile_path) == (
+            self.test_content
+        )
+
+    def test_wrong_password_leaves_file(self):
+        """Test that a wrong current password changes nothing."""
+        encrypted_path = self._encrypt()
+        before = self._read(encrypted_path)
+        result = rekey_file(
+            encrypted_path,
+            password=SecurePassword("wrong_password"),
+            new_password=self.new_password,
+        )
+        assert result.success is False
+        assert "Incorrect password" in result.error_message
+        assert self._read(encrypted_path) == before
+
+    def test_format_3_is_rejected(self):
+        """Test that files without a wrapped data key are left alone."""
+        encrypted_path = self._encrypt(format_version=DIRECT_KEY_FORMAT_VERSION)
+        before = self._read(encrypted_path)
+        result = rekey_file(
+            encrypted_path, password=self.password, new_password=self.new_password
+        )
+        assert result.success is False
+        assert "format version 4" in result.error_message
+        assert self._read(encrypted_path) == before
+        assert self._decrypted(encrypted_path, password=self.password) == (
+            self.test_content
+        )
+
+    def test_fsync_policy(self):
+        """Test that the new header is synced unless the policy is none."""
+        encrypted_path = self._encrypt()
+        with patch("src.crypto.rekey.os.fsync") as fsync:
+            assert rekey_file(
+                encrypted_path,
+                password=self.password,
+                new_password=self.new_password,
+                fsync=FsyncPolicy.NONE,
+            ).success
+            assert fsync.call_count == 0
+            assert rekey_file(
+                encrypted_path,
+                password=self.new_password,
+                new_password=self.password,
+            ).success
+            assert fsync.call_count == 1
+
+    def test_missing_new_credential(self):
+        """Test that a new password or keyfile is required."""
+        result = rekey_file(self._encrypt(), password=self.password)
+        assert result.success is False
+        assert "new password or keyfile" in result.error_message
@@ -0,0 +1,167 @@
+"""Tests for checkpointed, resumable encryption."""
+
+import json
+import os
+import stat
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import OperationStage
+from src.crypto.cancellation import CancellationToken
+from src.crypto.checkpoint import checkpoint_path, partial_path
+from src.crypto.encryption import (
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.verify import verify_file
+
+
+class TestResumableEncryption:
+    """Test interrupting and resuming encrypt calls."""
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, tmp_path, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self.directory = str(tmp_path)
+        self._temp_path = temp_file
+        self.test_content = os.urandom(CHUNK_SIZE * 40 + 3)
+        self.password = SecurePassword("test_password")
+        self.input_path = temp_file(self.test_content, name="input.bin")
+        self.output_path = os.path.join(self.directory, "input.bin.enc")
+        yield
+        self.password.clear()
+
+    def _encrypt(self, workers: int = 1, **kwargs):
+        """Run a resumable password encryption with a checkpoint per write."""
+        with (
+            patch("src.crypto.checkpoint.CHECKPOINT_INTERVAL", 0),
+            patch("src.crypto.progress.PROGRESS_INTERVAL", 0),
+            patch(
+                "src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0 if workers > 1 else 2**40
+            ),
+        ):
+            return encrypt_file_with_password(
+                self.input_path,
+                self.password,
+                self.output_path,
+                workers=workers,
+                chunk_size=CHUNK_SIZE,
+                in_flight_chunks=4,
+                resumable=True,
+                **kwargs,
+            )
+
+    def _interrupt(self, workers: int = 1) -> dict:
+        """Cancel an encryption halfway and return its checkpoint."""
+        token = CancellationToken()
+
+        def callback(info):
+            if info.bytes_done > len(self.test_content) // 2:
+                if info.stage != OperationStage.FINISHED:
+                    token.cancel()
+
+        result = self._encrypt(workers, progress=callback, cancel=token)
+        assert result.cancelled is True
+        assert not os.path.exists(self.output_path)
+        with open(checkpoint_path(self.output_path), "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        assert 0 < checkpoint["chunk_index"] < 40
+        return checkpoint
+
+    def _assert_decrypts(self) -> None:
+        """Check the finished output and that no resume state is left."""
+        assert not os.path.exists(partial_path(self.output_path))
+        assert not os.path.exists(checkpoint_path(self.output_path))
+        assert verify_file(self.output_path, password=self.password).success
+        decrypted_path = os.path.join(self.directory, "decrypted.bin")
+        assert decrypt_file_with_password(
+            self.output_path, self.password, decrypted_path
+        ).success
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_resume_after_interruption(self, workers):
+        """Test that a resumed call keeps the durable prefix and completes."""
+        checkpoint = self._interrupt(workers)
+        with open(partial_path(self.output_path), "rb") as f:
+            prefix = f.read(checkpoint["output_offset"])
+
+        result = self._encrypt(workers)
+        assert result.success is True
+        with open(self.output_path, "rb") as f:
+            assert f.read(len(prefix)) == prefix
+        self._assert_decrypts()
+
+    def test_torn_tail_is_discarded(self):
+        """Test that bytes written after the last checkpoint are dropped."""
+        self._interrupt()
+        with open(partial_path(self.output_path), "ab") as f:
+            f.write(os.urandom(1000))
+        assert self._encrypt().success is True
+        self._assert_decrypts()
+
+    def test_changed_input_discards_checkpoint(self):
+        """Test that a modified prefix fails once, then starts over."""
+        self._interrupt()
+        stat = os.stat(self.input_path)
+        self.test_content = b"x" + self.test_content[1:]
+        with open(self.input_path, "r+b") as f:
+            f.write(b"x")
+        os.utime(self.input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        result = self._encrypt()
+        assert result.success is False
+        assert "Input changed" in result.error_message
+        assert not os.path.exists(checkpoint_path(self.output_path))
+        assert self._encrypt().success is True
+        self._assert_decrypts()
+
+    def test_wrong_password_keeps_checkpoint(self):
+        """Test that resuming with another password fails without damage."""
+        self._interrupt()
+        result = encrypt_file_with_password(
+            self.input_path,
+            SecurePassword("other_password"),
+            self.output_path,
+            resumable=True,
+        )
+        assert result.success is False
+        assert os.path.exists(checkpoint_path(self.output_path))
+        assert self._encrypt().success is True
+        self._assert_decrypts()
+
+    def test_existing_output_is_replaced(self):
+        """Test a resumable call over an existing output keeps its mode."""
+        self._temp_path(b"previous", name="input.bin.enc")
+        os.chmod(self.output_path, 0o640)
+        assert self._encrypt().success is True
+        assert stat.S_IMODE(os.stat(self.output_path).st_mode) == 0o640
+        self._assert_decrypts()
+        assert self._encrypt().success is True
+        self._assert_decrypts()
+
+    def test_keyfile_mode(self):
+        """Test a completed resumable keyfile call leaves no resume state."""
+        keyfile_path = self._temp_path(b"k" * 64, name="test.key")
+        assert encrypt_file_with_keyfile(
+            self.input_path, keyfile_path, self.output_path, resumable=True
+        ).success
+        assert not os.path.exists(partial_path(self.output_path))
+        assert not os.path.exists(checkpoint_path(self.output_path))
+
+    def test_legacy_format_is_rejected(self):
+        """Test that format 2 files cannot be written resumably."""
+        result = encrypt_file_with_password(
+            self.input_path,
+            self.password,
+            self.output_path,
+            format_version=LEGACY_FORMAT_VERSION,
+            resumable=True,
+        )
+        assert result.success is False
+        assert "format version 3" in result.error_message
@@ -0,0 +1,144 @@
+"""Tests for operation stats, the stats hook and profiling."""
+
+import os
+import pstats
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION, PROFILE_DIR_ENV
+from src.crypto.encryption import (
+    decrypt_file_with_keyfile,
+    decrypt_file_with_password,
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.stats import set_stats_hook
+
+
+class TestOperationStats:
+    """Test the stats attached to encrypt and decrypt results."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 10 + 7)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+        set_stats_hook(None)
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _roundtrip(self, **kwargs):
+        """Encrypt and decrypt the test content, returning both results."""
+        workers = kwargs.pop("workers", 1)
+        encrypted_path = self._temp_path()
+        encrypted = encrypt_file_with_password(
+            self._temp_path(self.test_content),
+            self.password,
+            encrypted_path,
+            workers=workers,
+            **kwargs,
+        )
+        assert encrypted.success is True, encrypted.error_message
+        decrypted = decrypt_file_with_password(
+            encrypted_path, self.password, self._temp_path(), workers=workers
+        )
+        assert decrypted.success is True, decrypted.error_message
+        return encrypted, decrypted
+
+    def _check_stats(self, stats, operation: str, bytes_in: int, bytes_out: int):
+        """Check the fields every successful call reports."""
+        assert stats.operation == operation
+        assert stats.bytes_in == bytes_in
+        assert stats.bytes_out == bytes_out
+        assert stats.chunk_count == 11
+        assert stats.crypt_time > 0
+        assert min(stats.read_time, stats.write_time, stats.kdf_time) >= 0
+        assert stats.elapsed >= stats.kdf_time
+        assert stats.peak_buffer_bytes >= CHUNK_SIZE
+        assert 0 < stats.worker_utilization <= 1
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_roundtrip_stats(self, workers):
+        """Test stats on the serial and pipelined paths."""
+        with patch(
+            "src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0 if workers > 1 else 2**40
+        ):
+            encrypted, decrypted = self._roundtrip(
+                workers=workers, chunk_size=CHUNK_SIZE
+            )
+        encrypted_size = os.path.getsize(encrypted.output_path)
+        plain_size = len(self.test_content)
+        self._check_stats(encrypted.stats, "encrypt", plain_size, encrypted_size)
+        self._check_stats(decrypted.stats, "decrypt", encrypted_size, plain_size)
+        assert encrypted.stats.worker_count == workers
+
+    def test_process_and_positional_stats(self):
+        """Test stats of Fernet files, which use worker processes."""
+        with patch("src.crypto.engine.PARALLEL_MIN_FILE_SIZE", 0):
+            encrypted, decrypted = self._roundtrip(
+                workers=2, format_version=LEGACY_FORMAT_VERSION
+            )
+        for stats in (encrypted.stats, decrypted.stats):
+            assert stats.chunk_count == 11
+            assert stats.crypt_time > 0
+            assert stats.worker_count == 2
+
+    def test_keyfile_stats(self):
+        """Test that the keyfile entry points report stats."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted_path = self._temp_path()
+        encrypted = encrypt_file_with_keyfile(
+            self._temp_path(self.test_content), keyfile_path, encrypted_path
+        )
+        decrypted = decrypt_file_with_keyfile(
+            encrypted_path, keyfile_path, self._temp_path()
+        )
+        assert encrypted.stats.operation == "encrypt"
+        assert decrypted.stats.bytes_out == len(self.test_content)
+
+    def test_failure_has_no_stats(self):
+        """Test that failed calls carry no stats."""
+        result = decrypt_file_with_password(
+            self._temp_path(self.test_content), self.password, self._temp_path()
+        )
+        assert result.success is False
+        assert result.stats is None
+
+    def test_hook_receives_stats(self):
+        """Test the pluggable stats hook."""
+        received = []
+        assert set_stats_hook(received.append) is None
+        encrypted, decrypted = self._roundtrip()
+        assert received == [encrypted.stats, decrypted.stats]
+
+    def test_failing_hook_is_ignored(self, capsys):
+        """Test that an exception in the hook does not fail the call."""
+
+        def broken(stats):
+            raise RuntimeError("hook down")
+
+        set_stats_hook(broken)
+        encrypted, _ = self._roundtrip()
+        assert encrypted.stats is not None
+        assert "Stats hook failed: hook down" in capsys.readouterr().out
+
+    def test_profile_dump(self, tmp_path):
+        """Test that the profiling switch writes a readable pstats file."""
+        profile_dir = tmp_path / "profiles"
+        profile_dir.mkdir()
+        with patch.dict(os.environ, {PROFILE_DIR_ENV: str(profile_dir)}):
+            self._roundtrip()
+        names = sorted(os.listdir(profile_dir))
+        assert len(names) == 2
+        assert names[0].startswith("decrypt_file_with_password-")
+        assert names[1].startswith("encrypt_file_with_password-")
+        stats = pstats.Stats(os.path.join(profile_dir, names[1]))
+        assert stats.total_calls > 0
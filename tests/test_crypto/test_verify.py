@@ -0,0 +1,138 @@
+"""Tests for verify-only authentication of encrypted files."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE, LEGACY_FORMAT_VERSION
+from src.config.models import CipherAlgorithm
+from src.crypto.encryption import (
+    encrypt_file_with_keyfile,
+    encrypt_file_with_password,
+)
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.verify import verify_file
+
+
+class TestVerifyFile:
+    """Test authenticating every chunk without writing plaintext."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 5 + 321)
+        self.password = SecurePassword("test_password")
+
+    def teardown_method(self):
+        """Clean up test fixtures."""
+        self.password.clear()
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _encrypt(self, **kwargs) -> str:
+        """Encrypt the test content with the password and return the path."""
+        encrypted_path = self._temp_path()
+        kwargs.setdefault("chunk_size", CHUNK_SIZE)
+        assert encrypt_file_with_password(
+            self._temp_path(self.test_content), self.password, encrypted_path, **kwargs
+        ).success
+        return encrypted_path
+
+    def _flip_byte(self, path: str, offset: int) -> None:
+        """Corrupt one byte of a file."""
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(bytes([byte[0] ^ 1]))
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    @pytest.mark.parametrize(
+        "cipher", [CipherAlgorithm.AES_256_GCM, CipherAlgorithm.CHACHA20_POLY1305]
+    )
+    def test_intact_file_verifies(self, workers, cipher):
+        """Test that an intact file verifies with serial and pooled workers."""
+        encrypted_path = self._encrypt(cipher=cipher)
+        with patch("src.crypto.verify.PARALLEL_MIN_FILE_SIZE", 0):
+            result = verify_file(encrypted_path, self.password, workers=workers)
+        assert result.success is True, result.error_message
+        assert result.chunk_count == 6
+        assert result.bad_chunks == []
+        assert result.bytes_verified == len(self.test_content)
+        assert result.throughput > 0
+
+    def test_keyfile_file_verifies(self):
+        """Test verifying a keyfile mode file."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted_path = self._temp_path()
+        assert encrypt_file_with_keyfile(
+            self._temp_path(self.test_content), keyfile_path, encrypted_path
+        ).success
+        result = verify_file(encrypted_path, keyfile_path=keyfile_path)
+        assert result.success is True, result.error_message
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_legacy_file_verifies(self, workers):
+        """Test verifying Fernet frames on threads and worker processes."""
+        encrypted_path = self._encrypt(format_version=LEGACY_FORMAT_VERSION)
+        with patch("src.crypto.verify.PARALLEL_MIN_FILE_SIZE", 0):
+            result = verify_file(encrypted_path, self.password, workers=workers)
+        assert result.success is True, result.error_message
+        assert result.bytes_verified == len(self.test_content)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_corrupted_chunks_are_reported(self, workers):
+        """Test that every bad chunk is reported, not only the first."""
+        encrypted_path = self._encrypt()
+        self._flip_byte(encrypted_path, CHUNK_SIZE * 2 + 500)
+        self._flip_byte(encrypted_path, CHUNK_SIZE * 4 + 500)
+        with patch("src.crypto.verify.PARALLEL_MIN_FILE_SIZE", 0):
+            result = verify_file(encrypted_path, self.password, workers=workers)
+        assert result.success is False
+        assert result.bad_chunks == [2, 4]
+        assert "2 chunk(s) failed" in result.error_message
+
+    def test_truncated_at_frame_boundary_fails(self):
+        """Test that dropping the final frame is detected."""
+        encrypted_path = self._encrypt()
+        with open(encrypted_path, "r+b") as f:
+            # Keep the header and the first five full frames
+            f.seek(-24, os.SEEK_END)
+            index_offset = int.from_bytes(f.read(8), byteorder="big")
+            f.seek(index_offset + 8 * 5)
+            last_offset = int.from_bytes(f.read(8), byteorder="big")
+            f.truncate(last_offset - 4)
+
+        result = verify_file(encrypted_path, self.password)
+        assert result.success is False
+        assert result.bad_chunks == [4]
+
+    def test_truncated_frame_fails(self):
+        """Test that a frame cut in the middle is a framing error."""
+        encrypted_path = self._encrypt()
+        with open(encrypted_path, "r+b") as f:
+            f.truncate(CHUNK_SIZE * 3)
+        result = verify_file(encrypted_path, self.password)
+        assert result.success is False
+        assert "Truncated frame" in result.error_message
+
+    def test_wrong_password_fails(self):
+        """Test that a wrong password is reported before reading frames."""
+        result = verify_file(self._encrypt(), SecurePassword("wrong_password"))
+        assert result.success is False
+        assert "Incorrect password" in result.error_message
+
+    def test_wrong_mode_fails(self):
+        """Test that a password file is not verified as a keyfile file."""
+        result = verify_file(self._encrypt(), keyfile_path=self._temp_path(b"k" * 64))
+        assert result.success is False
+        assert "not encrypted with keyfile mode" in result.error_message
+
+    def test_missing_file_fails(self):
+        """Test that a missing file is reported."""
+        result = verify_file("/nonexistent/file.enc", self.password)
+        assert result.success is False
+        assert "File not found" in result.error_message
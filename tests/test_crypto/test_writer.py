@@ -0,0 +1,203 @@
+"""Tests for the streaming encrypted file writer."""
+
+import gzip
+import io
+import os
+import shutil
+import tarfile
+
+import pytest
+
+from src.config.constants import CHUNK_SIZE
+from src.config.models import CipherAlgorithm
+from src.crypto.encryption import (
+    decrypt_file_with_keyfile,
+    decrypt_file_with_password,
+    get_file_metadata,
+)
+from src.crypto.reader import EncryptedFileReader
+from src.crypto.secure_memory import SecurePassword
+from src.crypto.writer import EncryptedFileWriter
+
+
+class _PipeSink(io.RawIOBase):
+    """Write-only sink without tell() or seek(), like a pipe."""
+
+    def __init__(self):
+        """Initialize the sink."""
+        self.data = bytearray()
+
+    def writable(self):
+        """Return True."""
+        return True
+
+    def write(self, data):
+        """Collect written bytes."""
+        self.data += data
+        return len(data)
+
+
+class TestEncryptedFileWriter:
+    """Test streaming encryption into file objects."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.test_content = os.urandom(CHUNK_SIZE * 3 + 77)
+        self.password = SecurePassword("test_password")
+
+    @pytest.fixture(autouse=True)
+    def _use_temp_files(self, temp_file):
+        """Create each test's files in its own temporary directory."""
+        self._temp_path = temp_file
+
+    def _decrypt(self, encrypted_path):
+        """Decrypt a password file and return its plaintext."""
+        decrypted_path = self._temp_path()
+        result = decrypt_file_with_password(
+            encrypted_path, self.password, decrypted_path
+        )
+        assert result.success is True, result.error_message
+        with open(decrypted_path, "rb") as f:
+            return f.read()
+
+    def _stream(self, chunks, **kwargs):
+        """Write chunks through a writer into a new file."""
+        encrypted_path = self._temp_path()
+        with open(encrypted_path, "wb") as sink:
+            with EncryptedFileWriter(sink, self.password, **kwargs) as writer:
+                for chunk in chunks:
+                    writer.write(chunk)
+        return encrypted_path
+
+    def test_output_decrypts_like_a_file(self):
+        """Test that streamed output is a regular encrypted file."""
+        pieces = [self.test_content[i : i + 1000] for i in range(0, 200000, 1000)]
+        pieces.append(self.test_content[200000:])
+        encrypted_path = self._stream(pieces, original_extension=".csv")
+
+        assert self._decrypt(encrypted_path) == self.test_content
+        assert get_file_metadata(encrypted_path)["original_extension"] == ".csv"
+
+    def test_output_supports_random_access(self):
+        """Test that streamed output carries the chunk offset index."""
+        encrypted_path = self._stream([self.test_content])
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            reader.seek(CHUNK_SIZE * 2 + 5)
+            assert reader.read(10) == self.test_content[CHUNK_SIZE * 2 + 5 :][:10]
+
+    @pytest.mark.parametrize("size", [0, 1, CHUNK_SIZE, CHUNK_SIZE * 2])
+    def test_chunk_boundaries(self, size):
+        """Test empty input and inputs ending exactly on a chunk boundary."""
+        self.test_content = os.urandom(size)
+        encrypted_path = self._stream([self.test_content])
+        assert self._decrypt(encrypted_path) == self.test_content
+
+    def test_custom_chunk_size(self):
+        """Test that the writer records and uses a chunk size override."""
+        encrypted_path = self._stream([self.test_content], chunk_size=CHUNK_SIZE * 2)
+        assert get_file_metadata(encrypted_path)["chunk_size"] == CHUNK_SIZE * 2
+        assert self._decrypt(encrypted_path) == self.test_content
+
+    def test_copyfileobj(self):
+        """Test piping a file object with shutil.copyfileobj."""
+        encrypted_path = self._temp_path()
+        with open(encrypted_path, "wb") as sink:
+            with EncryptedFileWriter(sink, self.password) as writer:
+                shutil.copyfileobj(io.BytesIO(self.test_content), writer)
+        assert self._decrypt(encrypted_path) == self.test_content
+
+    def test_tarfile_stream(self):
+        """Test writing a tar stream straight into encryption."""
+        encrypted_path = self._temp_path()
+        with open(encrypted_path, "wb") as sink:
+            with EncryptedFileWriter(sink, self.password) as writer:
+                with tarfile.open(fileobj=writer, mode="w|") as archive:
+                    info = tarfile.TarInfo("report.bin")
+                    info.size = len(self.test_content)
+                    archive.addfile(info, io.BytesIO(self.test_content))
+
+        with tarfile.open(fileobj=io.BytesIO(self._decrypt(encrypted_path))) as archive:
+            assert archive.extractfile("report.bin").read() == self.test_content
+
+    def test_gzip_stream(self):
+        """Test compressing and encrypting in one pass."""
+        encrypted_path = self._temp_path()
+        with open(encrypted_path, "wb") as sink:
+            with EncryptedFileWriter(sink, self.password) as writer:
+                with gzip.GzipFile(fileobj=writer, mode="wb") as compressed:
+                    compressed.write(self.test_content)
+
+        assert gzip.decompress(self._decrypt(encrypted_path)) == self.test_content
+
+    def test_unseekable_sink(self):
+        """Test that sinks without tell() receive a complete file."""
+        sink = _PipeSink()
+        with EncryptedFileWriter(
+            sink, self.password, cipher=CipherAlgorithm.CHACHA20_POLY1305
+        ) as writer:
+            writer.write(self.test_content)
+
+        encrypted_path = self._temp_path(bytes(sink.data))
+        assert get_file_metadata(encrypted_path)["cipher"] == "chacha20-poly1305"
+        with EncryptedFileReader(encrypted_path, self.password) as reader:
+            assert reader.read() == self.test_content
+
+    def test_seekable_sink_records_size(self):
+        """Test that the plaintext size is filled in on seekable sinks."""
+        encrypted_path = self._stream([self.test_content[:1000], self.test_content])
+        metadata = get_file_metadata(encrypted_path)
+        assert metadata["plaintext_size"] == len(self.test_content) + 1000
+        assert metadata["chunk_count"] == 4
+        assert self._decrypt(encrypted_path)[1000:] == self.test_content
+
+    def test_unseekable_sink_size_unknown(self):
+        """Test that pipes get a header with an unknown plaintext size."""
+        sink = _PipeSink()
+        with EncryptedFileWriter(sink, self.password) as writer:
+            writer.write(self.test_content)
+        metadata = get_file_metadata(self._temp_path(bytes(sink.data)))
+        assert metadata["plaintext_size"] is None
+
+    def test_keyfile_mode(self):
+        """Test streaming with a keyfile."""
+        keyfile_path = self._temp_path(b"k" * 64)
+        encrypted_path = self._temp_path()
+        with open(encrypted_path, "wb") as sink:
+            with EncryptedFileWriter(sink, keyfile_path=keyfile_path) as writer:
+                writer.write(self.test_content)
+
+        decrypted_path = self._temp_path()
+        result = decrypt_file_with_keyfile(encrypted_path, keyfile_path, decrypted_path)
+        assert result.success is True
+        with open(decrypted_path, "rb") as f:
+            assert f.read() == self.test_content
+
+    def test_error_leaves_output_unterminated(self):
+        """Test that an exception inside the block does not seal the output."""
+        encrypted_path = self._temp_path()
+        with pytest.raises(RuntimeError):
+            with open(encrypted_path, "wb") as sink:
+                with EncryptedFileWriter(sink, self.password) as writer:
+                    writer.write(self.test_content)
+                    raise RuntimeError("exporter failed")
+
+        result = decrypt_file_with_password(
+            encrypted_path, self.password, self._temp_path()
+        )
+        assert result.success is False
+
+    def test_close_sink(self):
+        """Test that the sink is closed only when requested."""
+        sink = io.BytesIO()
+        EncryptedFileWriter(sink, self.password).close()
+        assert not sink.closed
+
+        EncryptedFileWriter(sink, self.password, close_sink=True).close()
+        assert sink.closed
+
+    def test_write_after_close_fails(self):
+        """Test that a closed writer rejects writes."""
+        writer = EncryptedFileWriter(io.BytesIO(), self.password)
+        writer.close()
+        with pytest.raises(ValueError):
+            writer.write(b"data")